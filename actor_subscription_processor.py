@@ -3,7 +3,8 @@
 import time
 import re
 import json
-from datetime import datetime
+import hashlib
+from datetime import datetime, date, timedelta, timezone
 import logging
 from typing import Optional, Dict, Any, List, Set, Callable, Tuple
 import threading
@@ -19,6 +20,14 @@ import utils
 
 logger = logging.getLogger(__name__)
 
+# --- 演员作品增量检查的自适应节奏 ---
+RECHECK_BASE_INTERVAL = timedelta(days=1)        # 作品列表无变化后的首个检查间隔，之后按无变化次数翻倍
+RECHECK_MAX_INTERVAL = timedelta(days=14)        # 普通演员的最长检查间隔
+RECHECK_DORMANT_INTERVAL = timedelta(days=30)    # 长期无新作 / 已故演员的检查间隔
+RECHECK_SLACK = timedelta(hours=1)               # 提前量，避免定时任务时间抖动导致整整错过一轮
+ACTIVE_WORK_WINDOW_DAYS = 180                    # 近期上映或即将上映的作品落在这个窗口内视为活跃演员
+DORMANT_AFTER_DAYS = 3 * 365                     # 最近一部作品早于这个天数视为长期无新作
+
 class MediaStatus(Enum):
     IN_LIBRARY = 'IN_LIBRARY'
     PENDING_RELEASE = 'PENDING_RELEASE'
@@ -71,21 +80,31 @@ class ActorSubscriptionProcessor:
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
-                    # 我们只需要 id 即可，因为子任务会自己去查详情
-                    cursor.execute("SELECT id FROM actor_subscriptions WHERE status = 'active' ORDER BY actor_name")
-                    subs_to_process = cursor.fetchall()
+                    # 我们只需要 id 即可，因为子任务会自己去查详情；未到 next_check_at 的演员本轮跳过
+                    cursor.execute("""
+                        SELECT id, (next_check_at IS NULL OR next_check_at <= NOW()) AS is_due
+                        FROM actor_subscriptions WHERE status = 'active' ORDER BY actor_name
+                    """)
+                    active_subs = cursor.fetchall()
         except Exception as e:
             logger.error(f"任务调度：获取已启用的订阅列表时失败: {e}", exc_info=True)
             _update_status(-1, "错误：获取订阅列表失败。")
             return
             
-        if not subs_to_process:
+        if not active_subs:
             logger.info("  ➜ 没有找到任何已启用的演员订阅，任务结束。")
             _update_status(100, "没有已启用的演员订阅。")
             return
+
+        subs_to_process = [sub for sub in active_subs if sub['is_due']]
+        skipped_count = len(active_subs) - len(subs_to_process)
+        if not subs_to_process:
+            logger.info(f"  ➜ {len(active_subs)} 个已启用的订阅均未到下次检查时间，任务结束。")
+            _update_status(100, "所有演员订阅均未到检查时间。")
+            return
             
         total_subs = len(subs_to_process)
-        logger.info(f"  ➜ 共找到 {total_subs} 个已启用的订阅需要并发处理。")
+        logger.info(f"  ➜ 共找到 {total_subs} 个到期的订阅需要并发处理 (另有 {skipped_count} 个未到检查时间，本轮跳过)。")
         
         # --- 步骤 2: 一次性预加载所有任务共享的媒体库缓存 ---
         _update_status(5, "正在从本地数据库缓存媒体信息...")
@@ -208,7 +227,8 @@ class ActorSubscriptionProcessor:
 
     def run_full_scan_for_actor(self, subscription_id: int, emby_media_map: Dict[str, str]):
         """
-        - 采用并发模型处理所有新增作品。
+        - 基于上次保存的作品快照做增量扫描：只有新增或筛选相关字段发生变化的作品才会进入筛选。
+        - 作品快照整体哈希未变时直接跳过，并按自适应节奏推迟该演员的下次检查时间。
         - 筛选出满足条件的条目后，统一调用 helpers.process_subscription_items_and_update_db 处理。
         """
         actor_name_for_log = f"订阅ID {subscription_id}"
@@ -216,14 +236,16 @@ class ActorSubscriptionProcessor:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
                     # --- 步骤 1: 获取订阅规则 ---
-                    cursor.execute("SELECT *, last_scanned_tmdb_ids_json FROM actor_subscriptions WHERE id = %s FOR UPDATE", (subscription_id,))
+                    cursor.execute("SELECT * FROM actor_subscriptions WHERE id = %s FOR UPDATE", (subscription_id,))
                     sub = cursor.fetchone()
                     if not sub: return
                     
                     actor_name_for_log = sub.get('actor_name', actor_name_for_log)
                     logger.info(f"--- 开始为演员 '{actor_name_for_log}' 执行作品扫描 ---")
                     
+                    has_scan_record = sub.get('last_scanned_tmdb_ids_json') is not None
                     last_scanned_ids = set(sub.get('last_scanned_tmdb_ids_json') or [])
+                    previous_snapshot = sub.get('credit_snapshot_json') or {}
                     subscription_source = {
                         "type": "actor_subscription", 
                         "id": subscription_id, 
@@ -233,30 +255,44 @@ class ActorSubscriptionProcessor:
 
                     # --- 步骤 2: 获取TMDb全量作品 ---
                     logger.info(f"  ➜ [阶段 1/3] 正在从 TMDb 获取演员 '{sub['actor_name']}' 的所有作品...")
-                    all_works = self._get_and_clean_actor_works(sub['tmdb_person_id'], self.tmdb_api_key)
+                    credits = tmdb.get_person_credits_tmdb(sub['tmdb_person_id'], self.tmdb_api_key)
                     if self.is_stop_requested(): return
-                    if not all_works:
-                        cursor.execute("UPDATE actor_subscriptions SET last_scanned_tmdb_ids_json = '[]' WHERE id = %s", (subscription_id,))
+                    if not credits:
+                        # 请求失败时保留原快照和检查时间，下一轮再试
+                        logger.warning(f"  ➜ 获取演员 '{actor_name_for_log}' 的作品列表失败，本轮跳过。")
                         return
+                    all_works = self._clean_actor_works(credits)
 
                     # --- 步骤 3: 计算差量 ---
-                    current_work_ids = {str(w.get('id')) for w in all_works if w.get('id')}
+                    # 快照必须在筛选之前生成：_process_single_work 会往作品字典里补充番位、季信息
+                    current_snapshot = {str(w['id']): self._credit_fingerprint(w, sub) for w in all_works}
+                    snapshot_hash = self._snapshot_hash(current_snapshot)
+
+                    if has_scan_record and snapshot_hash == sub.get('credit_snapshot_hash'):
+                        unchanged_count = (sub.get('unchanged_check_count') or 0) + 1
+                        next_check_at = self._compute_next_check_at(all_works, credits, unchanged_count)
+                        self._save_scan_state(cursor, subscription_id, current_snapshot, snapshot_hash, unchanged_count, next_check_at)
+                        conn.commit()
+                        logger.info(f"  ➜ 演员 '{actor_name_for_log}' 的作品列表无变化，跳过 (下次检查: {next_check_at.astimezone().strftime('%Y-%m-%d %H:%M')})。")
+                        return
+
+                    current_work_ids = set(current_snapshot)
                     new_work_ids = current_work_ids - last_scanned_ids
                     removed_work_ids = last_scanned_ids - current_work_ids
+                    # 快照升级前的旧记录没有指纹，不视为变化
+                    changed_work_ids = {
+                        tmdb_id for tmdb_id in current_work_ids & last_scanned_ids
+                        if tmdb_id in previous_snapshot and previous_snapshot[tmdb_id] != current_snapshot[tmdb_id]
+                    }
+                    works_to_process = [w for w in all_works if str(w['id']) in new_work_ids or str(w['id']) in changed_work_ids]
                     
-                    works_to_process = [w for w in all_works if str(w.get('id')) in new_work_ids]
-                    
-                    logger.info(f"  ➜ [阶段 1/3] 差量计算完成：发现 {len(new_work_ids)} 部新作品，{len(removed_work_ids)} 部作品已从TMDb移除。")
-
-                    if not works_to_process and not removed_work_ids:
-                        logger.info(f"  ➜ 演员 '{sub['actor_name']}' 的作品列表无变化，跳过。")
-                        return
+                    logger.info(f"  ➜ [阶段 1/3] 差量计算完成：发现 {len(new_work_ids)} 部新作品，{len(changed_work_ids)} 部作品信息有变化，{len(removed_work_ids)} 部作品已从TMDb移除。")
 
                     # --- 步骤 4: 并发筛选作品 ---
                     tmdb_items_to_subscribe = []
                     
                     if works_to_process:
-                        logger.info(f"  ➜ [阶段 2/3] 正在并发筛选 {len(works_to_process)} 部新作品 (检查题材、番位等)...")
+                        logger.info(f"  ➜ [阶段 2/3] 正在并发筛选 {len(works_to_process)} 部新增/变化作品 (检查题材、番位等)...")
                         with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
                             future_to_work = {
                                 executor.submit(self._process_single_work, work, sub): work 
@@ -271,6 +307,7 @@ class ActorSubscriptionProcessor:
                                         tmdb_items_to_subscribe.extend(valid_items)
                                 except Exception as e:
                                     logger.error(f"任务异常: {e}")
+                    if self.is_stop_requested(): return
 
                     # --- 步骤 5: 调用通用 Helper 进行处理 ---
                     if tmdb_items_to_subscribe:
@@ -284,11 +321,12 @@ class ActorSubscriptionProcessor:
                             subscription_source=subscription_source,
                             tmdb_api_key=self.tmdb_api_key
                         )
-                    else:
+                    elif works_to_process:
                         logger.info(f"  ➜ [阶段 3/3] 没有符合订阅条件的新条目。")
 
                     # --- 步骤 6: 清理过时记录 ---
-                    if removed_work_ids:
+                    # 清洗后一部作品都不剩多半是 TMDb 返回不完整，不据此批量解绑
+                    if removed_work_ids and all_works:
                         logger.info(f"  ➜ 发现 {len(removed_work_ids)} 个过时的追踪记录，将为其解绑...")
                         old_items_details = media_db.get_media_details_by_tmdb_ids(list(removed_work_ids))
                         for tmdb_id_to_clean in removed_work_ids:
@@ -296,11 +334,9 @@ class ActorSubscriptionProcessor:
                             if item_info:
                                 request_db.remove_subscription_source(tmdb_id_to_clean, item_info['item_type'], subscription_source)
 
-                    # --- 步骤 7: 更新扫描记录 ---
-                    cursor.execute(
-                        "UPDATE actor_subscriptions SET last_scanned_tmdb_ids_json = %s WHERE id = %s",
-                        (json.dumps(list(current_work_ids)), subscription_id)
-                    )
+                    # --- 步骤 7: 更新扫描记录与下次检查时间 ---
+                    # 作品列表有变化的演员下一轮照常检查，无变化计数清零
+                    self._save_scan_state(cursor, subscription_id, current_snapshot, snapshot_hash, 0, None)
                     
                     conn.commit()
                     logger.info(f"  ➜ 演员 '{actor_name_for_log}' 的扫描更新成功完成 ---")
@@ -308,6 +344,63 @@ class ActorSubscriptionProcessor:
         except Exception as e:
             logger.error(f"为订阅ID {actor_name_for_log} 执行扫描时发生严重错误: {e}", exc_info=True)
 
+    def _save_scan_state(self, cursor, subscription_id: int, snapshot: Dict[str, str], snapshot_hash: str,
+                         unchanged_count: int, next_check_at: Optional[datetime]):
+        cursor.execute(
+            """
+            UPDATE actor_subscriptions SET
+                last_scanned_tmdb_ids_json = %s, credit_snapshot_json = %s, credit_snapshot_hash = %s,
+                unchanged_check_count = %s, last_checked_at = NOW(), next_check_at = %s
+            WHERE id = %s
+            """,
+            (json.dumps(list(snapshot)), json.dumps(snapshot), snapshot_hash, unchanged_count, next_check_at, subscription_id)
+        )
+
+    def _credit_fingerprint(self, work: Dict, sub_config: Dict) -> str:
+        """
+        单部作品的指纹，只包含会影响筛选结果的字段。
+        评分和评价人数每天都在小幅波动，只记录其是否通过评分筛选，避免无意义的重复评估。
+        """
+        payload = [
+            work.get('media_type'),
+            work.get('title') or work.get('name') or '',
+            work.get('release_date') or work.get('first_air_date') or '',
+            sorted(work.get('genre_ids') or []),
+            work.get('order'),
+            self._passes_rating_filter(work, sub_config)[0],
+        ]
+        return hashlib.md5(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+    @staticmethod
+    def _snapshot_hash(snapshot: Dict[str, str]) -> str:
+        return hashlib.sha1(json.dumps(sorted(snapshot.items())).encode('utf-8')).hexdigest()
+
+    def _compute_next_check_at(self, works: List[Dict], person: Dict, unchanged_count: int) -> datetime:
+        """
+        作品列表连续无变化时按自适应节奏推迟下次检查：
+        - 有近期/即将上映作品的活跃演员：固定按基础间隔检查。
+        - 已故或最近一部作品已很久远的演员：按长间隔检查。
+        - 其余演员：基础间隔按连续无变化次数翻倍，封顶 RECHECK_MAX_INTERVAL。
+        """
+        today = date.today()
+        latest_date = None
+        for work in works:
+            try:
+                work_date = date.fromisoformat(work.get('release_date') or work.get('first_air_date'))
+            except (TypeError, ValueError):
+                continue
+            if latest_date is None or work_date > latest_date:
+                latest_date = work_date
+
+        if latest_date and latest_date >= today - timedelta(days=ACTIVE_WORK_WINDOW_DAYS):
+            interval = RECHECK_BASE_INTERVAL
+        elif person.get('deathday') or latest_date is None or latest_date < today - timedelta(days=DORMANT_AFTER_DAYS):
+            interval = RECHECK_DORMANT_INTERVAL
+        else:
+            interval = min(RECHECK_BASE_INTERVAL * (2 ** min(max(unchanged_count - 1, 0), 8)), RECHECK_MAX_INTERVAL)
+
+        return datetime.now(timezone.utc) + interval - RECHECK_SLACK
+
     
     def _filter_work_and_get_reason(self, work: Dict, sub_config, check_order: bool = True) -> Tuple[bool, Optional[str]]:
         """
@@ -350,17 +443,9 @@ class ActorSubscriptionProcessor:
 
         # --- 筛选 4: 评分和评价人数 ---
         # 检查作品的评分是否高于用户设置的阈值，同时考虑评价人数是否过少。
-        config_min_rating = sub_config['config_min_rating']
-        if config_min_rating > 0:
-            tmdb_rating = work.get('vote_average', 0.0)
-            vote_count = work.get('vote_count', 0)
-            min_vote_count_threshold = sub_config.get('config_min_vote_count', 10)
-            
-            # 如果评价人数不足或评分为0，则豁免评分检查
-            is_exempted = (vote_count < min_vote_count_threshold) or (tmdb_rating == 0.0)
-            
-            if not is_exempted and tmdb_rating < config_min_rating:
-                return False, f"评分过低 ({tmdb_rating:.1f}, {vote_count}人评价)"
+        is_rating_ok, rating_reason = self._passes_rating_filter(work, sub_config)
+        if not is_rating_ok:
+            return False, rating_reason
 
         # --- 筛选 5: 中文片名 ---
         # 检查作品的标题是否至少包含一个中文字符。
@@ -383,6 +468,20 @@ class ActorSubscriptionProcessor:
         # 如果所有检查都通过了，就返回 True
         return True, None
 
+    def _passes_rating_filter(self, work: Dict, sub_config) -> Tuple[bool, Optional[str]]:
+        config_min_rating = sub_config['config_min_rating']
+        if config_min_rating > 0:
+            tmdb_rating = work.get('vote_average', 0.0)
+            vote_count = work.get('vote_count', 0)
+            min_vote_count_threshold = sub_config.get('config_min_vote_count', 10)
+            
+            # 如果评价人数不足或评分为0，则豁免评分检查
+            is_exempted = (vote_count < min_vote_count_threshold) or (tmdb_rating == 0.0)
+            
+            if not is_exempted and tmdb_rating < config_min_rating:
+                return False, f"评分过低 ({tmdb_rating:.1f}, {vote_count}人评价)"
+        return True, None
+
     def _enrich_works_with_order(self, works: List[Dict], tmdb_person_id: int, api_key: str) -> List[Dict]:
         """
         【新增】通过并发请求，为演员的作品列表补充其在作品中的 'order' 字段。
@@ -463,14 +562,10 @@ class ActorSubscriptionProcessor:
         details = tmdb.get_tv_details(media_id, api_key, append_to_response="credits")
         return details
         
-    def _get_and_clean_actor_works(self, tmdb_person_id: int, api_key: str) -> List[Dict[str, Any]]:
+    def _clean_actor_works(self, credits: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
-        一个集成的函数，负责从TMDb获取演员作品，并立即进行垃圾过滤和去重。
+        对 TMDb 返回的演员作品 (get_person_credits_tmdb 的结果) 进行垃圾过滤和去重。
         """
-        credits = tmdb.get_person_credits_tmdb(tmdb_person_id, api_key)
-        if not credits:
-            return []
-
         movie_works = credits.get('movie_credits', {}).get('cast', [])
         tv_works = credits.get('tv_credits', {}).get('cast', [])
         
@@ -197,6 +197,8 @@ DYNAMIC_CONFIG_DEF = {
     constants.CONFIG_OPTION_115_MEDIA_ROOT_CID: (constants.CONFIG_SECTION_115, 'string', "0"),
     constants.CONFIG_OPTION_115_MEDIA_ROOT_NAME: (constants.CONFIG_SECTION_115, 'string', "媒体库"),
     constants.CONFIG_OPTION_115_COPY_PLAY_ENABLED: (constants.CONFIG_SECTION_115, 'boolean', False),
+    constants.CONFIG_OPTION_115_RELAY_CACHE_MAX_MB: (constants.CONFIG_SECTION_115, 'int', constants.DEFAULT_115_RELAY_CACHE_MAX_MB),
+    constants.CONFIG_OPTION_115_FFPROBE_CONCURRENCY: (constants.CONFIG_SECTION_115, 'int', constants.DEFAULT_115_FFPROBE_CONCURRENCY),
     constants.CONFIG_OPTION_LOCAL_STRM_ROOT: (constants.CONFIG_SECTION_115, 'string', "/mnt/media"),
     constants.CONFIG_OPTION_ETK_SERVER_URL: (constants.CONFIG_SECTION_115, 'string', "http://192.168.1.X:5257"),
     constants.CONFIG_OPTION_115_ENABLE_SYNC_DELETE: (constants.CONFIG_SECTION_115, 'boolean', False),
@@ -218,6 +220,7 @@ DYNAMIC_CONFIG_DEF = {
     constants.CONFIG_OPTION_KEYWORD_TO_TAGS: ("General", 'boolean', False),
     constants.CONFIG_OPTION_STUDIO_TO_CHINESE: ("General", 'boolean', False),
     constants.CONFIG_OPTION_GENERATE_COLLECTION_NFO: ("General", 'boolean', False),
+    constants.CONFIG_OPTION_CUSTOM_COLLECTION_REFRESH_WORKERS: ("General", 'int', constants.DEFAULT_CUSTOM_COLLECTION_REFRESH_WORKERS),
 
     # [Network] 
     constants.CONFIG_OPTION_NETWORK_PROXY_ENABLED: (constants.CONFIG_SECTION_NETWORK, 'boolean', False),
@@ -60,6 +60,10 @@ CONFIG_OPTION_115_MIN_VIDEO_SIZE = "p115_min_video_size"         # 忽略小视
 CONFIG_OPTION_115_EXTENSIONS = "p115_extensions"                 # 115转存/上传的文件扩展名列表
 CONFIG_OPTION_115_MEDIA_ROOT_CID = "p115_media_root_cid"         # 115网盘媒体库根目录CID
 CONFIG_OPTION_115_COPY_PLAY_ENABLED = "p115_copy_play_enabled"   # 是否启用复制播放
+CONFIG_OPTION_115_RELAY_CACHE_MAX_MB = "p115_relay_cache_max_mb" # Emby 服务端探测中转块缓存上限(MB)，0 为关闭
+DEFAULT_115_RELAY_CACHE_MAX_MB = 2048
+CONFIG_OPTION_115_FFPROBE_CONCURRENCY = "p115_ffprobe_concurrency" # 115 直链 ffprobe 全局并发数
+DEFAULT_115_FFPROBE_CONCURRENCY = 2
 CONFIG_OPTION_LOCAL_STRM_ROOT = "local_strm_root"                # 本地生成.strm的根目录
 CONFIG_OPTION_ETK_SERVER_URL = "etk_server_url"                  # ETK服务器地址 (用于strm文件内)
 CONFIG_OPTION_115_ENABLE_SYNC_DELETE = "p115_enable_sync_delete" # 是否联动删除网盘文件
@@ -131,6 +135,8 @@ CONFIG_OPTION_REMOVE_ACTORS_WITHOUT_AVATARS = "remove_actors_without_avatars" #
 CONFIG_OPTION_KEYWORD_TO_TAGS = "keyword_to_tags"               # 关键词写入标签 
 CONFIG_OPTION_STUDIO_TO_CHINESE = "studio_to_chinese"           # 是否将工作室/电视网名称转换为中文
 CONFIG_OPTION_GENERATE_COLLECTION_NFO = "generate_collection_nfo" # 是否在电影NFO中生成合集信息  
+CONFIG_OPTION_CUSTOM_COLLECTION_REFRESH_WORKERS = "custom_collection_refresh_workers" # 批量刷新榜单合集的并发数
+DEFAULT_CUSTOM_COLLECTION_REFRESH_WORKERS = 4                   # 默认并发数，1 代表逐个串行刷新
 
 # ==============================================================================
 # ✨ 外部API与数据源配置 (External APIs & Data Sources)
@@ -18,7 +18,7 @@ import psycopg2
 from handler.custom_collection import RecommendationEngine
 import config_manager
 from database.connection import get_db_connection
-from database import media_db, settings_db
+from database import media_db, settings_db, latest_feed_db, people_mirror_db
 import handler.emby as emby
 import handler.tmdb as tmdb
 from tasks.helpers import parse_full_asset_details, calculate_ancestor_ids, construct_metadata_payload, extract_top_directors, translate_tmdb_metadata_recursively
@@ -34,6 +34,7 @@ from ai_translator import AITranslator
 from watchlist_processor import WatchlistProcessor
 from handler.douban import DoubanApi
 import nfo_builder
+import handler.nfo_writer as nfo_writer
 logger = logging.getLogger(__name__)
 try:
     from handler.douban import DoubanApi
@@ -2532,6 +2533,9 @@ class MediaProcessor:
             
             execute_batch(cursor, sql, data_for_batch)
             logger.info(f"  ➜ 成功将 {len(data_for_batch)} 条层级元数据记录批量写入数据库。")
+            if not is_pending:
+                # 入库/重处理改变了在库内容，首页“最新”物化视图随本事务一起失效
+                latest_feed_db.mark_latest_feed_stale(cursor)
 
         except Exception as e:
             logger.error(f"批量写入层级元数据到数据库时失败: {e}", exc_info=True)
@@ -3069,6 +3073,7 @@ class MediaProcessor:
                         del self.processed_items_cache[deleted_item_id]
                     logger.debug(f"  ➜ 已从 '已处理' 中移除 ItemID: {deleted_item_id}")
                 conn.commit()
+                people_mirror_db.delete_item_links(list(deleted_items_to_clean))
                 logger.info("  ➜ 已删除媒体项的清理工作完成。")
             else:
                 logger.info("  ➜ 未发现需要从 '已处理' 中清理的已删除媒体项。")
@@ -3154,12 +3159,16 @@ class MediaProcessor:
                 logger.warning(f"  ➜ 无法确定 '{item_details.get('Name')}' 所属的媒体库ID。")
 
         # 4. 将任务交给核心处理函数
-        return self._process_item_core_logic(
+        result = self._process_item_core_logic(
             item_details_from_emby=item_details,
             force_full_update=force_full_update,
             specific_episode_ids=specific_episode_ids,
             media_info_only=media_info_only
         )
+        # 5. 演员表可能已被改写：登记到人物镜像，下次同步时定点刷新
+        if result and not media_info_only:
+            people_mirror_db.mark_items_dirty([emby_item_id] + list(specific_episode_ids or []))
+        return result
 
     # ---核心处理流程 ---
     def _process_item_core_logic(self, item_details_from_emby: Dict[str, Any], force_full_update: bool = False, specific_episode_ids: Optional[List[str]] = None, media_info_only: bool = False):
@@ -5228,36 +5237,9 @@ class MediaProcessor:
         if self._extract_season_from_path_or_text(os.path.basename(episode_dir)) is not None:
             series_root_dir = os.path.dirname(episode_dir)
 
-        # --- 智能比稳写入函数 ---
+        # --- 哈希清单写入：内容未变的 NFO 不读不写 ---
         def _write_nfo_if_changed(file_path: str, content: str) -> bool:
-            # ★ 核心修复：如果开启了强制写入，直接跳过比对！
-            if not force_write and os.path.exists(file_path):
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        old_content = f.read()
-                    
-                    def _get_tag_text(xml_str, tag):
-                        match = re.search(f'<{tag}[^>]*>(.*?)</{tag}>', xml_str, re.IGNORECASE | re.DOTALL)
-                        return match.group(1).strip() if match else ""
-
-                    old_title = _get_tag_text(old_content, 'title')
-                    old_plot = _get_tag_text(old_content, 'plot')
-                    new_title = _get_tag_text(content, 'title')
-                    new_plot = _get_tag_text(content, 'plot')
-
-                    if old_title == new_title and old_plot == new_plot:
-                        return False 
-                except Exception:
-                    pass 
-            
-            # 执行写入
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                return True
-            except Exception as e:
-                logger.error(f"  ➜ 写入 NFO 失败 {file_path}: {e}")
-                return False
+            return nfo_writer.write_if_changed(file_path, content, force=force_write)
 
         try:
             if item_type == "Movie":
@@ -5267,19 +5249,16 @@ class MediaProcessor:
                 if not movie_files:
                     movie_files = [media_path]
 
-                generated_count = 0
-                skipped_count = 0
-
-                for movie_file in movie_files:
-                    nfo_path = os.path.splitext(movie_file)[0] + ".nfo"
+                if len(movie_files) == 1:
+                    nfo_path = os.path.splitext(movie_files[0])[0] + ".nfo"
                     if _write_nfo_if_changed(nfo_path, nfo_content):
-                        generated_count += 1
                         logger.info(f"  ➜ 成功写入电影 NFO: {nfo_path}")
                     else:
-                        skipped_count += 1
                         logger.debug(f"  ➜ 电影 NFO 内容未变，跳过写入: {nfo_path}")
-
-                if len(movie_files) > 1:
+                else:
+                    generated_count, skipped_count = nfo_writer.write_many(
+                        [(os.path.splitext(f)[0] + ".nfo", nfo_content) for f in movie_files], force=force_write
+                    )
                     logger.info(
                         f"  ➜ 电影多版本 NFO 生成完成：实际更新 {generated_count} 个，跳过 {skipped_count} 个未变更。"
                     )
@@ -5329,8 +5308,7 @@ class MediaProcessor:
                 
                 if episodes_data and os.path.isdir(series_root_dir):
                     valid_exts = {'.mp4', '.mkv', '.avi', '.ts', '.iso', '.rmvb', '.strm'}
-                    generated_count = 0
-                    skipped_count = 0
+                    nfo_jobs = []
                     season_dirs_processed = set()
 
                     # ★★★ 新增：获取无头像过滤开关 ★★★
@@ -5369,9 +5347,7 @@ class MediaProcessor:
                                 if root_dir not in season_dirs_processed:
                                     if season_info:
                                         season_nfo_content = nfo_builder.build_season_nfo(season_info)
-                                        season_nfo_path = os.path.join(root_dir, "season.nfo")
-                                        if _write_nfo_if_changed(season_nfo_path, season_nfo_content):
-                                            logger.info(f"  ➜ 成功写入季 NFO: {season_nfo_path}")
+                                        nfo_jobs.append((os.path.join(root_dir, "season.nfo"), season_nfo_content))
                                     season_dirs_processed.add(root_dir)
 
                                 ep_list = episodes_data.values() if isinstance(episodes_data, dict) else (episodes_data if isinstance(episodes_data, list) else [])
@@ -5421,11 +5397,10 @@ class MediaProcessor:
                                     ep_nfo_content = nfo_builder.build_episode_nfo(dummy_ep, final_ep_cast)
 
                                 ep_nfo_path = os.path.join(root_dir, os.path.splitext(filename)[0] + ".nfo")
-                                
-                                if _write_nfo_if_changed(ep_nfo_path, ep_nfo_content):
-                                    generated_count += 1
-                                else:
-                                    skipped_count += 1
+                                nfo_jobs.append((ep_nfo_path, ep_nfo_content))
+
+                    # 季/分集 NFO 统一按目录批量写入 (有界 I/O 线程池并发)
+                    generated_count, skipped_count = nfo_writer.write_many(nfo_jobs, force=force_write)
                     logger.info(f"  ➜ 生成NFO完成，实际更新了 {generated_count} 个 NFO (跳过了 {skipped_count} 个未变更的)。")
 
             elif item_type == "Episode":
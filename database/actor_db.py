@@ -523,9 +523,18 @@ def update_actor_subscription(subscription_id: int, data: dict) -> bool:
                 cursor.execute(sql, params)
                 logger.info(f"  ➜ 成功更新订阅ID {subscription_id} 的配置。")
 
+                # 暂停后重新启用的订阅，下次定时任务立即检查，不再沿用暂停前排好的检查时间
+                if data.get('status') == 'active' and current_sub['status'] != 'active':
+                    cursor.execute("UPDATE actor_subscriptions SET next_check_at = NULL WHERE id = %s", (subscription_id,))
+
                 if final_config != old_config_snapshot:
                     logger.info(f"  ➜ 检测到订阅ID {subscription_id} 的筛选配置发生变更，将重置检查时间并清理历史忽略记录...")
-                    cursor.execute("UPDATE actor_subscriptions SET last_scanned_tmdb_ids_json = NULL WHERE id = %s", (subscription_id,))
+                    cursor.execute("""
+                        UPDATE actor_subscriptions SET
+                            last_scanned_tmdb_ids_json = NULL, credit_snapshot_json = NULL, credit_snapshot_hash = NULL,
+                            unchanged_check_count = 0, next_check_at = NULL
+                        WHERE id = %s
+                    """, (subscription_id,))
 
                     source_to_remove = {"type": "actor_subscription", "id": subscription_id}
                     source_filter = json.dumps([source_to_remove])
@@ -139,6 +139,118 @@ def init_db():
                     )
                 """)
 
+                logger.trace("  ➜ 正在创建 'user_sync_state' 表 (用户数据增量同步水位)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS user_sync_state (
+                        user_id TEXT PRIMARY KEY,
+                        last_synced_at TIMESTAMP WITH TIME ZONE,
+                        last_full_sync_at TIMESTAMP WITH TIME ZONE,
+                        dirty_since TIMESTAMP WITH TIME ZONE
+                    )
+                """)
+
+                logger.trace("  ➜ 正在创建 'user_latest_feed' 表 (用户 × 虚拟库的最新项目物化视图)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS user_latest_feed (
+                        user_id TEXT NOT NULL,
+                        collection_id INTEGER NOT NULL,
+                        emby_item_id TEXT NOT NULL,
+                        date_added TIMESTAMP WITH TIME ZONE,
+                        PRIMARY KEY (user_id, collection_id, emby_item_id)
+                    )
+                """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS user_latest_feed_state (
+                        user_id TEXT NOT NULL,
+                        collection_id INTEGER NOT NULL,
+                        built_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                        invalidated_at TIMESTAMP WITH TIME ZONE,
+                        PRIMARY KEY (user_id, collection_id)
+                    )
+                """)
+
+                logger.trace("  ➜ 正在创建 'emby_persons' / 'emby_person_item_links' 表 (Emby 人物与作品关联的本地镜像)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS emby_persons (
+                        emby_person_id TEXT PRIMARY KEY,
+                        name TEXT,
+                        tmdb_person_id TEXT,
+                        details_synced_at TIMESTAMP WITH TIME ZONE,  -- NULL = 需要向 Emby 补全 ProviderIds
+                        updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+                    )
+                """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS emby_person_item_links (
+                        emby_item_id TEXT NOT NULL,
+                        emby_person_id TEXT NOT NULL,
+                        item_type TEXT,
+                        library_id TEXT,
+                        person_type TEXT,
+                        role TEXT,
+                        synced_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                        PRIMARY KEY (emby_item_id, emby_person_id)
+                    )
+                """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS emby_people_dirty_items (
+                        emby_item_id TEXT PRIMARY KEY,
+                        queued_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+                    )
+                """)
+
+                logger.trace("  ➜ 正在创建 'playback_events' 表 (播放流水，只追加)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS playback_events (
+                        id BIGSERIAL PRIMARY KEY,
+                        event_type TEXT NOT NULL,          -- 'start' / 'stop'
+                        event_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                        user_id TEXT NOT NULL,
+                        user_name TEXT,
+                        item_id TEXT NOT NULL,
+                        item_type TEXT,
+                        item_name TEXT,
+                        series_id TEXT,
+                        series_name TEXT,
+                        season_number INTEGER,
+                        episode_number INTEGER,
+                        play_session_id TEXT,
+                        client TEXT,
+                        device_name TEXT,
+                        position_ticks BIGINT,
+                        play_duration_sec INTEGER DEFAULT 0, -- 仅 stop 事件：本次播放时长
+                        played_to_completion BOOLEAN
+                    )
+                """)
+
+                logger.trace("  ➜ 正在创建 'playback_daily_user' 表 (按天/用户/类型 汇总播放)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS playback_daily_user (
+                        day DATE NOT NULL,
+                        user_id TEXT NOT NULL,
+                        item_type TEXT NOT NULL,
+                        user_name TEXT,
+                        play_count INTEGER DEFAULT 0,
+                        duration_sec BIGINT DEFAULT 0,
+                        PRIMARY KEY (day, user_id, item_type)
+                    )
+                """)
+
+                logger.trace("  ➜ 正在创建 'playback_daily_item' 表 (按天/项目 汇总播放)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS playback_daily_item (
+                        day DATE NOT NULL,
+                        item_id TEXT NOT NULL,
+                        item_type TEXT,
+                        item_name TEXT,
+                        series_id TEXT,
+                        series_name TEXT,
+                        play_count INTEGER DEFAULT 0,
+                        user_count INTEGER DEFAULT 0,  -- 当天观看过的不同用户数
+                        duration_sec BIGINT DEFAULT 0,
+                        PRIMARY KEY (day, item_id)
+                    )
+                """)
+
                 logger.trace("  ➜ 正在创建 'collections_info' 表 ...")
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS collections_info (
@@ -168,7 +280,48 @@ def init_db():
                         item_type TEXT,
                         in_library_count INTEGER DEFAULT 0,
                         generated_media_info_json JSONB,
-                        sort_order INTEGER NOT NULL DEFAULT 0
+                        sort_order INTEGER NOT NULL DEFAULT 0,
+                        cover_version TEXT,
+                        cover_updated_at TIMESTAMP WITH TIME ZONE
+                    )
+                """)
+
+                logger.trace("  ➜ 正在创建 'list_title_match_cache' 表 (榜单标题匹配记忆)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS list_title_match_cache (
+                        norm_title TEXT NOT NULL,              -- 规范化后的榜单标题
+                        year TEXT NOT NULL DEFAULT '',         -- 榜单给出的年份，无年份为空串
+                        item_type TEXT NOT NULL,               -- 请求匹配的类型 'Movie' / 'Series'
+                        tmdb_id TEXT,                          -- NULL 表示短期的“未匹配”记忆
+                        matched_type TEXT,
+                        season_number INTEGER,
+                        confidence TEXT NOT NULL,              -- 'local' / 'exact' / 'contains' / 'fallback' / 'none'
+                        source_title TEXT,
+                        hit_count INTEGER NOT NULL DEFAULT 0,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                        expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                        PRIMARY KEY (norm_title, year, item_type)
+                    )
+                """)
+
+                logger.trace("  ➜ 正在创建 'douban_api_cache' 表 (豆瓣接口响应缓存)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS douban_api_cache (
+                        cache_key TEXT PRIMARY KEY,            -- sha1(方法 + 接口路径 + 规范化参数)
+                        endpoint TEXT NOT NULL,                -- 'subject_detail' / 'celebrities' / 'celebrity_detail' / 'search' / 'imdbid'
+                        response_json JSONB NOT NULL,
+                        hit_count INTEGER NOT NULL DEFAULT 0,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                        expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+                    )
+                """)
+
+                logger.trace("  ➜ 正在创建 'cover_render_signatures' 表 (封面生成输入指纹)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS cover_render_signatures (
+                        target_id TEXT PRIMARY KEY,            -- 媒体库 / 合集的 Emby ID
+                        signature TEXT NOT NULL,               -- sha1(风格配置 + 标题 + 角标 + 成员海报 ID/Tag)
+                        rendered_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
                     )
                 """)
 
@@ -232,6 +385,7 @@ def init_db():
                         paused_until DATE,
                         force_ended BOOLEAN DEFAULT FALSE,
                         watchlist_last_checked_at TIMESTAMP WITH TIME ZONE,
+                        watchlist_next_check_at TIMESTAMP WITH TIME ZONE, -- 常规追剧任务下次检查时间 (NULL = 立即)
                         watchlist_tmdb_status TEXT,
                         watchlist_next_episode_json JSONB,
                         watchlist_missing_info_json JSONB,
@@ -249,6 +403,7 @@ def init_db():
 
                         -- 内部管理字段
                         last_synced_at TIMESTAMP WITH TIME ZONE,
+                        content_hash TEXT, -- 元数据缓存任务写入内容的哈希，用于跳过未变化的行
                         created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
 
                         -- 主键
@@ -265,6 +420,18 @@ def init_db():
                     )
                 """)
 
+                logger.trace("  ➜ 正在创建 'subscribe_assistant_state_items' 表 (订阅助手行级状态)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS subscribe_assistant_state_items (
+                        state_key TEXT NOT NULL,
+                        item_key TEXT NOT NULL,
+                        item_json JSONB NOT NULL DEFAULT '{}'::jsonb,
+                        updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                        claimed_until TIMESTAMP WITH TIME ZONE,
+                        PRIMARY KEY (state_key, item_key)
+                    )
+                """)
+
                 logger.trace("  ➜ 正在创建 'subscribe_assistant_snapshots' 表...")
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS subscribe_assistant_snapshots (
@@ -331,7 +498,11 @@ def init_db():
                         config_genres_exclude_json JSONB,
                         status TEXT DEFAULT 'active',
                         last_scanned_tmdb_ids_json JSONB,
+                        credit_snapshot_json JSONB,
+                        credit_snapshot_hash TEXT,
+                        unchanged_check_count INTEGER NOT NULL DEFAULT 0,
                         last_checked_at TIMESTAMP WITH TIME ZONE,
+                        next_check_at TIMESTAMP WITH TIME ZONE,
                         added_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
                         config_min_rating REAL DEFAULT 6.0,
                         config_main_role_only BOOLEAN NOT NULL DEFAULT FALSE,
@@ -498,6 +669,7 @@ def init_db():
                         size BIGINT DEFAULT 0,
                         washing_level INTEGER,
                         washing_snapshot_json JSONB DEFAULT '{}'::jsonb,
+                        sync_gen BIGINT,               -- 目录树同步代号，用于识别失效缓存
                         updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(), -- 最后同步时间
                         
                         -- 复合唯一约束：同一个父目录下不能有同名文件 (用于快速查找)
@@ -506,6 +678,23 @@ def init_db():
                     )
                 """)
 
+                logger.trace("  ➜ 正在创建 'p115_strm_manifest' 表 (全量 STRM/字幕 生成清单)...")
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS p115_strm_manifest (
+                        local_path TEXT PRIMARY KEY,   -- 本地生成文件的绝对路径
+                        kind TEXT NOT NULL,            -- 'strm' / 'sub'
+                        target_cid TEXT,               -- 所属分类目录 CID
+                        fid TEXT,
+                        pick_code TEXT,
+                        sha1 TEXT,
+                        rel_path TEXT,                 -- 相对分类根的 115 路径
+                        content_hash TEXT,             -- STRM 内容哈希
+                        mtime DOUBLE PRECISION,        -- 写入后的本地 mtime
+                        file_size BIGINT DEFAULT 0,    -- 写入后的本地文件大小
+                        updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+                    )
+                """)
+
                 logger.trace("  ➜ 正在创建 'p115_mediainfo_cache' 表 (独立媒体信息指纹库)...")
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS p115_mediainfo_cache (
@@ -728,7 +917,8 @@ def init_db():
                             "pick_code": "TEXT",
                             "size": "BIGINT DEFAULT 0",
                             "washing_level": "INTEGER",
-                            "washing_snapshot_json": "JSONB DEFAULT '{}'::jsonb"
+                            "washing_snapshot_json": "JSONB DEFAULT '{}'::jsonb",
+                            "sync_gen": "BIGINT"
                         },
                         'p115_mediainfo_cache': {
                             "raw_ffprobe_json": "JSONB"
@@ -749,7 +939,12 @@ def init_db():
                             "tagline": "TEXT",
                             "watchlist_version_lock_json": "JSONB DEFAULT '{}'::jsonb",
                             "washing_level": "INTEGER",
-                            "washing_snapshot_json": "JSONB DEFAULT '{}'::jsonb"
+                            "washing_snapshot_json": "JSONB DEFAULT '{}'::jsonb",
+                            "content_hash": "TEXT",
+                            "watchlist_next_check_at": "TIMESTAMP WITH TIME ZONE"
+                        },
+                        'subscribe_assistant_state_items': {
+                            "claimed_until": "TIMESTAMP WITH TIME ZONE"
                         },
                         'subscribe_assistant_snapshots': {
                             "last_checked_at": "TIMESTAMP WITH TIME ZONE"
@@ -759,6 +954,10 @@ def init_db():
                             "resubscribe_source": "TEXT DEFAULT 'moviepilot'", 
                             "resubscribe_entire_season": "BOOLEAN DEFAULT FALSE"
                         },
+                        'custom_collections': {
+                            "cover_version": "TEXT",
+                            "cover_updated_at": "TIMESTAMP WITH TIME ZONE"
+                        },
                         'collections_info': {
                             "poster_path": "TEXT",
                             "all_tmdb_ids_json": "JSONB",
@@ -777,7 +976,11 @@ def init_db():
                         'actor_subscriptions': {
                             "config_main_role_only": "BOOLEAN NOT NULL DEFAULT FALSE",
                             "config_min_vote_count": "INTEGER NOT NULL DEFAULT 10",
-                            "last_scanned_tmdb_ids_json": "JSONB"
+                            "last_scanned_tmdb_ids_json": "JSONB",
+                            "credit_snapshot_json": "JSONB",
+                            "credit_snapshot_hash": "TEXT",
+                            "unchanged_check_count": "INTEGER NOT NULL DEFAULT 0",
+                            "next_check_at": "TIMESTAMP WITH TIME ZONE"
                         }
                     }
 
@@ -824,6 +1027,8 @@ def init_db():
                     cursor.execute("CREATE INDEX IF NOT EXISTS idx_mm_parent_series_season ON media_metadata (parent_series_tmdb_id, season_number);")
                     # 加速 "只看电影" 或 "只看剧集" 的筛选
                     cursor.execute("CREATE INDEX IF NOT EXISTS idx_mm_item_type ON media_metadata (item_type);")
+                    # 追剧调度：常规追剧任务只挑选到期的活跃剧集
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mm_watchlist_next_check ON media_metadata (watchlist_next_check_at NULLS FIRST) WHERE item_type = 'Series' AND watching_status IN ('Watching', 'Pending', 'Paused');")
                     # 加速 resubscribe_index 表的查询
                     cursor.execute("CREATE INDEX IF NOT EXISTS idx_ri_tmdb_type ON resubscribe_index (tmdb_id, item_type);")
 
@@ -919,6 +1124,18 @@ def init_db():
                     cursor.execute("ALTER TABLE p115_filesystem_cache DROP COLUMN IF EXISTS preid;")
 
                     cursor.execute("CREATE INDEX IF NOT EXISTS idx_shared_credit_ledger_created ON shared_credit_ledger_local (created_at DESC);")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ltmc_expires ON list_title_match_cache (expires_at);")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_playback_events_user_time ON playback_events (user_id, event_at DESC);")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_latest_feed_user_date ON user_latest_feed (user_id, date_added DESC);")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_epil_person ON emby_person_item_links (emby_person_id);")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_douban_api_cache_expires ON douban_api_cache (expires_at);")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_emby_persons_tmdb ON emby_persons (tmdb_person_id) WHERE tmdb_person_id IS NOT NULL;")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_playback_events_session ON playback_events (play_session_id) WHERE play_session_id IS NOT NULL;")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_playback_events_user_item ON playback_events (user_id, item_id, event_at DESC);")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_playback_events_stop_time ON playback_events (event_at) WHERE event_type = 'stop';")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_playback_daily_user_user ON playback_daily_user (user_id, day);")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_p115_strm_manifest_fid ON p115_strm_manifest (fid);")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_p115_strm_manifest_target ON p115_strm_manifest (target_cid);")
 
                     # 13. 【海量数据优化】加速追剧列表的聚合查询
                     cursor.execute("CREATE INDEX IF NOT EXISTS idx_mm_type_parent ON media_metadata (item_type, parent_series_tmdb_id);")
@@ -0,0 +1,46 @@
+# database/cover_db.py
+import logging
+from typing import Optional
+
+import psycopg2
+
+from .connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# ======================================================================
+# 模块: 封面生成输入指纹
+# ----------------------------------------------------------------------
+# 记录每个媒体库 / 合集上次成功上传封面时的输入指纹，输入不变时跳过重新生成。
+# ======================================================================
+
+
+def get_cover_signature(target_id: str) -> Optional[str]:
+    """ 读取上次成功生成封面时的输入指纹。"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT signature FROM cover_render_signatures WHERE target_id = %s", (target_id,))
+            row = cursor.fetchone()
+            return row['signature'] if row else None
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 读取封面指纹 (ID: {target_id}) 时出错: {e}")
+        return None
+
+
+def save_cover_signature(target_id: str, signature: str):
+    """ 封面上传成功后记录输入指纹。"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO cover_render_signatures (target_id, signature, rendered_at)
+                VALUES (%s, %s, NOW())
+                ON CONFLICT (target_id) DO UPDATE SET
+                    signature = EXCLUDED.signature,
+                    rendered_at = NOW()
+            """, (target_id, signature))
+            conn.commit()
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 保存封面指纹 (ID: {target_id}) 时出错: {e}")
+
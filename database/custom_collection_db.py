@@ -7,6 +7,7 @@ from typing import Optional, Dict, Any, List
 
 from .connection import get_db_connection
 from . import media_db, request_db
+from .latest_feed_db import mark_latest_feed_stale, delete_collection_feed
 import config_manager
 import constants
 import handler.tmdb as tmdb
@@ -76,8 +77,10 @@ def update_custom_collection(collection_id: int, name: str, type: str, definitio
             cursor = conn.cursor()
             # ★★★ 2. 在执行时传入新参数 ★★★
             cursor.execute(sql, (name, type, definition_json, status, allowed_user_ids_json, collection_id))
+            updated = cursor.rowcount > 0
+            mark_latest_feed_stale(cursor, collection_id=collection_id)
             conn.commit()
-            return cursor.rowcount > 0
+            return updated
     except psycopg2.Error as e:
         logger.error(f"更新自定义合集 ID {collection_id} 时出错: {e}", exc_info=True)
         return False
@@ -88,8 +91,10 @@ def delete_custom_collection(collection_id: int) -> bool:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM custom_collections WHERE id = %s", (collection_id,))
+            deleted = cursor.rowcount > 0
+            delete_collection_feed(cursor, collection_id)
             conn.commit()
-            return cursor.rowcount > 0
+            return deleted
     except psycopg2.Error as e:
         logger.error(f"删除自定义合集 (ID: {collection_id}) 时出错: {e}", exc_info=True)
         raise
@@ -137,6 +142,8 @@ def update_custom_collection_sync_results(collection_id: int, update_data: Dict[
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(sql, tuple(values))
+            # 榜单成员变化会影响“最新”视图
+            mark_latest_feed_stale(cursor, collection_id=collection_id)
             conn.commit()
     except psycopg2.Error as e:
         logger.error(f"更新自定义合集 {collection_id} 的同步结果时出错: {e}", exc_info=True)
@@ -318,6 +325,10 @@ def apply_and_persist_media_correction(collection_id: int, old_tmdb_id: Optional
             # 提交事务
             conn.commit()
             logger.info(f"  ➜ 成功为合集 {collection_id} 应用修正：Key='{correction_key}' -> {new_tmdb_id} (季: {season_number})")
+
+            # 旧 ID 被人工判定为错配，清掉指向它的标题匹配记忆，下次刷新重新匹配
+            if old_tmdb_id and str(old_tmdb_id) != str(new_tmdb_id):
+                invalidate_list_title_matches_for_tmdb_id(old_tmdb_id)
             return corrected_item_for_return
 
     except Exception as e:
@@ -590,6 +601,21 @@ def get_custom_collection_by_emby_id(emby_collection_id: str) -> Optional[Dict[s
         logger.error(f"根据 Emby ID {emby_collection_id} 获取自定义合集时出错: {e}", exc_info=True)
         return None
     
+def set_cover_version_by_emby_id(emby_collection_id: str, cover_version: str) -> bool:
+    """ 封面上传成功后记录封面版本 (内容哈希)，供反代生成稳定的 ImageTag / ETag。"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE custom_collections SET cover_version = %s, cover_updated_at = NOW()
+                WHERE emby_collection_id = %s AND cover_version IS DISTINCT FROM %s
+            """, (cover_version, emby_collection_id, cover_version))
+            conn.commit()
+            return cursor.rowcount > 0
+    except psycopg2.Error as e:
+        logger.error(f"记录合集 (Emby ID: {emby_collection_id}) 封面版本时出错: {e}", exc_info=True)
+        return False
+
 def get_active_collection_ids_for_latest_view() -> List[int]:
     """
     获取所有开启了“显示在最新媒体”选项(show_in_latest=True)的活跃合集 ID。
@@ -612,4 +638,130 @@ def get_active_collection_ids_for_latest_view() -> List[int]:
             return active_ids
     except psycopg2.Error as e:
         logger.error(f"获取最新视图合集ID列表时出错: {e}", exc_info=True)
-        return []
\ No newline at end of file
+        return []
+# ======================================================================
+# 榜单标题匹配记忆 (标题 → TMDb ID)
+# ======================================================================
+
+# 不同置信度的记忆有效期（天）。'none' 为未匹配的负记忆，过期后重新尝试。
+LIST_TITLE_MATCH_TTL_DAYS = {
+    'local': 30,
+    'exact': 90,
+    'contains': 30,
+    'fallback': 7,
+    'none': 3,
+}
+
+def get_list_title_match(norm_title: str, year: Optional[str], item_type: str) -> Optional[Dict[str, Any]]:
+    """ 读取一条未过期的榜单标题匹配记忆（只读，不在读路径上写库）。"""
+    if not norm_title:
+        return None
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT tmdb_id, matched_type, season_number, confidence
+                FROM list_title_match_cache
+                WHERE norm_title = %s AND year = %s AND item_type = %s
+                  AND expires_at > NOW()
+            """, (norm_title, str(year or ''), item_type))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 读取榜单标题匹配记忆 '{norm_title}' 时出错: {e}", exc_info=True)
+        return None
+
+def save_list_title_match(
+    norm_title: str,
+    year: Optional[str],
+    item_type: str,
+    tmdb_id: Optional[str],
+    matched_type: Optional[str],
+    season_number: Optional[int],
+    confidence: str,
+    source_title: Optional[str] = None
+):
+    """ 写入/刷新一条榜单标题匹配记忆，有效期由置信度决定。"""
+    if not norm_title:
+        return
+    ttl_days = LIST_TITLE_MATCH_TTL_DAYS.get(confidence, LIST_TITLE_MATCH_TTL_DAYS['fallback'])
+    sql = """
+        INSERT INTO list_title_match_cache
+            (norm_title, year, item_type, tmdb_id, matched_type, season_number, confidence, source_title, created_at, expires_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW() + make_interval(days => %s))
+        ON CONFLICT (norm_title, year, item_type) DO UPDATE SET
+            tmdb_id = EXCLUDED.tmdb_id,
+            matched_type = EXCLUDED.matched_type,
+            season_number = EXCLUDED.season_number,
+            confidence = EXCLUDED.confidence,
+            source_title = EXCLUDED.source_title,
+            created_at = NOW(),
+            expires_at = EXCLUDED.expires_at
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (
+                norm_title, str(year or ''), item_type,
+                str(tmdb_id) if tmdb_id else None, matched_type, season_number,
+                confidence, source_title, ttl_days
+            ))
+            conn.commit()
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 保存榜单标题匹配记忆 '{norm_title}' 时出错: {e}", exc_info=True)
+
+def invalidate_list_title_matches_for_tmdb_id(tmdb_id: str) -> int:
+    """ 手动修正匹配后，清除所有指向旧 TMDb ID 的记忆，避免错配被反复复用。"""
+    if not tmdb_id:
+        return 0
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM list_title_match_cache WHERE tmdb_id = %s", (str(tmdb_id),))
+            deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 清除 TMDb ID {tmdb_id} 的榜单标题匹配记忆时出错: {e}", exc_info=True)
+        return 0
+
+def purge_expired_list_title_matches() -> int:
+    """ 清理已过期的榜单标题匹配记忆。"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM list_title_match_cache WHERE expires_at <= NOW()")
+            deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 清理过期的榜单标题匹配记忆时出错: {e}", exc_info=True)
+        return 0
+
+def get_local_title_index_rows() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    为榜单标题匹配构建本地索引所需的原始数据。
+    返回 {'media': [电影/剧集的标题、原名、年份], 'seasons': [已知的 (剧集, 季号)]}。
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT tmdb_id, item_type, title, original_title, release_year
+                FROM media_metadata
+                WHERE item_type IN ('Movie', 'Series')
+                  AND (title IS NOT NULL OR original_title IS NOT NULL)
+            """)
+            media_rows = [dict(row) for row in cursor.fetchall()]
+            cursor.execute("""
+                SELECT parent_series_tmdb_id, season_number
+                FROM media_metadata
+                WHERE item_type = 'Season'
+                  AND parent_series_tmdb_id IS NOT NULL
+                  AND season_number IS NOT NULL
+            """)
+            season_rows = [dict(row) for row in cursor.fetchall()]
+            return {'media': media_rows, 'seasons': season_rows}
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 加载榜单标题本地索引数据时出错: {e}", exc_info=True)
+        return {'media': [], 'seasons': []}
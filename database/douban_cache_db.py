@@ -0,0 +1,77 @@
+# database/douban_cache_db.py
+import json
+import logging
+from typing import Optional, Dict, Any
+
+import psycopg2
+
+from .connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# ======================================================================
+# 模块: 豆瓣接口响应缓存
+# ----------------------------------------------------------------------
+# 只缓存成功响应；键由 DoubanApi 按 (方法, 接口路径, 规范化参数) 计算。
+# ======================================================================
+
+# 各类接口的缓存有效期（天）
+DOUBAN_CACHE_TTL_DAYS = {
+    'subject_detail': 7,
+    'celebrities': 30,
+    'celebrity_detail': 30,
+    'imdbid': 30,
+    'search': 1,
+}
+
+
+def get_douban_cache(cache_key: str) -> Optional[Dict[str, Any]]:
+    """ 读取一条未过期的缓存响应，命中时顺带累加 hit_count。"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE douban_api_cache
+                SET hit_count = hit_count + 1
+                WHERE cache_key = %s AND expires_at > NOW()
+                RETURNING response_json
+            """, (cache_key,))
+            row = cursor.fetchone()
+            conn.commit()
+            return row['response_json'] if row else None
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 读取豆瓣缓存时出错: {e}")
+        return None
+
+
+def save_douban_cache(cache_key: str, endpoint: str, response: Dict[str, Any]):
+    """ 写入/刷新一条缓存响应，有效期由接口类型决定。"""
+    ttl_days = DOUBAN_CACHE_TTL_DAYS.get(endpoint, DOUBAN_CACHE_TTL_DAYS['search'])
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO douban_api_cache (cache_key, endpoint, response_json, created_at, expires_at)
+                VALUES (%s, %s, %s, NOW(), NOW() + make_interval(days => %s))
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    response_json = EXCLUDED.response_json,
+                    created_at = NOW(),
+                    expires_at = EXCLUDED.expires_at
+            """, (cache_key, endpoint, json.dumps(response, ensure_ascii=False), ttl_days))
+            conn.commit()
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 保存豆瓣缓存时出错: {e}")
+
+
+def purge_expired_douban_cache() -> int:
+    """ 清理已过期的豆瓣缓存。"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM douban_api_cache WHERE expires_at <= NOW()")
+            deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+    except psycopg2.Error as e:
+        logger.error(f"  ➜ 清理过期的豆瓣缓存时出错: {e}")
+        return 0
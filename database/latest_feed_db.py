@@ -0,0 +1,146 @@
+# database/latest_feed_db.py
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from .connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# ======================================================================
+# 模块: 首页“最新项目”物化视图
+# ----------------------------------------------------------------------
+# user_latest_feed 按 (用户, 虚拟库) 保存该库对该用户可见的最新 N 个项目；
+# user_latest_feed_state.built_at 记录构建时刻，invalidated_at 晚于 built_at 即视为过期。
+# 媒体入库/删除、元数据同步、合集定义变更时只打过期标记，由下一次首页请求按需重建。
+# ======================================================================
+
+# 重建后至少保留多久才允许再次因失效而重建 (批量入库时避免每次首页请求都重算)
+_MIN_REBUILD_INTERVAL = '30 seconds'
+# 兜底过期时间：覆盖用户权限变更等不经过失效通知的场景
+_MAX_FEED_AGE = '6 hours'
+
+
+def get_stale_collection_ids(user_id: str, collection_ids: List[int]) -> List[int]:
+    """返回该用户需要重建 (缺失 / 已失效 / 超龄) 的虚拟库 ID。"""
+    if not collection_ids:
+        return []
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT c.id
+                    FROM unnest(%s::int[]) AS c(id)
+                    LEFT JOIN user_latest_feed_state s ON s.user_id = %s AND s.collection_id = c.id
+                    WHERE s.collection_id IS NULL
+                       OR s.built_at < NOW() - INTERVAL '{_MAX_FEED_AGE}'
+                       OR (s.invalidated_at > s.built_at AND s.built_at < NOW() - INTERVAL '{_MIN_REBUILD_INTERVAL}')
+                """, (list(collection_ids), user_id))
+                return [row['id'] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"  ➜ [最新视图] 读取用户 {user_id} 的物化状态失败: {e}")
+        return list(collection_ids)
+
+
+def get_build_timestamp() -> Optional[datetime]:
+    """取数据库当前时间作为构建时刻 (与 invalidated_at 使用同一时钟)。"""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT clock_timestamp() AS now")
+                return cursor.fetchone()['now']
+    except Exception as e:
+        logger.error(f"  ➜ [最新视图] 读取数据库时间失败: {e}")
+        return None
+
+
+def replace_collection_feed(user_id: str, collection_id: int, items: List[Dict[str, Any]], built_at: datetime) -> bool:
+    """
+    用一次查询结果覆盖 (用户, 虚拟库) 的物化行。
+    items 为 query_virtual_library_items 的返回 ({'Id', 'tmdb_id'})，入库时间从 media_metadata 回填。
+    built_at 应取查询开始前的 get_build_timestamp()，查询期间发生的失效会让本次结果在下次读取时被判为过期。
+    """
+    emby_ids = [str(i['Id']) for i in items if i.get('Id')]
+    tmdb_ids = [str(i.get('tmdb_id') or '') for i in items if i.get('Id')]
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM user_latest_feed WHERE user_id = %s AND collection_id = %s",
+                    (user_id, collection_id)
+                )
+                if emby_ids:
+                    cursor.execute("""
+                        INSERT INTO user_latest_feed (user_id, collection_id, emby_item_id, date_added)
+                        SELECT %s, %s, v.emby_id, MAX(m.date_added)
+                        FROM unnest(%s::text[], %s::text[]) AS v(emby_id, tmdb_id)
+                        LEFT JOIN media_metadata m
+                               ON m.tmdb_id = v.tmdb_id AND m.emby_item_ids_json->>0 = v.emby_id
+                        GROUP BY v.emby_id
+                    """, (user_id, collection_id, emby_ids, tmdb_ids))
+                cursor.execute("""
+                    INSERT INTO user_latest_feed_state (user_id, collection_id, built_at)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (user_id, collection_id) DO UPDATE SET built_at = EXCLUDED.built_at
+                """, (user_id, collection_id, built_at))
+            conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"  ➜ [最新视图] 写入用户 {user_id} / 合集 {collection_id} 的物化行失败: {e}")
+        return False
+
+
+def get_latest_item_ids(user_id: str, collection_ids: List[int], limit: int) -> List[str]:
+    """跨多个虚拟库读取该用户的最新项目 ID (按入库时间倒序去重)。"""
+    if not collection_ids:
+        return []
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT emby_item_id, MAX(date_added) AS date_added
+                    FROM user_latest_feed
+                    WHERE user_id = %s AND collection_id = ANY(%s)
+                    GROUP BY emby_item_id
+                    ORDER BY MAX(date_added) DESC NULLS LAST, emby_item_id
+                    LIMIT %s
+                """, (user_id, list(collection_ids), limit))
+                return [row['emby_item_id'] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"  ➜ [最新视图] 读取用户 {user_id} 的最新项目失败: {e}")
+        return []
+
+
+def mark_latest_feed_stale(cursor=None, collection_id: Optional[int] = None):
+    """
+    标记物化视图失效。不传 collection_id 时作用于全部虚拟库 (媒体项增删)。
+    传入 cursor 时随调用方事务一起提交/回滚；语句包在 SAVEPOINT 里，
+    失败只回滚这一句，不会让调用方整个事务进入 aborted 状态。
+    """
+    sql = "UPDATE user_latest_feed_state SET invalidated_at = clock_timestamp() WHERE (invalidated_at IS NULL OR invalidated_at <= built_at)"
+    params = ()
+    if collection_id is not None:
+        sql += " AND collection_id = %s"
+        params = (collection_id,)
+    if cursor is not None:
+        cursor.execute("SAVEPOINT sp_latest_feed_stale;")
+        try:
+            cursor.execute(sql, params)
+            cursor.execute("RELEASE SAVEPOINT sp_latest_feed_stale;")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT sp_latest_feed_stale;")
+            logger.error(f"  ➜ [最新视图] 标记物化视图失效失败: {e}")
+        return
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as own_cursor:
+                own_cursor.execute(sql, params)
+            conn.commit()
+    except Exception as e:
+        logger.error(f"  ➜ [最新视图] 标记物化视图失效失败: {e}")
+
+
+def delete_collection_feed(cursor, collection_id: int):
+    """合集被删除时清理其全部物化行 (随调用方事务提交)。"""
+    cursor.execute("DELETE FROM user_latest_feed WHERE collection_id = %s", (collection_id,))
+    cursor.execute("DELETE FROM user_latest_feed_state WHERE collection_id = %s", (collection_id,))
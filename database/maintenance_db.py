@@ -3,6 +3,7 @@ import psycopg2
 import re
 import os
 import json
+import threading
 from psycopg2 import sql
 from psycopg2.extras import Json, execute_values
 import logging
@@ -13,6 +14,7 @@ from collections import defaultdict
 from .connection import get_db_connection
 from .log_db import LogDBManager
 from .media_db import get_tmdb_id_from_emby_id
+from .latest_feed_db import mark_latest_feed_stale
 import constants
 
 logger = logging.getLogger(__name__)
@@ -223,6 +225,19 @@ def _delete_virtual_file_artifacts(paths: List[str]) -> int:
     return deleted
 
 
+def _forget_nfo_manifests_for_deleted_assets(deleted_assets: List[Dict[str, Any]]):
+    """媒体版本被删除后同步清理 NFO 哈希清单；拿不到路径时 (如整季删除) 在后台回收目录已不存在的清单。"""
+    try:
+        from handler import nfo_writer
+        paths = [a.get('path') for a in deleted_assets or [] if isinstance(a, dict) and a.get('path')]
+        if paths:
+            nfo_writer.forget_media_paths(paths)
+        else:
+            threading.Thread(target=nfo_writer.prune_stale_manifests, name="NfoManifestPrune", daemon=True).start()
+    except Exception as e:
+        logger.debug(f"  ➜ 清理 NFO 哈希清单失败: {e}")
+
+
 def _cleanup_virtual_imports_for_deleted_assets(cursor, deleted_assets: List[Dict[str, Any]]) -> Dict[str, int]:
     deleted_paths = {
         _norm_virtual_path(asset.get('path') or asset.get('Path'))
@@ -1618,6 +1633,7 @@ def cleanup_deleted_media_item(item_id: str, item_name: str, item_type: str, ser
                     return None
 
                 _cleanup_virtual_imports_for_deleted_assets(cursor, removed_assets)
+                _forget_nfo_manifests_for_deleted_assets(removed_assets)
 
                 if removed_sha1s:
                     _append_shared_cleanup_context(
@@ -1992,6 +2008,9 @@ def cleanup_deleted_media_item(item_id: str, item_name: str, item_type: str, ser
 
                     logger.info(f"--- 对 TMDB ID: {target_tmdb_id_for_full_cleanup} 的完全清理已完成 ---")
 
+                # 首页“最新”物化视图失效 (随本事务提交)
+                mark_latest_feed_stale(cursor)
+
                 # 提交事务
                 conn.commit()
 
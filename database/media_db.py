@@ -936,10 +936,39 @@ def get_global_popular_items(limit: int = 20) -> List[Dict[str, Any]]:
     """
     获取全站最受欢迎的媒体项（基于完整播放的用户数量）。
     用于“猜大家想看”的种子数据。
+    优先使用本地播放日汇总 (近 90 天每日观看人数累加，单集归并到剧集)，无汇总数据时回退到 user_media_data。
     """
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("""
+                WITH plays AS (
+                    SELECT item_id, SUM(user_count) AS user_count
+                    FROM playback_daily_item
+                    WHERE day > CURRENT_DATE - 90 AND item_type IN ('Movie', 'Episode')
+                    GROUP BY item_id
+                ),
+                mapped AS (
+                    SELECT
+                        CASE WHEN m.item_type = 'Episode' THEN m.parent_series_tmdb_id ELSE m.tmdb_id END AS tmdb_id,
+                        CASE WHEN m.item_type = 'Episode' THEN 'Series' ELSE m.item_type END AS item_type,
+                        p.user_count
+                    FROM plays p
+                    JOIN media_metadata m ON m.emby_item_ids_json @> to_jsonb(p.item_id)
+                    WHERE m.item_type IN ('Movie', 'Episode')
+                )
+                SELECT mm.tmdb_id, mm.item_type, mm.title, mm.release_year, SUM(x.user_count) AS play_count
+                FROM mapped x
+                JOIN media_metadata mm ON mm.tmdb_id = x.tmdb_id AND mm.item_type = x.item_type
+                GROUP BY mm.tmdb_id, mm.item_type, mm.title, mm.release_year
+                ORDER BY play_count DESC
+                LIMIT %s
+            """, (limit,))
+            history = [dict(row) for row in cursor.fetchall()]
+            if history:
+                logger.trace(f"  ➜ [数据库] 从播放汇总提取到全站最热 Top {len(history)} 作品 (榜首: {history[0].get('title')})。")
+                return history
+
             # 逻辑：统计每个 tmdb_id 被多少个不同的 user_id 标记为 played=TRUE
             cursor.execute("""
                 SELECT 
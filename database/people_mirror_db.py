@@ -0,0 +1,361 @@
+# database/people_mirror_db.py
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Set, Iterable
+
+from psycopg2.extras import execute_values
+
+from .connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# ======================================================================
+# 模块: Emby 人物 / 人物-作品关联 本地镜像
+# ----------------------------------------------------------------------
+# emby_person_item_links 以作品为单位整体替换 (作品的 People 列表即真相)；
+# emby_persons 只保存被作品引用过的人物，details_synced_at 为空表示还需向 Emby 补全 ProviderIds。
+# emby_people_dirty_items 由 Webhook / 核心处理流程登记，下次同步时定点拉取这些作品。
+# ======================================================================
+
+MIRROR_ITEM_TYPES = ('Movie', 'Series', 'Season', 'Episode')
+
+
+def _people_rows(item: Dict[str, Any], library_id: Optional[str]) -> List[tuple]:
+    rows = []
+    seen = set()
+    for person in item.get('People') or []:
+        person_id = person.get('Id')
+        if not person_id or person_id in seen:
+            continue
+        seen.add(person_id)
+        rows.append((
+            str(item['Id']), str(person_id), item.get('Type'), library_id,
+            person.get('Type'), person.get('Role'), person.get('Name'),
+        ))
+    return rows
+
+
+def replace_items_people(items: List[Dict[str, Any]]) -> int:
+    """
+    用 Emby 返回的作品 (需带 Id / Type / People，可选 _SourceLibraryId) 整体替换其人物关联。
+    没有 _SourceLibraryId 的作品沿用镜像中已有的库 ID。返回写入的关联数。
+    """
+    items = [i for i in items if i.get('Id')]
+    if not items:
+        return 0
+    item_ids = [str(i['Id']) for i in items]
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT DISTINCT ON (emby_item_id) emby_item_id, library_id
+                    FROM emby_person_item_links
+                    WHERE emby_item_id = ANY(%s) AND library_id IS NOT NULL
+                """, (item_ids,))
+                known_libraries = {row['emby_item_id']: row['library_id'] for row in cursor.fetchall()}
+
+                rows = []
+                for item in items:
+                    library_id = item.get('_SourceLibraryId') or known_libraries.get(str(item['Id']))
+                    rows.extend(_people_rows(item, library_id))
+
+                cursor.execute("DELETE FROM emby_person_item_links WHERE emby_item_id = ANY(%s)", (item_ids,))
+                if rows:
+                    persons = {}
+                    for row in rows:
+                        persons.setdefault(row[1], row[6])
+                    execute_values(cursor, """
+                        INSERT INTO emby_persons (emby_person_id, name)
+                        VALUES %s
+                        ON CONFLICT (emby_person_id) DO UPDATE SET
+                            name = COALESCE(EXCLUDED.name, emby_persons.name),
+                            updated_at = NOW()
+                        WHERE emby_persons.name IS DISTINCT FROM EXCLUDED.name
+                    """, list(persons.items()), page_size=1000)
+                    execute_values(cursor, """
+                        INSERT INTO emby_person_item_links
+                            (emby_item_id, emby_person_id, item_type, library_id, person_type, role)
+                        VALUES %s
+                    """, [row[:6] for row in rows], page_size=1000)
+                cursor.execute("DELETE FROM emby_people_dirty_items WHERE emby_item_id = ANY(%s)", (item_ids,))
+            conn.commit()
+        return len(rows)
+    except Exception as e:
+        logger.error(f"  ➜ [人物镜像] 写入 {len(items)} 个作品的人物关联失败: {e}")
+        raise
+
+
+def delete_item_links(item_ids: List[str]):
+    """作品从 Emby 删除时清理其关联。"""
+    if not item_ids:
+        return
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM emby_person_item_links WHERE emby_item_id = ANY(%s)", (list(item_ids),))
+                cursor.execute("DELETE FROM emby_people_dirty_items WHERE emby_item_id = ANY(%s)", (list(item_ids),))
+            conn.commit()
+    except Exception as e:
+        logger.error(f"  ➜ [人物镜像] 删除作品关联失败: {e}")
+
+
+def delete_links_synced_before(cutoff: datetime) -> int:
+    """全量同步收尾：删除本轮没有再出现的作品关联，以及不再被任何作品引用的人物。"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM emby_person_item_links WHERE synced_at < %s", (cutoff,))
+            removed = cursor.rowcount
+            cursor.execute("""
+                DELETE FROM emby_persons p
+                WHERE NOT EXISTS (SELECT 1 FROM emby_person_item_links l WHERE l.emby_person_id = p.emby_person_id)
+            """)
+        conn.commit()
+    return removed
+
+
+def reset_person_details():
+    """全量同步前调用：所有人物重新向 Emby 补全详情 (覆盖在 Emby 端直接改名等情况)。"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE emby_persons SET details_synced_at = NULL")
+        conn.commit()
+
+
+def get_person_ids_missing_details(limit: int = 500) -> List[str]:
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT emby_person_id FROM emby_persons
+                WHERE details_synced_at IS NULL
+                ORDER BY emby_person_id
+                LIMIT %s
+            """, (limit,))
+            return [row['emby_person_id'] for row in cursor.fetchall()]
+
+
+def update_person_details(persons: List[Dict[str, Any]], requested_ids: Iterable[str]):
+    """
+    写入从 Emby 取回的人物详情 (Id / Name / ProviderIds)。
+    requested_ids 中 Emby 没有返回的人物 (已被删除) 一并移出镜像。
+    """
+    found = {str(p['Id']): p for p in persons if p.get('Id')}
+    missing = [pid for pid in requested_ids if pid not in found]
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            if found:
+                execute_values(cursor, """
+                    UPDATE emby_persons AS p
+                    SET name = v.name, tmdb_person_id = v.tmdb_id,
+                        details_synced_at = NOW(), updated_at = NOW()
+                    FROM (VALUES %s) AS v(emby_person_id, name, tmdb_id)
+                    WHERE p.emby_person_id = v.emby_person_id
+                """, [
+                    (pid, p.get('Name'), (p.get('ProviderIds') or {}).get('Tmdb') or None)
+                    for pid, p in found.items()
+                ], page_size=1000)
+            if missing:
+                cursor.execute("DELETE FROM emby_person_item_links WHERE emby_person_id = ANY(%s)", (missing,))
+                cursor.execute("DELETE FROM emby_persons WHERE emby_person_id = ANY(%s)", (missing,))
+        conn.commit()
+
+
+def mark_items_dirty(item_ids: List[str]):
+    """登记需要重新拉取人物列表的作品 (Webhook 入库 / 元数据更新、核心处理完成)。"""
+    item_ids = [str(i) for i in item_ids if i]
+    if not item_ids:
+        return
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                execute_values(cursor, """
+                    INSERT INTO emby_people_dirty_items (emby_item_id) VALUES %s
+                    ON CONFLICT (emby_item_id) DO UPDATE SET queued_at = NOW()
+                """, [(i,) for i in item_ids])
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"  ➜ [人物镜像] 登记待同步作品失败: {e}")
+
+
+def get_dirty_item_ids(limit: int = 500) -> List[str]:
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT emby_item_id FROM emby_people_dirty_items ORDER BY queued_at LIMIT %s",
+                (limit,)
+            )
+            return [row['emby_item_id'] for row in cursor.fetchall()]
+
+
+def get_db_now() -> datetime:
+    """数据库当前时间 (与 synced_at 默认值同一时钟)，作为全量同步的截止线。"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT NOW() AS now")
+            return cursor.fetchone()['now']
+
+
+def has_data() -> bool:
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM emby_person_item_links) AS has_rows")
+            return bool(cursor.fetchone()['has_rows'])
+
+
+# ----------------------------------------------------------------------
+# 读取
+# ----------------------------------------------------------------------
+
+def _scope_sql(library_ids: Optional[List[str]], item_types: Optional[Iterable[str]], params: list) -> str:
+    sql = ""
+    if library_ids:
+        sql += " AND l.library_id = ANY(%s)"
+        params.append(list(library_ids))
+    if item_types:
+        sql += " AND l.item_type = ANY(%s)"
+        params.append(list(item_types))
+    return sql
+
+
+def get_persons(library_ids: Optional[List[str]] = None, item_types: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    返回被指定范围内作品引用的人物，结构与 Emby Person 条目一致：{'Id', 'Name', 'ProviderIds': {'Tmdb'}}。
+    """
+    params: list = []
+    scope = _scope_sql(library_ids, item_types, params)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT p.emby_person_id, p.name, p.tmdb_person_id
+                FROM emby_persons p
+                WHERE EXISTS (
+                    SELECT 1 FROM emby_person_item_links l
+                    WHERE l.emby_person_id = p.emby_person_id {scope}
+                )
+            """, tuple(params))
+            return [
+                {
+                    'Id': row['emby_person_id'],
+                    'Name': row['name'],
+                    'ProviderIds': {'Tmdb': row['tmdb_person_id']} if row['tmdb_person_id'] else {},
+                }
+                for row in cursor.fetchall()
+            ]
+
+
+def get_linked_person_ids() -> Set[str]:
+    """被任意作品引用的人物 ID 集合。"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT emby_person_id FROM emby_person_item_links")
+            return {row['emby_person_id'] for row in cursor.fetchall()}
+
+
+def get_person_item_map(
+    person_ids: List[str],
+    library_ids: Optional[List[str]] = None,
+    item_types: Optional[Iterable[str]] = None,
+) -> Dict[str, Set[str]]:
+    """人物 -> 关联作品 ID 集合。"""
+    if not person_ids:
+        return {}
+    params: list = [list(person_ids)]
+    scope = _scope_sql(library_ids, item_types, params)
+    result: Dict[str, Set[str]] = defaultdict(set)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT l.emby_person_id, l.emby_item_id
+                FROM emby_person_item_links l
+                WHERE l.emby_person_id = ANY(%s) {scope}
+            """, tuple(params))
+            for row in cursor.fetchall():
+                result[row['emby_person_id']].add(row['emby_item_id'])
+    return result
+
+
+def get_duplicate_tmdb_groups() -> Dict[str, List[Dict[str, Any]]]:
+    """按 TMDb ID 分组，返回拥有多个 Emby 人物条目的分组。"""
+    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT emby_person_id, name, tmdb_person_id
+                FROM emby_persons
+                WHERE tmdb_person_id IN (
+                    SELECT tmdb_person_id FROM emby_persons
+                    WHERE tmdb_person_id IS NOT NULL
+                    GROUP BY tmdb_person_id
+                    HAVING COUNT(*) > 1
+                )
+                ORDER BY tmdb_person_id, emby_person_id
+            """)
+            for row in cursor.fetchall():
+                groups[row['tmdb_person_id']].append({
+                    'Id': row['emby_person_id'],
+                    'Name': row['name'],
+                    'ProviderIds': {'Tmdb': row['tmdb_person_id']},
+                })
+    return dict(groups)
+
+
+# ----------------------------------------------------------------------
+# 演员维护任务对 Emby 写入成功后的同步修改
+# ----------------------------------------------------------------------
+
+def rename_persons(renames: List[tuple]):
+    """renames: [(emby_person_id, new_name), ...]"""
+    if not renames:
+        return
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                execute_values(cursor, """
+                    UPDATE emby_persons AS p
+                    SET name = v.name, updated_at = NOW()
+                    FROM (VALUES %s) AS v(emby_person_id, name)
+                    WHERE p.emby_person_id = v.emby_person_id
+                """, renames)
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"  ➜ [人物镜像] 更新人物名失败: {e}")
+
+
+def reassign_person_links(from_person_id: str, to_person_id: str, item_ids: Iterable[str]):
+    """合并分身：把指定作品上的关联从小号转给主号 (主号已在该作品中的直接丢弃小号关联)。"""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE emby_person_item_links l
+                    SET emby_person_id = %s, synced_at = NOW()
+                    WHERE l.emby_person_id = %s AND l.emby_item_id = ANY(%s)
+                      AND NOT EXISTS (
+                          SELECT 1 FROM emby_person_item_links k
+                          WHERE k.emby_item_id = l.emby_item_id AND k.emby_person_id = %s
+                      )
+                """, (to_person_id, from_person_id, item_ids, to_person_id))
+                cursor.execute(
+                    "DELETE FROM emby_person_item_links WHERE emby_person_id = %s AND emby_item_id = ANY(%s)",
+                    (from_person_id, item_ids)
+                )
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"  ➜ [人物镜像] 转移人物关联失败: {e}")
+
+
+def delete_persons(person_ids: List[str]):
+    """人物在 Emby 中被删除后同步移出镜像。"""
+    if not person_ids:
+        return
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM emby_person_item_links WHERE emby_person_id = ANY(%s)", (list(person_ids),))
+                cursor.execute("DELETE FROM emby_persons WHERE emby_person_id = ANY(%s)", (list(person_ids),))
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"  ➜ [人物镜像] 删除人物失败: {e}")
@@ -0,0 +1,284 @@
+# database/playback_db.py
+import logging
+from typing import Optional, List, Dict, Any
+
+from .connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# ======================================================================
+# 模块: 本地播放流水与汇总
+# ----------------------------------------------------------------------
+# playback_events 只追加，由 Webhook 的 playback.start / playback.stop 写入；
+# playback_daily_user / playback_daily_item 在 stop 事件入库时增量累加，
+# 用户中心报表、仪表盘排行、全站热门都直接读汇总表，不再实时请求 Emby 插件。
+# ======================================================================
+
+# 单次播放时长上限 (秒)：防止 start 后客户端崩溃、隔天才收到 stop 导致时长失真
+_MAX_SINGLE_PLAY_SECONDS = 12 * 3600
+# 查找与 stop 配对的 start 事件的时间窗口
+_START_LOOKUP_WINDOW = '1 day'
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None and str(value).strip() != '' else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _extract_event_fields(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """从 Emby Webhook 载荷中提取入库字段。缺少用户或项目时返回 None。"""
+    user = data.get("User") or {}
+    item = data.get("Item") or {}
+    session = data.get("Session") or {}
+    playback_info = data.get("PlaybackInfo") or {}
+
+    user_id = str(user.get("Id") or "").strip()
+    item_id = str(item.get("Id") or "").strip()
+    if not user_id or not item_id:
+        return None
+
+    return {
+        "user_id": user_id,
+        "user_name": user.get("Name"),
+        "item_id": item_id,
+        "item_type": item.get("Type") or "Video",
+        "item_name": item.get("Name"),
+        "series_id": str(item.get("SeriesId") or "") or None,
+        "series_name": item.get("SeriesName"),
+        "season_number": _to_int(item.get("ParentIndexNumber")),
+        "episode_number": _to_int(item.get("IndexNumber")),
+        "play_session_id": str(playback_info.get("PlaySessionId") or session.get("PlaySessionId") or "") or None,
+        "client": session.get("Client"),
+        "device_name": session.get("DeviceName"),
+        "position_ticks": _to_int(playback_info.get("PositionTicks")),
+        "played_to_completion": playback_info.get("PlayedToCompletion"),
+        "runtime_ticks": _to_int(item.get("RunTimeTicks")),
+    }
+
+
+def record_playback_event(event_type: str, data: Dict[str, Any]) -> bool:
+    """
+    记录一条 Webhook 播放事件。
+    - playback.start: 只写流水。
+    - playback.stop: 与最近的 start 配对计算播放时长，写流水并在同一事务内累加日汇总。
+    """
+    kind = {"playback.start": "start", "playback.stop": "stop"}.get(event_type)
+    if not kind:
+        return False
+    fields = _extract_event_fields(data)
+    if not fields:
+        return False
+
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                play_duration_sec = 0
+                if kind == "stop":
+                    # 1. 找到本次播放的 start：优先按 PlaySessionId，其次按 用户+项目
+                    cursor.execute(f"""
+                        SELECT s.id, EXTRACT(EPOCH FROM (NOW() - s.event_at)) AS elapsed
+                        FROM playback_events s
+                        WHERE s.event_type = 'start'
+                          AND s.event_at > NOW() - INTERVAL '{_START_LOOKUP_WINDOW}'
+                          AND (
+                              (%(sid)s IS NOT NULL AND s.play_session_id = %(sid)s)
+                              OR (s.user_id = %(uid)s AND s.item_id = %(iid)s)
+                          )
+                          AND NOT EXISTS (
+                              SELECT 1 FROM playback_events t
+                              WHERE t.event_type = 'stop'
+                                AND t.user_id = s.user_id AND t.item_id = s.item_id
+                                AND t.event_at >= s.event_at
+                          )
+                        ORDER BY s.event_at DESC
+                        LIMIT 1
+                    """, {"sid": fields["play_session_id"], "uid": fields["user_id"], "iid": fields["item_id"]})
+                    start_row = cursor.fetchone()
+                    if start_row:
+                        play_duration_sec = int(start_row["elapsed"] or 0)
+                        cap = _MAX_SINGLE_PLAY_SECONDS
+                        if fields["runtime_ticks"]:
+                            cap = min(cap, int(fields["runtime_ticks"] / 10_000_000 * 1.5))
+                        play_duration_sec = max(0, min(play_duration_sec, cap))
+
+                    # 2. 当天该用户是否已经看过此项目 (用于项目维度的去重人数)
+                    cursor.execute("""
+                        SELECT 1 FROM playback_events
+                        WHERE event_type = 'stop' AND user_id = %s AND item_id = %s
+                          AND event_at >= CURRENT_DATE
+                        LIMIT 1
+                    """, (fields["user_id"], fields["item_id"]))
+                    is_new_viewer_today = cursor.fetchone() is None
+
+                cursor.execute("""
+                    INSERT INTO playback_events (
+                        event_type, user_id, user_name, item_id, item_type, item_name,
+                        series_id, series_name, season_number, episode_number,
+                        play_session_id, client, device_name, position_ticks,
+                        play_duration_sec, played_to_completion
+                    ) VALUES (
+                        %(event_type)s, %(user_id)s, %(user_name)s, %(item_id)s, %(item_type)s, %(item_name)s,
+                        %(series_id)s, %(series_name)s, %(season_number)s, %(episode_number)s,
+                        %(play_session_id)s, %(client)s, %(device_name)s, %(position_ticks)s,
+                        %(play_duration_sec)s, %(played_to_completion)s
+                    )
+                """, {**fields, "event_type": kind, "play_duration_sec": play_duration_sec})
+
+                if kind == "stop":
+                    cursor.execute("""
+                        INSERT INTO playback_daily_user (day, user_id, item_type, user_name, play_count, duration_sec)
+                        VALUES (CURRENT_DATE, %s, %s, %s, 1, %s)
+                        ON CONFLICT (day, user_id, item_type) DO UPDATE SET
+                            user_name = COALESCE(EXCLUDED.user_name, playback_daily_user.user_name),
+                            play_count = playback_daily_user.play_count + 1,
+                            duration_sec = playback_daily_user.duration_sec + EXCLUDED.duration_sec
+                    """, (fields["user_id"], fields["item_type"], fields["user_name"], play_duration_sec))
+
+                    cursor.execute("""
+                        INSERT INTO playback_daily_item (
+                            day, item_id, item_type, item_name, series_id, series_name,
+                            play_count, user_count, duration_sec
+                        )
+                        VALUES (CURRENT_DATE, %s, %s, %s, %s, %s, 1, 1, %s)
+                        ON CONFLICT (day, item_id) DO UPDATE SET
+                            item_type = EXCLUDED.item_type,
+                            item_name = COALESCE(EXCLUDED.item_name, playback_daily_item.item_name),
+                            series_id = COALESCE(EXCLUDED.series_id, playback_daily_item.series_id),
+                            series_name = COALESCE(EXCLUDED.series_name, playback_daily_item.series_name),
+                            play_count = playback_daily_item.play_count + 1,
+                            user_count = playback_daily_item.user_count + %s,
+                            duration_sec = playback_daily_item.duration_sec + EXCLUDED.duration_sec
+                    """, (
+                        fields["item_id"], fields["item_type"], fields["item_name"],
+                        fields["series_id"], fields["series_name"], play_duration_sec,
+                        1 if is_new_viewer_today else 0,
+                    ))
+            conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"  ➜ [播放流水] 记录播放事件失败 ({event_type}, item={fields.get('item_id')}): {e}")
+        return False
+
+
+def has_playback_events() -> bool:
+    """本地是否已有播放流水 (用于决定报表是否需要回退到 Playback Reporting 插件)。"""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT EXISTS (SELECT 1 FROM playback_events WHERE event_type = 'stop') AS has_rows")
+                row = cursor.fetchone()
+                return bool(row and row['has_rows'])
+    except Exception as e:
+        logger.error(f"  ➜ [播放流水] 检查本地播放流水失败: {e}")
+        return False
+
+
+def local_history_covers(days: int) -> bool:
+    """
+    本地播放流水是否已覆盖最近 days 天：最早的 stop 事件早于统计窗口的第一天。
+    未覆盖时窗口前段的历史只在 Playback Reporting 插件里，报表应继续读插件。
+    """
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT MIN(event_at)::date <= CURRENT_DATE - %s AS covered
+                    FROM playback_events
+                    WHERE event_type = 'stop'
+                """, (days,))
+                row = cursor.fetchone()
+                return bool(row and row['covered'])
+    except Exception as e:
+        logger.error(f"  ➜ [播放流水] 检查本地播放流水覆盖范围失败: {e}")
+        return False
+
+
+def get_user_playback_totals(user_id: str, days: int, item_type: Optional[str] = None) -> Dict[str, int]:
+    """从日汇总表读取个人播放次数与总时长 (秒)。"""
+    sql = """
+        SELECT COALESCE(SUM(play_count), 0) AS total_count, COALESCE(SUM(duration_sec), 0) AS total_seconds
+        FROM playback_daily_user
+        WHERE user_id = %s AND day > CURRENT_DATE - %s
+    """
+    params = [user_id, days]
+    if item_type:
+        sql += " AND item_type = %s"
+        params.append(item_type)
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, tuple(params))
+                row = cursor.fetchone()
+                return {"total_count": int(row['total_count']), "total_seconds": int(row['total_seconds'])}
+    except Exception as e:
+        logger.error(f"  ➜ [播放流水] 读取用户 {user_id} 播放汇总失败: {e}")
+        return {"total_count": 0, "total_seconds": 0}
+
+
+def get_user_recent_playbacks(user_id: str, days: int, item_type: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """读取个人最近的播放记录 (stop 事件，已带剧集名/季/集，无需回查 Emby)。"""
+    sql = """
+        SELECT item_id, item_type, item_name, series_name, season_number, episode_number,
+               play_duration_sec, event_at
+        FROM playback_events
+        WHERE user_id = %s AND event_type = 'stop'
+          AND event_at > NOW() - make_interval(days => %s)
+    """
+    params = [user_id, days]
+    if item_type:
+        sql += " AND item_type = %s"
+        params.append(item_type)
+    sql += " ORDER BY event_at DESC LIMIT %s"
+    params.append(limit)
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, tuple(params))
+                return [dict(row) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"  ➜ [播放流水] 读取用户 {user_id} 播放记录失败: {e}")
+        return []
+
+
+def get_dashboard_rollups(days: int, item_types: tuple = ('Movie', 'Episode')) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    仪表盘汇总：
+    - daily: 每天的播放次数与时长
+    - users: 每个用户的播放次数与时长
+    - items: 每个项目的播放次数 (原始 Emby ID，由调用方聚合到剧集)
+    """
+    result = {"daily": [], "users": [], "items": []}
+    type_list = list(item_types)
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT day, SUM(play_count) AS play_count, SUM(duration_sec) AS duration_sec
+                    FROM playback_daily_user
+                    WHERE day > CURRENT_DATE - %s AND item_type = ANY(%s)
+                    GROUP BY day
+                    ORDER BY day
+                """, (days, type_list))
+                result["daily"] = [dict(row) for row in cursor.fetchall()]
+
+                cursor.execute("""
+                    SELECT user_id, MAX(user_name) AS user_name,
+                           SUM(play_count) AS play_count, SUM(duration_sec) AS duration_sec
+                    FROM playback_daily_user
+                    WHERE day > CURRENT_DATE - %s AND item_type = ANY(%s)
+                    GROUP BY user_id
+                """, (days, type_list))
+                result["users"] = [dict(row) for row in cursor.fetchall()]
+
+                cursor.execute("""
+                    SELECT item_id, SUM(play_count) AS play_count, SUM(user_count) AS user_count
+                    FROM playback_daily_item
+                    WHERE day > CURRENT_DATE - %s AND item_type = ANY(%s)
+                    GROUP BY item_id
+                """, (days, type_list))
+                result["items"] = [dict(row) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"  ➜ [播放流水] 读取仪表盘汇总失败: {e}")
+    return result
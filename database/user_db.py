@@ -67,7 +67,7 @@ def upsert_user_media_data(data: Dict[str, Any]):
         raise
 
 def upsert_user_media_data_batch(user_id: str, items_data: List[Dict[str, Any]]):
-    """【V1】为一个指定用户，批量更新或插入其所有媒体的状态。"""
+    """【V2】为一个指定用户，批量更新或插入其媒体状态。值未变化的行不会被改写。"""
     
     if not user_id or not items_data:
         return
@@ -83,7 +83,14 @@ def upsert_user_media_data_batch(user_id: str, items_data: List[Dict[str, Any]])
             playback_position_ticks = EXCLUDED.playback_position_ticks,
             play_count = EXCLUDED.play_count,
             last_played_date = EXCLUDED.last_played_date,
-            last_updated_at = EXCLUDED.last_updated_at;
+            last_updated_at = EXCLUDED.last_updated_at
+        WHERE (
+            user_media_data.is_favorite, user_media_data.played, user_media_data.playback_position_ticks,
+            user_media_data.play_count, user_media_data.last_played_date
+        ) IS DISTINCT FROM (
+            EXCLUDED.is_favorite, EXCLUDED.played, EXCLUDED.playback_position_ticks,
+            EXCLUDED.play_count, EXCLUDED.last_played_date
+        );
     """
     
     values_to_insert = []
@@ -111,6 +118,57 @@ def upsert_user_media_data_batch(user_id: str, items_data: List[Dict[str, Any]])
         logger.error(f"DB: 批量更新用户 {user_id} 的媒体数据时失败: {e}", exc_info=True)
         raise
 
+def get_user_sync_states() -> Dict[str, Dict[str, Any]]:
+    """获取所有用户的数据同步水位，返回 {user_id: row}。"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT user_id, last_synced_at, last_full_sync_at, dirty_since FROM user_sync_state")
+            return {row['user_id']: dict(row) for row in cursor.fetchall()}
+    except Exception as e:
+        logger.error(f"DB: 读取用户同步水位失败: {e}", exc_info=True)
+        return {}
+
+def mark_user_sync_dirty(user_id: str):
+    """Webhook 收到用户数据变化时调用：标记该用户需要增量同步 (只记录最早的变化时间)。"""
+    if not user_id:
+        return
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO user_sync_state (user_id, dirty_since) VALUES (%s, NOW())
+                ON CONFLICT (user_id) DO UPDATE SET
+                    dirty_since = COALESCE(user_sync_state.dirty_since, EXCLUDED.dirty_since)
+            """, (user_id,))
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"DB: 标记用户 {user_id} 待同步失败: {e}")
+
+def save_user_sync_state(user_id: str, synced_at: datetime, is_full: bool):
+    """
+    记录一次成功同步的水位。
+    仅当同步开始之后没有新的 Webhook 变化时才清除 dirty 标记，避免漏掉同步过程中发生的变更。
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO user_sync_state (user_id, last_synced_at, last_full_sync_at, dirty_since)
+                VALUES (%(uid)s, %(at)s, CASE WHEN %(full)s THEN %(at)s END, NULL)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    last_synced_at = EXCLUDED.last_synced_at,
+                    last_full_sync_at = COALESCE(EXCLUDED.last_full_sync_at, user_sync_state.last_full_sync_at),
+                    dirty_since = CASE
+                        WHEN user_sync_state.dirty_since IS NOT NULL AND user_sync_state.dirty_since > %(at)s
+                        THEN user_sync_state.dirty_since
+                        ELSE NULL
+                    END
+            """, {"uid": user_id, "at": synced_at, "full": bool(is_full)})
+            conn.commit()
+    except Exception as e:
+        logger.error(f"DB: 保存用户 {user_id} 同步水位失败: {e}", exc_info=True)
+
 def get_all_emby_users() -> List[Dict[str, Any]]:
     """获取本地缓存的所有Emby用户信息。"""
     
@@ -259,6 +317,7 @@ def delete_emby_users_by_ids(user_ids: List[str]) -> int:
             sql = "DELETE FROM emby_users WHERE id = ANY(%s)"
             cursor.execute(sql, (user_ids,))
             deleted_count = cursor.rowcount
+            cursor.execute("DELETE FROM user_sync_state WHERE user_id = ANY(%s)", (user_ids,))
             conn.commit()
             logger.info(f"  ➜ 从本地数据库中同步删除了 {deleted_count} 个陈旧的用户记录。")
             return deleted_count
@@ -130,7 +130,8 @@ def add_item_to_watchlist(tmdb_id: str, item_name: str) -> bool:
                 DO UPDATE SET 
                     watching_status = 'NONE',
                     force_ended = FALSE,
-                    paused_until = NULL;
+                    paused_until = NULL,
+                    watchlist_next_check_at = NULL;
             """
             cursor.execute(upsert_sql, (tmdb_id, item_name))
             
@@ -160,6 +161,8 @@ def update_watchlist_item_status(tmdb_id: str, new_status: str) -> bool:
     set_clauses = [f"{key} = %s" for key in updates.keys()]
     # 追加更新时间
     set_clauses.append("watchlist_last_checked_at = NOW()")
+    # 手动改状态后立即进入下一轮常规追剧检查
+    set_clauses.append("watchlist_next_check_at = NULL")
     
     values = list(updates.values())
     
@@ -290,6 +293,7 @@ def batch_update_watchlist_status(item_ids: list, new_status: str) -> int:
             # 构建 SET 子句
             set_clauses = [f"{key} = %s" for key in updates.keys()]
             set_clauses.append("watchlist_last_checked_at = NOW()") 
+            set_clauses.append("watchlist_next_check_at = NULL")
             
             # 构建参数值：先放入 SET 的值
             values = list(updates.values())
@@ -829,6 +833,7 @@ def get_series_by_dynamic_condition(condition_sql: str = None, library_ids: Opti
             emby_item_ids_json,
             force_ended,
             paused_until,
+            watchlist_next_check_at,
             last_episode_to_air_json,
             watchlist_tmdb_status AS tmdb_status,
             watchlist_missing_info_json AS missing_info_json,
@@ -940,6 +945,7 @@ def revive_completed_series_and_season(parent_tmdb_id: str, season_number: int):
                 UPDATE media_metadata
                 SET watching_status = 'Watching',
                     watchlist_last_checked_at = NOW(),
+                    watchlist_next_check_at = NULL,
                     force_ended = FALSE,
                     paused_until = NULL
                 WHERE tmdb_id = %s
@@ -971,6 +977,7 @@ def update_watching_status_by_tmdb_id(tmdb_id: str, item_type: str, new_status:
                 UPDATE media_metadata 
                 SET watching_status = %s, 
                     watchlist_last_checked_at = NOW(),
+                    watchlist_next_check_at = NULL,
                     force_ended = FALSE,
                     paused_until = NULL
                 WHERE tmdb_id = %s AND item_type = %s
@@ -1049,6 +1056,27 @@ def update_watchlist_metadata(tmdb_id: str, updates: Dict[str, Any]):
         logger.error(f"DB: 更新剧集 {tmdb_id} 追剧元数据失败: {e}")
         raise
 
+def promote_watchlist_series(tmdb_id: str) -> bool:
+    """
+    把剧集的下次检查时间提前到现在 (Webhook 报告新集入库时调用)。
+    即使单项刷新任务排队或被丢弃，下一轮常规追剧任务也会优先处理它。
+    """
+    sql = """
+        UPDATE media_metadata
+        SET watchlist_next_check_at = NOW()
+        WHERE tmdb_id = %s AND item_type = 'Series'
+          AND (watchlist_next_check_at IS NULL OR watchlist_next_check_at > NOW())
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (tmdb_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+    except Exception as e:
+        logger.error(f"DB: 提前剧集 {tmdb_id} 的追剧检查时间失败: {e}")
+        return False
+
 def get_season_emby_id(parent_tmdb_id: str, season_number: int) -> Optional[str]:
     """
     根据父剧集 TMDb ID 和季号，查询该季在 Emby 中的 Item ID。
@@ -8,6 +8,7 @@ import time
 import gevent
 import numpy as np
 import sys
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 import json
 from datetime import datetime, timedelta
@@ -18,7 +19,7 @@ from urllib.parse import urlparse, parse_qs, unquote
 import handler.tmdb as tmdb
 import config_manager
 from tasks.helpers import parse_series_title_and_season
-from database import media_db, connection
+from database import media_db, connection, custom_collection_db
 from handler.douban import DoubanApi
 from handler.tmdb import search_media
 from ai_translator import AITranslator
@@ -42,6 +43,12 @@ class ListImporter:
     }
     VALID_MAOYAN_PLATFORMS = {'tencent', 'iqiyi', 'youku', 'mango'}
 
+    # 本地标题索引 (类级共享，所有合集刷新复用同一份)
+    _local_title_index = None
+    _local_title_index_built_at = 0.0
+    _local_title_index_lock = threading.Lock()
+    _LOCAL_TITLE_INDEX_TTL = 600
+
     def __init__(self, tmdb_api_key: str):
         self.tmdb_api_key = tmdb_api_key
         self.session = requests.Session()
@@ -452,10 +459,134 @@ class ListImporter:
         
         return items, source_type
 
+    @staticmethod
+    def _normalize_title(s: str) -> str:
+        if not s: return ""
+        return re.sub(r'[\s:：·\-*\'!,?.。]+', '', s).lower()
+
+    @classmethod
+    def _get_local_title_index(cls) -> Dict[str, Any]:
+        """
+        【类方法】获取 media_metadata 的本地标题索引 (进程内共享，定时重建)。
+        结构: {'titles': {(规范标题, 类型): {tmdb_id: release_year}}, 'seasons': {(剧集ID, 季号)}}
+        """
+        now = time.time()
+        if cls._local_title_index is not None and now - cls._local_title_index_built_at < cls._LOCAL_TITLE_INDEX_TTL:
+            return cls._local_title_index
+
+        with cls._local_title_index_lock:
+            if cls._local_title_index is not None and time.time() - cls._local_title_index_built_at < cls._LOCAL_TITLE_INDEX_TTL:
+                return cls._local_title_index
+
+            start_t = time.time()
+            raw = custom_collection_db.get_local_title_index_rows()
+            titles: Dict[Tuple[str, str], Dict[str, Optional[int]]] = {}
+            for row in raw.get('media', []):
+                tmdb_id = str(row['tmdb_id'])
+                for name in (row.get('title'), row.get('original_title')):
+                    norm = cls._normalize_title(name)
+                    if norm:
+                        titles.setdefault((norm, row['item_type']), {})[tmdb_id] = row.get('release_year')
+            seasons = {(str(r['parent_series_tmdb_id']), r['season_number']) for r in raw.get('seasons', [])}
+
+            cls._local_title_index = {'titles': titles, 'seasons': seasons}
+            cls._local_title_index_built_at = time.time()
+            logger.debug(f"  ➜ [榜单匹配] 本地标题索引已构建：{len(titles)} 个标题，{len(seasons)} 个季，耗时 {time.time() - start_t:.2f}s。")
+            return cls._local_title_index
+
+    def _match_title_locally(self, title: str, item_type: str, year: Optional[str] = None) -> Optional[Tuple[str, str, Optional[int]]]:
+        """
+        在本地 media_metadata 的标题/原名中查找唯一命中。
+        有歧义（同名多部）或年份对不上时一律放弃，交给 TMDb 搜索。
+        """
+        index = self._get_local_title_index()
+
+        def unique_candidate(name: str, year_filter: Optional[str]) -> Optional[str]:
+            candidates = index['titles'].get((self._normalize_title(name), item_type))
+            if not candidates:
+                return None
+            if year_filter:
+                candidates = {tid: y for tid, y in candidates.items() if y is not None and str(y) == str(year_filter)}
+            return next(iter(candidates)) if len(candidates) == 1 else None
+
+        if item_type == 'Movie':
+            tmdb_id = unique_candidate(title, year)
+            return (tmdb_id, 'Movie', None) if tmdb_id else None
+
+        if item_type == 'Series':
+            # 仅用正则解析季号，不带 api_key，避免为本地查找触发 TMDb 调用
+            show_name, season_number = parse_series_title_and_season(title)
+            if season_number is None:
+                tmdb_id = unique_candidate(title, year)
+                return (tmdb_id, 'Series', None) if tmdb_id else None
+            # 榜单年份通常是该季的年份而非首播年份，校验季时不比对年份
+            tmdb_id = unique_candidate(show_name or title, None)
+            if tmdb_id and (tmdb_id, season_number) in index['seasons']:
+                return tmdb_id, 'Series', season_number
+        return None
+
     def _match_title_to_tmdb(self, title: str, item_type: str, year: Optional[str] = None) -> Optional[Tuple[str, str, Optional[int]]]:
-        def normalize_string(s: str) -> str:
-            if not s: return ""
-            return re.sub(r'[\s:：·\-*\'!,?.。]+', '', s).lower()
+        """
+        标题 → TMDb ID 的分层匹配：匹配记忆 → 本地媒体库标题 → TMDb 搜索。
+        只有记忆和本地都未命中的新标题才会真正请求 TMDb，结果按置信度写回记忆。
+        """
+        norm_title = self._normalize_title(title)
+        if not norm_title:
+            return None
+        year_info = f" (年份: {year})" if year else ""
+
+        memo = custom_collection_db.get_list_title_match(norm_title, year, item_type)
+        if memo:
+            if not memo.get('tmdb_id'):
+                logger.debug(f"  ➜ [匹配记忆] '{title}'{year_info} 近期已确认无法匹配，跳过 TMDb 搜索。")
+                return None
+            logger.debug(f"  ➜ [匹配记忆] '{title}'{year_info} 命中记忆 ({memo.get('confidence')}): {memo['tmdb_id']}")
+            return str(memo['tmdb_id']), memo.get('matched_type') or item_type, memo.get('season_number')
+
+        try:
+            local_result = self._match_title_locally(title, item_type, year)
+        except Exception as e:
+            logger.warning(f"  ➜ [榜单匹配] 本地标题查找 '{title}' 出错，将直接搜索 TMDb: {e}")
+            local_result = None
+        if local_result:
+            tmdb_id, matched_type, matched_season = local_result
+            logger.info(f"  ➜ 标题 '{title}'{year_info} 通过【本地媒体库】匹配到: {tmdb_id}")
+            custom_collection_db.save_list_title_match(norm_title, year, item_type, tmdb_id, matched_type, matched_season, 'local', title)
+            return local_result
+
+        try:
+            match_result, confidence = self._search_title_on_tmdb(title, item_type, year)
+        except Exception as e:
+            logger.warning(f"  ➜ [榜单匹配] TMDb 搜索 '{title}'{year_info} 出错，本次不写匹配记忆: {e}")
+            return None
+        if match_result:
+            tmdb_id, matched_type, matched_season = match_result
+            custom_collection_db.save_list_title_match(norm_title, year, item_type, tmdb_id, matched_type, matched_season, confidence, title)
+        elif confidence == 'none':
+            custom_collection_db.save_list_title_match(norm_title, year, item_type, None, None, None, 'none', title)
+        else:
+            logger.debug(f"  ➜ [榜单匹配] '{title}'{year_info} 的 TMDb 请求失败，不写负记忆，下次重试。")
+        return match_result
+
+    def _search_title_on_tmdb(self, title: str, item_type: str, year: Optional[str] = None) -> Tuple[Optional[Tuple[str, str, Optional[int]]], str]:
+        """
+        通过 TMDb 搜索匹配标题，返回 (匹配结果, 置信度)。
+        未匹配且途中有 TMDb 请求失败（返回 None）时置信度为 'error'，只有 TMDb 确实返回空结果才是 'none'。
+        """
+        failed_requests: List[str] = []
+        match_result, confidence = self._search_title_on_tmdb_impl(title, item_type, year, failed_requests)
+        if not match_result and failed_requests:
+            return None, 'error'
+        return match_result, confidence
+
+    def _search_title_on_tmdb_impl(self, title: str, item_type: str, year: Optional[str], failed_requests: List[str]) -> Tuple[Optional[Tuple[str, str, Optional[int]]], str]:
+        normalize_string = self._normalize_title
+
+        def search(query: str, search_year: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+            results = search_media(query, self.tmdb_api_key, item_type, year=search_year)
+            if results is None:
+                failed_requests.append(query)
+            return results
 
         if item_type == 'Movie':
             titles_to_try = set([title.strip()])
@@ -484,7 +615,7 @@ class ListImporter:
             for title_variation in final_titles:
                 if not title_variation: continue
                 
-                results = search_media(title_variation, self.tmdb_api_key, 'Movie', year=year)
+                results = search(title_variation, year)
                 
                 if first_search_results is None:
                     first_search_results = results
@@ -501,7 +632,7 @@ class ListImporter:
                     if (norm_variation == norm_title or norm_variation == norm_original_title) and self._movie_result_matches_year(result, year):
                         tmdb_id = str(result.get('id'))
                         logger.info(f"  ➜ 电影标题 '{title}'{year_info} 通过【精确规范匹配】(使用'{title_variation}') 成功匹配到: {result.get('title')} (ID: {tmdb_id})")
-                        return tmdb_id, 'Movie', None
+                        return (tmdb_id, 'Movie', None), 'exact'
                 
                 for result in results:
                     norm_title = normalize_string(result.get('title'))
@@ -510,7 +641,7 @@ class ListImporter:
                     if (norm_variation in norm_title or norm_variation in norm_original_title) and self._movie_result_matches_year(result, year):
                         tmdb_id = str(result.get('id'))
                         logger.info(f"  ➜ 电影标题 '{title}'{year_info} 通过【包含匹配】(使用'{title_variation}') 成功匹配到: {result.get('title')} (ID: {tmdb_id})")
-                        return tmdb_id, 'Movie', None
+                        return (tmdb_id, 'Movie', None), 'contains'
 
             if first_search_results:
                 first_result = None
@@ -521,34 +652,35 @@ class ListImporter:
                             break
                     if not first_result:
                         logger.warning(f"  ➜ 电影标题 '{title}'{year_info} 有搜索结果，但没有同年份结果，拒绝回退到首条，避免同名电影错配。")
-                        return None
+                        return None, 'none'
                 else:
                     first_result = first_search_results[0]
 
                 tmdb_id = str(first_result.get('id'))
                 logger.warning(f"  ➜ 电影标题 '{title}'{year_info} 所有精确匹配和包含匹配均失败。将【回退使用】最相关的搜索结果: {first_result.get('title')} (ID: {tmdb_id})")
-                return tmdb_id, 'Movie', None
+                return (tmdb_id, 'Movie', None), 'fallback'
 
             logger.error(f"  ➜ 电影标题 '{title}'{year_info} 未能在TMDb上找到任何搜索结果。")
-            return None
+            return None, 'none'
         
         elif item_type == 'Series':
             show_name_parsed, season_number_to_validate = parse_series_title_and_season(title, api_key=self.tmdb_api_key)
             show_name = show_name_parsed if show_name_parsed else title
             
-            results = search_media(show_name, self.tmdb_api_key, 'Series', year=year)
+            results = search(show_name, year)
 
             if not results and year and season_number_to_validate is not None:
                 logger.debug(f"  ➜ 带年份 '{year}' 搜索剧集 '{show_name}' 未找到结果，可能是后续季。尝试不带年份进行回退搜索...")
-                results = search_media(show_name, self.tmdb_api_key, 'Series', year=None)
+                results = search(show_name, None)
 
             if not results:
                 year_info = f" (年份: {year})" if year else ""
                 logger.warning(f"  ➜ 剧集标题 '{title}' (搜索词: '{show_name}'){year_info} 未能在TMDb上找到匹配项。")
-                return None
+                return None, 'none'
             
             if season_number_to_validate is None:
                 series_result = None
+                series_confidence = 'exact'
                 norm_show_name = normalize_string(show_name)
                 
                 for result in results:
@@ -559,9 +691,10 @@ class ListImporter:
                 
                 if not series_result:
                     series_result = results[0]
+                    series_confidence = 'fallback'
                     logger.warning(f"  ➜ 剧集 '{show_name}' 未找到精确匹配，使用首个结果: {series_result.get('name')} (ID: {series_result.get('id')})")
 
-                return str(series_result.get('id')), 'Series', None
+                return (str(series_result.get('id')), 'Series', None), series_confidence
 
             else:
                 def verify_season_in_results(candidates_list, source_desc=""):
@@ -578,6 +711,8 @@ class ListImporter:
                         candidate_name = candidate.get('name')
                         
                         series_details = tmdb.get_tv_details(int(candidate_id), self.tmdb_api_key, append_to_response="seasons")
+                        if series_details is None:
+                            failed_requests.append(f"tv/{candidate_id}")
                         
                         if series_details and 'seasons' in series_details:
                             has_season = False
@@ -595,11 +730,11 @@ class ListImporter:
 
                 matched_id = verify_season_in_results(results[:5])
                 if matched_id:
-                    return matched_id, 'Series', season_number_to_validate
+                    return (matched_id, 'Series', season_number_to_validate), 'exact'
 
                 if year:
                     logger.info(f"  ➜ 剧集 '{show_name}' 带年份 ({year}) 搜索结果中未找到第 {season_number_to_validate} 季，尝试移除年份重搜...")
-                    results_no_year = search_media(show_name, self.tmdb_api_key, 'Series', year=None)
+                    results_no_year = search(show_name, None)
                     
                     if results_no_year:
                         checked_ids = set(str(r.get('id')) for r in results[:5])
@@ -608,22 +743,22 @@ class ListImporter:
                         if candidates_no_year:
                             matched_id = verify_season_in_results(candidates_no_year, source_desc=" (无年份重搜)")
                             if matched_id:
-                                return matched_id, 'Series', season_number_to_validate
+                                return (matched_id, 'Series', season_number_to_validate), 'exact'
 
                 logger.warning(f"  ➜ 验证失败！在 '{show_name}' 的所有搜索结果中，均未找到第 {season_number_to_validate} 季。")
                     
                 if show_name != title:
                     logger.info(f"  ➜ [兜底机制] 尝试使用原始标题 '{title}' 进行回退搜索...")
-                    fallback_results = search_media(title, self.tmdb_api_key, 'Series', year=None)
+                    fallback_results = search(title, None)
                     
                     if fallback_results:
                         best_match = fallback_results[0]
                         logger.info(f"  ➜ [兜底成功] 原始标题 '{title}' 匹配到了: {best_match.get('name')} (ID: {best_match.get('id')})")
-                        return str(best_match.get('id')), 'Series', None
+                        return (str(best_match.get('id')), 'Series', None), 'fallback'
             
-            return None
+            return None, 'none'
                 
-        return None
+        return None, 'none'
 
     def process(self, definition: Dict) -> Tuple[List[Dict[str, str]], str]:
         raw_url = definition.get('url')
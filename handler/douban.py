@@ -23,10 +23,18 @@ logger = logging.getLogger(__name__)
 class DoubanApi:
     _session: Optional[requests.Session] = None
     _session_lock = threading.Lock()
-    # --- ✨ 新增的冷却相关属性 ✨ ---
-    _cooldown_seconds: float = 1.5  # 默认冷却时间（秒），可以设置一个安全值
-    _last_request_time: float = 0.0 # 上次请求的时间戳
-    _cooldown_lock = threading.Lock() # 用于冷却计时的线程锁，防止多线程下计时错乱
+    # --- ✨ 自适应请求调度 (各线程预约请求时刻，等待期间不持锁) ✨ ---
+    _cooldown_seconds: float = 1.5   # 基础请求间隔（秒），可以设置一个安全值
+    _current_interval: float = 1.5   # 当前间隔：触发 1080 限流时翻倍，成功后逐步回落到基础值
+    _next_slot: float = 0.0          # 下一个可预约的请求时刻 (time.monotonic)
+    _backoff_generation: int = 0     # 每次退避 +1，已预约但尚未发出的请求据此重新排队
+    _governor_lock = threading.Lock() # 只保护调度状态，不在持锁期间 sleep
+    _MAX_INTERVAL = 60.0
+    _BACKOFF_FACTOR = 2.0
+    _RECOVERY_FACTOR = 0.9
+    # --- ✨ 响应缓存 (database.douban_cache_db) ✨ ---
+    _CACHE_PURGE_INTERVAL = 6 * 3600
+    _last_cache_purge: float = 0.0
     # --- ✨ 新增属性结束 ✨ ---
     _user_cookie: Optional[str] = None
 
@@ -56,25 +64,90 @@ class DoubanApi:
                     logger.trace("DoubanApi requests.Session 已初始化。")
         
         if cooldown_seconds is not None and cooldown_seconds > 0:
-            DoubanApi._cooldown_seconds = cooldown_seconds
+            with DoubanApi._governor_lock:
+                DoubanApi._cooldown_seconds = cooldown_seconds
+                DoubanApi._current_interval = max(DoubanApi._current_interval, cooldown_seconds)
             logger.trace(f"  ➜ 豆瓣Api 已设置请求冷却时间为: {DoubanApi._cooldown_seconds} 秒。")
         if user_cookie:
             DoubanApi._user_cookie = user_cookie
             logger.trace("  ➜ DoubanApi 已加载用户登录 Cookie。")
     @classmethod
     def _apply_cooldown(cls):
-        """在每次API请求前应用冷却等待，线程安全。"""
-        with cls._cooldown_lock:
-            now = time.time()
-            elapsed = now - cls._last_request_time
-            
-            if elapsed < cls._cooldown_seconds:
-                wait_time = cls._cooldown_seconds - elapsed
+        """
+        在每次API请求前预约一个请求时刻并等待，线程安全。
+        锁内只做预约，睡眠在锁外进行；等待期间发生退避时重新预约。
+        """
+        while True:
+            with cls._governor_lock:
+                now = time.monotonic()
+                slot = max(now, cls._next_slot)
+                cls._next_slot = slot + cls._current_interval
+                generation = cls._backoff_generation
+            wait_time = slot - now
+            if wait_time > 0:
                 logger.trace(f"  ➜ 豆瓣 API 冷却中... 等待 {wait_time:.2f} 秒。")
                 time.sleep(wait_time)
-            
-            # 无论是否等待，都更新最后请求时间为当前时间
-            cls._last_request_time = time.time()
+            if generation == cls._backoff_generation:
+                return
+
+    @classmethod
+    def _on_rate_limited(cls):
+        """触发限流：间隔翻倍 (有上限)，并把下一个请求时刻推后一个新间隔。"""
+        with cls._governor_lock:
+            cls._current_interval = min(cls._MAX_INTERVAL, max(cls._current_interval, cls._cooldown_seconds) * cls._BACKOFF_FACTOR)
+            cls._next_slot = max(cls._next_slot, time.monotonic() + cls._current_interval)
+            cls._backoff_generation += 1
+            interval = cls._current_interval
+        logger.warning(f"  ➜ 豆瓣限流退避：请求间隔调整为 {interval:.1f} 秒。")
+
+    @classmethod
+    def _on_request_success(cls):
+        """请求成功：退避后的间隔逐步回落到基础值。"""
+        if cls._current_interval > cls._cooldown_seconds:
+            with cls._governor_lock:
+                cls._current_interval = max(cls._cooldown_seconds, cls._current_interval * cls._RECOVERY_FACTOR)
+
+    @staticmethod
+    def _classify_endpoint(url: str) -> str:
+        if url.startswith(DoubanApi._urls["search"]):
+            return "search"
+        if url.startswith("/movie/imdb/"):
+            return "imdbid"
+        if url.endswith("/celebrities"):
+            return "celebrities"
+        if url.startswith("/celebrity/"):
+            return "celebrity_detail"
+        return "subject_detail"
+
+    @staticmethod
+    def _cache_key(method: str, url: str, params: Dict[str, Any]) -> str:
+        # _ts 只是签名用的日期，不影响响应内容
+        normalized = {k: v for k, v in params.items() if k != '_ts'}
+        raw = f"{method}|{url}|{json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _cache_get(cls, cache_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            from database import douban_cache_db
+            return douban_cache_db.get_douban_cache(cache_key)
+        except Exception as e:
+            logger.debug(f"  ➜ 读取豆瓣缓存失败，直接请求: {e}")
+            return None
+
+    @classmethod
+    def _cache_put(cls, cache_key: str, url: str, response: Dict[str, Any]):
+        try:
+            from database import douban_cache_db
+            douban_cache_db.save_douban_cache(cache_key, cls._classify_endpoint(url), response)
+            now = time.monotonic()
+            if now - cls._last_cache_purge > cls._CACHE_PURGE_INTERVAL:
+                cls._last_cache_purge = now
+                purged = douban_cache_db.purge_expired_douban_cache()
+                if purged:
+                    logger.debug(f"  ➜ 已清理 {purged} 条过期的豆瓣缓存。")
+        except Exception as e:
+            logger.debug(f"  ➜ 写入豆瓣缓存失败: {e}")
 
     @classmethod
     def _ensure_session(cls):
@@ -99,6 +172,11 @@ class DoubanApi:
         return err_dict
 
     def __invoke(self, url: str, **kwargs) -> Dict[str, Any]:
+        cache_key = DoubanApi._cache_key('GET', url, kwargs)
+        cached = DoubanApi._cache_get(cache_key)
+        if cached is not None:
+            logger.trace(f"  ➜ 豆瓣缓存命中: GET {url}")
+            return cached
         DoubanApi._apply_cooldown()
         DoubanApi._ensure_session() # <--- 在每次请求前确保 session 存在
         if DoubanApi._session is None: return self._make_error_dict("session_not_initialized", "Session未初始化")
@@ -117,9 +195,15 @@ class DoubanApi:
             if response_json.get("code") == 1080:
                 msg = response_json.get('msg', "豆瓣API速率限制")
                 logger.warning(f"  ➜ GET触发豆瓣速率限制: {msg}")
+                DoubanApi._on_rate_limited()
                 return self._make_error_dict("rate_limit", msg, response_json)
+            DoubanApi._on_request_success()
+            if "code" not in response_json: # 带 code 的是豆瓣业务错误，不缓存
+                DoubanApi._cache_put(cache_key, url, response_json)
             return response_json
         except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                DoubanApi._on_rate_limited()
             msg = str(e)
             if e.response is not None:
                 try:
@@ -142,6 +226,11 @@ class DoubanApi:
             return self._make_error_dict("json_decode_error", "无效的JSON响应")
 
     def __post(self, url: str, **kwargs) -> Dict[str, Any]:
+        cache_key = DoubanApi._cache_key('POST', url, kwargs)
+        cached = DoubanApi._cache_get(cache_key)
+        if cached is not None:
+            logger.trace(f"  ➜ 豆瓣缓存命中: POST {url}")
+            return cached
         DoubanApi._apply_cooldown()
         DoubanApi._ensure_session() # <--- 在每次请求前确保 session 存在
         if DoubanApi._session is None: return self._make_error_dict("session_not_initialized", "Session未初始化")
@@ -159,9 +248,15 @@ class DoubanApi:
             if response_json.get("code") == 1080:
                 msg = response_json.get('msg', "豆瓣API速率限制")
                 logger.warning(f"  ➜ POST触发豆瓣速率限制: {msg}")
+                DoubanApi._on_rate_limited()
                 return self._make_error_dict("rate_limit", msg, response_json)
+            DoubanApi._on_request_success()
+            if "code" not in response_json: # 带 code 的是豆瓣业务错误，不缓存
+                DoubanApi._cache_put(cache_key, url, response_json)
             return response_json
         except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                DoubanApi._on_rate_limited()
             # ▼▼▼ 核心修改在这里 ▼▼▼
             if e.response is not None and e.response.status_code == 404:
                 # 1. 这是一个预期的“未找到”情况，使用 WARNING 级别日志，而不是 ERROR
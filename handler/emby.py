@@ -5,6 +5,7 @@ import concurrent.futures
 import os
 import gc
 import json
+import hashlib
 import base64
 import shutil
 import time
@@ -895,6 +896,7 @@ def notify_emby_file_changes(file_paths: List[str], base_url: str, api_key: str,
     【极速轻量级刷新】
     直接提取文件所在目录，向上寻根并触发 Emby 的局部精准扫描。
     彻底抛弃 Emby 带有 90 秒延迟的 Updated 队列接口。
+    扫描为异步执行：目录进入 handler.emby_refresh 的合并窗口，返回 True 表示已受理。
     """
     if not file_paths: 
         return True
@@ -926,10 +928,10 @@ def notify_emby_file_changes(file_paths: List[str], base_url: str, api_key: str,
 
         # logger.info(f"  ➜ 收到 {len(file_paths)} 个文件{action_zh}请求，准备对 {len(dirs_to_refresh)} 个父目录触发精准扫描...")
 
-        # 直接拿鞭子抽，让 Emby 扫目录
-        for d in dirs_to_refresh:
-            _force_refresh_directory_tree(d, base_url, api_key)
-            
+        # 交给刷新调度器：窗口期内的请求合并去重，按本地路径索引找到 Emby 目录后统一扫描
+        from handler import emby_refresh
+        emby_refresh.request_refresh(list(dirs_to_refresh), base_url, api_key)
+
         return True
     except Exception as e:
         logger.error(f"  ➜ [极速通知] 触发扫描失败: {e}")
@@ -1003,6 +1005,29 @@ def get_all_persons_from_emby(
     if library_ids and not force_full_scan:
         logger.info(f"  ➜ 检测到配置了 {len(library_ids)} 个媒体库，将优先尝试精准扫描...")
 
+        # 优先读取本地人物镜像 (增量同步后直接查库，不再对 Emby 全库做 People 枚举)
+        from handler import people_mirror
+        from database import people_mirror_db
+        if people_mirror.sync(base_url, api_key, user_id, stop_event=stop_event):
+            mirrored_persons = people_mirror_db.get_persons(
+                library_ids=library_ids,
+                item_types=[t for t in source_item_types.split(',') if t]
+            )
+            if mirrored_persons:
+                logger.info(f"  ➜ 人物镜像命中，发现 {len(mirrored_persons)} 位独立人物需要同步。")
+                total_mirrored = len(mirrored_persons)
+                for i in range(0, total_mirrored, batch_size):
+                    if stop_event and stop_event.is_set():
+                        return
+                    yield mirrored_persons[i:i + batch_size]
+                    if update_status_callback:
+                        processed = min(i + batch_size, total_mirrored)
+                        update_status_callback(int((processed / total_mirrored) * 95), f"已扫描 {processed}/{total_mirrored} 名人物...")
+                return
+        if stop_event and stop_event.is_set():
+            return
+        logger.warning("  ➜ 人物镜像不可用或为空，回退为直接扫描媒体库...")
+
         media_items = get_emby_library_items(
             base_url=base_url,
             api_key=api_key,
@@ -1406,6 +1431,10 @@ def upload_item_image(
         response = emby_client.post(url, headers=headers, params=params, data=b64_data, timeout=60)
         if response.status_code in (200, 204):
             logger.debug(f"  ➜ 成功上传 Item {item_id} 的 {image_type} 图片。")
+            if image_type == "Primary":
+                # 若目标是自建合集，同步刷新封面版本，让反代下发的长缓存封面 URL 随之变化
+                from database import custom_collection_db
+                custom_collection_db.set_cover_version_by_emby_id(item_id, hashlib.sha1(image_data).hexdigest()[:16])
             return True
 
         logger.error(f"  ➜ 上传 Item 图片失败: HTTP {response.status_code} - {response.text[:300]}")
@@ -2257,36 +2286,28 @@ def get_all_emby_users_from_server(base_url: str, api_key: str) -> Optional[List
         return None
 
 # --- 获取指定用户的所有媒体的用户数据 ---
-def get_all_user_view_data(user_id: str, base_url: str, api_key: str) -> Optional[List[Dict[str, Any]]]:
+def _fetch_user_view_data(user_id: str, base_url: str, api_key: str, extra_params: Dict[str, Any],
+                          only_with_state: bool = True) -> Optional[List[Dict[str, Any]]]:
     """
-    【V5 - 魔法日志版】
-    - 增加 CRITICAL 级别的日志，用于打印从 Emby 获取到的最原始的 Item JSON 数据。
+    分批拉取用户视角下的媒体及其 UserData。only_with_state=True 时只保留有播放/收藏/进度的条目。
+    任一批次失败返回 None，避免调用方把不完整的结果当作同步成功。
     """
     if not all([user_id, base_url, api_key]):
         return None
 
-    all_items_with_data = []
-    item_types = "Movie,Series,Episode"
-    fields = "UserData,Type,SeriesId,ProviderIds,Name,LastPlayedDate,PlayCount" 
-    
+    result = []
     api_url = f"{base_url.rstrip('/')}/Items"
-    
     params = {
         "api_key": api_key,
         "Recursive": "true",
-        "IncludeItemTypes": item_types,
-        "Fields": fields,
-        "UserId": user_id
+        "IncludeItemTypes": "Movie,Series,Episode",
+        "Fields": "UserData,Type,SeriesId,ProviderIds,Name,LastPlayedDate,PlayCount",
+        "UserId": user_id,
     }
-    
+    params.update(extra_params or {})
+
     start_index = 0
     batch_size = 2000
-
-    # ★★★ 2. 设置一个计数器，我们不需要打印所有日志，有几个样本就够了 ★★★
-    log_counter = 0
-    LOG_LIMIT = 5 # 只打印前 5 个有用户数据的条目
-
-    logger.debug(f"开始为用户 {user_id} 分批获取所有媒体的用户数据")
     while True:
         try:
             request_params = params.copy()
@@ -2295,30 +2316,44 @@ def get_all_user_view_data(user_id: str, base_url: str, api_key: str) -> Optiona
 
             response = emby_client.get(api_url, params=request_params)
             response.raise_for_status()
-            data = response.json()
-            items = data.get("Items", [])
-            
+            items = response.json().get("Items", [])
             if not items:
                 break
 
             for item in items:
                 user_data = item.get("UserData", {})
                 # 我们只关心那些确实有播放记录或收藏的条目
-                if user_data.get('Played') or user_data.get('IsFavorite') or user_data.get('PlaybackPositionTicks', 0) > 0:
-                    
-                    all_items_with_data.append(item)
-            
+                if not only_with_state or user_data.get('Played') or user_data.get('IsFavorite') or user_data.get('PlaybackPositionTicks', 0) > 0:
+                    result.append(item)
+
             start_index += len(items)
             if len(items) < batch_size:
                 break
-
         except Exception as e:
             logger.error(f"为用户 {user_id} 获取媒体数据时，处理批次 StartIndex={start_index} 失败: {e}", exc_info=True)
-            break
-            
-    logger.debug(f"为用户 {user_id} 的全量同步完成，共找到 {len(all_items_with_data)} 个有状态的媒体项。")
+            return None
+    return result
+
+def get_all_user_view_data(user_id: str, base_url: str, api_key: str) -> Optional[List[Dict[str, Any]]]:
+    """全量获取某用户所有有状态 (已播放/收藏/有进度) 的电影、剧集、分集。"""
+    logger.debug(f"开始为用户 {user_id} 分批获取所有媒体的用户数据")
+    all_items_with_data = _fetch_user_view_data(user_id, base_url, api_key, {})
+    if all_items_with_data is not None:
+        logger.debug(f"为用户 {user_id} 的全量同步完成，共找到 {len(all_items_with_data)} 个有状态的媒体项。")
     return all_items_with_data
 
+def get_user_view_data_changed_since(user_id: str, base_url: str, api_key: str, since: datetime) -> Optional[List[Dict[str, Any]]]:
+    """
+    增量获取某用户自 since 之后 UserData 有变化的条目 (Emby MinDateLastSavedForUser)。
+    不过滤“无状态”条目，这样取消已播放/取消收藏也能被同步。
+    """
+    since_str = since.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return _fetch_user_view_data(user_id, base_url, api_key, {"MinDateLastSavedForUser": since_str}, only_with_state=False)
+
+def get_user_series_view_data(user_id: str, base_url: str, api_key: str, series_id: str) -> Optional[List[Dict[str, Any]]]:
+    """获取某用户在一部剧集下所有有状态的分集 (用于增量同步时重新聚合剧集级状态)。"""
+    return _fetch_user_view_data(user_id, base_url, api_key, {"ParentId": series_id, "IncludeItemTypes": "Episode"})
+
 # --- 在 Emby 中创建一个新用户 ---
 def create_user_with_policy(
     username: str, 
@@ -2923,6 +2958,17 @@ def remove_tags_from_item(item_id: str, tags_to_remove: List[str], emby_server_u
         logger.error(f"移除标签失败 (ID: {item_id}): {e}")
         return False
 
+def set_item_tags(item_id: str, tags: List[str], emby_server_url: str, emby_api_key: str, user_id: str,
+                  locked_fields: Optional[List[str]] = None) -> bool:
+    """
+    直接把项目标签写成目标集合 (调用方已根据列表接口返回的 Tags 算好差异，省去一次读取标签的请求)。
+    locked_fields 为列表接口返回的 LockedFields，若 Tags 被锁定则一并解锁。
+    """
+    payload = {"Tags": list(tags or [])}
+    if locked_fields and "Tags" in locked_fields:
+        payload["LockedFields"] = [f for f in locked_fields if f != "Tags"]
+    return update_emby_item_details(item_id, payload, emby_server_url, emby_api_key, user_id)
+
 # --- 触发 神医 重新提取媒体信息 ---
 def trigger_media_info_refresh(item_id: str, base_url: str, api_key: str, user_id: str) -> bool:
     """
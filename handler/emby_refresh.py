@@ -0,0 +1,256 @@
+# handler/emby_refresh.py
+"""
+Emby 目录刷新调度 (本地 路径 -> 文件夹 ID 索引 + 合并去抖)。
+
+- 索引：枚举各媒体库的 Folder / Series / Season 条目与库根目录，记录 路径 -> Emby ID；
+  Webhook 入库/删除时增量维护，超过 REBUILD_INTERVAL 后在下次刷新前重建。
+  寻找“Emby 已认识的最近祖先目录”只查本地索引，不再逐级请求 GET /Items?Path=。
+- 调度：各处的刷新请求先进入待处理集合，窗口期 (FLUSH_WINDOW 秒) 结束后统一执行：
+  同一已知父目录下的多个兄弟目录合并为对父目录的一次刷新，已被祖先覆盖的目录不再单独刷新。
+"""
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FLUSH_WINDOW = 3.0          # 去抖窗口 (秒)
+REBUILD_INTERVAL = 6 * 3600  # 索引全量重建周期 (秒)
+MAX_ASCEND_LEVELS = 4        # 最多向上找 4 级 (文件 -> 电影目录 -> 分类目录 -> 媒体库根目录)
+COLLAPSE_MIN_SIBLINGS = 3    # 同一父目录下至少这么多个目录待刷新时，合并为刷新父目录
+_INDEX_ITEM_TYPES = "Folder,Series,Season"
+_PAGE_SIZE = 5000
+
+_lock = threading.Lock()
+_path_index: Dict[str, Tuple[str, str]] = {}   # 规范化路径 -> (Emby ID, 名称)
+_id_to_path: Dict[str, str] = {}
+_library_roots: set = set()
+_index_built_at = 0.0
+_index_build_lock = threading.Lock()
+
+_pending_dirs: set = set()
+_pending_creds: Tuple[str, str] = ('', '')
+_flush_timer: Optional[threading.Timer] = None
+
+
+def _norm(path: str) -> str:
+    if not path:
+        return ''
+    return os.path.normpath(str(path)).rstrip('/\\') or str(path)
+
+
+def _get_emby_config() -> Tuple[str, str]:
+    import config_manager
+    return (
+        config_manager.APP_CONFIG.get("emby_server_url", "") or "",
+        config_manager.APP_CONFIG.get("emby_api_key", "") or "",
+    )
+
+
+# ======================================================================
+# 路径索引
+# ======================================================================
+
+def index_item(item_id: str, path: str, name: Optional[str] = None):
+    """登记 (或更新) 一个 Emby 目录型条目，供 Webhook 入库时调用。"""
+    if not item_id or not path:
+        return
+    key = _norm(path)
+    with _lock:
+        old_path = _id_to_path.get(item_id)
+        if old_path and old_path != key:
+            _path_index.pop(old_path, None)
+        _path_index[key] = (item_id, name or key)
+        _id_to_path[item_id] = key
+
+
+def forget_item(item_id: str):
+    """条目在 Emby 中被删除时移出索引。"""
+    with _lock:
+        path = _id_to_path.pop(item_id, None)
+        if path and path not in _library_roots:
+            _path_index.pop(path, None)
+
+
+def rebuild_index(base_url: Optional[str] = None, api_key: Optional[str] = None) -> bool:
+    """从媒体库枚举全量重建索引。失败时保留旧索引。"""
+    from handler.emby import emby_client, get_all_libraries_with_paths
+
+    if not base_url or not api_key:
+        base_url, api_key = _get_emby_config()
+    if not base_url or not api_key:
+        return False
+
+    with _index_build_lock:
+        started = time.time()
+        new_index: Dict[str, Tuple[str, str]] = {}
+        new_roots = set()
+        try:
+            for lib in get_all_libraries_with_paths(base_url, api_key, force_refresh=True) or []:
+                info = lib.get('info') or {}
+                for location in lib.get('paths') or []:
+                    key = _norm(location)
+                    new_roots.add(key)
+                    new_index.setdefault(key, (info.get('Id'), info.get('Name') or key))
+
+            api_url = f"{base_url.rstrip('/')}/Items"
+            start_index = 0
+            while True:
+                resp = emby_client.get(api_url, params={
+                    "api_key": api_key,
+                    "Recursive": "true",
+                    "IncludeItemTypes": _INDEX_ITEM_TYPES,
+                    "Fields": "Path",
+                    "StartIndex": start_index,
+                    "Limit": _PAGE_SIZE,
+                })
+                resp.raise_for_status()
+                items = resp.json().get("Items", [])
+                for item in items:
+                    if item.get("Id") and item.get("Path"):
+                        # 物理文件夹条目优先于库根目录的 CollectionFolder 映射
+                        new_index[_norm(item["Path"])] = (item["Id"], item.get("Name") or item["Path"])
+                if len(items) < _PAGE_SIZE:
+                    break
+                start_index += _PAGE_SIZE
+        except Exception as e:
+            logger.warning(f"  ➜ [精准扫描] 构建 Emby 路径索引失败，暂时沿用旧索引: {e}")
+            return False
+
+        global _path_index, _id_to_path, _library_roots, _index_built_at
+        with _lock:
+            _path_index = new_index
+            _id_to_path = {item_id: path for path, (item_id, _) in new_index.items() if item_id}
+            _library_roots = new_roots
+            _index_built_at = time.time()
+        logger.debug(f"  ➜ [精准扫描] Emby 路径索引已重建: {len(new_index)} 个目录，耗时 {time.time() - started:.1f}s。")
+        return True
+
+
+def _ensure_index(base_url: str, api_key: str) -> bool:
+    if _path_index and time.time() - _index_built_at < REBUILD_INTERVAL:
+        return True
+    return rebuild_index(base_url, api_key) or bool(_path_index)
+
+
+def find_known_ancestor(target_dir: str, include_self: bool = True) -> Optional[Tuple[str, str, str]]:
+    """在索引中向上查找 Emby 已认识的最近目录，返回 (路径, Emby ID, 名称)。"""
+    current_path = _norm(target_dir)
+    if not include_self:
+        current_path = os.path.dirname(current_path)
+    for _ in range(MAX_ASCEND_LEVELS):
+        if not current_path or current_path in ('/', '\\'):
+            break
+        # 物理目录已不存在 (删除场景) 时直接向上追溯
+        if os.path.exists(current_path):
+            with _lock:
+                hit = _path_index.get(current_path)
+            if hit and hit[0]:
+                return current_path, hit[0], hit[1]
+        current_path = os.path.dirname(current_path)
+    return None
+
+
+# ======================================================================
+# 合并去抖调度
+# ======================================================================
+
+def request_refresh(dirs: List[str], base_url: Optional[str] = None, api_key: Optional[str] = None):
+    """登记待刷新的目录，窗口期结束后统一合并执行。"""
+    global _flush_timer, _pending_creds
+    dirs = [d for d in dirs if d]
+    if not dirs:
+        return
+    with _lock:
+        _pending_dirs.update(dirs)
+        if base_url and api_key:
+            _pending_creds = (base_url, api_key)
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(FLUSH_WINDOW, _flush)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+
+def _plan_targets(dirs: List[str]) -> Tuple[Dict[str, Tuple[str, str]], List[str]]:
+    """把待刷新目录映射为要刷新的 Emby 目录：{路径: (ID, 名称)}，以及索引中找不到归属的目录。"""
+    targets: Dict[str, Tuple[str, str]] = {}
+    unresolved = []
+    for d in dirs:
+        hit = find_known_ancestor(d)
+        if hit:
+            targets[hit[0]] = (hit[1], hit[2])
+        else:
+            unresolved.append(d)
+
+    # 兄弟目录合并：同一已知父目录 (非媒体库根目录) 下待刷新目录足够多时，改为刷新父目录
+    by_parent: Dict[str, List[str]] = {}
+    parent_info: Dict[str, Tuple[str, str]] = {}
+    for path in targets:
+        parent = find_known_ancestor(path, include_self=False)
+        if parent and parent[0] not in _library_roots:
+            by_parent.setdefault(parent[0], []).append(path)
+            parent_info[parent[0]] = (parent[1], parent[2])
+    for parent_path, children in by_parent.items():
+        if len(children) >= COLLAPSE_MIN_SIBLINGS:
+            for child in children:
+                targets.pop(child, None)
+            targets[parent_path] = parent_info[parent_path]
+
+    # 祖先已在刷新列表中 (Recursive 刷新会覆盖子目录) 的目录不再单独刷新
+    ordered = sorted(targets, key=len)
+    kept: Dict[str, Tuple[str, str]] = {}
+    for path in ordered:
+        if any(path.startswith(anc.rstrip('/\\') + os.sep) for anc in kept):
+            continue
+        kept[path] = targets[path]
+    return kept, unresolved
+
+
+def _flush():
+    global _flush_timer
+    with _lock:
+        dirs = list(_pending_dirs)
+        _pending_dirs.clear()
+        _flush_timer = None
+        base_url, api_key = _pending_creds
+    if not dirs:
+        return
+
+    from handler.emby import emby_client, _force_refresh_directory_tree
+    if not base_url or not api_key:
+        base_url, api_key = _get_emby_config()
+    if not base_url or not api_key:
+        return
+
+    try:
+        if not _ensure_index(base_url, api_key):
+            # 索引不可用：退回逐级查询 Emby 的旧逻辑
+            for d in dirs:
+                _force_refresh_directory_tree(d, base_url, api_key)
+            return
+
+        targets, unresolved = _plan_targets(dirs)
+        refresh_params = {
+            "api_key": api_key,
+            "Recursive": "true",
+            "MetadataRefreshMode": "Default",
+            "ImageRefreshMode": "Default",
+            "ReplaceAllImages": "false",
+            "ReplaceAllMetadata": "false"
+        }
+        for path, (target_id, target_name) in targets.items():
+            try:
+                emby_client.post(f"{base_url.rstrip('/')}/Items/{target_id}/Refresh", params=refresh_params)
+                logger.info(f"  ➜ [精准扫描] 已通知 Emby 对 '{target_name}' 立即扫描！")
+            except Exception as e:
+                logger.warning(f"  ➜ [精准扫描] 通知 Emby 扫描 '{target_name}' 失败: {e}")
+        if len(dirs) > len(targets):
+            logger.debug(f"  ➜ [精准扫描] {len(dirs)} 个待刷新目录已合并为 {len(targets)} 次扫描。")
+
+        for d in unresolved:
+            # 索引中找不到归属 (如新建的媒体库)：用旧逻辑兜底一次
+            _force_refresh_directory_tree(d, base_url, api_key)
+    except Exception as e:
+        logger.error(f"  ➜ [精准扫描] 执行合并刷新失败: {e}", exc_info=True)
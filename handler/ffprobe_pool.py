@@ -0,0 +1,187 @@
+# handler/ffprobe_pool.py
+"""
+115 直链 ffprobe 统一调度池。
+
+- 全局并发受 p115_ffprobe_concurrency 限制，所有调用方 (整理、MP直出、全量同步、媒体信息备份/还原、
+  共享资源补 RAW) 都经由这里排队，不再各自起 ffprobe 子进程。
+- 优先级队列：数值越小越先执行，交互/播放 > 整理 > 回填 > 空闲预热。
+- 同一 SHA1 (无 SHA1 时按 pick_code) 的并发请求合并为一次探测，结果直接写入 p115_mediainfo_cache；
+  调用方可通过 cache_context 传入 fid / pick_code / file_name，随缓存写入一并用于补齐 preid 与片源标记。
+- prewarm() 只入队不等待，排在所有其它探测之后，用于在 Emby 读取前预先备好新整理文件的媒体信息。
+"""
+import itertools
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import config_manager
+import constants
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_PLAYBACK = 0
+PRIORITY_INTERACTIVE = 10
+PRIORITY_ORGANIZE = 20
+PRIORITY_BACKFILL = 50
+PRIORITY_PREWARM = 90
+
+WORKER_IDLE_SECONDS = 60     # 空闲这么久且超出并发上限的 worker 自行退出
+
+_queue: "queue.PriorityQueue" = queue.PriorityQueue()
+_seq = itertools.count()
+_lock = threading.Lock()
+_inflight: Dict[str, "_ProbeJob"] = {}
+_workers: Dict[int, threading.Thread] = {}
+
+
+class _ProbeJob:
+    __slots__ = ('key', 'sha1', 'file_node', 'cache_context', 'runner', 'priority', 'started', 'done', 'result', 'callbacks')
+
+    def __init__(self, key: str, sha1: Optional[str], file_node: Any, runner: Callable, priority: int,
+                 cache_context: Optional[Dict[str, Any]] = None):
+        self.key = key
+        self.sha1 = sha1
+        self.file_node = file_node
+        self.cache_context = dict(cache_context or {})
+        self.runner = runner
+        self.priority = priority
+        self.started = False
+        self.done = threading.Event()
+        self.result = None
+        self.callbacks = []
+
+
+def _get_concurrency() -> int:
+    try:
+        value = int(config_manager.APP_CONFIG.get(
+            constants.CONFIG_OPTION_115_FFPROBE_CONCURRENCY, constants.DEFAULT_115_FFPROBE_CONCURRENCY
+        ) or 1)
+    except (TypeError, ValueError):
+        value = constants.DEFAULT_115_FFPROBE_CONCURRENCY
+    return max(1, value)
+
+
+def _job_key(file_node: Any, sha1: Optional[str]) -> Optional[str]:
+    if sha1:
+        return str(sha1).strip().upper()
+    if isinstance(file_node, dict):
+        pick_code = file_node.get('pc') or file_node.get('pick_code') or file_node.get('pickcode')
+    else:
+        pick_code = getattr(file_node, 'pc', None) or getattr(file_node, 'pick_code', None)
+    return f"pc:{pick_code}" if pick_code else None
+
+
+def _ensure_workers():
+    limit = _get_concurrency()
+    with _lock:
+        for slot in range(limit):
+            worker = _workers.get(slot)
+            if worker is None or not worker.is_alive():
+                worker = threading.Thread(target=_worker_loop, args=(slot,), name=f"FfprobeWorker-{slot}", daemon=True)
+                _workers[slot] = worker
+                worker.start()
+
+
+def _worker_loop(slot: int):
+    while True:
+        try:
+            _, _, job = _queue.get(timeout=WORKER_IDLE_SECONDS)
+        except queue.Empty:
+            if slot >= _get_concurrency():
+                with _lock:
+                    if _workers.get(slot) is threading.current_thread():
+                        _workers.pop(slot, None)
+                return
+            continue
+        try:
+            _run_job(job)
+        finally:
+            _queue.task_done()
+
+
+def _run_job(job: _ProbeJob):
+    with _lock:
+        # 优先级提升时同一任务会重复入队，已经执行过的副本直接丢弃
+        if job.started:
+            return
+        job.started = True
+    result = None
+    try:
+        result = job.runner()
+        if result and job.sha1:
+            emby_json, raw_ffprobe = result if isinstance(result, tuple) else (result, None)
+            # 只有 RAW 没有 Emby 结构 (如共享资源补 RAW) 时同样落库，emby_json 允许为空
+            if emby_json or raw_ffprobe:
+                from handler.p115_service import P115CacheManager
+                P115CacheManager.save_mediainfo_cache(
+                    job.sha1,
+                    emby_json or None,
+                    raw_ffprobe,
+                    file_info=job.file_node if isinstance(job.file_node, dict) else None,
+                    fid=job.cache_context.get('fid'),
+                    pick_code=job.cache_context.get('pick_code'),
+                    file_name=job.cache_context.get('file_name'),
+                )
+    except Exception as e:
+        logger.warning(f"  ➜ [ffprobe队列] 探测异常: {job.key[:16]} -> {e}", exc_info=True)
+        result = None
+    finally:
+        with _lock:
+            job.result = result
+            _inflight.pop(job.key, None)
+            callbacks = list(job.callbacks)
+        job.done.set()
+    for callback in callbacks:
+        try:
+            callback(result)
+        except Exception as e:
+            logger.warning(f"  ➜ [ffprobe队列] 探测完成回调失败: {job.key[:16]} -> {e}")
+
+
+def _submit(file_node: Any, sha1: Optional[str], runner: Callable, priority: int, callback: Optional[Callable] = None,
+            cache_context: Optional[Dict[str, Any]] = None) -> Optional[_ProbeJob]:
+    key = _job_key(file_node, sha1)
+    if not key:
+        return None
+    sha1 = str(sha1).strip().upper() if sha1 else None
+    with _lock:
+        job = _inflight.get(key)
+        if job is None:
+            job = _ProbeJob(key, sha1, file_node, runner, priority, cache_context=cache_context)
+            _inflight[key] = job
+            _queue.put((priority, next(_seq), job))
+        else:
+            # 合并到已有任务时，补上先来者没带的缓存上下文
+            for name, value in (cache_context or {}).items():
+                if value and not job.cache_context.get(name):
+                    job.cache_context[name] = value
+            if priority < job.priority and not job.started:
+                job.priority = priority
+                _queue.put((priority, next(_seq), job))
+        if callback:
+            job.callbacks.append(callback)
+    _ensure_workers()
+    return job
+
+
+def probe(file_node: Any, sha1: Optional[str], runner: Callable, priority: int = PRIORITY_INTERACTIVE,
+          cache_context: Optional[Dict[str, Any]] = None):
+    """
+    排队执行一次探测并等待结果。runner 为真正执行 ffprobe 的无参函数，返回 (emby_json, raw_ffprobe) 或 None。
+    同一 SHA1 已在队列/执行中时直接等待那一次的结果。
+    cache_context 可含 fid / pick_code / file_name，原样转给 save_mediainfo_cache。
+    """
+    job = _submit(file_node, sha1, runner, priority, cache_context=cache_context)
+    if job is None:
+        # 连 pick_code 都没有时无从合并，runner 自己会快速返回
+        return runner()
+    job.done.wait()
+    return job.result
+
+
+def prewarm(file_node: Any, sha1: Optional[str], runner: Callable, on_result: Optional[Callable] = None,
+            cache_context: Optional[Dict[str, Any]] = None) -> bool:
+    """以最低优先级入队，不等待。on_result(result) 在探测完成后于 worker 线程中调用。"""
+    return _submit(file_node, sha1, runner, PRIORITY_PREWARM, callback=on_result, cache_context=cache_context) is not None
+
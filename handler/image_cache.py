@@ -0,0 +1,297 @@
+# handler/image_cache.py
+"""
+图片代理磁盘缓存 (Emby 图片 / TMDb 等外部图片)。
+
+- 原图按内容哈希存储 (同图不同 URL 只存一份)，URL -> 内容哈希 的映射单独存 meta。
+- 过期后用上游 ETag / Last-Modified 做条件请求，304 直接续期；上游失败时返回旧图。
+- 支持按宽度缩放 (宽度按 50px 取整，限制变体数量) 及转 WebP，变体同样落盘复用。
+- 对浏览器输出稳定 ETag，命中 If-None-Match 时返回 304。
+- 只缓存上游 Content-Type 为 image/* 的响应；磁盘总量超过 MAX_CACHE_BYTES 时按最近访问时间 (LRU) 淘汰。
+"""
+import os
+import io
+import json
+import time
+import hashlib
+import logging
+import threading
+
+import requests
+
+import config_manager
+
+logger = logging.getLogger(__name__)
+
+_CACHE_DIR = os.path.join(config_manager.PERSISTENT_DATA_PATH, "cache", "images")
+_META_DIR = os.path.join(_CACHE_DIR, "meta")
+_BLOB_DIR = os.path.join(_CACHE_DIR, "blobs")
+
+FRESH_TTL = 24 * 3600              # 普通图片：一天内不回源
+IMMUTABLE_TTL = 30 * 24 * 3600     # 带 tag 的 Emby 图片：内容随 tag 变化，可长期缓存
+PURGE_AFTER = 60 * 24 * 3600       # 超过该时间未被访问的缓存文件会被清理
+MAX_CACHE_BYTES = 2 * 1024 ** 3    # 图片缓存总大小上限，超出后淘汰最久未访问的图片
+PURGE_WRITE_TRIGGER = MAX_CACHE_BYTES // 10   # 自上次清理后新写入这么多字节，提前触发一次清理
+MAX_WIDTH = 2000
+WIDTH_STEP = 50
+
+_session = None
+_session_lock = threading.Lock()
+_last_purge_at = 0
+_written_since_purge = 0
+_purge_running = False
+_purge_lock = threading.Lock()
+
+
+def get_session():
+    """图片代理共用的连接池 Session。"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=1)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def _sha1(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _meta_path(key):
+    return os.path.join(_META_DIR, key[:2], f"{key}.json")
+
+
+def _blob_path(content_hash):
+    return os.path.join(_BLOB_DIR, content_hash[:2], content_hash)
+
+
+def _write_atomic(path, data, mode='wb'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, mode) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _load_meta(key):
+    try:
+        with open(_meta_path(key), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_meta(key, meta):
+    try:
+        _write_atomic(_meta_path(key), json.dumps(meta), mode='w')
+    except OSError as e:
+        logger.debug(f"  ➜ [图片缓存] 写入元信息失败: {e}")
+
+
+def _read_blob(content_hash):
+    path = _blob_path(content_hash)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.utime(path, None)
+        return data
+    except OSError:
+        return None
+
+
+def _note_written(size):
+    global _written_since_purge
+    with _purge_lock:
+        _written_since_purge += size
+
+
+def _store_blob(data):
+    content_hash = hashlib.sha256(data).hexdigest()
+    path = _blob_path(content_hash)
+    if not os.path.exists(path):
+        try:
+            _write_atomic(path, data)
+            _note_written(len(data))
+        except OSError as e:
+            logger.debug(f"  ➜ [图片缓存] 写入图片失败: {e}")
+    return content_hash
+
+
+def _is_image_content_type(content_type):
+    return (content_type or '').split(';', 1)[0].strip().lower().startswith('image/')
+
+
+def normalize_width(width):
+    """把请求宽度规整到 50px 的整数倍，非法值返回 None。"""
+    try:
+        width = int(width)
+    except (TypeError, ValueError):
+        return None
+    if width <= 0:
+        return None
+    width = min(MAX_WIDTH, width)
+    return ((width + WIDTH_STEP - 1) // WIDTH_STEP) * WIDTH_STEP
+
+
+def _make_variant(content_hash, data, content_type, width, fmt):
+    """生成缩放/转码后的变体，返回 (variant_hash, bytes, content_type)。失败时返回原图。"""
+    variant_key = _sha1(f"{content_hash}|{width or ''}|{fmt or ''}")
+    variant_path = _blob_path(variant_key)
+    target_type = 'image/webp' if fmt == 'webp' else content_type
+    cached = _read_blob(variant_key)
+    if cached is not None:
+        return variant_key, cached, target_type
+
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            if width and img.width > width:
+                height = max(1, round(img.height * width / img.width))
+                img = img.resize((width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            if fmt == 'webp':
+                img.save(out, format='WEBP', quality=82, method=4)
+            elif (img.format or '').upper() == 'PNG' or img.mode in ('RGBA', 'LA', 'P'):
+                img.save(out, format='PNG', optimize=True)
+                target_type = 'image/png'
+            else:
+                img.convert('RGB').save(out, format='JPEG', quality=85, optimize=True)
+                target_type = 'image/jpeg'
+        variant_data = out.getvalue()
+        _write_atomic(variant_path, variant_data)
+        _note_written(len(variant_data))
+        return variant_key, variant_data, target_type
+    except Exception as e:
+        logger.debug(f"  ➜ [图片缓存] 缩放图片失败，返回原图: {e}")
+        return content_hash, data, content_type
+
+
+def _maybe_purge():
+    """
+    清理缓存 (后台线程执行)：每天一次，或自上次清理后新写入超过 PURGE_WRITE_TRIGGER 时提前执行。
+    先删长期未访问的文件，再在总大小超限时按 mtime (读取时会 touch) 从旧到新淘汰图片。
+    """
+    global _last_purge_at, _written_since_purge, _purge_running
+    now = time.time()
+    with _purge_lock:
+        if _purge_running:
+            return
+        if now - _last_purge_at < 24 * 3600 and _written_since_purge < PURGE_WRITE_TRIGGER:
+            return
+        _last_purge_at = now
+        _written_since_purge = 0
+        _purge_running = True
+
+    def _purge():
+        global _purge_running
+        removed = 0
+        evicted = 0
+        try:
+            blobs = []
+            total_bytes = 0
+            for base in (_META_DIR, _BLOB_DIR):
+                for root_dir, _, files in os.walk(base):
+                    for name in files:
+                        path = os.path.join(root_dir, name)
+                        try:
+                            st = os.stat(path)
+                            if now - st.st_mtime > PURGE_AFTER:
+                                os.remove(path)
+                                removed += 1
+                            elif base == _BLOB_DIR and not name.endswith('.tmp'):
+                                blobs.append((st.st_mtime, st.st_size, path))
+                                total_bytes += st.st_size
+                        except OSError:
+                            continue
+
+            if total_bytes > MAX_CACHE_BYTES:
+                # 淘汰到上限的 90%，避免每次写入都刚好越线
+                target_bytes = MAX_CACHE_BYTES * 9 // 10
+                for _, size, path in sorted(blobs):
+                    if total_bytes <= target_bytes:
+                        break
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total_bytes -= size
+                    evicted += 1
+        finally:
+            with _purge_lock:
+                _purge_running = False
+        if removed:
+            logger.info(f"  ➜ [图片缓存] 已清理 {removed} 个长期未访问的缓存文件。")
+        if evicted:
+            logger.info(f"  ➜ [图片缓存] 缓存超出上限，已按最近访问时间淘汰 {evicted} 张图片。")
+
+    threading.Thread(target=_purge, name="image-cache-purge", daemon=True).start()
+
+
+def fetch_image(source_key, fetch_url, *, headers=None, proxies=None, immutable=False, timeout=20,
+                width=None, fmt=None, if_none_match=None):
+    """
+    取图 (优先本地缓存)。
+    source_key: 不含密钥的稳定来源标识 (用于缓存键)。
+    返回 dict: status (200/304/上游错误码), body, content_type, etag, max_age, last_modified。
+    """
+    _maybe_purge()
+    key = _sha1(source_key)
+    ttl = IMMUTABLE_TTL if immutable else FRESH_TTL
+    now = time.time()
+    meta = _load_meta(key)
+    data = _read_blob(meta['content_hash']) if meta else None
+
+    if data is None or now - float(meta.get('fetched_at') or 0) > ttl:
+        req_headers = dict(headers or {})
+        if data is not None:
+            if meta.get('upstream_etag'):
+                req_headers['If-None-Match'] = meta['upstream_etag']
+            if meta.get('upstream_last_modified'):
+                req_headers['If-Modified-Since'] = meta['upstream_last_modified']
+        try:
+            resp = get_session().get(fetch_url, headers=req_headers, timeout=timeout, proxies=proxies)
+            if resp.status_code == 304 and data is not None:
+                meta['fetched_at'] = now
+                _save_meta(key, meta)
+            elif resp.status_code == 200 and resp.content and not _is_image_content_type(resp.headers.get('Content-Type')):
+                logger.debug(f"  ➜ [图片缓存] 上游返回非图片内容 ({resp.headers.get('Content-Type')})，不缓存。")
+                if data is None:
+                    return {'status': 415, 'body': None}
+            elif resp.status_code == 200 and resp.content:
+                data = resp.content
+                meta = {
+                    'content_hash': _store_blob(data),
+                    'content_type': resp.headers.get('Content-Type'),
+                    'upstream_etag': resp.headers.get('ETag'),
+                    'upstream_last_modified': resp.headers.get('Last-Modified'),
+                    'fetched_at': now,
+                }
+                _save_meta(key, meta)
+            elif data is None:
+                return {'status': resp.status_code or 502, 'body': None}
+        except requests.exceptions.RequestException as e:
+            if data is None:
+                raise
+            logger.debug(f"  ➜ [图片缓存] 回源失败，返回本地旧图: {e}")
+
+    content_hash, content_type = meta['content_hash'], meta.get('content_type') or 'image/jpeg'
+    if width or fmt:
+        content_hash, data, content_type = _make_variant(content_hash, data, content_type, width, fmt)
+
+    etag = f'"{content_hash[:32]}"'
+    result = {
+        'status': 200,
+        'body': data,
+        'content_type': content_type,
+        'etag': etag,
+        'max_age': ttl,
+        'last_modified': meta.get('upstream_last_modified'),
+    }
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(',')]:
+        result['status'] = 304
+        result['body'] = b''
+    return result
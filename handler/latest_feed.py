@@ -0,0 +1,95 @@
+# handler/latest_feed.py
+"""
+首页“最新项目”：基于 user_latest_feed 物化视图。
+
+- 首页读取只查一次物化表 (跨虚拟库按入库时间倒序去重)，Emby 只补齐最终一页的详情。
+- 物化行缺失 / 被标记失效 / 超龄时，仅对该用户的这几个虚拟库重跑规则查询并回写。
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from database import custom_collection_db, latest_feed_db, queries_db
+
+logger = logging.getLogger(__name__)
+
+# 每个 (用户, 虚拟库) 物化的最新项目数量，也是单次首页请求能返回的上限
+FEED_SIZE = 100
+
+
+def get_collection_filter_ids(coll_data: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    获取合集的 TMDb ID 过滤器：
+    - 榜单类：限制在榜单包含的 TMDb ID 范围内；
+    - AI 推荐类：暂不支持“最新”视图 (动态生成)，返回一个不存在的 ID 防止泄露；
+    - 规则类：返回 None，表示不限制 ID，只走 Rules。
+    """
+    c_type = coll_data.get('type')
+    if c_type == 'list':
+        raw_json = coll_data.get('generated_media_info_json')
+        raw_list = json.loads(raw_json) if isinstance(raw_json, str) else (raw_json or [])
+        return [str(i.get('tmdb_id')) for i in raw_list if i.get('tmdb_id')]
+    elif c_type in ['ai_recommendation', 'ai_recommendation_global']:
+        return ["-1"]
+    return None
+
+
+def _is_empty_filter(tmdb_ids_filter: Optional[List[str]]) -> bool:
+    return tmdb_ids_filter is not None and (len(tmdb_ids_filter) == 0 or tmdb_ids_filter == ["-1"])
+
+
+def _get_definition(coll: Dict[str, Any]) -> Dict[str, Any]:
+    definition = coll.get('definition_json') or {}
+    if isinstance(definition, str):
+        definition = json.loads(definition)
+    return definition
+
+
+def _rebuild_collection_feed(user_id: str, coll: Dict[str, Any]):
+    built_at = latest_feed_db.get_build_timestamp()
+    if built_at is None:
+        return
+    definition = _get_definition(coll)
+    tmdb_ids_filter = get_collection_filter_ids(coll)
+    items = []
+    if not _is_empty_filter(tmdb_ids_filter):
+        items, _ = queries_db.query_virtual_library_items(
+            rules=definition.get('rules', []),
+            logic=definition.get('logic', 'AND'),
+            user_id=user_id,
+            limit=FEED_SIZE,
+            offset=0,
+            sort_by='DateCreated',
+            sort_order='Descending',
+            item_types=definition.get('item_type', ['Movie']),
+            target_library_ids=definition.get('target_library_ids', []),
+            tmdb_ids=tmdb_ids_filter
+        )
+    latest_feed_db.replace_collection_feed(user_id, coll['id'], items, built_at)
+
+
+def get_user_latest_item_ids(user_id: str, limit: int) -> List[str]:
+    """全局最新：返回该用户所有可见、开启“显示最新”的虚拟库中最新的 Emby ID 列表。"""
+    visible = []
+    for coll in custom_collection_db.get_all_active_custom_collections():
+        if not _get_definition(coll).get('show_in_latest', True):
+            continue
+        # 检查权限
+        allowed_users = coll.get('allowed_user_ids')
+        if allowed_users and user_id not in allowed_users:
+            continue
+        visible.append(coll)
+    if not visible:
+        return []
+
+    by_id = {coll['id']: coll for coll in visible}
+    stale_ids = latest_feed_db.get_stale_collection_ids(user_id, list(by_id.keys()))
+    if stale_ids:
+        logger.debug(f"  ➜ [最新视图] 用户 {user_id} 有 {len(stale_ids)} 个虚拟库的最新列表需要重建。")
+    for coll_id in stale_ids:
+        try:
+            _rebuild_collection_feed(user_id, by_id[coll_id])
+        except Exception as e:
+            logger.error(f"  ➜ [最新视图] 重建合集 {coll_id} 的最新列表失败: {e}")
+
+    return latest_feed_db.get_latest_item_ids(user_id, list(by_id.keys()), min(limit, FEED_SIZE))
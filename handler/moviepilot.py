@@ -3,7 +3,11 @@
 import requests
 import json
 import re
+import time
+import base64
+import hashlib
 import logging
+import threading
 from typing import Dict, Any, Optional, List, Tuple
 
 import handler.tmdb as tmdb
@@ -67,34 +71,177 @@ _MP_RENAME_OPTIONAL_SEGMENT_VARS = {
 # 核心基础函数 (Token管理与API请求)
 # ======================================================================
 
-def _get_access_token(config: Dict[str, Any] = None) -> Optional[str]:
+class _MoviePilotClient:
     """
-    【内部辅助】获取 MoviePilot 的 Access Token。
+    MoviePilot API 客户端 (模块级单例)。
+    - mp_config 短时缓存，避免每次请求都查库；
+    - Access Token (JWT) 缓存到过期前，401 时自动重新登录并重放一次；
+    - 复用 keep-alive 连接池；
+    - 订阅列表等读多写少的接口做短 TTL 缓存，写操作后主动失效。
     """
-    try:
-        # ★★★ 统一从 mp_config 读取
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+    _SETTINGS_TTL = 30
+    _DEFAULT_TOKEN_TTL = 30 * 60
+    _TOKEN_EXPIRE_MARGIN = 60
+    SUBSCRIPTIONS_TTL = 30
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._session = None
+        self._settings = None
+        self._settings_at = 0.0
+        self._token = None
+        self._token_key = None
+        self._token_expires_at = 0.0
+        self._subs_cache = None
+        self._subs_cache_key = None
+        self._subs_cache_at = 0.0
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def settings(self) -> Dict[str, Any]:
+        now = time.time()
+        if self._settings is None or now - self._settings_at > self._SETTINGS_TTL:
+            self._settings = settings_db.get_setting('mp_config') or {}
+            self._settings_at = now
+        return self._settings
+
+    def invalidate_settings(self):
+        """配置保存后调用：下次请求重新读取 mp_config 并重新登录。"""
+        with self._lock:
+            self._settings = None
+            self._token = None
+            self._subs_cache = None
+
+    @property
+    def base_url(self) -> str:
+        return str(self.settings().get('moviepilot_url') or '').rstrip('/')
+
+    @staticmethod
+    def _decode_jwt_exp(token: str) -> Optional[float]:
+        try:
+            payload = token.split('.')[1]
+            payload += '=' * (-len(payload) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+            return float(exp) if exp else None
+        except Exception:
+            return None
+
+    def _credentials_key(self) -> Optional[tuple]:
+        mp_config = self.settings()
+        moviepilot_url = str(mp_config.get('moviepilot_url') or '').rstrip('/')
         mp_username = mp_config.get('moviepilot_username', '')
         mp_password = mp_config.get('moviepilot_password', '')
-        
         if not all([moviepilot_url, mp_username, mp_password]):
             return None
+        pwd_digest = hashlib.sha1(str(mp_password).encode('utf-8')).hexdigest()
+        return moviepilot_url, mp_username, mp_password, pwd_digest
 
-        login_url = f"{moviepilot_url}/api/v1/login/access-token"
-        login_data = {"username": mp_username, "password": mp_password}
-        
-        login_response = requests.post(login_url, data=login_data, timeout=10)
-        login_response.raise_for_status()
-        
-        return login_response.json().get("access_token")
-    except Exception as e:
-        logger.error(f"  ➜ 获取 MoviePilot Token 失败: {e}")
+    def get_token(self, force_refresh: bool = False) -> Optional[str]:
+        creds = self._credentials_key()
+        if not creds:
+            return None
+        moviepilot_url, mp_username, mp_password, pwd_digest = creds
+        token_key = (moviepilot_url, mp_username, pwd_digest)
+
+        with self._lock:
+            if (not force_refresh and self._token and self._token_key == token_key
+                    and time.time() < self._token_expires_at):
+                return self._token
+
+            try:
+                login_url = f"{moviepilot_url}/api/v1/login/access-token"
+                login_data = {"username": mp_username, "password": mp_password}
+                login_response = self.session.post(login_url, data=login_data, timeout=10)
+                login_response.raise_for_status()
+                token = login_response.json().get("access_token")
+            except Exception as e:
+                logger.error(f"  ➜ 获取 MoviePilot Token 失败: {e}")
+                self._token = None
+                return None
+
+            if not token:
+                self._token = None
+                return None
+
+            expires_at = self._decode_jwt_exp(token) or (time.time() + self._DEFAULT_TOKEN_TTL)
+            self._token = token
+            self._token_key = token_key
+            self._token_expires_at = expires_at - self._TOKEN_EXPIRE_MARGIN
+            logger.debug("  ➜ 已登录 MoviePilot 并缓存 Access Token。")
+            return token
+
+    def request(self, method: str, url: str, headers: dict = None, **kwargs) -> requests.Response:
+        """发起 MP 请求；携带的 Token 失效 (401) 时重新登录并重放一次。"""
+        response = self.session.request(method, url, headers=headers, **kwargs)
+        if response.status_code == 401 and headers and 'Authorization' in headers:
+            logger.debug("  ➜ MoviePilot Token 已失效，重新登录后重试。")
+            new_token = self.get_token(force_refresh=True)
+            if new_token:
+                headers = dict(headers)
+                headers['Authorization'] = f"Bearer {new_token}"
+                response = self.session.request(method, url, headers=headers, **kwargs)
+        if method.upper() != 'GET' and '/api/v1/subscribe' in url:
+            # 订阅发生增删改，订阅列表缓存立即作废
+            self.invalidate_subscriptions()
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def get_cached_subscriptions(self) -> Optional[List[dict]]:
+        with self._lock:
+            if (self._subs_cache is not None and self._subs_cache_key == self.base_url
+                    and time.time() - self._subs_cache_at < self.SUBSCRIPTIONS_TTL):
+                # 返回浅拷贝，避免调用方修改后污染缓存
+                return [dict(sub) for sub in self._subs_cache]
         return None
 
+    def set_cached_subscriptions(self, subs: List[dict]):
+        with self._lock:
+            self._subs_cache = [dict(sub) for sub in subs if isinstance(sub, dict)]
+            self._subs_cache_key = self.base_url
+            self._subs_cache_at = time.time()
+
+    def invalidate_subscriptions(self):
+        with self._lock:
+            self._subs_cache = None
+
+
+_mp_client = _MoviePilotClient()
+
+
+def _get_access_token(config: Dict[str, Any] = None) -> Optional[str]:
+    """
+    【内部辅助】获取 MoviePilot 的 Access Token (带缓存，过期前复用)。
+    """
+    return _mp_client.get_token()
+
+
+def reset_client_cache():
+    """MoviePilot 配置变更后清空客户端缓存 (配置、Token、订阅列表)。"""
+    _mp_client.invalidate_settings()
+
 def _get_mp_base_and_headers(config: Dict[str, Any] = None) -> Tuple[str, Optional[dict], str]:
-    mp_config = settings_db.get_setting('mp_config') or {}
-    moviepilot_url = str(mp_config.get('moviepilot_url') or '').rstrip('/')
+    moviepilot_url = _mp_client.base_url
     if not moviepilot_url:
         return "", None, "MoviePilot URL 未配置"
 
@@ -265,8 +412,7 @@ def subscribe_with_custom_payload(payload: dict, config: Dict[str, Any] = None)
     所有其他订阅函数最终都应调用此函数。
     """
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         
         access_token = _get_access_token(config)
         if not access_token:
@@ -278,7 +424,7 @@ def subscribe_with_custom_payload(payload: dict, config: Dict[str, Any] = None)
 
         logger.trace(f"  ➜ 最终发送给 MoviePilot 的 Payload: {json.dumps(payload, ensure_ascii=False)}")
         
-        sub_response = requests.post(subscribe_url, headers=subscribe_headers, json=payload, timeout=60)
+        sub_response = _mp_client.post(subscribe_url, headers=subscribe_headers, json=payload, timeout=60)
         
         if sub_response.status_code in [200, 201, 204]:
             logger.info(f"  ➜ MoviePilot 已接受订阅任务。")
@@ -299,8 +445,7 @@ def cancel_subscription(tmdb_id: str, item_type: str, config: Dict[str, Any], se
     【取消订阅】根据 TMDB ID 和类型取消订阅。
     """
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         
         access_token = _get_access_token(config)
         if not access_token:
@@ -320,7 +465,7 @@ def cancel_subscription(tmdb_id: str, item_type: str, config: Dict[str, Any], se
             logger.info(f"  ➜ 正在向 MoviePilot 发送取消订阅请求: {media_id_for_api}{season_log}")
 
             try:
-                response = requests.delete(cancel_url, headers=headers, params=params, timeout=30)
+                response = _mp_client.delete(cancel_url, headers=headers, params=params, timeout=30)
                 if response.status_code in [200, 204]:
                     logger.info(f"  ➜ MoviePilot 已成功取消订阅: {media_id_for_api}{season_log}")
                     return True
@@ -375,8 +520,7 @@ def check_subscription_exists(tmdb_id: str, item_type: str, config: Dict[str, An
     【查询订阅】检查订阅是否存在。
     """
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         
         access_token = _get_access_token(config)
         if not access_token:
@@ -390,7 +534,7 @@ def check_subscription_exists(tmdb_id: str, item_type: str, config: Dict[str, An
         if item_type in ['Series', 'Season'] and season is not None:
             params['season'] = season
 
-        response = requests.get(api_url, headers=headers, params=params, timeout=15)
+        response = _mp_client.get(api_url, headers=headers, params=params, timeout=15)
         
         if response.status_code == 200:
             data = response.json()
@@ -402,17 +546,23 @@ def check_subscription_exists(tmdb_id: str, item_type: str, config: Dict[str, An
         return False
 
 
-def list_subscriptions(config: Dict[str, Any] = None) -> List[dict]:
-    """返回 MoviePilot 当前全部订阅。"""
+def list_subscriptions(config: Dict[str, Any] = None, use_cache: bool = True) -> List[dict]:
+    """返回 MoviePilot 当前全部订阅 (默认走短 TTL 缓存，订阅变更后自动失效)。"""
     try:
+        if use_cache:
+            cached = _mp_client.get_cached_subscriptions()
+            if cached is not None:
+                return cached
         moviepilot_url, headers, error = _get_mp_base_and_headers(config)
         if error:
             logger.warning(f"  ➜ 获取 MP 订阅列表失败：{error}")
             return []
-        res = requests.get(f"{moviepilot_url}/api/v1/subscribe/", headers=headers, timeout=20)
+        res = _mp_client.get(f"{moviepilot_url}/api/v1/subscribe/", headers=headers, timeout=20)
         if res.status_code == 200:
             data = res.json()
-            return data if isinstance(data, list) else []
+            data = data if isinstance(data, list) else []
+            _mp_client.set_cached_subscriptions(data)
+            return data
         logger.warning(f"  ➜ 获取 MP 订阅列表失败: {res.status_code} - {res.text[:200]}")
         return []
     except Exception as e:
@@ -438,7 +588,7 @@ def delete_subscription_by_id(subscribe_id: int, config: Dict[str, Any] = None)
         if error:
             logger.warning(f"  ➜ 删除 MP 订阅失败：{error}")
             return False
-        res = requests.delete(f"{moviepilot_url}/api/v1/subscribe/{int(subscribe_id)}", headers=headers, timeout=15)
+        res = _mp_client.delete(f"{moviepilot_url}/api/v1/subscribe/{int(subscribe_id)}", headers=headers, timeout=15)
         return res.status_code in (200, 204)
     except Exception as e:
         logger.error(f"  ➜ 删除 MP 订阅异常: {e}")
@@ -490,8 +640,7 @@ def update_subscription_status(tmdb_id: int, season: Optional[int], status: str,
     status: 'R' (运行/订阅), 'S' (暂停/停止), 'P' (待定)
     """
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         
         access_token = _get_access_token(config)
         if not access_token:
@@ -506,7 +655,7 @@ def update_subscription_status(tmdb_id: int, season: Optional[int], status: str,
         if season is not None:
             get_params['season'] = season
         
-        get_res = requests.get(get_url, headers=headers, params=get_params, timeout=10)
+        get_res = _mp_client.get(get_url, headers=headers, params=get_params, timeout=10)
         
         sub_id = None
         if get_res.status_code == 200:
@@ -519,11 +668,11 @@ def update_subscription_status(tmdb_id: int, season: Optional[int], status: str,
 
         status_url = f"{moviepilot_url}/api/v1/subscribe/status/{sub_id}"
         status_params = {"state": status}
-        requests.put(status_url, headers=headers, params=status_params, timeout=10)
+        _mp_client.put(status_url, headers=headers, params=status_params, timeout=10)
         
         if total_episodes is not None:
             detail_url = f"{moviepilot_url}/api/v1/subscribe/{sub_id}"
-            detail_res = requests.get(detail_url, headers=headers, timeout=10)
+            detail_res = _mp_client.get(detail_url, headers=headers, timeout=10)
             
             if detail_res.status_code == 200:
                 sub_data = detail_res.json()
@@ -541,7 +690,7 @@ def update_subscription_status(tmdb_id: int, season: Optional[int], status: str,
                         logger.info(f"  ➜ [MP修正] 自动修正缺失集数: {old_lack} -> {new_lack} (因总集数 {old_total}->{total_episodes})")
 
                     update_url = f"{moviepilot_url}/api/v1/subscribe/"
-                    update_res = requests.put(update_url, headers=headers, json=sub_data, timeout=10)
+                    update_res = _mp_client.put(update_url, headers=headers, json=sub_data, timeout=10)
                     
                     if update_res.status_code in [200, 204]:
                         logger.info(f"  ➜ [MP同步] 已将 MP 订阅 (ID:{sub_id}) 的总集数更新为 {total_episodes}")
@@ -675,7 +824,7 @@ def _extract_download_task_list(data: Any) -> list:
 
 def _request_json(method: str, url: str, headers: dict = None, **kwargs):
     try:
-        response = requests.request(method, url, headers=headers, **kwargs)
+        response = _mp_client.request(method, url, headers=headers, **kwargs)
         if response.status_code not in (200, 201, 204):
             return None, response
         if response.status_code == 204 or not response.text:
@@ -980,8 +1129,7 @@ def analyze_mp_download_history_for_deletion(tmdb_id: str, item_type: str, seaso
     hashes_to_delete = set()
 
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         access_token = _get_access_token(config)
         if not access_token or not moviepilot_url:
             return []
@@ -1053,8 +1201,7 @@ def analyze_mp_records_for_deletion(tmdb_id: str, item_type: str, season: Option
     hashes_to_delete = set()
     
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         access_token = _get_access_token(config)
         if not access_token: return [], []
 
@@ -1067,7 +1214,7 @@ def analyze_mp_records_for_deletion(tmdb_id: str, item_type: str, season: Option
         # 1. 拉取该标题下的所有整理记录
         while True:
             try:
-                res = requests.get(search_url, headers=headers, params={"title": title, "page": page, "count": 500}, timeout=30)
+                res = _mp_client.get(search_url, headers=headers, params={"title": title, "page": page, "count": 500}, timeout=30)
                 if res.status_code != 200: break
                 data = res.json()
                 if not data: break
@@ -1140,8 +1287,7 @@ def analyze_mp_episode_residue_for_deletion(tmdb_id: str, seasons: Optional[List
     target_seasons = {int(s) for s in (seasons or []) if s}
 
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         access_token = _get_access_token(config)
         if not access_token:
             return [], []
@@ -1153,7 +1299,7 @@ def analyze_mp_episode_residue_for_deletion(tmdb_id: str, seasons: Optional[List
 
         while True:
             try:
-                res = requests.get(search_url, headers=headers, params={"title": title, "page": page, "count": 500}, timeout=30)
+                res = _mp_client.get(search_url, headers=headers, params={"title": title, "page": page, "count": 500}, timeout=30)
                 if res.status_code != 200:
                     break
                 data = res.json()
@@ -1208,8 +1354,7 @@ def analyze_mp_episode_residue_download_history(tmdb_id: str, seasons: Optional[
     target_seasons = {int(s) for s in (seasons or []) if s}
 
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         access_token = _get_access_token(config)
         if not access_token or not moviepilot_url:
             return []
@@ -1262,8 +1407,7 @@ def analyze_mp_episode_residue_download_history(tmdb_id: str, seasons: Optional[
 def smart_cleanup_mp_episode_residue(tmdb_id: str, seasons: Optional[List[int]], title: str, config: Dict[str, Any], delete_history: bool = True, delete_files: bool = True) -> bool:
     """订阅完成后清理分集转全集留下的单集整理记录、种子和源文件。"""
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         access_token = _get_access_token(config)
         if not access_token:
             return False
@@ -1284,7 +1428,7 @@ def smart_cleanup_mp_episode_residue(tmdb_id: str, seasons: Optional[List[int]],
             del_params = {"deletesrc": "false", "deletedest": "false"}
             for rec in records_to_delete:
                 try:
-                    requests.delete(del_url, headers=headers, params=del_params, json=rec, timeout=10)
+                    _mp_client.delete(del_url, headers=headers, params=del_params, json=rec, timeout=10)
                 except Exception:
                     pass
             logger.info("  ➜ [订阅清理] 分集整理记录删除完成。")
@@ -1296,7 +1440,7 @@ def smart_cleanup_mp_episode_residue(tmdb_id: str, seasons: Optional[List[int]],
             tasks_to_delete = _expand_hashes_with_same_data(hashes_to_delete, all_tasks, action_name="删除")
             for h in tasks_to_delete:
                 try:
-                    res = requests.delete(f"{moviepilot_url}/api/v1/download/{h}", headers=headers, timeout=20)
+                    res = _mp_client.delete(f"{moviepilot_url}/api/v1/download/{h}", headers=headers, timeout=20)
                     ok = res.status_code in [200, 204]
                     try:
                         body = res.json()
@@ -1325,8 +1469,7 @@ def smart_cleanup_mp_media(tmdb_id: str, item_type: str, season: Optional[int],
     【无脑删除版】取消存活集保护，宁可错杀一千，绝不放过一个。
     """
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         access_token = _get_access_token(config)
         if not access_token: return False
 
@@ -1351,7 +1494,7 @@ def smart_cleanup_mp_media(tmdb_id: str, item_type: str, season: Optional[int],
             del_url = f"{moviepilot_url}/api/v1/history/transfer"
             del_params = {"deletesrc": "false", "deletedest": "false"}
             for rec in records_to_delete:
-                try: requests.delete(del_url, headers=headers, params=del_params, json=rec, timeout=10)
+                try: _mp_client.delete(del_url, headers=headers, params=del_params, json=rec, timeout=10)
                 except: pass
             logger.info(f"  ➜ [MP智能清理] 整理记录删除完成。")
 
@@ -1367,7 +1510,7 @@ def smart_cleanup_mp_media(tmdb_id: str, item_type: str, season: Optional[int],
             # 执行删除
             for h in tasks_to_delete:
                 try:
-                    res = requests.delete(f"{moviepilot_url}/api/v1/download/{h}", headers=headers, timeout=20)
+                    res = _mp_client.delete(f"{moviepilot_url}/api/v1/download/{h}", headers=headers, timeout=20)
                     ok = res.status_code in [200, 204]
                     try:
                         body = res.json()
@@ -1399,8 +1542,7 @@ def delete_download_tasks(keyword: str, config: Dict[str, Any] = None, hashes: l
         return False
 
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         
         access_token = _get_access_token(config)
         if not access_token: return False
@@ -1415,7 +1557,7 @@ def delete_download_tasks(keyword: str, config: Dict[str, Any] = None, hashes: l
             
             del_url = f"{moviepilot_url}/api/v1/download/{task_hash}"
             try:
-                del_res = requests.delete(del_url, headers=headers, timeout=10)
+                del_res = _mp_client.delete(del_url, headers=headers, timeout=10)
                 if del_res.status_code == 200:
                     logger.info(f" ➜ [下载器清理] 已精确删除任务 Hash: {task_hash[:8]}...")
                     deleted_count += 1
@@ -1438,14 +1580,13 @@ def delete_download_tasks(keyword: str, config: Dict[str, Any] = None, hashes: l
 def get_downloading_tasks(config: Dict[str, Any] = None) -> list:
     """获取 MP 正在下载列表。注意：这个接口只返回“下载中”，不包含全部做种任务。"""
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         
         access_token = _get_access_token(config)
         if not access_token: return []
 
         headers = {"Authorization": f"Bearer {access_token}"}
-        res = requests.get(f"{moviepilot_url}/api/v1/download/", headers=headers, timeout=15)
+        res = _mp_client.get(f"{moviepilot_url}/api/v1/download/", headers=headers, timeout=15)
         if res.status_code == 200:
             tasks = _extract_download_task_list(res.json())
             if tasks:
@@ -1459,24 +1600,13 @@ def get_downloading_tasks(config: Dict[str, Any] = None) -> list:
 def get_subscription_by_tmdbid(tmdb_id: int, season: Optional[int], config: Dict[str, Any] = None) -> dict:
     """根据 TMDb ID 获取单条订阅详情 (通过遍历所有订阅实现，更可靠)"""
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
-        
-        access_token = _get_access_token(config)
-        if not access_token: return {}
-
-        headers = {"Authorization": f"Bearer {access_token}"}
-        res = requests.get(f"{moviepilot_url}/api/v1/subscribe/", headers=headers, timeout=15)
-        
-        if res.status_code == 200:
-            subs = res.json()
-            for sub in subs:
-                if str(sub.get('tmdbid')) == str(tmdb_id):
-                    if season is not None:
-                        if str(sub.get('season')) == str(season):
-                            return sub
-                    else:
+        for sub in list_subscriptions(config):
+            if str(sub.get('tmdbid')) == str(tmdb_id):
+                if season is not None:
+                    if str(sub.get('season')) == str(season):
                         return sub
+                else:
+                    return sub
         return {}
     except Exception as e:
         logger.error(f"  ➜ 获取 MP 订阅详情失败: {e}")
@@ -1487,14 +1617,13 @@ def update_subscription(payload: dict, config: Dict[str, Any] = None) -> bool:
     【更新订阅】根据提供的 payload 更新订阅信息。
     """
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         
         access_token = _get_access_token(config)
         if not access_token: return False
 
         headers = {"Authorization": f"Bearer {access_token}"}
-        res = requests.put(f"{moviepilot_url}/api/v1/subscribe/", headers=headers, json=payload, timeout=15)
+        res = _mp_client.put(f"{moviepilot_url}/api/v1/subscribe/", headers=headers, json=payload, timeout=15)
         if res.status_code in [200, 204]:
             return True
         logger.warning(f"  ➜ 更新 MP 订阅失败: {res.status_code} - {res.text}")
@@ -1619,14 +1748,13 @@ def lock_series_subscription_version(
 def search_subscription(sub_id: int, config: Dict[str, Any] = None) -> bool:
     """触发指定订阅的立即搜索"""
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         
         access_token = _get_access_token(config)
         if not access_token: return False
 
         headers = {"Authorization": f"Bearer {access_token}"}
-        res = requests.get(f"{moviepilot_url}/api/v1/subscribe/search/{sub_id}", headers=headers, timeout=30)
+        res = _mp_client.get(f"{moviepilot_url}/api/v1/subscribe/search/{sub_id}", headers=headers, timeout=30)
         return res.status_code == 200
     except Exception as e:
         logger.error(f"  ➜ 触发 MP 订阅搜索失败: {e}")
@@ -1638,8 +1766,7 @@ def recognize_media(title: str, config: Dict[str, Any] = None) -> Optional[tuple
     返回: (tmdb_id, media_type, title) 或 None
     """
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         
         access_token = _get_access_token(config)
         if not access_token or not moviepilot_url:
@@ -1649,7 +1776,7 @@ def recognize_media(title: str, config: Dict[str, Any] = None) -> Optional[tuple
         headers = {"Authorization": f"Bearer {access_token}"}
         params = {"title": title}
 
-        res = requests.get(url, headers=headers, params=params, timeout=10)
+        res = _mp_client.get(url, headers=headers, params=params, timeout=10)
         if res.status_code == 200:
             data = res.json()
             media_info = data.get("media_info")
@@ -1723,15 +1850,14 @@ def cleanup_stale_washing_subscriptions(config: Dict[str, Any], timeout_days: in
 
     cleaned_subs = []
     try:
-        mp_config = settings_db.get_setting('mp_config') or {}
-        moviepilot_url = mp_config.get('moviepilot_url', '').rstrip('/')
+        moviepilot_url = _mp_client.base_url
         access_token = _get_access_token(config)
         if not access_token: 
             return []
 
         headers = {"Authorization": f"Bearer {access_token}"}
         # 获取所有订阅
-        res = requests.get(f"{moviepilot_url}/api/v1/subscribe/", headers=headers, timeout=15)
+        res = _mp_client.get(f"{moviepilot_url}/api/v1/subscribe/", headers=headers, timeout=15)
 
         if res.status_code != 200:
             return []
@@ -1765,7 +1891,7 @@ def cleanup_stale_washing_subscriptions(config: Dict[str, Any], timeout_days: in
 
                     # 调用删除接口
                     del_url = f"{moviepilot_url}/api/v1/subscribe/{sub_id}"
-                    del_res = requests.delete(del_url, headers=headers, timeout=10)
+                    del_res = _mp_client.delete(del_url, headers=headers, timeout=10)
                     
                     if del_res.status_code in [200, 204]:
                         logger.info(f"  ➜ [洗版清理] 成功取消超时洗版订阅: 《{name}》S{season}")
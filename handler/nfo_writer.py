@@ -0,0 +1,259 @@
+# handler/nfo_writer.py
+"""
+NFO 写入器 (内容哈希清单 + 原子写入)。
+
+- 每个 NFO 目录在本地数据目录下对应一份清单：文件名 -> 内容哈希 / mtime / 大小。
+- 新内容哈希与清单一致、且文件 mtime/大小未被外部改动时直接跳过，不读取旧文件。
+- 清单缺失 (首次运行) 时读一次旧文件比对哈希，一致则只补记清单。
+- 写入走同目录临时文件 + os.replace，不会留下写了一半的 NFO。
+- write_many 按目录分组，同一批次 (如整季分集) 在有界 I/O 线程池中并发写入。
+- 媒体项删除时 forget_media_paths 移除对应条目；目录已不存在的清单由 prune_stale_manifests 回收。
+"""
+import os
+import json
+import hashlib
+import logging
+import time
+import threading
+import concurrent.futures
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import config_manager
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST_DIR = os.path.join(config_manager.PERSISTENT_DATA_PATH, "cache", "nfo_manifest")
+NFO_IO_WORKERS = 4
+PRUNE_MIN_INTERVAL = 600     # 两次全量回收清单之间的最短间隔 (秒)
+
+_dir_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+_dir_locks_guard = threading.Lock()
+_prune_lock = threading.Lock()
+_last_prune_at = 0.0
+
+
+def _dir_lock(directory: str) -> threading.Lock:
+    with _dir_locks_guard:
+        return _dir_locks[directory]
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def _manifest_path(directory: str) -> str:
+    key = hashlib.sha1(os.path.normpath(directory).encode('utf-8')).hexdigest()
+    return os.path.join(_MANIFEST_DIR, key[:2], f"{key}.json")
+
+
+def _read_manifest_file(path: str) -> Tuple[str, Dict[str, dict]]:
+    """返回 (记录的目录, 文件条目)。早期版本的清单只有文件条目，目录为空串。"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return "", {}
+    if not isinstance(data, dict):
+        return "", {}
+    if isinstance(data.get('files'), dict):
+        return str(data.get('dir') or ""), data['files']
+    return "", data
+
+
+def _load_manifest(directory: str) -> Dict[str, dict]:
+    return _read_manifest_file(_manifest_path(directory))[1]
+
+
+def _save_manifest(directory: str, manifest: Dict[str, dict]):
+    path = _manifest_path(directory)
+    if not manifest:
+        _remove_manifest_file(path)
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dir': os.path.normpath(directory), 'files': manifest}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.debug(f"  ➜ [NFO] 保存哈希清单失败 ({directory}): {e}")
+
+
+def _remove_manifest_file(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.debug(f"  ➜ [NFO] 删除哈希清单失败 ({path}): {e}")
+        return False
+
+
+def _stat_signature(path: str):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def _is_unchanged(path: str, digest: str, entry: dict) -> bool:
+    """判断磁盘上的 NFO 是否已是目标内容。"""
+    signature = _stat_signature(path)
+    if signature is None:
+        return False
+    if entry:
+        return entry.get('h') == digest and [entry.get('m'), entry.get('s')] == list(signature)
+    # 清单里没有记录：读一次旧文件做哈希比对
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return _content_hash(f.read()) == digest
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def _write_atomic(path: str, content: str):
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{name}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _write_one(path: str, content: str, digest: str, entry: dict, force: bool) -> Tuple[bool, dict]:
+    """返回 (是否实际写入, 新的清单条目)。写入失败时条目为 None。"""
+    if not force and _is_unchanged(path, digest, entry):
+        if entry:
+            return False, entry
+        signature = _stat_signature(path)
+        return False, {'h': digest, 'm': signature[0], 's': signature[1]} if signature else None
+    try:
+        _write_atomic(path, content)
+    except Exception as e:
+        logger.error(f"  ➜ 写入 NFO 失败 {path}: {e}")
+        return False, None
+    signature = _stat_signature(path)
+    return True, {'h': digest, 'm': signature[0], 's': signature[1]} if signature else None
+
+
+def write_many(jobs: List[Tuple[str, str]], force: bool = False) -> Tuple[int, int]:
+    """
+    批量写入 NFO。jobs: [(nfo_path, content), ...]。
+    返回 (实际写入数, 跳过数)；写入失败的既不计入写入也不计入跳过。
+    """
+    by_dir: Dict[str, Dict[str, str]] = defaultdict(dict)
+    for path, content in jobs:
+        # 同一路径重复出现时以最后一次为准
+        by_dir[os.path.dirname(path)][os.path.basename(path)] = content
+
+    written = skipped = 0
+    for directory, files in by_dir.items():
+        with _dir_lock(directory):
+            manifest = _load_manifest(directory)
+            tasks = [
+                (os.path.join(directory, name), content, _content_hash(content), manifest.get(name), name)
+                for name, content in files.items()
+            ]
+            if len(tasks) == 1:
+                results = [_write_one(*tasks[0][:4], force)]
+            else:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=min(NFO_IO_WORKERS, len(tasks))) as executor:
+                    results = list(executor.map(lambda t: _write_one(*t[:4], force), tasks))
+
+            manifest_changed = False
+            for task, (did_write, entry) in zip(tasks, results):
+                name = task[4]
+                if did_write:
+                    written += 1
+                elif entry is not None:
+                    skipped += 1
+                if entry is None:
+                    manifest_changed = manifest.pop(name, None) is not None or manifest_changed
+                elif manifest.get(name) != entry:
+                    manifest[name] = entry
+                    manifest_changed = True
+            if manifest_changed:
+                _save_manifest(directory, manifest)
+    return written, skipped
+
+
+def write_if_changed(path: str, content: str, force: bool = False) -> bool:
+    """写入单个 NFO，内容未变时跳过。返回是否实际写入。"""
+    written, _ = write_many([(path, content)], force=force)
+    return written > 0
+
+
+def forget_media_paths(media_paths: List[str]):
+    """
+    媒体项被删除后移除其 NFO 的清单条目。
+    文件路径 (电影 / 分集) 只移除同名 .nfo 条目；目录路径 (剧集根目录) 或目录已不存在时整份清单删除，
+    并回收该目录下各季子目录的清单。
+    """
+    removed_roots = []
+    for media_path in media_paths or []:
+        if not media_path:
+            continue
+        media_path = os.path.normpath(str(media_path))
+        if os.path.splitext(media_path)[1] and not os.path.isdir(media_path):
+            directory = os.path.dirname(media_path)
+            nfo_name = os.path.splitext(os.path.basename(media_path))[0] + ".nfo"
+        else:
+            directory, nfo_name = media_path, None
+            removed_roots.append(media_path)
+
+        with _dir_lock(directory):
+            if nfo_name and os.path.isdir(directory):
+                manifest = _load_manifest(directory)
+                if manifest.pop(nfo_name, None) is not None:
+                    _save_manifest(directory, manifest)
+            else:
+                _remove_manifest_file(_manifest_path(directory))
+
+    if removed_roots:
+        prune_stale_manifests(under=removed_roots, force=True)
+
+
+def prune_stale_manifests(under: List[str] = None, force: bool = False) -> int:
+    """
+    删除所记录目录已不存在的清单。under 给定时只处理这些目录下的清单 (含目录已存在但属于被删剧集的子目录)。
+    未指定 force 时两次全量回收之间至少间隔 PRUNE_MIN_INTERVAL 秒。返回删除的清单数量。
+    """
+    global _last_prune_at
+    if not os.path.isdir(_MANIFEST_DIR):
+        return 0
+    with _prune_lock:
+        if not force and time.time() - _last_prune_at < PRUNE_MIN_INTERVAL:
+            return 0
+        if under is None:
+            _last_prune_at = time.time()
+        prefixes = [os.path.join(os.path.normpath(p), "") for p in under or []]
+        removed = 0
+        for bucket in os.scandir(_MANIFEST_DIR):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if not entry.name.endswith(".json"):
+                    continue
+                directory, _ = _read_manifest_file(entry.path)
+                if not directory:
+                    continue
+                if prefixes:
+                    if not any(os.path.join(directory, "").startswith(prefix) for prefix in prefixes):
+                        continue
+                elif os.path.isdir(directory):
+                    continue
+                with _dir_lock(directory):
+                    if _remove_manifest_file(entry.path):
+                        removed += 1
+    if removed:
+        logger.debug(f"  ➜ [NFO] 已回收 {removed} 份失效的哈希清单。")
+    return removed
@@ -130,11 +130,38 @@ class P115MediaAnalyzerMixin:
 
         return info_dict
 
-    def _probe_mediainfo_with_ffprobe(self, file_node, sha1=None, silent_log=False, metadata_context=None):
+    def _probe_mediainfo_with_ffprobe(self, file_node, sha1=None, silent_log=False, metadata_context=None, priority=None, cache_context=None):
         """
         最终兜底：通过 115 直链调用容器内 ffprobe。
-        返回 Emby MediaSourceInfo 标准兼容结构，可直接写入 p115_mediainfo_cache。
+        返回 (Emby MediaSourceInfo 标准兼容结构, ffprobe 原始结果)；前者解析不出时为 None，原始结果仍会返回。
+        经 ffprobe_pool 统一排队限流，同一 SHA1 的并发请求合并为一次；有 SHA1 时结果已写入 p115_mediainfo_cache。
         """
+        if not file_node:
+            return None
+        from handler import ffprobe_pool
+        return ffprobe_pool.probe(
+            file_node,
+            sha1,
+            lambda: self._run_ffprobe_probe(file_node, sha1=sha1, silent_log=silent_log, metadata_context=metadata_context),
+            priority=ffprobe_pool.PRIORITY_INTERACTIVE if priority is None else priority,
+            cache_context=cache_context,
+        )
+
+    def _prewarm_mediainfo_with_ffprobe(self, file_node, sha1, on_result=None, cache_context=None):
+        """空闲预热：最低优先级入队，不等待结果。"""
+        if not file_node or not sha1:
+            return False
+        from handler import ffprobe_pool
+        return ffprobe_pool.prewarm(
+            file_node,
+            sha1,
+            lambda: self._run_ffprobe_probe(file_node, sha1=sha1, silent_log=True),
+            on_result=on_result,
+            cache_context=cache_context,
+        )
+
+    def _run_ffprobe_probe(self, file_node, sha1=None, silent_log=False, metadata_context=None):
+        """实际执行一次 ISO 专用解析 / ffprobe，只应由 ffprobe_pool 的 worker 调用。"""
         if not file_node:
             return None
 
@@ -325,7 +352,8 @@ class P115MediaAnalyzerMixin:
             if not emby_json:
                 if not silent_log:
                     logger.warning(f"  ➜ [ffprobe] 未解析出有效 MediaStreams: {original_name}")
-                return None
+                # RAW 仍然有效时照样交回，由 ffprobe_pool 单独落库 (共享资源补 RAW 只需要 RAW)
+                return (None, probe_data) if probe_data else None
 
             if not silent_log:
                 logger.info(f"  ➜ [ffprobe] 成功生成媒体信息 -> {original_name}")
@@ -2403,19 +2431,15 @@ class P115MediaAnalyzerMixin:
 
         # 2. 本地 DB 没有，最后才 ffprobe。彻底移除中心服务器路径，保留 ETK 格式化结果。
         if not raw_json and file_node:
+            from handler import ffprobe_pool
+            # 探测结果已由 ffprobe_pool 写入 p115_mediainfo_cache
             raw_json, raw_ffprobe = self._probe_mediainfo_with_ffprobe(
-                file_node, sha1=sha1, silent_log=silent_log, metadata_context=guessed_info
+                file_node, sha1=sha1, silent_log=silent_log, metadata_context=guessed_info,
+                priority=ffprobe_pool.PRIORITY_ORGANIZE
             ) or (None, None)
 
             if raw_json:
                 data_source = "ffprobe解析"
-                cache_mgr = _get_p115_cache_manager()
-                cache_mgr.save_mediainfo_cache(
-                    sha1,
-                    raw_json,
-                    raw_ffprobe,
-                    file_info=file_node if isinstance(file_node, dict) else None,
-                )
 
         if not raw_json:
             return {}
@@ -0,0 +1,387 @@
+# handler/p115_relay_cache.py
+"""
+Emby 服务端 (ffprobe / Lavf) 探测 115 文件时的中转块缓存。
+
+- 按 1MB 对齐分块，只缓存文件头部/尾部的“探测区”，片头片尾之外的正片字节直接流式转发，不落盘。
+- 块文件按 LRU 淘汰，总量受 p115_relay_cache_max_mb 限制 (0 为关闭缓存，仅做转发)。
+- 上游请求统一走带连接池的 keep-alive Session，读取缓冲放大到 256KB。
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+
+import config_manager
+import constants
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 1024 * 1024
+HEAD_ZONE_BYTES = 32 * 1024 * 1024
+TAIL_ZONE_BYTES = 16 * 1024 * 1024
+STREAM_CHUNK_SIZE = 256 * 1024
+UPSTREAM_TIMEOUT = (5, 30)
+
+_CACHE_DIR = os.path.join(config_manager.PERSISTENT_DATA_PATH, "cache", "p115_relay")
+_RANGE_RE = re.compile(r'^\s*bytes=(\d*)-(\d*)\s*$')
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+_EXCLUDED_HEADERS = {'content-encoding', 'transfer-encoding', 'connection', 'host'}
+
+_session = None
+_session_lock = threading.Lock()
+
+_index = OrderedDict()   # 块文件路径 -> 字节数 (按最近使用排序)
+_index_bytes = 0
+_index_loaded = False
+_index_lock = threading.Lock()
+
+_block_locks = {}
+_block_locks_guard = threading.Lock()
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def _max_cache_bytes():
+    try:
+        mb = int(config_manager.APP_CONFIG.get(
+            constants.CONFIG_OPTION_115_RELAY_CACHE_MAX_MB, constants.DEFAULT_115_RELAY_CACHE_MAX_MB
+        ))
+    except (TypeError, ValueError):
+        mb = constants.DEFAULT_115_RELAY_CACHE_MAX_MB
+    return max(0, mb) * 1024 * 1024
+
+
+def _file_dir(cache_key):
+    digest = hashlib.sha1(str(cache_key).encode('utf-8')).hexdigest()
+    return os.path.join(_CACHE_DIR, digest[:2], digest)
+
+
+def _block_path(cache_key, block_index):
+    return os.path.join(_file_dir(cache_key), f"{block_index}.blk")
+
+
+def _load_index():
+    """首次使用时扫描缓存目录，按 mtime 重建 LRU 顺序。"""
+    global _index_loaded, _index_bytes
+    if _index_loaded:
+        return
+    entries = []
+    if os.path.isdir(_CACHE_DIR):
+        for root_dir, _, files in os.walk(_CACHE_DIR):
+            for name in files:
+                if not name.endswith('.blk'):
+                    continue
+                path = os.path.join(root_dir, name)
+                try:
+                    st = os.stat(path)
+                    entries.append((st.st_mtime, path, st.st_size))
+                except OSError:
+                    continue
+    entries.sort()
+    for _, path, size in entries:
+        _index[path] = size
+        _index_bytes += size
+    _index_loaded = True
+
+
+def _touch_block(path):
+    with _index_lock:
+        _load_index()
+        if path in _index:
+            _index.move_to_end(path)
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def _register_block(path, size):
+    """登记新块并按 LRU 淘汰到上限以内。"""
+    global _index_bytes
+    limit = _max_cache_bytes()
+    evicted = []
+    with _index_lock:
+        _load_index()
+        _index_bytes -= _index.pop(path, 0)
+        _index[path] = size
+        _index_bytes += size
+        while _index_bytes > limit and _index:
+            old_path, old_size = _index.popitem(last=False)
+            _index_bytes -= old_size
+            evicted.append(old_path)
+    for old_path in evicted:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+
+
+def _load_meta(cache_key):
+    try:
+        with open(os.path.join(_file_dir(cache_key), "meta.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_meta(cache_key, meta):
+    try:
+        file_dir = _file_dir(cache_key)
+        os.makedirs(file_dir, exist_ok=True)
+        with open(os.path.join(file_dir, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    except OSError as e:
+        logger.debug(f"  ➜ [中转缓存] 写入文件元信息失败: {e}")
+
+
+def _get_block_lock(path):
+    with _block_locks_guard:
+        lock = _block_locks.get(path)
+        if lock is None:
+            lock = _block_locks[path] = threading.Lock()
+        return lock
+
+
+def _parse_range(range_header):
+    if not range_header:
+        return None
+    match = _RANGE_RE.match(range_header)
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    start, end = match.group(1), match.group(2)
+    if not start:
+        # bytes=-N (尾部 N 字节)，需要知道文件大小后再换算
+        return (None, int(end))
+    return (int(start), int(end) if end else None)
+
+
+class _UpstreamError(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def _fetch_block(cache_key, url, headers, block_index, meta):
+    """读取一个缓存块；不存在时向上游请求该块并落盘。返回 (bytes, meta)。"""
+    path = _block_path(cache_key, block_index)
+    if meta and os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            _touch_block(path)
+            return data, meta
+        except OSError:
+            pass
+
+    with _get_block_lock(path):
+        if meta and os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            _touch_block(path)
+            return data, meta
+
+        block_start = block_index * BLOCK_SIZE
+        block_end = block_start + BLOCK_SIZE - 1
+        if meta:
+            block_end = min(block_end, int(meta['size']) - 1)
+        req_headers = dict(headers)
+        req_headers['Range'] = f"bytes={block_start}-{block_end}"
+        resp = _get_session().get(url, headers=req_headers, timeout=UPSTREAM_TIMEOUT)
+        if resp.status_code != 206:
+            raise _UpstreamError(resp)
+
+        match = _CONTENT_RANGE_RE.search(resp.headers.get('Content-Range', ''))
+        if not match or match.group(3) == '*':
+            raise _UpstreamError(resp)
+        if not meta:
+            meta = {'size': int(match.group(3)), 'content_type': resp.headers.get('Content-Type') or 'application/octet-stream'}
+            _save_meta(cache_key, meta)
+
+        data = resp.content
+        _store_block(path, data)
+        return data, meta
+
+
+def _store_block(path, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        _register_block(path, len(data))
+    except OSError as e:
+        logger.debug(f"  ➜ [中转缓存] 写入缓存块失败: {e}")
+
+
+def _stream_block_run(cache_key, url, headers, first_block, last_block, size):
+    """一次上游请求拉取连续多个缺失块，边落盘边产出 (block_index, data)，避免逐块往返。"""
+    run_start = first_block * BLOCK_SIZE
+    run_end = min((last_block + 1) * BLOCK_SIZE, size) - 1
+    req_headers = dict(headers)
+    req_headers['Range'] = f"bytes={run_start}-{run_end}"
+    with _get_session().get(url, headers=req_headers, stream=True, timeout=UPSTREAM_TIMEOUT) as resp:
+        if resp.status_code != 206:
+            raise _UpstreamError(resp)
+        buffer = bytearray()
+        block_index = first_block
+        for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            buffer.extend(chunk)
+            while len(buffer) >= BLOCK_SIZE:
+                data = bytes(buffer[:BLOCK_SIZE])
+                del buffer[:BLOCK_SIZE]
+                _store_block(_block_path(cache_key, block_index), data)
+                yield block_index, data
+                block_index += 1
+        if buffer and block_index <= last_block:
+            data = bytes(buffer)
+            _store_block(_block_path(cache_key, block_index), data)
+            yield block_index, data
+
+
+def _is_probe_block(block_index, size):
+    block_start = block_index * BLOCK_SIZE
+    return block_start < HEAD_ZONE_BYTES or block_start + BLOCK_SIZE > size - TAIL_ZONE_BYTES
+
+
+def _passthrough(url, headers):
+    resp = _get_session().get(url, headers=headers, stream=True, timeout=UPSTREAM_TIMEOUT)
+    response_headers = [(name, value) for name, value in resp.headers.items() if name.lower() not in _EXCLUDED_HEADERS]
+
+    def generate():
+        try:
+            for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                yield chunk
+        finally:
+            resp.close()
+
+    return resp.status_code, response_headers, generate()
+
+
+def relay(cache_key, url, headers, range_header=None):
+    """
+    为 Emby 服务端中转 115 文件字节。
+    返回 (status_code, headers, body_iterable)，由路由层包装成 Response。
+    status_code 反映首个上游请求的结果，路由层可据此判断直链是否失效。
+    """
+    headers = {k: v for k, v in headers.items() if k.lower() != 'range'}
+    rng = _parse_range(range_header)
+    if not cache_key or rng is None or _max_cache_bytes() <= 0:
+        if range_header:
+            headers['Range'] = range_header
+        return _passthrough(url, headers)
+
+    meta = _load_meta(cache_key)
+    start, end = rng
+    try:
+        if not meta:
+            # 借首个块的响应拿到文件总大小
+            first_block = 0 if start is None else start // BLOCK_SIZE
+            _, meta = _fetch_block(cache_key, url, headers, first_block, None)
+        size = int(meta['size'])
+        if start is None:
+            start, end = max(0, size - end), size - 1
+        if start >= size:
+            return 416, [('Content-Range', f"bytes */{size}")], iter(())
+        end = size - 1 if end is None else min(end, size - 1)
+        # 请求起点不在探测区：正片播放/转码，直接透传
+        if not _is_probe_block(start // BLOCK_SIZE, size):
+            headers['Range'] = range_header
+            return _passthrough(url, headers)
+        first_data, meta = _fetch_block(cache_key, url, headers, start // BLOCK_SIZE, meta)
+    except _UpstreamError as e:
+        resp = e.response
+        response_headers = [(name, value) for name, value in resp.headers.items() if name.lower() not in _EXCLUDED_HEADERS]
+        return resp.status_code, response_headers, iter((resp.content,))
+    except Exception as e:
+        logger.debug(f"  ➜ [中转缓存] 块缓存不可用，改为直接转发: {e}")
+        headers['Range'] = range_header
+        return _passthrough(url, headers)
+
+    def generate():
+        pos = start
+        data = first_data
+        while pos <= end:
+            block_index = pos // BLOCK_SIZE
+            if _is_probe_block(block_index, size):
+                if data is None:
+                    # 连续缺失的探测块合并成一次上游请求
+                    last_block = block_index
+                    while (
+                        last_block + 1 <= end // BLOCK_SIZE
+                        and last_block - block_index < 63
+                        and _is_probe_block(last_block + 1, size)
+                        and not os.path.exists(_block_path(cache_key, last_block + 1))
+                    ):
+                        last_block += 1
+                    if last_block > block_index and not os.path.exists(_block_path(cache_key, block_index)):
+                        try:
+                            for run_index, run_data in _stream_block_run(cache_key, url, headers, block_index, last_block, size):
+                                offset = pos - run_index * BLOCK_SIZE
+                                piece = run_data[offset:offset + (end - pos + 1)]
+                                if not piece:
+                                    return
+                                yield piece
+                                pos += len(piece)
+                                if pos > end:
+                                    return
+                        except Exception as e:
+                            logger.debug(f"  ➜ [中转缓存] 批量拉取探测块失败，终止本次中转: {e}")
+                            return
+                        continue
+                    try:
+                        data, _ = _fetch_block(cache_key, url, headers, block_index, meta)
+                    except Exception as e:
+                        logger.debug(f"  ➜ [中转缓存] 读取块 {block_index} 失败，终止本次中转: {e}")
+                        return
+                offset = pos - block_index * BLOCK_SIZE
+                piece = data[offset:offset + (end - pos + 1)]
+                if not piece:
+                    return
+                yield piece
+                pos += len(piece)
+                data = None
+                continue
+
+            # 探测区之间的正片部分：一次性流式转发到下一个探测区之前
+            tail_start = ((size - TAIL_ZONE_BYTES) // BLOCK_SIZE) * BLOCK_SIZE
+            segment_end = min(end, tail_start - 1)
+            seg_headers = dict(headers)
+            seg_headers['Range'] = f"bytes={pos}-{segment_end}"
+            try:
+                with _get_session().get(url, headers=seg_headers, stream=True, timeout=UPSTREAM_TIMEOUT) as resp:
+                    if resp.status_code != 206:
+                        logger.debug(f"  ➜ [中转缓存] 正片段转发失败 HTTP {resp.status_code}")
+                        return
+                    for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                        yield chunk
+                        pos += len(chunk)
+            except Exception as e:
+                logger.debug(f"  ➜ [中转缓存] 正片段转发中断: {e}")
+                return
+            if pos <= segment_end:
+                return
+
+    response_headers = [
+        ('Content-Type', meta.get('content_type') or 'application/octet-stream'),
+        ('Content-Length', str(end - start + 1)),
+        ('Content-Range', f"bytes {start}-{end}/{size}"),
+        ('Accept-Ranges', 'bytes'),
+    ]
+    return 206, response_headers, generate()
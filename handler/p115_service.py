@@ -4363,8 +4363,11 @@ class P115CacheManager:
 
     @staticmethod
     def save_mediainfo_cache(sha1, mediainfo_json, raw_ffprobe_json=None, file_info=None, *, fid=None, pick_code=None, file_name=None):
-        """写入本地 p115_mediainfo_cache，结构保持 Emby MediaSourceInfo 标准格式"""
-        if not sha1 or not mediainfo_json:
+        """
+        写入本地 p115_mediainfo_cache，结构保持 Emby MediaSourceInfo 标准格式。
+        mediainfo_json 可为空：只有 RAW 时照样落库，已有的 mediainfo_json 不会被空值覆盖。
+        """
+        if not sha1 or not (mediainfo_json or raw_ffprobe_json):
             return False
 
         try:
@@ -4432,7 +4435,7 @@ class P115CacheManager:
                         VALUES (%s, %s, %s, NOW(), 0)
                         ON CONFLICT (sha1)
                         DO UPDATE SET
-                            mediainfo_json = EXCLUDED.mediainfo_json,
+                            mediainfo_json = COALESCE(EXCLUDED.mediainfo_json, p115_mediainfo_cache.mediainfo_json),
                             raw_ffprobe_json = COALESCE(EXCLUDED.raw_ffprobe_json, p115_mediainfo_cache.raw_ffprobe_json),
                             created_at = NOW()
                     """, (
@@ -8453,6 +8456,20 @@ class SmartOrganizer(P115MediaAnalyzerMixin):
                                             with open(mediainfo_filepath, 'w', encoding='utf-8') as f:
                                                 f.write(mediainfo_text)
                                             logger.info(f"  ➜ 已生成媒体信息文件：{mediainfo_filename}")
+                                        elif file_sha1 and pick_code:
+                                            # 未命中缓存：空闲预热，赶在 Emby 读取前探测并补写 -mediainfo.json
+                                            def _write_prewarmed_mediainfo(result, path=mediainfo_filepath, name=mediainfo_filename):
+                                                emby_obj = result[0] if isinstance(result, tuple) else result
+                                                if emby_obj and not os.path.exists(path):
+                                                    with open(path, 'w', encoding='utf-8') as f:
+                                                        json.dump(emby_obj, f, ensure_ascii=False, indent=2)
+                                                    logger.info(f"  ➜ [预热] 已补写媒体信息文件：{name}")
+                                            prewarm_node = {**(file_item if isinstance(file_item, dict) else {}), 'sha1': file_sha1, 'pc': pick_code}
+                                            if self._prewarm_mediainfo_with_ffprobe(
+                                                prewarm_node, file_sha1, on_result=_write_prewarmed_mediainfo,
+                                                cache_context={'fid': fid, 'pick_code': pick_code, 'file_name': file_name},
+                                            ):
+                                                logger.debug(f"  ➜ 未命中本地缓存，已加入 ffprobe 预热队列: {new_filename}")
                                         else:
                                             logger.debug(f"  ➜ 跳过媒体信息文件生成，未命中本地缓存: {new_filename}")
                                     except Exception as e:
@@ -8729,20 +8746,16 @@ class SmartOrganizer(P115MediaAnalyzerMixin):
                             mediainfo_text = P115CacheManager.get_mediainfo_cache_text(sha1)
 
                         if not mediainfo_text:
-                            emby_obj, raw_ffprobe = self._probe_mediainfo_with_ffprobe(file_item, sha1=sha1, silent_log=False) or (None, None)
+                            from handler import ffprobe_pool
+                            probe_sha1 = sha1 or file_item.get('sha1') or file_item.get('sha')
+                            probe_sha1 = str(probe_sha1).upper() if probe_sha1 else None
+                            # 有 SHA1 时探测结果由 ffprobe_pool 直接写入 p115_mediainfo_cache
+                            emby_obj, raw_ffprobe = self._probe_mediainfo_with_ffprobe(
+                                file_item, sha1=probe_sha1, silent_log=False, priority=ffprobe_pool.PRIORITY_ORGANIZE,
+                                cache_context={'fid': fid, 'pick_code': pick_code, 'file_name': original_name},
+                            ) or (None, None)
                             if emby_obj:
-                                probe_sha1 = sha1 or file_item.get('sha1') or file_item.get('sha')
                                 if probe_sha1:
-                                    probe_sha1 = str(probe_sha1).upper()
-                                    P115CacheManager.save_mediainfo_cache(
-                                        probe_sha1,
-                                        emby_obj,
-                                        raw_ffprobe,
-                                        file_info=file_item,
-                                        fid=fid,
-                                        pick_code=pick_code,
-                                        file_name=original_name,
-                                    )
                                     sha1 = probe_sha1
                                     file_item['sha1'] = probe_sha1
                                 mediainfo_text = json.dumps(emby_obj, ensure_ascii=False, indent=2)
@@ -0,0 +1,204 @@
+# handler/people_mirror.py
+"""
+Emby 人物镜像同步。
+
+演员维护类任务 (人物名翻译、合并分身、清理幽灵) 统一读取本地 emby_persons / emby_person_item_links，
+不再各自对 Emby 全库做 Fields=People 枚举：
+- 增量：按 MinDateLastSaved 只拉上次同步之后保存过的作品，再定点拉取 Webhook / 核心处理登记的作品；
+- 全量：镜像为空、超过 FULL_SYNC_INTERVAL 或调用方要求时，分页重扫全部媒体库并清理消失的关联；
+- 新出现的人物才向 Emby 补全 ProviderIds (TMDb ID)。
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from database import people_mirror_db, settings_db
+from handler.emby import emby_client, get_emby_libraries
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = 'emby_people_mirror_state'
+FULL_SYNC_INTERVAL = timedelta(days=7)
+INCREMENTAL_OVERLAP = timedelta(minutes=5)   # 增量窗口向前多取一点，容忍时钟偏差
+PAGE_SIZE = 1000
+DETAILS_BATCH_SIZE = 500
+IDS_PER_REQUEST = 100                        # 按 ID 拉取时单次请求的 ID 数 (URL 长度限制)
+MEDIA_COLLECTION_TYPES = ('movies', 'tvshows', 'homevideos', 'musicvideos')
+
+_sync_lock = threading.Lock()
+
+
+def _load_state() -> dict:
+    return settings_db.get_setting(STATE_KEY) or {}
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _is_stopped(stop_event: Optional[threading.Event]) -> bool:
+    return bool(stop_event and stop_event.is_set())
+
+
+def _iter_library_pages(base_url: str, api_key: str, library_id: str, min_saved: Optional[datetime]):
+    """分页拉取一个媒体库内带 People 的作品。"""
+    api_url = f"{base_url.rstrip('/')}/Items"
+    start_index = 0
+    while True:
+        params = {
+            "api_key": api_key,
+            "ParentId": library_id,
+            "Recursive": "true",
+            "IncludeItemTypes": ",".join(people_mirror_db.MIRROR_ITEM_TYPES),
+            "Fields": "People",
+            "StartIndex": start_index,
+            "Limit": PAGE_SIZE,
+        }
+        if min_saved:
+            params["MinDateLastSaved"] = min_saved.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.0000000Z')
+        response = emby_client.get(api_url, params=params)
+        response.raise_for_status()
+        items = response.json().get("Items", [])
+        if not items:
+            return
+        for item in items:
+            item['_SourceLibraryId'] = library_id
+        yield items
+        if len(items) < PAGE_SIZE:
+            return
+        start_index += PAGE_SIZE
+
+
+def _fetch_items_by_ids(base_url: str, api_key: str, item_ids: List[str], fields: str) -> List[Dict[str, Any]]:
+    """
+    按 ID 批量拉取条目。与 emby.get_emby_items_by_id 不同，请求失败时直接抛出，
+    这样“没返回”才能可靠地当作“已被删除”处理。
+    """
+    api_url = f"{base_url.rstrip('/')}/Items"
+    items = []
+    for i in range(0, len(item_ids), IDS_PER_REQUEST):
+        batch_ids = item_ids[i:i + IDS_PER_REQUEST]
+        response = emby_client.get(api_url, params={
+            "api_key": api_key,
+            "Ids": ",".join(batch_ids),
+            "Limit": len(batch_ids),
+            "Fields": fields,
+        })
+        response.raise_for_status()
+        items.extend(response.json().get("Items", []))
+    return items
+
+
+def _sync_dirty_items(base_url: str, api_key: str, stop_event) -> int:
+    synced = 0
+    while not _is_stopped(stop_event):
+        item_ids = people_mirror_db.get_dirty_item_ids(limit=500)
+        if not item_ids:
+            break
+        items = _fetch_items_by_ids(base_url, api_key, item_ids, fields="People")
+        items = [i for i in items if i.get('Type') in people_mirror_db.MIRROR_ITEM_TYPES]
+        people_mirror_db.replace_items_people(items)
+        # Emby 已查不到的作品 (期间被删除) 直接清理
+        returned = {str(i.get('Id')) for i in items}
+        people_mirror_db.delete_item_links([i for i in item_ids if i not in returned])
+        synced += len(items)
+    return synced
+
+
+def _sync_person_details(base_url: str, api_key: str, stop_event, update_status_callback, status_progress: int) -> int:
+    fetched = 0
+    while not _is_stopped(stop_event):
+        person_ids = people_mirror_db.get_person_ids_missing_details(limit=DETAILS_BATCH_SIZE)
+        if not person_ids:
+            break
+        persons = _fetch_items_by_ids(base_url, api_key, person_ids, fields="ProviderIds")
+        people_mirror_db.update_person_details(persons, person_ids)
+        fetched += len(person_ids)
+        if update_status_callback:
+            update_status_callback(status_progress, f"人物镜像：已补全 {fetched} 位人物详情...")
+    return fetched
+
+
+def sync(
+    base_url: str,
+    api_key: str,
+    user_id: str,
+    stop_event: Optional[threading.Event] = None,
+    update_status_callback: Optional[Callable] = None,
+    force_full: bool = False,
+    status_progress: int = 0,
+) -> bool:
+    """
+    把镜像同步到最新。返回 False 表示同步未完成 (被中止或出错)，调用方应谨慎使用镜像数据。
+    status_progress: 同步期间回调进度条停留的位置 (由调用方的阶段决定)。
+    """
+    if not all([base_url, api_key, user_id]):
+        logger.error("  ➜ [人物镜像] 缺少 Emby 配置，无法同步。")
+        return False
+
+    with _sync_lock:
+        state = _load_state()
+        last_full = _parse_ts(state.get('full_at'))
+        last_incremental = _parse_ts(state.get('incremental_at'))
+        now = datetime.now(timezone.utc)
+        do_full = (
+            force_full
+            or not last_full
+            or not last_incremental
+            or now - last_full > FULL_SYNC_INTERVAL
+            or not people_mirror_db.has_data()
+        )
+
+        try:
+            libraries = get_emby_libraries(base_url, api_key, user_id) or []
+            library_ids = [lib['Id'] for lib in libraries if lib.get('CollectionType') in MEDIA_COLLECTION_TYPES]
+            if not library_ids:
+                logger.warning("  ➜ [人物镜像] 未获取到任何媒体库，跳过同步。")
+                return False
+
+            cutoff = people_mirror_db.get_db_now()
+            min_saved = None if do_full else last_incremental - INCREMENTAL_OVERLAP
+            if do_full:
+                logger.info(f"  ➜ [人物镜像] 开始全量同步 {len(library_ids)} 个媒体库的人物关联...")
+                people_mirror_db.reset_person_details()
+            else:
+                logger.debug(f"  ➜ [人物镜像] 增量同步自 {min_saved.isoformat()} 以来保存过的作品...")
+
+            scanned = 0
+            for library_id in library_ids:
+                for items in _iter_library_pages(base_url, api_key, library_id, min_saved):
+                    if _is_stopped(stop_event):
+                        logger.info("  ➜ [人物镜像] 同步被中止。")
+                        return False
+                    people_mirror_db.replace_items_people(items)
+                    scanned += len(items)
+                    if update_status_callback:
+                        update_status_callback(status_progress, f"人物镜像：已同步 {scanned} 个作品...")
+
+            dirty_synced = _sync_dirty_items(base_url, api_key, stop_event)
+            if do_full and not _is_stopped(stop_event):
+                removed = people_mirror_db.delete_links_synced_before(cutoff)
+                if removed:
+                    logger.info(f"  ➜ [人物镜像] 已清理 {removed} 条失效的人物关联。")
+            details_fetched = _sync_person_details(base_url, api_key, stop_event, update_status_callback, status_progress)
+            if _is_stopped(stop_event):
+                return False
+
+            state['incremental_at'] = now.isoformat()
+            if do_full:
+                state['full_at'] = now.isoformat()
+            settings_db.save_setting(STATE_KEY, state)
+            logger.info(
+                f"  ➜ [人物镜像] {'全量' if do_full else '增量'}同步完成：作品 {scanned + dirty_synced} 个，"
+                f"补全人物详情 {details_fetched} 位。"
+            )
+            return True
+        except Exception as e:
+            logger.error(f"  ➜ [人物镜像] 同步失败: {e}", exc_info=True)
+            return False
@@ -4,7 +4,7 @@ import os
 import time
 import logging
 import threading
-from typing import List, Optional, Any, Set
+from typing import List, Optional, Any, Set, Tuple
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from gevent import spawn_later
@@ -35,6 +35,14 @@ MEDIAINFO_UPLOAD_DEDUPE_SECONDS = 300
 MEDIAINFO_UPLOAD_LOG_DEDUPE_SECONDS = 120
 DEBOUNCE_DELAY = 3 # 防抖延迟秒数
 
+# --- 文件稳定性跟踪 (close-write / moved-to 事件驱动，静默窗口兜底) ---
+STABILITY_LOCK = threading.Lock()
+PENDING_STABILITY = {}  # 文件路径 -> {'stat': (size, mtime), 'quiet_since': ts, 'first_seen': ts}
+STABILITY_SWEEP_TIMER = None
+STABILITY_SWEEP_INTERVAL = 1          # 兜底巡检间隔 (秒)
+STABILITY_QUIET_SECONDS = 3           # 收不到 close-write 的网络文件系统：大小和 mtime 静默这么久即视为写完
+STABILITY_MAX_WAIT_SECONDS = 6 * 3600 # 超过这么久仍在变化的文件放弃跟踪
+
 # --- 全局队列抑制标志 ---
 IS_PROCESSING_PAUSED = False
 
@@ -79,7 +87,15 @@ class MediaFileHandler(FileSystemEventHandler):
             self._handle_mediainfo_update(event.src_path)
             return
         if not event.is_directory and self._is_valid_media_file(event.src_path):
-            self._enqueue_file(event.src_path)
+            # 刚创建的文件可能还在写入，等 close-write 事件或静默窗口确认写完
+            _track_file_stability(event.src_path)
+
+    def on_closed(self, event):
+        # inotify IN_CLOSE_WRITE：写入方已关闭文件，只对正在跟踪的新文件生效
+        if event.is_directory:
+            return
+        if _is_tracking_stability(event.src_path):
+            _mark_file_ready(event.src_path)
 
     def on_modified(self, event):
         if event.is_directory:
@@ -96,7 +112,8 @@ class MediaFileHandler(FileSystemEventHandler):
             self._handle_mediainfo_update(event.dest_path)
             return
         if not event.is_directory and self._is_valid_media_file(event.dest_path):
-            self._enqueue_file(event.dest_path)
+            # moved-to：下载器/rsync 写完临时文件后改名，目标文件已完整
+            _mark_file_ready(event.dest_path)
 
     def _handle_mediainfo_update(self, file_path: str):
         if not file_path or _is_path_excluded(file_path, self.exclude_dirs):
@@ -180,10 +197,6 @@ class MediaFileHandler(FileSystemEventHandler):
             MEDIAINFO_DIR_SCAN_TIMERS[norm_dir] = timer
             timer.start()
 
-    def _enqueue_file(self, file_path: str):
-        """新增/移动文件入队"""
-        enqueue_file_actively(file_path)
-
 def _is_path_excluded(file_path: str, exclude_paths: List[str]) -> bool:
     if not exclude_paths:
         return False
@@ -302,8 +315,73 @@ def _filter_etk_standard_files(file_paths: List[str]) -> List[str]:
             logger.warning(f"  ➜ [实时监控] 非 ETK 标准 STRM，已跳过：{os.path.basename(fp)}")
     return valid
 
+def _stat_file(file_path: str) -> Optional[Tuple[int, float]]:
+    try:
+        st = os.stat(file_path)
+        return st.st_size, st.st_mtime
+    except OSError:
+        return None
+
+def _is_tracking_stability(file_path: str) -> bool:
+    with STABILITY_LOCK:
+        return file_path in PENDING_STABILITY
+
+def _track_file_stability(file_path: str):
+    """登记一个可能仍在写入的文件，由事件或兜底巡检确认写完后再入队。"""
+    global STABILITY_SWEEP_TIMER
+    now = time.time()
+    with STABILITY_LOCK:
+        if file_path not in PENDING_STABILITY:
+            PENDING_STABILITY[file_path] = {'stat': _stat_file(file_path), 'quiet_since': now, 'first_seen': now}
+        if STABILITY_SWEEP_TIMER is None:
+            STABILITY_SWEEP_TIMER = spawn_later(STABILITY_SWEEP_INTERVAL, _sweep_pending_stability)
+
+def _mark_file_ready(file_path: str):
+    """文件已写完：移出跟踪，非空则进入按目录聚合的处理队列。"""
+    with STABILITY_LOCK:
+        PENDING_STABILITY.pop(file_path, None)
+    stat = _stat_file(file_path)
+    if not stat or stat[0] <= 0:
+        return
+    _push_ready_file(file_path)
+
+def _sweep_pending_stability():
+    """兜底巡检：STRM 非空即就绪；其它文件大小和 mtime 在静默窗口内不变即就绪。"""
+    global STABILITY_SWEEP_TIMER
+    now = time.time()
+    ready = []
+    with STABILITY_LOCK:
+        for fp, state in list(PENDING_STABILITY.items()):
+            stat = _stat_file(fp)
+            if stat is None:
+                del PENDING_STABILITY[fp]
+                continue
+            if now - state['first_seen'] > STABILITY_MAX_WAIT_SECONDS:
+                logger.warning(f"  ➜ [实时监控] 文件长时间仍在变化，放弃等待：{os.path.basename(fp)}")
+                del PENDING_STABILITY[fp]
+                continue
+            if stat != state['stat']:
+                state['stat'] = stat
+                state['quiet_since'] = now
+            if stat[0] > 0 and (fp.lower().endswith('.strm') or now - state['quiet_since'] >= STABILITY_QUIET_SECONDS):
+                ready.append(fp)
+                del PENDING_STABILITY[fp]
+        STABILITY_SWEEP_TIMER = spawn_later(STABILITY_SWEEP_INTERVAL, _sweep_pending_stability) if PENDING_STABILITY else None
+    for fp in ready:
+        _push_ready_file(fp)
+
 def enqueue_file_actively(file_path: str):
-    """主动将文件推入监控队列"""
+    """
+    主动将文件推入监控队列。
+    STRM 由调用方写完后才推送，直接视为就绪；其它文件先做稳定性跟踪。
+    """
+    if str(file_path or '').lower().endswith('.strm'):
+        _mark_file_ready(file_path)
+    else:
+        _track_file_stability(file_path)
+
+def _push_ready_file(file_path: str):
+    """已写完的文件加入队列，防抖后按目录聚合处理。"""
     global DEBOUNCE_TIMER
     if not _is_etk_standard_strm(file_path):
         logger.warning(f"  ➜ [实时监控] 非 ETK 标准 STRM，已跳过：{os.path.basename(file_path)}")
@@ -381,13 +459,14 @@ def process_batch_queue():
         threading.Thread(target=_handle_batch_refresh_only_task, args=(files_to_refresh_only,)).start()
 
 def _handle_batch_file_task(processor, file_paths: List[str]):
-    valid_files = _wait_for_files_stability(file_paths)
+    # 入队前已确认写完，这里只剔除期间被删除的文件
+    valid_files = [fp for fp in file_paths if os.path.exists(fp)]
     valid_files = _filter_etk_standard_files(valid_files)
     if not valid_files: return
     processor.process_file_actively_batch(valid_files)
 
 def _handle_batch_refresh_only_task(file_paths: List[str]):
-    valid_files = _wait_for_files_stability(file_paths)
+    valid_files = [fp for fp in file_paths if os.path.exists(fp)]
     valid_files = _filter_etk_standard_files(valid_files)
     if not valid_files: return
     
@@ -408,45 +487,6 @@ def _handle_batch_refresh_only_task(file_paths: List[str]):
     logger.info(f"  ➜ [实时监控-排除路径] 正在向 Emby 发送 {len(valid_files)} 个文件的极速入库通知。")
     emby.notify_emby_file_changes(valid_files, base_url, api_key)
 
-def _wait_for_files_stability(file_paths: List[str]) -> List[str]:
-    """
-    文件稳定性检测 (仅针对媒体文件)
-    """
-    valid_files = []
-    pending_files = {fp: {'last_size': -1, 'stable_count': 0} for fp in file_paths if os.path.exists(fp)}
-            
-    for _ in range(60):
-        if not pending_files: break
-            
-        for fp in list(pending_files.keys()):
-            if not os.path.exists(fp):
-                del pending_files[fp]
-                continue
-                
-            try:
-                size = os.path.getsize(fp)
-                if fp.lower().endswith('.strm') and size > 0:
-                    valid_files.append(fp)
-                    del pending_files[fp]
-                    continue
-                
-                if size > 0 and size == pending_files[fp]['last_size']:
-                    pending_files[fp]['stable_count'] += 1
-                else:
-                    pending_files[fp]['stable_count'] = 0
-                    
-                pending_files[fp]['last_size'] = size
-                if pending_files[fp]['stable_count'] >= 3:
-                    valid_files.append(fp)
-                    del pending_files[fp]
-            except Exception:
-                pass
-                
-        if pending_files:
-            time.sleep(1)
-            
-    return valid_files
-
 class MonitorService:
     processor_instance = None
 
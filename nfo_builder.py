@@ -1,6 +1,5 @@
 # nfo_builder.py
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
 import logging
 import json
 from tasks.helpers import extract_top_directors
@@ -13,6 +12,43 @@ def _add_element(parent, tag, text):
         elem = ET.SubElement(parent, tag)
         elem.text = str(text)
 
+def _escape_like_minidom(text) -> str:
+    # 与 minidom._write_data 相同：& < " > 全部转义
+    return str(text).replace("&", "&amp;").replace("<", "&lt;").replace('"', "&quot;").replace(">", "&gt;")
+
+def _normalize_newlines(text) -> str:
+    # 原实现经过一次 XML 解析，文本中的 \r\n / \r 会被归一化为 \n (属性值里的由 ET 转义保留)
+    return str(text).replace('\r\n', '\n').replace('\r', '\n')
+
+def _write_element(elem, indent, out):
+    out.append(f"{indent}<{elem.tag}")
+    for name, value in elem.attrib.items():
+        out.append(f' {name}="{_escape_like_minidom(value)}"')
+    children = list(elem)
+    if children:
+        out.append(">\n")
+        child_indent = indent + "  "
+        if elem.text:
+            out.append(_escape_like_minidom(f"{child_indent}{_normalize_newlines(elem.text)}\n"))
+        for child in children:
+            _write_element(child, child_indent, out)
+            if child.tail:
+                out.append(_escape_like_minidom(f"{child_indent}{_normalize_newlines(child.tail)}\n"))
+        out.append(f"{indent}</{elem.tag}>\n")
+    elif elem.text:
+        out.append(f">{_escape_like_minidom(_normalize_newlines(elem.text))}</{elem.tag}>\n")
+    else:
+        out.append("/>\n")
+
+def _serialize(root) -> str:
+    """
+    一次遍历完成缩进与序列化，逐字节复现原 minidom.parseString(...).toprettyxml(indent="  ") 的输出
+    (含 &quot; 转义和 <x/> 空标签写法)，升级后已有 NFO 不会因格式差异被整体重写。
+    """
+    out = ['<?xml version="1.0" ?>\n']
+    _write_element(root, "", out)
+    return "".join(out)
+
 def _format_dateadded(date_str):
     """将 Emby 的 ISO 时间转换为 NFO 标准时间 (YYYY-MM-DD HH:MM:SS)"""
     if not date_str: return ""
@@ -139,7 +175,7 @@ def build_movie_nfo(data: dict, cast: list) -> str:
     _add_actors(root, cast) 
     _add_directors(root, data)
         
-    return minidom.parseString(ET.tostring(root, encoding='utf-8')).toprettyxml(indent="  ")
+    return _serialize(root)
 
 def build_tvshow_nfo(data: dict, cast: list) -> str:
     root = ET.Element('tvshow')
@@ -192,7 +228,7 @@ def build_tvshow_nfo(data: dict, cast: list) -> str:
     _add_actors(root, cast) 
     _add_directors(root, data)
         
-    return minidom.parseString(ET.tostring(root, encoding='utf-8')).toprettyxml(indent="  ")
+    return _serialize(root)
 
 def build_season_nfo(data: dict) -> str:
     root = ET.Element('season')
@@ -211,7 +247,7 @@ def build_season_nfo(data: dict) -> str:
         ET.SubElement(root, 'uniqueid', type='tmdb', default='true').text = str(data.get('id'))
         _add_element(root, 'tmdbid', data.get('id'))
 
-    return minidom.parseString(ET.tostring(root, encoding='utf-8')).toprettyxml(indent="  ")
+    return _serialize(root)
 
 def build_episode_nfo(data: dict, cast: list) -> str:
     root = ET.Element('episodedetails')
@@ -239,4 +275,4 @@ def build_episode_nfo(data: dict, cast: list) -> str:
 
     _add_directors(root, data)
         
-    return minidom.parseString(ET.tostring(root, encoding='utf-8')).toprettyxml(indent="  ")
\ No newline at end of file
+    return _serialize(root)
\ No newline at end of file
@@ -5,6 +5,7 @@ import requests
 import re
 import os
 import json
+import hashlib
 import threading
 from flask import Flask, request, Response, redirect, send_file, session
 from urllib.parse import urlparse, urlunparse, unquote
@@ -32,6 +33,7 @@ from handler.p115_copy_play import (
     recycle_clone_after_direct_url,
 )
 from handler import p115_play_pool
+from handler import latest_feed
 from utils import extract_pickcode_from_strm_url
 
 import extensions
@@ -744,6 +746,36 @@ def _fetch_sorted_items_via_emby_proxy(user_id, item_ids, sort_by, sort_order, l
         logger.error(f"  ➜ Emby代理排序或内存回退时失败: {e}", exc_info=True)
         return {"Items": [], "TotalRecordCount": 0}
 
+# --- 虚拟库视图的稳定标识 / 条件请求 ---
+# 视图与封面的版本只由合集定义和封面内容决定，客户端可用 If-None-Match 复用缓存。
+_COVER_IMAGE_MAX_AGE = 365 * 24 * 3600
+
+
+def _stable_view_uuid(kind, db_id):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"emby-toolkit/{kind}/{db_id}"))
+
+
+def _collection_view_etag(coll):
+    fingerprint = json.dumps([
+        coll.get('id'), coll.get('name'), coll.get('definition_json'), coll.get('emby_collection_id'),
+        coll.get('in_library_count'), coll.get('cover_version'),
+    ], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+
+def _collection_image_tag(coll):
+    """ImageTag = 真实 Emby 合集 ID + 封面版本 (handle_get_mimicked_library_image 只取 '?' 之前的部分)。"""
+    return f"{coll.get('emby_collection_id')}?v={coll.get('cover_version') or '0'}"
+
+
+def _conditional_json_response(payload):
+    """按响应内容生成 ETag，命中 If-None-Match 时返回 304。视图按用户区分，只允许私有缓存。"""
+    body = json.dumps(payload)
+    resp = Response(body, mimetype='application/json')
+    resp.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest())
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp.make_conditional(request)
+
 def handle_get_views():
     """
     获取用户的主页视图列表。
@@ -785,8 +817,8 @@ def handle_get_views():
             # 生成虚拟库对象
             db_id = coll['id']
             mimicked_id = to_mimicked_id(db_id)
-            # 使用时间戳强制刷新封面
-            image_tags = {"Primary": f"{real_emby_collection_id}?timestamp={int(time.time())}"}
+            # 封面版本变化时 tag 才变化，客户端据此决定是否重新下载
+            image_tags = {"Primary": _collection_image_tag(coll)}
             definition = coll.get('definition_json') or {}
             
             if isinstance(definition, str):
@@ -803,10 +835,10 @@ def handle_get_views():
 
             fake_view = {
                 "Name": coll['name'], "ServerId": real_server_id, "Id": mimicked_id,
-                "Guid": str(uuid.uuid4()), "Etag": f"{db_id}{int(time.time())}",
+                "Guid": _stable_view_uuid('guid', db_id), "Etag": _collection_view_etag(coll),
                 "DateCreated": "2025-01-01T00:00:00.0000000Z", "CanDelete": False, "CanDownload": False,
                 "SortName": coll['name'], "ExternalUrls": [], "ProviderIds": {}, "IsFolder": True,
-                "ParentId": "2", "Type": "CollectionFolder", "PresentationUniqueKey": str(uuid.uuid4()),
+                "ParentId": "2", "Type": "CollectionFolder", "PresentationUniqueKey": _stable_view_uuid('puk', db_id),
                 "DisplayPreferencesId": real_emby_collection_id if real_emby_collection_id else f"custom-{db_id}", "ForcedSortName": coll['name'],
                 "Taglines": [], "RemoteTrailers": [],
                 "UserData": {"PlaybackPositionTicks": 0, "IsFavorite": False, "Played": False},
@@ -840,7 +872,7 @@ def handle_get_views():
             final_items.extend(fake_views_items)
 
         final_response = {"Items": final_items, "TotalRecordCount": len(final_items)}
-        return Response(json.dumps(final_response), mimetype='application/json')
+        return _conditional_json_response(final_response)
         
     except Exception as e:
         logger.error(f"[PROXY] 获取视图数据时出错: {e}", exc_info=True)
@@ -854,7 +886,7 @@ def handle_get_mimicked_library_details(user_id, mimicked_id):
 
         real_server_id = extensions.EMBY_SERVER_ID
         real_emby_collection_id = coll.get('emby_collection_id')
-        image_tags = {"Primary": real_emby_collection_id} if real_emby_collection_id else {}
+        image_tags = {"Primary": _collection_image_tag(coll)} if real_emby_collection_id else {}
         
         definition = coll.get('definition_json') or {}
         if isinstance(definition, str):
@@ -873,8 +905,8 @@ def handle_get_mimicked_library_details(user_id, mimicked_id):
             "Name": coll['name'], 
             "ServerId": real_server_id, 
             "Id": mimicked_id,
-            "Guid": str(uuid.uuid4()), 
-            "Etag": f"{real_db_id}{int(time.time())}",
+            "Guid": _stable_view_uuid('guid', real_db_id), 
+            "Etag": _collection_view_etag(coll),
             "DateCreated": "2025-01-01T00:00:00.0000000Z", 
             "CanDelete": False, 
             "CanDownload": False,
@@ -884,7 +916,7 @@ def handle_get_mimicked_library_details(user_id, mimicked_id):
             "IsFolder": True,
             "ParentId": "2", 
             "Type": "CollectionFolder", 
-            "PresentationUniqueKey": str(uuid.uuid4()),
+            "PresentationUniqueKey": _stable_view_uuid('puk', real_db_id),
             # 【关键修复】继承真实库的偏好设置ID，防止前端读取不到 Tabs 配置报错
             "DisplayPreferencesId": real_emby_collection_id if real_emby_collection_id else f"custom-{real_db_id}", 
             "ForcedSortName": coll['name'],
@@ -900,7 +932,7 @@ def handle_get_mimicked_library_details(user_id, mimicked_id):
             "LockData": False,
             "Tags": []
         }
-        return Response(json.dumps(fake_library_details), mimetype='application/json')
+        return _conditional_json_response(fake_library_details)
     except Exception as e:
         logger.error(f"获取伪造库详情时出错: {e}", exc_info=True)
         return "Internal Server Error", 500
@@ -910,14 +942,41 @@ def handle_get_mimicked_library_image(path):
         tag_with_timestamp = request.args.get('tag') or request.args.get('Tag')
         if not tag_with_timestamp: return "Bad Request", 400
         real_emby_collection_id = tag_with_timestamp.split('?')[0]
+        # 带封面版本的 tag：同一 tag 对应的图片内容永远不变，可由反代直接应答条件请求
+        is_versioned = '?v=' in tag_with_timestamp and not tag_with_timestamp.endswith('?v=0')
+        etag = hashlib.sha1(tag_with_timestamp.encode('utf-8')).hexdigest()[:32]
+        cover_updated_at = None
+
+        if is_versioned:
+            if request.if_none_match.contains(etag):
+                not_modified = Response(status=304)
+                not_modified.set_etag(etag)
+                return not_modified
+            coll = custom_collection_db.get_custom_collection_by_emby_id(real_emby_collection_id)
+            cover_updated_at = coll.get('cover_updated_at') if coll else None
+            if cover_updated_at and request.if_modified_since and request.if_modified_since >= cover_updated_at.replace(microsecond=0):
+                not_modified = Response(status=304)
+                not_modified.set_etag(etag)
+                return not_modified
+
         base_url, _ = _get_real_emby_url_and_key()
         image_url = f"{base_url}/Items/{real_emby_collection_id}/Images/Primary"
         headers = {key: value for key, value in request.headers if key.lower() != 'host'}
         headers['Host'] = urlparse(base_url).netloc
+        if is_versioned:
+            headers = {k: v for k, v in headers.items() if k.lower() not in ('if-none-match', 'if-modified-since')}
         resp = requests.get(image_url, headers=headers, stream=True, params=request.args)
         excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
+        if is_versioned:
+            excluded_headers += ['etag', 'last-modified', 'cache-control', 'expires']
         response_headers = [(name, value) for name, value in resp.raw.headers.items() if name.lower() not in excluded_headers]
-        return Response(resp.iter_content(chunk_size=8192), resp.status_code, response_headers)
+        out = Response(resp.iter_content(chunk_size=8192), resp.status_code, response_headers)
+        if is_versioned and resp.status_code == 200:
+            out.set_etag(etag)
+            if cover_updated_at:
+                out.last_modified = cover_updated_at
+            out.headers['Cache-Control'] = f'public, max-age={_COVER_IMAGE_MAX_AGE}'
+        return out
     except Exception as e:
         return "Internal Proxy Error", 500
 
@@ -1280,20 +1339,6 @@ def handle_get_latest_items(user_id, params):
         limit = int(params.get('Limit', 20))
         fields = params.get('Fields', "PrimaryImageAspectRatio,BasicSyncInfo,DateCreated,UserData")
 
-        # --- 辅助函数：获取合集的过滤 ID ---
-        def get_collection_filter_ids(coll_data):
-            c_type = coll_data.get('type')
-            # 1. 榜单类：必须限制在榜单包含的 TMDb ID 范围内
-            if c_type == 'list':
-                raw_json = coll_data.get('generated_media_info_json')
-                raw_list = json.loads(raw_json) if isinstance(raw_json, str) else (raw_json or [])
-                return [str(i.get('tmdb_id')) for i in raw_list if i.get('tmdb_id')]
-            # 2. AI 推荐类：暂不支持“最新”视图 (因为是动态生成的)，返回一个不存在的 ID 防止泄露
-            elif c_type in ['ai_recommendation', 'ai_recommendation_global']:
-                return ["-1"] 
-            # 3. 规则类：返回 None，表示不限制 ID，只走 Rules
-            return None
-
         # 场景一：单个虚拟库的最新
         if virtual_library_id and is_mimicked_id(virtual_library_id):
             real_db_id = from_mimicked_id(virtual_library_id)
@@ -1307,7 +1352,7 @@ def handle_get_latest_items(user_id, params):
                 return Response(json.dumps([]), mimetype='application/json')
 
             # --- 修复核心：获取 ID 过滤器 ---
-            tmdb_ids_filter = get_collection_filter_ids(collection_info)
+            tmdb_ids_filter = latest_feed.get_collection_filter_ids(collection_info)
             # 如果是 AI 合集返回了 ["-1"]，或者榜单为空，直接返回空结果
             if tmdb_ids_filter is not None and (len(tmdb_ids_filter) == 0 or tmdb_ids_filter == ["-1"]):
                  return Response(json.dumps([]), mimetype='application/json')
@@ -1337,50 +1382,8 @@ def handle_get_latest_items(user_id, params):
 
         # 场景二：全局最新 (所有可见合集的聚合)
         elif not virtual_library_id:
-            # 获取所有开启了“显示最新”的合集 ID
-            included_collection_ids = custom_collection_db.get_active_collection_ids_for_latest_view()
-            if not included_collection_ids:
-                return Response(json.dumps([]), mimetype='application/json')
-            
-            all_latest = []
-            for coll_id in included_collection_ids:
-                coll = custom_collection_db.get_custom_collection_by_id(coll_id)
-                if not coll: continue
-                
-                # 检查权限
-                allowed_users = coll.get('allowed_user_ids')
-                if allowed_users and user_id not in allowed_users: continue
-
-                # --- 修复核心：获取 ID 过滤器 ---
-                tmdb_ids_filter = get_collection_filter_ids(coll)
-                if tmdb_ids_filter is not None and (len(tmdb_ids_filter) == 0 or tmdb_ids_filter == ["-1"]):
-                    continue
-
-                definition = coll.get('definition_json')
-                items, _ = queries_db.query_virtual_library_items(
-                    rules=definition.get('rules', []),
-                    logic=definition.get('logic', 'AND'),
-                    user_id=user_id,
-                    limit=limit, 
-                    offset=0,
-                    sort_by='DateCreated',
-                    sort_order='Descending',
-                    item_types=definition.get('item_type', ['Movie']),
-                    target_library_ids=definition.get('target_library_ids', []),
-                    tmdb_ids=tmdb_ids_filter # <--- 传入 TMDb ID 限制
-                )
-                all_latest.extend(items)
-            
-            # 去重并获取详情
-            unique_ids = list({i['Id'] for i in all_latest})
-            if not unique_ids: return Response(json.dumps([]), mimetype='application/json')
-            
-            # 批量获取详情
-            items_details = _fetch_items_in_chunks(base_url, api_key, user_id, unique_ids, "DateCreated")
-            # 内存排序
-            items_details.sort(key=lambda x: x.get('DateCreated', ''), reverse=True)
-            # 截取
-            latest_ids = [i['Id'] for i in items_details[:limit]]
+            # 读物化视图 (过期的虚拟库会先按需重建)，只对最终一页去 Emby 取详情
+            latest_ids = latest_feed.get_user_latest_item_ids(user_id, limit)
 
         else:
             # 原生库请求，直接转发
@@ -1,12 +1,13 @@
 # routes/media.py
 
-from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask import Blueprint, request, jsonify, Response, session
 import logging
 import os
 import json
 import requests
 
 import handler.emby as emby
+from handler import image_cache
 import config_manager
 import constants
 import task_manager
@@ -171,16 +172,33 @@ def api_update_edited_cast_sa(item_id):
     
     return jsonify({"message": "手动更新任务已在后台启动。"}), 202
 
+_PLACEHOLDER_PNG = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
+
+def _build_cached_image_response(result):
+    """把 image_cache.fetch_image 的结果包装成带缓存头的响应。"""
+    response = Response(result['body'], status=result['status'], content_type=result['content_type'])
+    response.headers['ETag'] = result['etag']
+    response.headers['Cache-Control'] = f"private, max-age={int(result['max_age'])}"
+    if result.get('last_modified'):
+        response.headers['Last-Modified'] = result['last_modified']
+    return response
+
 # ▼▼▼ 通用外部图片代理接口 ▼▼▼
 @media_api_bp.route('/image_proxy', methods=['GET'])
 def proxy_external_image():
     """
     一个安全的通用外部图片代理。
-    【V3 - 代理适配版】增加了对系统全局代理的支持，解决 TMDb 图片连接重置问题。
+    【V4 - 缓存版】走本地磁盘缓存 + 条件回源，支持 w (宽度) / fmt=webp 缩放转码，并对浏览器输出 ETag。
+    会回源并落盘，因此开启认证时必须登录才能使用，且只接受 http/https 地址。
     """
+    if config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_AUTH_ENABLED, False) and 'emby_user_id' not in session:
+        return jsonify({"status": "error", "message": "需要登录才能访问此资源"}), 401
+
     external_url = request.args.get('url')
     if not external_url:
         return jsonify({"error": "缺少 'url' 参数"}), 400
+    if urlparse(external_url).scheme not in ('http', 'https'):
+        return jsonify({"error": "只支持 http/https 图片地址"}), 400
 
     try:
         # 1. 获取程序配置
@@ -197,31 +215,30 @@ def proxy_external_image():
             'Referer': f"{parsed_url.scheme}://{parsed_url.netloc}/"
         }
         
-        logger.debug(f"  ➜ 代理请求外部图片: URL='{external_url}', 使用代理={bool(proxies)}")
-
-        # 4. 带着代理和伪装头去请求
-        # 增加 verify=False 可以防止某些代理抓包导致的 SSL 报错（可选）
-        response = requests.get(
-            external_url, 
-            stream=True, 
-            timeout=15, 
-            headers=headers, 
-            proxies=proxies
-        )
-
-        response.raise_for_status()
-
-        return Response(
-            stream_with_context(response.iter_content(chunk_size=8192)),
-            content_type=response.headers.get('Content-Type'),
-            status=response.status_code
+        logger.trace(f"  ➜ 代理请求外部图片: URL='{external_url}', 使用代理={bool(proxies)}")
+
+        # 4. 优先读本地缓存，过期时带条件头回源
+        result = image_cache.fetch_image(
+            external_url,
+            external_url,
+            headers=headers,
+            proxies=proxies,
+            # TMDb 图片路径本身就是内容寻址的，可长期缓存
+            immutable=(parsed_url.netloc == 'image.tmdb.org'),
+            timeout=15,
+            width=image_cache.normalize_width(request.args.get('w')),
+            fmt='webp' if request.args.get('fmt') == 'webp' else None,
+            if_none_match=request.headers.get('If-None-Match'),
         )
+        if result['status'] not in (200, 304) or result['body'] is None:
+            raise requests.exceptions.HTTPError(f"HTTP {result['status']}")
+        return _build_cached_image_response(result)
     except requests.exceptions.RequestException as e:
         # 这里的报错就是你看到的那个
         logger.error(f"通用图片代理错误: 无法获取 URL '{external_url}'. 错误: {e}")
         # 返回一个占位图，省得前端裂图
         return Response(
-            b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82',
+            _PLACEHOLDER_PNG,
             mimetype='image/png',
             status=404
         )
@@ -232,14 +249,16 @@ def proxy_external_image():
 def proxy_emby_image(image_path):
     """
     一个安全的、动态的 Emby 图片代理。
-    【V2 - 完整修复版】确保 api_key 作为 URL 参数传递，适用于所有图片类型。
+    【V3 - 缓存版】确保 api_key 作为 URL 参数传递；结果落盘缓存，带 tag 的图片长期有效。
+    额外参数 w / fmt 由本代理处理 (缩放/转 WebP)，不会转发给 Emby。
     """
     try:
         emby_url = extensions.media_processor_instance.emby_url.rstrip('/')
         emby_api_key = extensions.media_processor_instance.emby_api_key
 
-        # 1. 构造基础 URL，包含路径和原始查询参数
-        query_string = request.query_string.decode('utf-8')
+        # 1. 构造基础 URL，包含路径和原始查询参数 (剔除本代理自用参数)
+        query_pairs = [(k, v) for k, v in parse_qsl(request.query_string.decode('utf-8'), keep_blank_values=True) if k not in ('w', 'fmt')]
+        query_string = urlencode(query_pairs)
         target_url = f"{emby_url}/{image_path}"
         if query_string:
             target_url += f"?{query_string}"
@@ -251,21 +270,27 @@ def proxy_emby_image(image_path):
         
         logger.trace(f"代理图片请求 (最终URL): {_mask_url_query_secret(target_url_with_key)}")
 
-        # 3. 发送请求
-        emby_response = requests.get(target_url_with_key, stream=True, timeout=20)
-        emby_response.raise_for_status()
-
-        # 4. 将 Emby 的响应流式传输回浏览器
-        return Response(
-            stream_with_context(emby_response.iter_content(chunk_size=8192)),
-            content_type=emby_response.headers.get('Content-Type'),
-            status=emby_response.status_code
+        # 3. 读缓存/回源 (缓存键不含 api_key)
+        has_tag = any(k.lower() == 'tag' and v for k, v in query_pairs)
+        result = image_cache.fetch_image(
+            target_url,
+            target_url_with_key,
+            immutable=has_tag,
+            timeout=20,
+            width=image_cache.normalize_width(request.args.get('w')),
+            fmt='webp' if request.args.get('fmt') == 'webp' else None,
+            if_none_match=request.headers.get('If-None-Match'),
         )
+        if result['status'] not in (200, 304) or result['body'] is None:
+            raise requests.exceptions.HTTPError(f"HTTP {result['status']}")
+
+        # 4. 返回本地缓存内容
+        return _build_cached_image_response(result)
     except Exception as e:
         logger.error(f"代理 Emby 图片时发生严重错误: {e}", exc_info=True)
         # 返回一个1x1的透明像素点作为占位符，避免显示大的裂图图标
         return Response(
-            b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82',
+            _PLACEHOLDER_PNG,
             mimetype='image/png'
         )
     
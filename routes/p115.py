@@ -9,7 +9,8 @@ import os
 import re
 import time
 import random
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs
+import hashlib
 import requests
 from flask import Blueprint, jsonify, request, redirect, Response, stream_with_context, current_app, session
 from extensions import admin_required, emby_login_required
@@ -26,7 +27,7 @@ from handler.p115_copy_play import (
     record_source_play,
     recycle_clone_after_direct_url,
 )
-from handler import p115_play_pool
+from handler import p115_play_pool, p115_relay_cache
 import constants
 import config_manager
 from functools import lru_cache, wraps
@@ -1769,6 +1770,99 @@ def handle_sorting_rules():
         settings_db.save_setting('p115_sorting_rules', rules)
         return jsonify({"status": "success", "message": "115 分类规则已保存"})
     
+class _PlayUrlCache:
+    """
+    主账号直链短缓存：key = (pick_code, 申请直链用的 UA, 账号指纹)。
+    - 有效期取直链自带的过期时间 (URL 参数 t) 减去安全余量，解析不到时用默认 TTL。
+    - 同一 key 的并发未命中只放一个请求去 115 取直链，其余请求等待结果 (single-flight)。
+    """
+    DEFAULT_TTL = 300
+    MAX_TTL = 1800
+    SAFETY_MARGIN = 60
+    WAIT_TIMEOUT = 30
+    MAX_ENTRIES = 4096
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> (url, expires_at)
+        self._inflight = {}  # key -> {"event": Event, "url": None}
+
+    @classmethod
+    def _expires_at(cls, url):
+        now = time.time()
+        try:
+            t_values = parse_qs(urlparse(str(url)).query).get('t')
+            if t_values:
+                expires = int(t_values[0]) - cls.SAFETY_MARGIN
+                return min(expires, now + cls.MAX_TTL)
+        except (TypeError, ValueError):
+            pass
+        return now + cls.DEFAULT_TTL
+
+    def acquire(self, key):
+        """返回 (url, is_leader)。命中缓存直接给 url；未命中时首个请求成为 leader 负责解析，其余等待 leader 结果。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.time():
+                return entry[0], False
+            if entry:
+                self._entries.pop(key, None)
+            flight = self._inflight.get(key)
+            if flight is None:
+                self._inflight[key] = {"event": threading.Event(), "url": None}
+                return None, True
+        flight["event"].wait(self.WAIT_TIMEOUT)
+        return flight["url"], False
+
+    def release(self, key, url):
+        """leader 解析结束后调用 (无论成败)，写入缓存并唤醒等待者。"""
+        with self._lock:
+            flight = self._inflight.pop(key, None)
+            if url:
+                expires_at = self._expires_at(url)
+                if expires_at > time.time():
+                    if len(self._entries) >= self.MAX_ENTRIES:
+                        now = time.time()
+                        self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+                        if len(self._entries) >= self.MAX_ENTRIES:
+                            self._entries.pop(next(iter(self._entries)), None)
+                    self._entries[key] = (url, expires_at)
+        if flight:
+            flight["url"] = url
+            flight["event"].set()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_account(self, account_key):
+        with self._lock:
+            for key in [k for k in self._entries if k[2] == account_key]:
+                self._entries.pop(key, None)
+
+
+_play_url_cache = _PlayUrlCache()
+
+
+def _p115_account_cache_key():
+    """主账号凭据指纹：切换 Token/Cookie 后旧直链自然失效。"""
+    raw = f"{P115Service.get_token() or ''}|{P115Service.get_cookies() or ''}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _relay_115_for_emby_server(real_url, request_ua, cache_key):
+    """Emby 服务端探测/Remux：经块缓存中转 115 字节。返回 (上游状态码, Response)。"""
+    headers_to_115 = {
+        "User-Agent": request_ua,
+        "Accept": "*/*",
+        "Connection": "keep-alive"
+    }
+    status, response_headers, body = p115_relay_cache.relay(
+        cache_key, real_url, headers_to_115, range_header=request.headers.get('Range')
+    )
+    return status, Response(stream_with_context(body), status=status, headers=response_headers)
+
+
 @p115_bp.route('/play/<pick_code>', methods=['GET', 'HEAD']) 
 @p115_bp.route('/play/<pick_code>/<path:filename>', methods=['GET', 'HEAD'])
 def play_115_video(pick_code, filename=None):
@@ -1822,17 +1916,8 @@ def play_115_video(pick_code, filename=None):
                     logger.warning("  ⚠️ [小号播放] 路由层未拿到小号直链，已按小号池优先规则中止本次播放。")
                     return "Play pool failed", 503
                 if is_emby_server:
-                    headers_to_115 = {
-                        "User-Agent": request_ua,
-                        "Accept": "*/*",
-                        "Connection": "keep-alive",
-                    }
-                    if 'Range' in request.headers:
-                        headers_to_115['Range'] = request.headers['Range']
-                    resp = requests.get(real_url, headers=headers_to_115, stream=True, timeout=10)
-                    excluded_headers = ['content-encoding', 'transfer-encoding', 'connection', 'host']
-                    response_headers = [(name, value) for name, value in resp.headers.items() if name.lower() not in excluded_headers]
-                    return Response(stream_with_context(resp.iter_content(chunk_size=8192)), status=resp.status_code, headers=response_headers)
+                    _, response = _relay_115_for_emby_server(real_url, request_ua, pick_code)
+                    return response
                 response = redirect(real_url, code=302)
                 response.headers['Access-Control-Allow-Origin'] = '*'
                 return response
@@ -1859,34 +1944,51 @@ def play_115_video(pick_code, filename=None):
         use_openapi = (api_priority != 'cookie')
         rebuilt_copy_play = False
         
-        for i in range(max_retries):
-            try:
-                if use_openapi:
-                    real_url = client.openapi_downurl(play_pick_code, user_agent=request_ua)
-                else:
-                    real_url = client.download_url(play_pick_code, user_agent=request_ua)
-                    
+        # 未走复制播放时，主账号直链按 (PC, UA, 账号) 短缓存，起播时的并发 Range 请求只解析一次
+        url_cache_key = None
+        url_flight_leader = False
+        if str(play_pick_code) == str(pick_code):
+            url_cache_key = (str(pick_code), request_ua, _p115_account_cache_key())
+            real_url, url_flight_leader = _play_url_cache.acquire(url_cache_key)
+            if real_url:
+                record_source_play(pick_code, **copy_play_kwargs)
+            elif not url_flight_leader:
+                return "Failed to get download URL or Rate Limited", 404
+
+        try:
+            for i in range(max_retries):
                 if real_url:
-                    if str(play_pick_code) == str(pick_code):
-                        record_source_play(pick_code, **copy_play_kwargs)
-                    else:
-                        recycle_clone_after_direct_url(play_pick_code, "起播后清理")
                     break
-            except Exception as e:
-                if str(play_pick_code) != str(pick_code) and is_copy_play_missing_error(e):
-                    discard_copy_play_clone(play_pick_code)
-                    if rebuilt_copy_play:
-                        return "Copy play clone expired", 503
-                    play_pick_code = prepare_copy_play_pick_code(pick_code, force_new=True, **copy_play_kwargs)
-                    rebuilt_copy_play = True
-                    if not play_pick_code:
-                        return "Copy play failed", 503
-                    use_openapi = (api_priority != 'cookie')
-                    continue
-                logger.warning(f"  ➜ [直链解析] {'OpenAPI' if use_openapi else 'Cookie'} 接口异常: {e}")
+                try:
+                    if use_openapi:
+                        real_url = client.openapi_downurl(play_pick_code, user_agent=request_ua)
+                    else:
+                        real_url = client.download_url(play_pick_code, user_agent=request_ua)
+                    
+                    if real_url:
+                        if str(play_pick_code) == str(pick_code):
+                            record_source_play(pick_code, **copy_play_kwargs)
+                        else:
+                            recycle_clone_after_direct_url(play_pick_code, "起播后清理")
+                        break
+                except Exception as e:
+                    if str(play_pick_code) != str(pick_code) and is_copy_play_missing_error(e):
+                        discard_copy_play_clone(play_pick_code)
+                        if rebuilt_copy_play:
+                            return "Copy play clone expired", 503
+                        play_pick_code = prepare_copy_play_pick_code(pick_code, force_new=True, **copy_play_kwargs)
+                        rebuilt_copy_play = True
+                        if not play_pick_code:
+                            return "Copy play failed", 503
+                        use_openapi = (api_priority != 'cookie')
+                        continue
+                    logger.warning(f"  ➜ [直链解析] {'OpenAPI' if use_openapi else 'Cookie'} 接口异常: {e}")
             
-            use_openapi = not use_openapi
-            time.sleep(0.5)
+                use_openapi = not use_openapi
+                time.sleep(0.5)
+        finally:
+            if url_flight_leader:
+                _play_url_cache.release(url_cache_key, real_url if str(play_pick_code) == str(pick_code) else None)
         
         if not real_url:
             return "Failed to get download URL or Rate Limited", 404
@@ -1896,21 +1998,13 @@ def play_115_video(pick_code, filename=None):
         # =================================================================
         if is_emby_server:
             # logger.info(f"  ➜ 检测到 Emby 服务端介入 ({client_ua})，启动中转代理！")
-            
-            headers_to_115 = {
-                "User-Agent": request_ua,
-                "Accept": "*/*",
-                "Connection": "keep-alive"
-            }
-            if 'Range' in request.headers:
-                headers_to_115['Range'] = request.headers['Range']
-
-            resp = requests.get(real_url, headers=headers_to_115, stream=True, timeout=10)
-            
-            excluded_headers = ['content-encoding', 'transfer-encoding', 'connection', 'host']
-            response_headers = [(name, value) for name, value in resp.headers.items() if name.lower() not in excluded_headers]
-            
-            return Response(stream_with_context(resp.iter_content(chunk_size=8192)), status=resp.status_code, headers=response_headers)
+            upstream_status, response = _relay_115_for_emby_server(real_url, request_ua, pick_code)
+            if url_cache_key and upstream_status in (401, 403):
+                # 账号级拒绝 (风控/登录失效)：该账号下的缓存直链全部作废
+                _play_url_cache.invalidate_account(url_cache_key[2])
+            elif url_cache_key and upstream_status in (404, 410):
+                _play_url_cache.invalidate(url_cache_key)
+            return response
 
         else:
             # 正常第三方客户端，下发 302，让它自己去连 115！
@@ -5,6 +5,7 @@ from flask import Blueprint, jsonify, request
 from extensions import admin_required
 from database import settings_db
 from handler.hdhive_client import HDHiveClient
+import handler.moviepilot as moviepilot
 from tasks.hdhive import task_download_from_hdhive, filter_hdhive_resources
 from handler.tg_userbot import TGUserBotManager, tg_task_queue
 from handler.tg_media_candidate import build_channel_task_payload
@@ -76,7 +77,8 @@ def save_mp_config():
     """保存 MoviePilot 配置"""
     new_cfg = request.json
     settings_db.save_setting('mp_config', new_cfg)
-    
+    moviepilot.reset_client_cache()
+
     return jsonify({"success": True, "message": "MoviePilot 配置已保存生效"})
 
 # ==========================================
@@ -8,7 +8,7 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 
 from extensions import emby_login_required 
-from database import user_db, settings_db, media_db, request_db
+from database import user_db, settings_db, media_db, request_db, playback_db
 import config_manager     
 import constants
 import handler.tmdb as tmdb
@@ -385,6 +385,90 @@ def upload_avatar():
         "new_tag": new_tag
     })
 
+def _format_local_playback_title(row):
+    """本地流水已带剧集名/季/集，直接拼标题。"""
+    title = row.get('item_name') or "未知影片"
+    if row.get('item_type') == 'Episode' and row.get('series_name'):
+        season_num = row.get('season_number')
+        episode_num = row.get('episode_number')
+        if season_num is not None and episode_num is not None:
+            return f"{row['series_name']} - 第 {season_num} 季 - 第 {episode_num} 集"
+        return f"{row['series_name']} - {title}"
+    return title
+
+def _build_local_personal_report(emby_user_id, days, media_type_filter):
+    """基于本地播放流水与日汇总生成个人报告，格式与插件版一致。"""
+    item_type = None if media_type_filter == 'all' else media_type_filter
+    totals = playback_db.get_user_playback_totals(emby_user_id, days, item_type)
+    recent = playback_db.get_user_recent_playbacks(emby_user_id, days, item_type, limit=20)
+
+    history_list = []
+    for row in recent:
+        event_at = row.get('event_at')
+        history_list.append({
+            "title": _format_local_playback_title(row),
+            "date": event_at.astimezone().strftime('%Y-%m-%d %H:%M:%S') if event_at else None,
+            "duration": int((row.get('play_duration_sec') or 0) / 60),
+            "item_type": row.get('item_type') or "Video",
+            "item_id": row.get('item_id')
+        })
+
+    return {
+        "total_count": totals['total_count'],
+        "total_minutes": int(totals['total_seconds'] / 60),
+        "history_list": history_list
+    }
+
+def _build_local_dashboard_stats(days, config):
+    """基于本地日汇总生成仪表盘数据，格式与插件版一致。"""
+    rollups = playback_db.get_dashboard_rollups(days)
+
+    daily = rollups['daily']
+    sorted_dates = [str(r['day']) for r in daily]
+    total_plays = sum(int(r['play_count'] or 0) for r in daily)
+    total_seconds = sum(int(r['duration_sec'] or 0) for r in daily)
+
+    users = sorted(rollups['users'], key=lambda r: int(r['duration_sec'] or 0), reverse=True)
+
+    # 媒体排行：原始 Emby ID (含单集) 聚合到电影/剧集
+    item_counts = {str(r['item_id']): int(r['play_count'] or 0) for r in rollups['items']}
+    aggregation_map = media_db.get_dashboard_aggregation_map(list(item_counts.keys()))
+    media_counter = {}
+    for raw_emby_id, count in item_counts.items():
+        info = aggregation_map.get(raw_emby_id)
+        if not info:
+            continue
+        target_tmdb_id = info['id']
+        if target_tmdb_id not in media_counter:
+            media_counter[target_tmdb_id] = {
+                "id": info['emby_id'],
+                "name": info['name'],
+                "type": info['type'],
+                "poster_path": info['poster_path'],
+                "count": 0
+            }
+        media_counter[target_tmdb_id]["count"] += count
+
+    return {
+        "total_plays": total_plays,
+        "total_duration_hours": round(total_seconds / 3600, 2),
+        "active_users": len([u for u in users if int(u['play_count'] or 0) > 0]),
+        "watched_items": len(media_counter),
+        "hourly_heat": {},
+        "emby_url": config.get('emby_public_url') or config.get('emby_server_url'),
+        "emby_server_id": extensions.EMBY_SERVER_ID,
+        "chart_trend": {
+            "dates": sorted_dates,
+            "counts": [int(r['play_count'] or 0) for r in daily],
+            "hours": [round(int(r['duration_sec'] or 0) / 3600, 1) for r in daily]
+        },
+        "chart_users": {
+            "names": [u['user_name'] or u['user_id'] for u in users[:10]],
+            "hours": [round(int(u['duration_sec'] or 0) / 3600, 1) for u in users[:10]]
+        },
+        "media_rank": sorted(media_counter.values(), key=lambda x: x["count"], reverse=True)[:20]
+    }
+
 @user_portal_bp.route('/playback-report', methods=['GET'])
 @emby_login_required
 def get_playback_report():
@@ -397,6 +481,12 @@ def get_playback_report():
     media_type_filter = request.args.get('media_type', 'all')
     
     config = config_manager.APP_CONFIG
+
+    # 本地播放流水 (Webhook 入库) 覆盖整个统计窗口时直接读本地；
+    # 窗口起点早于第一条本地流水时，之前的历史只在 Playback Reporting 插件里，继续读插件
+    has_local_events = playback_db.has_playback_events()
+    if has_local_events and playback_db.local_history_covers(days):
+        return jsonify({"personal": _build_local_personal_report(emby_user_id, days, media_type_filter)})
     
     # ==================================================
     # 1. 获取 个人数据
@@ -406,6 +496,9 @@ def get_playback_report():
     )
     
     if "error" in personal_res:
+        if has_local_events:
+            logger.warning(f"  ➜ 读取 Playback Reporting 插件失败 ({personal_res['error']})，改用本地播放流水。")
+            return jsonify({"personal": _build_local_personal_report(emby_user_id, days, media_type_filter)})
         if personal_res["error"] == "plugin_not_installed":
             return jsonify({"status": "error", "message": "服务端未安装 Playback Reporting 插件"}), 404
         return jsonify({"status": "error", "message": "获取数据失败"}), 500
@@ -540,6 +633,11 @@ def get_dashboard_stats():
     # 1. 参数处理
     days = request.args.get('days', 30, type=int)
     config = config_manager.APP_CONFIG
+
+    # 本地日汇总覆盖整个统计窗口时直接读本地；否则窗口前段历史仍需读 Playback Reporting 插件
+    has_local_events = playback_db.has_playback_events()
+    if has_local_events and playback_db.local_history_covers(days):
+        return jsonify(_build_local_dashboard_stats(days, config))
     
     # 2. 从 Emby 获取全站原始流水
     endpoint = "/user_usage_stats/UserPlaylist"
@@ -559,6 +657,9 @@ def get_dashboard_stats():
         response.raise_for_status()
         raw_data = response.json()
     except Exception as e:
+        if has_local_events:
+            logger.warning(f"  ➜ 读取 Playback Reporting 插件失败 ({e})，仪表盘改用本地播放汇总。")
+            return jsonify(_build_local_dashboard_stats(days, config))
         logger.error(f"获取仪表盘数据失败: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -6,6 +6,7 @@ import time
 import os
 import re
 import json
+import hashlib
 import random
 from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
@@ -18,6 +19,7 @@ import task_manager
 import handler.emby as emby
 from handler.p115_copy_play import cleanup_for_playback_stop
 from handler import p115_play_pool
+from handler import emby_refresh
 import config_manager
 import constants
 import handler.telegram as telegram
@@ -30,7 +32,7 @@ from tasks.media import task_sync_all_metadata
 from handler.custom_collection import RecommendationEngine
 from handler import tmdb_collections as collections_handler
 from services.cover_generator import CoverGeneratorService
-from database import custom_collection_db, tmdb_collection_db, settings_db, user_db, maintenance_db, media_db, queries_db, watchlist_db
+from database import custom_collection_db, tmdb_collection_db, settings_db, user_db, maintenance_db, media_db, queries_db, watchlist_db, playback_db, people_mirror_db
 from database.connection import get_db_connection
 from database.log_db import LogDBManager
 from handler.p115_service import P115Service, SmartOrganizer, get_config
@@ -1247,6 +1249,8 @@ def _handle_full_processing_flow(processor: 'MediaProcessor', item_id: str, forc
                 logger.info(
                     f"  ➜ [智能追剧] 触发单项刷新：{refresh_scope_text}"
                 )
+                # 先把下次检查时间提前到现在：即使单项任务排队未执行，下一轮常规追剧也会优先处理
+                watchlist_db.promote_watchlist_series(str(tmdb_id))
                 task_manager.submit_task(
                     task_process_watchlist,
                     task_name=f"刷新智能追剧: 《{item_name_for_log}》",
@@ -1716,6 +1720,9 @@ def emby_webhook():
         original_item_id = item_from_webhook.get("Id")
         original_item_type = item_from_webhook.get("Type")
         original_item_name = item_from_webhook.get("Name", "未知项目")
+        if original_item_id:
+            emby_refresh.forget_item(original_item_id)
+            people_mirror_db.delete_item_links([original_item_id])
         # 如果是分集，提取所属剧集 ID，供后续清理主库使用
         series_id_from_webhook = item_from_webhook.get("SeriesId") if original_item_type == "Episode" else None
 
@@ -1969,6 +1976,12 @@ def emby_webhook():
         if not user_id or not item_id_from_webhook:
             return jsonify({"status": "event_ignored_missing_data"}), 200
 
+        # 播放流水入库 (用户中心报表/仪表盘/全站热门的数据源)，异步执行不阻塞 Webhook
+        if event_type in ["playback.start", "playback.stop"]:
+            try:
+                spawn(playback_db.record_playback_event, event_type, data)
+            except Exception as e:
+                logger.error(f"  ➜ [播放流水] 任务分配失败: {e}")
 
         id_to_update_in_db = None
         if item_type_from_webhook in ['Movie', 'Series']:
@@ -2035,6 +2048,9 @@ def emby_webhook():
                 except Exception as e:
                     logger.error(f"  ➜ 发送播放通知任务分配失败: {e}")
 
+        # 标记该用户待增量同步，由“同步用户数据”任务按水位拉取 Emby 的权威状态
+        spawn(user_db.mark_user_sync_dirty, user_id)
+
         try:
             if len(update_data) > 2:
                 user_db.upsert_user_media_data(update_data)
@@ -2135,6 +2151,13 @@ def emby_webhook():
         if event_type == "image.update" and original_item_id in UPDATING_IMAGES:
             logger.debug(f"  ➜ Webhook: 忽略项目 '{original_item_name}' 的图片更新通知 (系统生成的封面)。")
             return jsonify({"status": "ignored_self_triggered_update"}), 200
+
+        # 用户在 Emby 里手动换了合集封面：刷新 cover_version，否则虚拟库按一年缓存的旧封面 URL 不会失效
+        if event_type == "image.update" and original_item_type == "BoxSet":
+            primary_tag = (item_from_webhook.get("ImageTags") or {}).get("Primary")
+            new_version = primary_tag or hashlib.sha1(f"{original_item_id}:{time.time()}".encode("utf-8")).hexdigest()
+            if custom_collection_db.set_cover_version_by_emby_id(original_item_id, str(new_version)[:16]):
+                logger.debug(f"  ➜ Webhook: 合集 '{original_item_name}' 的封面已被手动更换，已刷新封面版本。")
         
         # --- 【拦截 2】如果是系统正在更新元数据，直接拦截 ---
         if event_type == "metadata.update" and original_item_id in UPDATING_METADATA:
@@ -2165,6 +2188,10 @@ def emby_webhook():
         if _should_skip_non_etk_strm_webhook(original_item_type, original_item_name, original_item_path):
             return jsonify({"status": "ignored_non_etk_strm"}), 200
 
+        # 演员表可能变化：登记到人物镜像，下次同步时定点刷新
+        if event_type != "image.update" and original_item_type in people_mirror_db.MIRROR_ITEM_TYPES:
+            people_mirror_db.mark_items_dirty([original_item_id])
+
     # ======================================================================
     # ★★★ 处理音乐 (Audio) 入库事件 ★★★
     # ======================================================================
@@ -2190,6 +2217,8 @@ def emby_webhook():
     # ★★★ 处理视频入库事件 (原有的逻辑保持不变) ★★★
     # ======================================================================
     if event_type in ["item.add", "library.new"]:
+        if original_item_type in ["Series", "Season", "Folder"] and original_item_path:
+            emby_refresh.index_item(original_item_id, original_item_path, original_item_name)
         spawn(_wait_for_stream_data_and_enqueue, original_item_id, original_item_name, original_item_type, original_item_path)
         
         logger.info(f"  ➜ Webhook: 收到入库事件 '{original_item_name}'，已分派预检任务。")
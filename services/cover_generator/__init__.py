@@ -1,6 +1,10 @@
 # services/cover_generator/__init__.py
 
+import os
+import time
+import threading
 import logging
+import hashlib
 import shutil
 import yaml
 import json
@@ -9,7 +13,7 @@ import requests
 from pathlib import Path
 from typing import Dict, Any, List, Tuple, Optional
 from gevent import spawn_later
-from database import custom_collection_db, queries_db
+from database import custom_collection_db, queries_db, cover_db
 import config_manager
 import handler.emby as emby 
 from extensions import UPDATING_IMAGES
@@ -21,6 +25,9 @@ logger = logging.getLogger(__name__)
 
 class CoverGeneratorService:
     SORT_BY_DISPLAY_NAME = { "Random": "随机", "Latest": "最新添加" }
+    # 渲染逻辑有不兼容改动时递增，使旧指纹全部失效
+    SIGNATURE_VERSION = 1
+    POSTER_CACHE_MAX_AGE_DAYS = 30
 
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -35,47 +42,104 @@ class CoverGeneratorService:
         self.data_path = Path(config_manager.PERSISTENT_DATA_PATH) / "cover_generator"
         self.covers_path = self.data_path / "covers"
         self.font_path = self.data_path / "fonts"
+        self.poster_cache_path = self.data_path / "poster_cache"
         self.covers_path.mkdir(parents=True, exist_ok=True)
         self.font_path.mkdir(parents=True, exist_ok=True)
+        self.poster_cache_path.mkdir(parents=True, exist_ok=True)
         self.zh_font_path = None
         self.en_font_path = None
         self.zh_font_path_multi_1 = None
         self.en_font_path_multi_1 = None
         self._fonts_checked_and_ready = False
+        self._asset_fingerprint = None
 
-    def generate_for_library(self, emby_server_id: str, library: Dict[str, Any], item_count: Optional[int] = None, content_types: Optional[List[str]] = None, custom_collection_data: Optional[Dict] = None):
+    def prepare(self):
+        """预先检查/下载字体，供并发生成封面前调用。"""
+        self.__get_fonts()
+
+    def generate_for_library(self, emby_server_id: str, library: Dict[str, Any], item_count: Optional[int] = None, content_types: Optional[List[str]] = None, custom_collection_data: Optional[Dict] = None, force: bool = False):
+        """
+        生成并上传封面。输入 (风格配置、标题、角标、成员海报 ID/Tag) 与上次成功上传时一致则跳过；
+        force=True 时无视指纹强制重新生成。
+        """
         sort_by_name = self.SORT_BY_DISPLAY_NAME.get(self._sort_by, self._sort_by)
         logger.info(f"  ➜ 开始以排序方式: {sort_by_name} 为媒体库 '{library['Name']}' 生成封面...")
         self.__get_fonts()
-        image_data = self.__generate_image_data(emby_server_id, library, item_count, content_types, custom_collection_data)
+        render_ctx = {'target_id': library.get("Id") or library.get("ItemId"), 'force': force, 'signature': None, 'unchanged': False}
+        image_data = self.__generate_image_data(emby_server_id, library, item_count, content_types, custom_collection_data, render_ctx)
+        if render_ctx['unchanged']:
+            logger.info(f"  ➜ 媒体库 '{library['Name']}' 的封面素材未变化，跳过重新生成。")
+            return True
         if not image_data:
             logger.error(f"  ➜ 为媒体库 '{library['Name']}' 生成封面图片失败。")
             return False
         success = self.__set_library_image(emby_server_id, library, image_data)
         if success:
             logger.info(f"  ➜ 成功更新媒体库 '{library['Name']}' 的封面！")
+            if render_ctx['target_id'] and render_ctx['signature']:
+                cover_db.save_cover_signature(render_ctx['target_id'], render_ctx['signature'])
         else:
             logger.error(f"  ➜ 上传封面到媒体库 '{library['Name']}' 失败。")
         return success
 
-    def __generate_image_data(self, server_id: str, library: Dict[str, Any], item_count: Optional[int] = None, content_types: Optional[List[str]] = None, custom_collection_data: Optional[Dict] = None) -> bytes:
+    def __is_unchanged(self, render_ctx: Dict[str, Any], title: Tuple[str, str], item_count: Any, sources: List[str]) -> bool:
+        """计算本次封面的输入指纹并记入 render_ctx；与上次成功上传时一致则返回 True。"""
+        payload = json.dumps({
+            'v': self.SIGNATURE_VERSION,
+            'config': self.config,
+            'title': list(title),
+            'item_count': item_count,
+            'sources': sources,
+            'assets': self.__asset_fingerprint(),
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        signature = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        render_ctx['signature'] = signature
+        if render_ctx['force'] or not render_ctx['target_id']:
+            return False
+        render_ctx['unchanged'] = cover_db.get_cover_signature(render_ctx['target_id']) == signature
+        return render_ctx['unchanged']
+
+    def __asset_fingerprint(self) -> List[Any]:
+        """字体文件与风格素材 (styles 目录下的文件) 的路径 / mtime / 大小；替换字体或升级风格后指纹随之变化。"""
+        if self._asset_fingerprint is None:
+            style_dir = Path(__file__).parent / "styles"
+            asset_paths = [self.zh_font_path, self.en_font_path, self.zh_font_path_multi_1, self.en_font_path_multi_1]
+            asset_paths += sorted(p for p in style_dir.iterdir() if p.is_file())
+            fingerprint = []
+            for path in asset_paths:
+                try:
+                    st = os.stat(path) if path else None
+                except OSError:
+                    st = None
+                fingerprint.append([str(path) if path else None, st.st_mtime_ns if st else None, st.st_size if st else None])
+            self._asset_fingerprint = fingerprint
+        return self._asset_fingerprint
+
+    def __generate_image_data(self, server_id: str, library: Dict[str, Any], item_count: Optional[int] = None, content_types: Optional[List[str]] = None, custom_collection_data: Optional[Dict] = None, render_ctx: Optional[Dict[str, Any]] = None) -> bytes:
+        render_ctx = render_ctx if render_ctx is not None else {'target_id': None, 'force': True, 'signature': None, 'unchanged': False}
         library_name = library['Name']
         title = self.__get_library_title_from_yaml(library_name)
         custom_image_paths = self.__check_custom_image(library_name)
         if custom_image_paths:
             logger.info(f"  ➜ 发现媒体库 '{library_name}' 的自定义图片，将使用路径模式生成。")
+            sources = []
+            for path in custom_image_paths:
+                stat = os.stat(path)
+                sources.append(f"file:{path}:{stat.st_mtime_ns}:{stat.st_size}")
+            if self.__is_unchanged(render_ctx, title, item_count, sources):
+                return None
             return self.__generate_image_from_path(library_name, title, custom_image_paths, item_count)
         
         # ★★★ 真实海报兜底 (针对“即将上线”等本地无资源的榜单) ★★★
         if custom_collection_data and custom_collection_data.get('type') in ['list', 'ai_recommendation_global']:
-            tmdb_image_data = self.__generate_from_local_tmdb_metadata(library_name, title, custom_collection_data, item_count)
-            if tmdb_image_data:
+            tmdb_image_data = self.__generate_from_local_tmdb_metadata(library_name, title, custom_collection_data, item_count, render_ctx)
+            if tmdb_image_data or render_ctx['unchanged']:
                 return tmdb_image_data
 
         logger.trace(f"  ➜ 未发现自定义图片，将从服务器 '{server_id}' 获取媒体项作为封面来源。")
-        return self.__generate_from_server(server_id, library, title, item_count, content_types, custom_collection_data)
+        return self.__generate_from_server(server_id, library, title, item_count, content_types, custom_collection_data, render_ctx)
 
-    def __generate_from_local_tmdb_metadata(self, library_name: str, title: Tuple[str, str], custom_collection_data: Dict, item_count: Optional[int]) -> Optional[bytes]:
+    def __generate_from_local_tmdb_metadata(self, library_name: str, title: Tuple[str, str], custom_collection_data: Dict, item_count: Optional[int], render_ctx: Dict[str, Any]) -> Optional[bytes]:
         """
         当本地没有 Emby 媒体项时，利用数据库里存储的 poster_path 下载海报。
         """
@@ -112,6 +176,13 @@ class CoverGeneratorService:
             
             # 从数据库批量查询 poster_path
             metadata_map = queries_db.get_missing_items_metadata(tmdb_ids)
+
+            sources = [
+                f"tmdb:{tmdb_id}:{(metadata_map.get(tmdb_id) or {}).get('poster_path')}"
+                for tmdb_id in tmdb_ids
+            ]
+            if self.__is_unchanged(render_ctx, title, item_count, sources):
+                return None
             
             image_paths = []
             
@@ -184,12 +255,16 @@ class CoverGeneratorService:
             logger.warning(f"  ➜ 下载外部图片失败 {url}: {e}")
         return None
 
-    def __generate_from_server(self, server_id: str, library: Dict[str, Any], title: Tuple[str, str], item_count: Optional[int] = None, content_types: Optional[List[str]] = None, custom_collection_data: Optional[Dict] = None) -> bytes:
+    def __generate_from_server(self, server_id: str, library: Dict[str, Any], title: Tuple[str, str], item_count: Optional[int] = None, content_types: Optional[List[str]] = None, custom_collection_data: Optional[Dict] = None, render_ctx: Optional[Dict[str, Any]] = None) -> bytes:
         required_items_count = 1 if self._cover_style.startswith('single') else 9
         items = self.__get_valid_items_from_library(server_id, library, required_items_count, content_types, custom_collection_data)
         if not items:
             logger.warning(f"  ➜ 在媒体库 '{library['Name']}' 中找不到任何带有可用图片的媒体项。")
             return None
+        # 图片 URL 已包含条目 ID 与图片 Tag，成员及其海报都没变时无需下载和渲染
+        sources = [self.__get_image_url(item) for item in items[:required_items_count]]
+        if render_ctx is not None and self.__is_unchanged(render_ctx, title, item_count, sources):
+            return None
         if self._cover_style.startswith('single'):
             image_url = self.__get_image_url(items[0])
             if not image_url: return None
@@ -460,11 +535,23 @@ class CoverGeneratorService:
             if len(path_parts) >= 4 and path_parts[1] == 'Items' and path_parts[3] == 'Images':
                 item_id = path_parts[2]
                 image_type = path_parts[4]
+                # 海报缓存：(条目, 图片类型, Tag) 不变则图片内容不变，直接复用本地副本
+                cache_path = self.poster_cache_path / f"{item_id}_{image_type}_{image_tag}.jpg" if image_tag else None
+                if cache_path and cache_path.exists() and cache_path.stat().st_size > 0:
+                    os.utime(cache_path)
+                    shutil.copyfile(cache_path, filepath)
+                    return filepath
                 success = emby.download_emby_image(
                     item_id=item_id, image_type=image_type, image_tag=image_tag,
                     save_path=str(filepath), emby_server_url=base_url, emby_api_key=api_key
                 )
-                if success: return filepath
+                if success:
+                    if cache_path:
+                        # 先写临时文件再原子替换，并发生成时其他线程不会读到半截文件
+                        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                        shutil.copyfile(filepath, tmp_path)
+                        os.replace(tmp_path, cache_path)
+                    return filepath
             else:
                 logger.error(f"  ➜ 无法从API路径解析有效的项目ID和图片类型: {api_path}")
         except Exception as e:
@@ -536,6 +623,9 @@ class CoverGeneratorService:
             response = requests.post(upload_url, data=image_data, headers=headers, timeout=30)
             response.raise_for_status()
             logger.debug(f"  ➜ 成功上传封面到媒体库 '{library['Name']}'。")
+            if library_id:
+                # 虚拟库的 ImageTag / ETag 由封面内容哈希决定，内容不变客户端就不会重新下载
+                custom_collection_db.set_cover_version_by_emby_id(library_id, hashlib.sha1(image_data).hexdigest()[:16])
             return True
         except requests.exceptions.RequestException as e:
             logger.error(f"  ➜ 上传封面到媒体库 '{library['Name']}' 时发生网络错误: {e}")
@@ -543,6 +633,22 @@ class CoverGeneratorService:
                 logger.error(f"  ➜ 响应状态: {e.response.status_code}, 响应内容: {e.response.text[:200]}")
             return False
 
+    def prune_poster_cache(self, max_age_days: Optional[int] = None) -> int:
+        """删除长时间未被使用的海报缓存，返回删除数量。"""
+        max_age = (max_age_days or self.POSTER_CACHE_MAX_AGE_DAYS) * 86400
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in self.poster_cache_path.glob("*.jpg"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.debug(f"  ➜ 已清理 {removed} 张过期的封面海报缓存。")
+        return removed
+
     def __get_library_title_from_yaml(self, library_name: str) -> Tuple[str, str]:
         zh_title, en_title = library_name, ''
         if not self._title_config_str:
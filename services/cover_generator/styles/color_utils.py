@@ -0,0 +1,32 @@
+# services/cover_generator/styles/color_utils.py
+
+import numpy as np
+
+
+def most_common_vibrant_pixels(img, limit, threshold=20, gray_diff_threshold=10):
+    """
+    统计 RGB 图片中非黑/白/灰像素的颜色频次，返回 [(color, count), ...]，
+    结果 (含并列时按首次出现排序) 与 Counter(过滤后的像素).most_common(limit) 一致。
+    """
+    pixels = np.asarray(img, dtype=np.int32).reshape(-1, 3)
+    r, g, b = pixels[:, 0], pixels[:, 1], pixels[:, 2]
+    near_black = (r < threshold) & (g < threshold) & (b < threshold)
+    near_white = (r > 255 - threshold) & (g > 255 - threshold) & (b > 255 - threshold)
+    near_gray = (np.abs(r - g) < gray_diff_threshold) & (np.abs(g - b) < gray_diff_threshold) & (np.abs(r - b) < gray_diff_threshold)
+    filtered = pixels[~(near_black | near_white | near_gray)]
+    if filtered.size == 0:
+        return []
+    # 打包成 24 位整数后做直方图
+    packed = (filtered[:, 0] << 16) | (filtered[:, 1] << 8) | filtered[:, 2]
+    values, first_index, counts = np.unique(packed, return_index=True, return_counts=True)
+    order = np.lexsort((first_index, -counts))[:limit]
+    return [
+        (((int(v) >> 16) & 0xFF, (int(v) >> 8) & 0xFF, int(v) & 0xFF), int(c))
+        for v, c in zip(values[order], counts[order])
+    ]
+
+
+def horizontal_gradient_mask(width, height, gamma=0.7):
+    """生成从左到右渐变的 L 模式蒙版数据 (uint8 数组)。"""
+    row = (255.0 * (np.arange(width) / width) ** gamma).astype(np.uint8)
+    return np.tile(row, (height, 1))
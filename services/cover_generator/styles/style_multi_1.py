@@ -13,6 +13,7 @@ import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
 
 from .badge_drawer import draw_badge
+from .color_utils import most_common_vibrant_pixels, horizontal_gradient_mask
 
 logger = logging.getLogger(__name__)
 
@@ -34,16 +35,6 @@ POSTER_GEN_CONFIG = {
 }
 
 # ========== 辅助函数 (从单图风格文件中复制过来) ==========
-def is_not_black_white_gray_near(color, threshold=20):
-    r, g, b = color
-    if (r < threshold and g < threshold and b < threshold) or \
-       (r > 255 - threshold and g > 255 - threshold and b > 255 - threshold):
-        return False
-    gray_diff_threshold = 10
-    if abs(r - g) < gray_diff_threshold and abs(g - b) < gray_diff_threshold and abs(r - b) < gray_diff_threshold:
-        return False
-    return True
-
 def rgb_to_hsv(color):
     r, g, b = [x / 255.0 for x in color]
     return colorsys.rgb_to_hsv(r, g, b)
@@ -61,11 +52,8 @@ def find_dominant_vibrant_colors(image, num_colors=5):
     img = image.copy()
     img.thumbnail((100, 100))
     img = img.convert('RGB')
-    pixels = list(img.getdata())
-    filtered_pixels = [p for p in pixels if is_not_black_white_gray_near(p)]
-    if not filtered_pixels: return []
-    color_counter = Counter(filtered_pixels)
-    dominant_colors = color_counter.most_common(num_colors * 3)
+    dominant_colors = most_common_vibrant_pixels(img, num_colors * 3)
+    if not dominant_colors: return []
     macaron_colors = []
     seen_hues = set()
     for color, count in dominant_colors:
@@ -194,9 +182,7 @@ def create_gradient_background(width, height, color=None):
     color2 = (r2, g2, b2, 255)
     left_image = Image.new("RGBA", (width, height), color1)
     right_image = Image.new("RGBA", (width, height), color2)
-    mask = Image.new("L", (width, height), 0)
-    mask_data = [int(255.0 * (x / width) ** 0.7) for y in range(height) for x in range(width)]
-    mask.putdata(mask_data)
+    mask = Image.fromarray(horizontal_gradient_mask(width, height, 0.7), "L")
     return Image.composite(right_image, left_image, mask)
 
 def get_poster_primary_color(image_path):
@@ -5,11 +5,11 @@ import colorsys
 import random
 import base64
 from io import BytesIO
-from collections import Counter
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
 
 from .badge_drawer import draw_badge
+from .color_utils import most_common_vibrant_pixels
 
 logger = logging.getLogger(__name__)
 
@@ -17,16 +17,6 @@ logger = logging.getLogger(__name__)
 canvas_size = (1920, 1080)
 
 # ========== 辅助函数 ==========
-def is_not_black_white_gray_near(color, threshold=20):
-    r, g, b = color
-    if (r < threshold and g < threshold and b < threshold) or \
-       (r > 255 - threshold and g > 255 - threshold and b > 255 - threshold):
-        return False
-    gray_diff_threshold = 10
-    if abs(r - g) < gray_diff_threshold and abs(g - b) < gray_diff_threshold and abs(r - b) < gray_diff_threshold:
-        return False
-    return True
-
 def rgb_to_hsv(color):
     r, g, b = [x / 255.0 for x in color]
     return colorsys.rgb_to_hsv(r, g, b)
@@ -44,11 +34,8 @@ def find_dominant_vibrant_colors(image, num_colors=5):
     img = image.copy()
     img.thumbnail((100, 100))
     img = img.convert('RGB')
-    pixels = list(img.getdata())
-    filtered_pixels = [p for p in pixels if is_not_black_white_gray_near(p)]
-    if not filtered_pixels: return []
-    color_counter = Counter(filtered_pixels)
-    dominant_colors = color_counter.most_common(num_colors * 3)
+    dominant_colors = most_common_vibrant_pixels(img, num_colors * 3)
+    if not dominant_colors: return []
     macaron_colors = []
     seen_hues = set()
     for color, count in dominant_colors:
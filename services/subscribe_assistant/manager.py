@@ -207,7 +207,7 @@ class SubscribeAssistantManager:
         return stats
 
     def run_download_check(self) -> int:
-        torrents = store.read_state(STATE_TORRENTS)
+        torrents = store.read_items(STATE_TORRENTS)
         if not torrents:
             return 0
         live = moviepilot.get_downloading_tasks(self.app_config)
@@ -218,57 +218,53 @@ class SubscribeAssistantManager:
         changed = 0
         now = time.time()
 
-        def updater(data):
+        def handler(torrent_hash, task):
             nonlocal changed
-            for torrent_hash, task in list(data.items()):
-                info = live_by_hash.get(str(torrent_hash).lower())
-                if not info:
-                    if self.cfg.manual_delete_listen:
-                        self._clear_download_pending(task.get("subscribe_id"), torrent_hash, "下载任务已不存在")
-                        data.pop(torrent_hash, None)
-                        changed += 1
-                    continue
-                progress = _progress_value(info)
-                baseline = float(task.get("baseline_progress") or 0)
-                baseline_at = float(task.get("baseline_at") or task.get("time") or now)
-                if progress >= 100 or info.get("state") in ("已完成", "completed", "COMPLETE"):
-                    self._clear_download_pending(task.get("subscribe_id"), torrent_hash, "下载已完成")
-                    data.pop(torrent_hash, None)
+            info = live_by_hash.get(str(torrent_hash).lower())
+            if not info:
+                if self.cfg.manual_delete_listen:
+                    self._clear_download_pending(task.get("subscribe_id"), torrent_hash, "下载任务已不存在")
                     changed += 1
-                    continue
-                if now - baseline_at < self.cfg.download_timeout_minutes * 60:
-                    continue
-                if progress - baseline >= self.cfg.download_progress_threshold:
-                    task["baseline_progress"] = progress
-                    task["baseline_at"] = now
-                    task["retry_count"] = 0
-                    data[torrent_hash] = task
-                    continue
-                retry_count = _safe_int(task.get("retry_count")) + 1
-                task["retry_count"] = retry_count
+                    return store.DELETE
+                return task
+            progress = _progress_value(info)
+            baseline = float(task.get("baseline_progress") or 0)
+            baseline_at = float(task.get("baseline_at") or task.get("time") or now)
+            if progress >= 100 or info.get("state") in ("已完成", "completed", "COMPLETE"):
+                self._clear_download_pending(task.get("subscribe_id"), torrent_hash, "下载已完成")
+                changed += 1
+                return store.DELETE
+            if now - baseline_at < self.cfg.download_timeout_minutes * 60:
+                return task
+            if progress - baseline >= self.cfg.download_progress_threshold:
+                task["baseline_progress"] = progress
                 task["baseline_at"] = now
-                data[torrent_hash] = task
-                if retry_count >= self.cfg.download_retry_limit:
-                    logger.warning("  ➜ [订阅助手] 下载任务 %s 连续停滞，已达到人工保护阈值。", str(torrent_hash)[:8])
-                    continue
-                if moviepilot.delete_download_tasks("", self.app_config, hashes=[torrent_hash]):
-                    fingerprint = self._delete_fingerprint(task)
-                    store.record_deleted_resource(
-                        fingerprint,
-                        tmdb_id=str(task.get("tmdb_id") or ""),
-                        season_number=task.get("season"),
-                        episodes=task.get("episodes") or [],
-                        reason="timeout",
-                        retention_hours=self.cfg.delete_record_retention_hours,
-                    )
-                    if self.cfg.auto_search_when_delete and task.get("subscribe_id"):
-                        moviepilot.search_subscription(_safe_int(task.get("subscribe_id")), self.app_config)
-                    self._clear_download_pending(task.get("subscribe_id"), torrent_hash, "下载超时删种")
-                    data.pop(torrent_hash, None)
-                    changed += 1
-            return data
-
-        store.update_state(STATE_TORRENTS, updater)
+                task["retry_count"] = 0
+                return task
+            retry_count = _safe_int(task.get("retry_count")) + 1
+            task["retry_count"] = retry_count
+            task["baseline_at"] = now
+            if retry_count >= self.cfg.download_retry_limit:
+                logger.warning("  ➜ [订阅助手] 下载任务 %s 连续停滞，已达到人工保护阈值。", str(torrent_hash)[:8])
+                return task
+            if moviepilot.delete_download_tasks("", self.app_config, hashes=[torrent_hash]):
+                fingerprint = self._delete_fingerprint(task)
+                store.record_deleted_resource(
+                    fingerprint,
+                    tmdb_id=str(task.get("tmdb_id") or ""),
+                    season_number=task.get("season"),
+                    episodes=task.get("episodes") or [],
+                    reason="timeout",
+                    retention_hours=self.cfg.delete_record_retention_hours,
+                )
+                if self.cfg.auto_search_when_delete and task.get("subscribe_id"):
+                    moviepilot.search_subscription(_safe_int(task.get("subscribe_id")), self.app_config)
+                self._clear_download_pending(task.get("subscribe_id"), torrent_hash, "下载超时删种")
+                changed += 1
+                return store.DELETE
+            return task
+
+        store.process_items(STATE_TORRENTS, handler)
         return changed
 
     def run_snapshot_verify(self, limit: int = 100) -> int:
@@ -598,27 +594,22 @@ class SubscribeAssistantManager:
             return
         now = time.time()
 
-        def updater(data):
-            data[str(torrent_hash).lower()] = {
-                "hash": str(torrent_hash).lower(),
-                "subscribe_id": subscribe_id,
-                "baseline_progress": float(metadata.get("progress") or 0),
-                "baseline_at": now,
-                "retry_count": 0,
-                "time": now,
-                **metadata,
-            }
-            return data
-
-        store.update_state(STATE_TORRENTS, updater)
+        store.put_item(STATE_TORRENTS, str(torrent_hash).lower(), {
+            "hash": str(torrent_hash).lower(),
+            "subscribe_id": subscribe_id,
+            "baseline_progress": float(metadata.get("progress") or 0),
+            "baseline_at": now,
+            "retry_count": 0,
+            "time": now,
+            **metadata,
+        })
         self._mark_active_source(subscribe_id, SOURCE_DOWNLOAD_PENDING, "下载已发起，等待整理入库")
 
     def _remember_subscription(self, subscribe_id: int, info: Dict[str, Any], reason: str = "", extra: Dict[str, Any] = None) -> None:
         if not subscribe_id:
             return
 
-        def updater(data):
-            task = data.get(str(subscribe_id), {})
+        def updater(task):
             task["subscribe_id"] = subscribe_id
             task["subscribe_info"] = info or {}
             task["tmdb_id"] = str((info or {}).get("tmdbid") or (info or {}).get("tmdb_id") or task.get("tmdb_id") or "")
@@ -628,30 +619,26 @@ class SubscribeAssistantManager:
             task["updated_at"] = time.time()
             if extra:
                 task.update(extra)
-            data[str(subscribe_id)] = task
-            return data
+            return task
 
-        store.update_state(STATE_SUBSCRIBES, updater)
+        store.update_item(STATE_SUBSCRIBES, str(subscribe_id), updater)
 
     def _remove_subscription_state(self, subscribe_id: int, info: Dict[str, Any], reason: str = "") -> None:
-        def updater(data):
-            task = data.get(str(subscribe_id), {})
+        def updater(task):
             task["subscribe_id"] = subscribe_id
             task["subscribe_info"] = info or task.get("subscribe_info") or {}
             task["deleted"] = True
             task["last_event"] = reason
             task["active_sources"] = {}
             task["updated_at"] = time.time()
-            data[str(subscribe_id)] = task
-            return data
+            return task
 
-        store.update_state(STATE_SUBSCRIBES, updater)
+        store.update_item(STATE_SUBSCRIBES, str(subscribe_id), updater)
 
     def _has_recent_manual_mp_change(self, subscribe_id: int, field: str) -> bool:
         if not subscribe_id:
             return False
-        data = store.read_state(STATE_SUBSCRIBES)
-        task = data.get(str(subscribe_id)) if isinstance(data, dict) else {}
+        task = store.read_item(STATE_SUBSCRIBES, str(subscribe_id))
         change = task.get("last_manual_change") if isinstance(task, dict) else {}
         if not isinstance(change, dict):
             return False
@@ -672,22 +659,19 @@ class SubscribeAssistantManager:
         if not subscribe_id:
             return
 
-        def updater(data):
-            task = data.get(str(subscribe_id), {})
+        def updater(task):
             task["expected_mp_update"] = {
                 "fields": fields or [],
                 "state": expected_state,
                 "total_episode": expected_total,
                 "updated_at": time.time(),
             }
-            data[str(subscribe_id)] = task
-            return data
+            return task
 
-        store.update_state(STATE_SUBSCRIBES, updater)
+        store.update_item(STATE_SUBSCRIBES, str(subscribe_id), updater)
 
     def _consume_expected_mp_update(self, subscribe_id: int, info: Dict[str, Any], fields: List[str]) -> bool:
-        data = store.read_state(STATE_SUBSCRIBES)
-        task = data.get(str(subscribe_id)) if isinstance(data, dict) else {}
+        task = store.read_item(STATE_SUBSCRIBES, str(subscribe_id))
         expected = task.get("expected_mp_update") if isinstance(task, dict) else {}
         if not isinstance(expected, dict):
             return False
@@ -705,29 +689,17 @@ class SubscribeAssistantManager:
         if expected_total and _safe_int(info.get("total_episode")) not in (0, expected_total):
             return False
 
-        def updater(current):
-            item = current.get(str(subscribe_id), {})
+        def updater(item):
             item.pop("expected_mp_update", None)
-            current[str(subscribe_id)] = item
-            return current
+            return item
 
-        store.update_state(STATE_SUBSCRIBES, updater)
+        store.update_item(STATE_SUBSCRIBES, str(subscribe_id), updater)
         return True
 
     def _clear_torrents_for_subscription(self, subscribe_id: int, reason: str) -> int:
         if not subscribe_id:
             return 0
-        removed = 0
-
-        def updater(data):
-            nonlocal removed
-            for torrent_hash, task in list(data.items()):
-                if _safe_int((task or {}).get("subscribe_id")) == subscribe_id:
-                    data.pop(torrent_hash, None)
-                    removed += 1
-            return data
-
-        store.update_state(STATE_TORRENTS, updater)
+        removed = store.delete_items_by_field(STATE_TORRENTS, "subscribe_id", _safe_int(subscribe_id))
         if removed:
             logger.info("  ➜ [订阅助手] 已清理订阅 %s 的下载监控：%s，数量=%s。", subscribe_id, reason, removed)
         return removed
@@ -1090,43 +1062,37 @@ class SubscribeAssistantManager:
             return
         active_sources = decision.get("sources") or {}
 
-        def updater(data):
-            task = data.get(str(subscribe_id), {})
+        def updater(task):
             task["active_sources"] = active_sources
             task["last_reason"] = decision.get("reason")
             task["updated_at"] = time.time()
-            data[str(subscribe_id)] = task
-            return data
+            return task
 
-        store.update_state(STATE_SUBSCRIBES, updater)
+        store.update_item(STATE_SUBSCRIBES, str(subscribe_id), updater)
 
     def _mark_active_source(self, subscribe_id: int, source: str, reason: str) -> None:
-        def updater(data):
-            task = data.get(str(subscribe_id), {})
+        def updater(task):
             sources = task.get("active_sources") or {}
             sources[source] = reason
             task["active_sources"] = sources
             task["updated_at"] = time.time()
-            data[str(subscribe_id)] = task
-            return data
+            return task
 
-        store.update_state(STATE_SUBSCRIBES, updater)
+        store.update_item(STATE_SUBSCRIBES, str(subscribe_id), updater)
 
     def _clear_download_pending(self, subscribe_id: int, torrent_hash: str, reason: str) -> None:
         if not subscribe_id:
             return
 
-        def updater(data):
-            task = data.get(str(subscribe_id), {})
+        def updater(task):
             sources = task.get("active_sources") or {}
             sources.pop(SOURCE_DOWNLOAD_PENDING, None)
             task["active_sources"] = sources
             task["last_reason"] = reason
             task["updated_at"] = time.time()
-            data[str(subscribe_id)] = task
-            return data
+            return task
 
-        store.update_state(STATE_SUBSCRIBES, updater)
+        store.update_item(STATE_SUBSCRIBES, str(subscribe_id), updater)
 
     def _parse_subscribe_source(self, source: Any) -> Dict[str, Any]:
         text = str(source or "")
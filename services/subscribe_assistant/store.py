@@ -1,4 +1,5 @@
 import json
+import threading
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
@@ -42,6 +43,218 @@ def update_state(key: str, updater) -> Dict[str, Any]:
     return updated
 
 
+# ----------------------------------------------------------------------
+# 行级状态：每个订阅 / 每个种子一行，写入只涉及变化的行，
+# 并发的 MP 事件只在同一行上互斥，不再争抢整块 JSON。
+# ----------------------------------------------------------------------
+
+DELETE = object()
+_legacy_migrated = set()
+_legacy_lock = threading.Lock()
+
+
+def _ensure_migrated(key: str) -> None:
+    """把旧版整块 JSON 状态拆成行 (每个进程每个 key 只检查一次)。"""
+    if key in _legacy_migrated:
+        return
+    with _legacy_lock:
+        if key in _legacy_migrated:
+            return
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO subscribe_assistant_state_items (state_key, item_key, item_json, updated_at)
+                    SELECT s.state_key, e.key, e.value, s.updated_at
+                    FROM subscribe_assistant_state s, jsonb_each(s.state_json) e
+                    WHERE s.state_key = %s AND jsonb_typeof(s.state_json) = 'object'
+                    ON CONFLICT (state_key, item_key) DO NOTHING
+                    """,
+                    (key,),
+                )
+                cursor.execute("DELETE FROM subscribe_assistant_state WHERE state_key = %s", (key,))
+            conn.commit()
+        _legacy_migrated.add(key)
+
+
+def read_items(key: str) -> Dict[str, Dict[str, Any]]:
+    _ensure_migrated(key)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT item_key, item_json FROM subscribe_assistant_state_items WHERE state_key = %s",
+                (key,),
+            )
+            rows = cursor.fetchall()
+    return {row["item_key"]: row["item_json"] if isinstance(row["item_json"], dict) else {} for row in rows}
+
+
+def read_item(key: str, item_key: str) -> Dict[str, Any]:
+    _ensure_migrated(key)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT item_json FROM subscribe_assistant_state_items WHERE state_key = %s AND item_key = %s",
+                (key, str(item_key)),
+            )
+            row = cursor.fetchone()
+    value = row["item_json"] if row else None
+    return value if isinstance(value, dict) else {}
+
+
+def put_item(key: str, item_key: str, value: Dict[str, Any]) -> None:
+    _ensure_migrated(key)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO subscribe_assistant_state_items (state_key, item_key, item_json, updated_at)
+                VALUES (%s, %s, %s::jsonb, NOW())
+                ON CONFLICT (state_key, item_key) DO UPDATE SET
+                    item_json = EXCLUDED.item_json,
+                    updated_at = NOW()
+                """,
+                (key, str(item_key), json.dumps(value or {}, ensure_ascii=False)),
+            )
+        conn.commit()
+
+
+def update_item(key: str, item_key: str, updater) -> Optional[Dict[str, Any]]:
+    """
+    行级读-改-写：在同一事务内锁住该行 (不存在则先占位)，updater 接收当前值的副本并返回新值。
+    updater 返回 None 时删除该行。
+    """
+    _ensure_migrated(key)
+    item_key = str(item_key)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO subscribe_assistant_state_items (state_key, item_key)
+                VALUES (%s, %s)
+                ON CONFLICT (state_key, item_key) DO NOTHING
+                """,
+                (key, item_key),
+            )
+            cursor.execute(
+                """
+                SELECT item_json FROM subscribe_assistant_state_items
+                WHERE state_key = %s AND item_key = %s
+                FOR UPDATE
+                """,
+                (key, item_key),
+            )
+            row = cursor.fetchone()
+            current = row["item_json"] if row and isinstance(row["item_json"], dict) else {}
+            updated = updater(dict(current))
+            if updated is None:
+                cursor.execute(
+                    "DELETE FROM subscribe_assistant_state_items WHERE state_key = %s AND item_key = %s",
+                    (key, item_key),
+                )
+            elif updated != current or not row:
+                cursor.execute(
+                    """
+                    UPDATE subscribe_assistant_state_items
+                    SET item_json = %s::jsonb, updated_at = NOW()
+                    WHERE state_key = %s AND item_key = %s
+                    """,
+                    (json.dumps(updated, ensure_ascii=False), key, item_key),
+                )
+        conn.commit()
+    return updated
+
+
+def delete_items_by_field(key: str, field: str, value: Any) -> int:
+    _ensure_migrated(key)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                DELETE FROM subscribe_assistant_state_items
+                WHERE state_key = %s AND item_json ->> %s = %s
+                """,
+                (key, field, str(value)),
+            )
+            count = cursor.rowcount
+        conn.commit()
+    return count
+
+
+_CLAIM_LEASE_SECONDS = 600
+
+
+def process_items(key: str, handler) -> int:
+    """
+    逐行处理某类状态，handler(item_key, item) 返回新值 (与原值相同则不写)、或返回 DELETE 删除该行。
+    先用一个短事务给未被占用的行打上认领租约 (claimed_until) 并提交，handler 在不持有任何行锁的情况下执行
+    (其中可能有 MP 网络请求、以及对其它行的 update_item)，最后再用一个事务写回结果。
+    处理期间行被 put_item / update_item 改写过 (updated_at 变化) 时以对方为准，本轮结果丢弃。
+    已被其它进程认领且租约未过期的行本轮直接跳过，返回实际发生写入的行数。
+    """
+    _ensure_migrated(key)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE subscribe_assistant_state_items
+                SET claimed_until = NOW() + make_interval(secs => %s)
+                WHERE state_key = %s AND (claimed_until IS NULL OR claimed_until < NOW())
+                RETURNING item_key, item_json, updated_at
+                """,
+                (_CLAIM_LEASE_SECONDS, key),
+            )
+            rows = sorted(cursor.fetchall(), key=lambda r: r["item_key"])
+        conn.commit()
+    if not rows:
+        return 0
+
+    results = []
+    try:
+        for row in rows:
+            current = row["item_json"] if isinstance(row["item_json"], dict) else {}
+            result = handler(row["item_key"], dict(current))
+            if result is DELETE or (isinstance(result, dict) and result != current):
+                results.append((row, result))
+    finally:
+        written = _write_processed_items(key, results, [row["item_key"] for row in rows])
+    return written
+
+
+def _write_processed_items(key: str, results: list, claimed_keys: List[str]) -> int:
+    written = 0
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            for row, result in results:
+                if result is DELETE:
+                    cursor.execute(
+                        """
+                        DELETE FROM subscribe_assistant_state_items
+                        WHERE state_key = %s AND item_key = %s AND updated_at IS NOT DISTINCT FROM %s
+                        """,
+                        (key, row["item_key"], row["updated_at"]),
+                    )
+                else:
+                    cursor.execute(
+                        """
+                        UPDATE subscribe_assistant_state_items
+                        SET item_json = %s::jsonb, updated_at = NOW()
+                        WHERE state_key = %s AND item_key = %s AND updated_at IS NOT DISTINCT FROM %s
+                        """,
+                        (json.dumps(result, ensure_ascii=False), key, row["item_key"], row["updated_at"]),
+                    )
+                written += cursor.rowcount
+            cursor.execute(
+                """
+                UPDATE subscribe_assistant_state_items SET claimed_until = NULL
+                WHERE state_key = %s AND item_key = ANY(%s)
+                """,
+                (key, claimed_keys),
+            )
+        conn.commit()
+    return written
+
+
 def upsert_snapshot(
     *,
     tmdb_id: str,
@@ -3,14 +3,14 @@
 
 import time
 import logging
-from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 导入需要的底层模块和共享实例
 from database.connection import get_db_connection
-from database import actor_db
+from database import actor_db, people_mirror_db
 import constants
 import handler.emby as emby
+from handler import people_mirror
 import task_manager
 import utils
 from actor_utils import enrich_all_actor_aliases_task
@@ -266,6 +266,7 @@ def task_persons_translation(processor):
                 continue
 
             batch_updated_count = 0
+            renamed_persons = []
             with ThreadPoolExecutor(max_workers=10) as executor:
                 future_to_task = {
                     executor.submit(
@@ -286,11 +287,13 @@ def task_persons_translation(processor):
                         success = future.result()
                         if success:
                             batch_updated_count += 1
+                            renamed_persons.append(task_info)
                         else:
                             logger.warning(f"    - ➜ [更新失败] Emby API 拒绝更新人物 ID: {task_info[0]} -> '{task_info[1]}'")
                     except Exception as exc:
                         logger.error(f"    - ➜ [异常] 更新人物 (ID: {task_info[0]}) 时发生错误: {exc}")
 
+            people_mirror_db.rename_persons(renamed_persons)
             total_updated_count += batch_updated_count
             if batch_updated_count > 0:
                 logger.info(f"  ➜ 批次 {batch_num}/{total_batches} 完成，成功更新 {batch_updated_count} 个人物名。")
@@ -330,60 +333,38 @@ def task_merge_duplicate_actors(processor):
             return
 
         # ======================================================================
-        # 阶段 1: 扫描媒体库，建立演员到媒体项的映射
+        # 阶段 1: 同步本地人物镜像 (增量)
         # ======================================================================
-        logger.info(f"  ➜ 将扫描 {len(library_ids_to_process)} 个选定媒体库来建立演员-媒体映射...")
-        task_manager.update_status_from_thread(5, f"阶段 1/4: 扫描媒体库，建立演员-媒体映射...")
-
-        all_media_items = emby.get_emby_library_items(
-            base_url=processor.emby_url, api_key=processor.emby_api_key, user_id=processor.emby_user_id,
-            library_ids=library_ids_to_process, media_type_filter="Movie,Series", fields="People"
-        )
-        if not all_media_items:
-            task_manager.update_status_from_thread(100, "任务完成：在选定的媒体库中未找到任何媒体项。")
+        task_manager.update_status_from_thread(5, "阶段 1/4: 同步人物镜像...")
+        if not people_mirror.sync(
+            processor.emby_url, processor.emby_api_key, processor.emby_user_id,
+            stop_event=processor.get_stop_event(),
+            update_status_callback=task_manager.update_status_from_thread,
+            status_progress=5,
+        ):
+            if processor.is_stop_requested():
+                task_manager.update_status_from_thread(100, "任务已中止。")
+            else:
+                task_manager.update_status_from_thread(-1, "任务失败：人物镜像同步失败")
             return
 
-        actor_media_map = defaultdict(set)
-        for item in all_media_items:
-            for person in item.get("People", []):
-                if person_id := person.get("Id"):
-                    actor_media_map[person_id].add(item['Id'])
-        
-        logger.info(f"  ➜ 演员-媒体映射建立完成，共统计了 {len(actor_media_map)} 位演员的媒体关联。")
-
         # ======================================================================
-        # 阶段 2: 扫描所有演员，并按 TMDb ID 分组
+        # 阶段 2: 从镜像中按 TMDb ID 找出分身，并统计其在选定媒体库中的作品
         # ======================================================================
-        task_manager.update_status_from_thread(25, "阶段 2/4: 扫描所有演员，按TMDb ID分组...")
-        
-        tmdb_id_to_persons_map = defaultdict(list)
-        person_generator = emby.get_all_persons_from_emby(
-            base_url=processor.emby_url, api_key=processor.emby_api_key, user_id=processor.emby_user_id,
-            stop_event=processor.get_stop_event(),
-            force_full_scan=True
+        task_manager.update_status_from_thread(25, "阶段 2/4: 按TMDb ID分组并统计作品...")
+        duplicate_groups = people_mirror_db.get_duplicate_tmdb_groups()
+        actor_media_map = people_mirror_db.get_person_item_map(
+            [p['Id'] for persons in duplicate_groups.values() for p in persons],
+            library_ids=library_ids_to_process,
+            item_types=("Movie", "Series"),
         )
-
-        total_scanned = 0
-        for person_batch in person_generator:
-            if processor.is_stop_requested():
-                logger.info("任务在扫描演员阶段被用户中断。")
-                task_manager.update_status_from_thread(100, "任务已中止。")
-                return
-            
-            for person in person_batch:
-                if tmdb_id := person.get("ProviderIds", {}).get("Tmdb"):
-                    tmdb_id_to_persons_map[tmdb_id].append(person)
-            
-            total_scanned += len(person_batch)
-            task_manager.update_status_from_thread(25, f"阶段 2/4: 已扫描 {total_scanned} 名演员...")
+        logger.info(f"  ➜ 人物镜像中共有 {len(duplicate_groups)} 组 TMDb ID 对应多个人物条目。")
 
         # ======================================================================
         # 阶段 3: 识别分身演员并制定合并计划
         # ======================================================================
         task_manager.update_status_from_thread(50, "阶段 3/4: 识别分身并制定合并计划...")
         
-        duplicate_groups = {k: v for k, v in tmdb_id_to_persons_map.items() if len(v) > 1}
-        
         if not duplicate_groups:
             logger.info("扫描完成，没有发现任何拥有相同TMDb ID的分身演员。")
             task_manager.update_status_from_thread(100, "任务完成，未发现分身演员。")
@@ -493,12 +474,14 @@ def task_merge_duplicate_actors(processor):
                         logger.error(f"    - ➜ 更新媒体项 '{item_details.get('Name')}' 失败！")
 
             if all_media_updates_succeeded:
+                people_mirror_db.reassign_person_links(deletee['Id'], keeper['Id'], media_ids_to_update)
                 logger.info(f"  ➜ 所有媒体项已成功转移，准备删除“小号”演员 '{deletee['Name']}' (ID: {deletee['Id']})...")
                 delete_success = emby.delete_person_custom_api(
                     base_url=processor.emby_url, api_key=processor.emby_api_key, person_id=deletee['Id']
                 )
                 if delete_success:
                     deleted_count += 1
+                    people_mirror_db.delete_persons([deletee['Id']])
             else:
                 logger.error(f"  ➜ 由于媒体项更新失败，演员 '{deletee['Name']}' (ID: {deletee['Id']}) 将被跳过，不予删除，以保证数据安全。")
             
@@ -529,37 +512,27 @@ def task_purge_ghost_actors(processor):
 
     try:
         # ======================================================================
-        # 阶段 1: 全局扫描所有媒体库，获取所有关联的人物ID (白名单)
+        # 阶段 1: 从人物镜像获取所有被引用的人物ID (白名单)
         # ======================================================================
-        task_manager.update_status_from_thread(0, "准备阶段: 正在扫描所有媒体库...")
-        
-        # 1.1 获取服务器上所有可见的媒体库ID
-        all_libraries = emby.get_emby_libraries(processor.emby_url, processor.emby_api_key, processor.emby_user_id)
-        if not all_libraries:
-            task_manager.update_status_from_thread(100, "任务中止：无法获取服务器媒体库列表。")
+        task_manager.update_status_from_thread(0, "准备阶段: 正在同步人物镜像...")
+
+        # 镜像覆盖服务器上所有媒体库的 电影/剧集/季/集，增量同步后即可作为白名单；
+        # 镜像中残留的旧关联只会让白名单偏大 (少删)，不会误删仍被引用的人物。
+        if not people_mirror.sync(
+            processor.emby_url, processor.emby_api_key, processor.emby_user_id,
+            stop_event=processor.get_stop_event(),
+            update_status_callback=task_manager.update_status_from_thread,
+        ):
+            if processor.is_stop_requested():
+                logger.info("任务在建立白名单阶段被用户中断。")
+            else:
+                task_manager.update_status_from_thread(-1, "任务失败：人物镜像同步失败，为安全起见不执行删除。")
             return
-        
-        all_library_ids = [lib['Id'] for lib in all_libraries if lib.get('CollectionType') in ['movies', 'tvshows', 'homevideos', 'musicvideos']]
-        logger.info(f"  ➜ 将扫描服务器上的 {len(all_library_ids)} 个媒体库...")
 
-        # 1.2 获取所有媒体项
-        all_media_items = emby.get_emby_library_items(
-            base_url=processor.emby_url, api_key=processor.emby_api_key, user_id=processor.emby_user_id,
-            library_ids=all_library_ids, media_type_filter="Movie,Series", fields="People"
-        )
-        if not all_media_items:
+        whitelist_person_ids = people_mirror_db.get_linked_person_ids()
+        if not whitelist_person_ids:
             task_manager.update_status_from_thread(100, "任务完成：服务器中未找到任何媒体项。")
             return
-
-        # 1.3 建立白名单
-        whitelist_person_ids = set()
-        for item in all_media_items:
-            if processor.is_stop_requested():
-                logger.info("任务在建立白名单阶段被用户中断。")
-                return
-            for person in item.get("People", []):
-                if person_id := person.get("Id"):
-                    whitelist_person_ids.add(person_id)
         
         logger.info(f"  ➜ 白名单建立完成，服务器中共有 {len(whitelist_person_ids)} 位被引用的演员/职员。")
 
@@ -217,7 +217,9 @@ def _task_run_chain_internal(processor, task_name: str, sequence_config_key: str
                     'role-translation', 
                     'enrich-aliases', 
                     'populate-metadata',
-                    'restore_mediainfo'
+                    'restore_mediainfo',
+                    'generate-all-covers',
+                    'generate-custom-collection-covers'
                 ]
                 
                 if task_key in tasks_requiring_force_flag:
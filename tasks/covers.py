@@ -2,6 +2,7 @@
 # 封面生成任务模块
 
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 导入需要的底层模块和共享实例
 import handler.emby as emby
@@ -12,10 +13,36 @@ from .custom_collections import _get_cover_badge_text_for_collection
 
 logger = logging.getLogger(__name__)
 
+# 同时渲染封面的线程数 (Pillow / NumPy 的重计算会释放 GIL)
+COVER_RENDER_WORKERS = 3
+
+def _run_cover_jobs(processor, cover_service, targets, job, name_of, target_label):
+    """
+    用小线程池并发执行封面生成，按完成顺序汇报进度 (10% ~ 100%)。
+    素材未变化的目标在 generate_for_library 内会直接跳过，不下载也不渲染。
+    """
+    total = len(targets)
+    # 并发前先把字体准备好，避免多个线程同时下载同一个字体文件
+    cover_service.prepare()
+    done_count = 0
+    with ThreadPoolExecutor(max_workers=min(COVER_RENDER_WORKERS, total), thread_name_prefix="CoverRender") as executor:
+        future_to_target = {executor.submit(job, target): target for target in targets}
+        for future in as_completed(future_to_target):
+            target = future_to_target[future]
+            try:
+                future.result()
+            except Exception as e_gen:
+                logger.error(f"为{target_label} '{name_of(target)}' 生成封面时发生错误: {e_gen}", exc_info=True)
+            done_count += 1
+            progress = 10 + int((done_count / total) * 90)
+            task_manager.update_status_from_thread(progress, f"({done_count}/{total}) 已处理: {name_of(target)}")
+    cover_service.prune_poster_cache()
+
 # ★★★ 立即生成所有媒体库封面的后台任务 ★★★
-def task_generate_all_covers(processor):
+def task_generate_all_covers(processor, force_full_update: bool = True):
     """
     后台任务：为所有（未被忽略的）媒体库生成封面。
+    手动触发时默认强制重新生成；任务链中以 force_full_update=False 调用，素材未变化的媒体库直接跳过。
     """
     task_name = "一键生成所有媒体库封面"
     logger.trace(f"--- 开始执行 '{task_name}' 任务 ---")
@@ -81,47 +108,43 @@ def task_generate_all_covers(processor):
             'audiobooks': 'AudioBook'  # <-- 增加有声读物的映射
         }
 
-        for i, library in enumerate(libraries_to_process):
-            if processor.is_stop_requested(): break
-            
-            progress = 10 + int((i / total) * 90)
-            task_manager.update_status_from_thread(progress, f"({i+1}/{total}) 正在处理: {library.get('Name')}")
+        def process_library(library):
+            if processor.is_stop_requested():
+                return
+            library_id = library.get('Id')
+            collection_type = library.get('CollectionType')
+            item_type_to_query = None # 先重置
+
+            # --- ★★★ 核心修复 3：使用更精确的 if/elif 逻辑判断查询类型 ★★★ ---
+            # 优先使用 CollectionType 进行判断，这是最准确的
+            if collection_type:
+                item_type_to_query = TYPE_MAP.get(collection_type)
             
-            try:
-                library_id = library.get('Id')
-                collection_type = library.get('CollectionType')
-                item_type_to_query = None # 先重置
-
-                # --- ★★★ 核心修复 3：使用更精确的 if/elif 逻辑判断查询类型 ★★★ ---
-                # 优先使用 CollectionType 进行判断，这是最准确的
-                if collection_type:
-                    item_type_to_query = TYPE_MAP.get(collection_type)
-                
-                # 如果 CollectionType 不存在，再使用 Type == 'CollectionFolder' 作为备用方案
-                # 这专门用于处理像“混合库测试”那样的特殊库
-                elif library.get('Type') == 'CollectionFolder':
-                    logger.info(f"媒体库 '{library.get('Name')}' 是一个特殊的 CollectionFolder，将查询电影和剧集。")
-                    item_type_to_query = 'Movie,Series'
-                # --- 修复结束 ---
-
-                item_count = 0
-                if library_id and item_type_to_query:
-                    item_count = emby.get_item_count(
-                        base_url=processor.emby_url,
-                        api_key=processor.emby_api_key,
-                        user_id=processor.emby_user_id,
-                        parent_id=library_id,
-                        item_type=item_type_to_query
-                    ) or 0
-
-                cover_service.generate_for_library(
-                    emby_server_id='main_emby', # 这里的 server_id 只是一个占位符，不影响忽略逻辑
-                    library=library,
-                    item_count=item_count
-                )
-            except Exception as e_gen:
-                logger.error(f"为媒体库 '{library.get('Name')}' 生成封面时发生错误: {e_gen}", exc_info=True)
-                continue
+            # 如果 CollectionType 不存在，再使用 Type == 'CollectionFolder' 作为备用方案
+            # 这专门用于处理像“混合库测试”那样的特殊库
+            elif library.get('Type') == 'CollectionFolder':
+                logger.info(f"媒体库 '{library.get('Name')}' 是一个特殊的 CollectionFolder，将查询电影和剧集。")
+                item_type_to_query = 'Movie,Series'
+            # --- 修复结束 ---
+
+            item_count = 0
+            if library_id and item_type_to_query:
+                item_count = emby.get_item_count(
+                    base_url=processor.emby_url,
+                    api_key=processor.emby_api_key,
+                    user_id=processor.emby_user_id,
+                    parent_id=library_id,
+                    item_type=item_type_to_query
+                ) or 0
+
+            cover_service.generate_for_library(
+                emby_server_id='main_emby', # 这里的 server_id 只是一个占位符，不影响忽略逻辑
+                library=library,
+                item_count=item_count,
+                force=force_full_update
+            )
+
+        _run_cover_jobs(processor, cover_service, libraries_to_process, process_library, lambda lib: lib.get('Name'), "媒体库")
         
         final_message = "所有媒体库封面已处理完毕！"
         if processor.is_stop_requested(): final_message = "任务已中止。"
@@ -132,9 +155,10 @@ def task_generate_all_covers(processor):
         task_manager.update_status_from_thread(-1, f"任务失败: {e}")
 
 # ★★★ 只为所有自建合集生成封面的后台任务 ★★★
-def task_generate_all_custom_collection_covers(processor):
+def task_generate_all_custom_collection_covers(processor, force_full_update: bool = True):
     """
     后台任务：为所有已启用、且已在Emby中创建的自定义合集生成封面。
+    手动触发时默认强制重新生成；任务链中以 force_full_update=False 调用，素材未变化的合集直接跳过。
     """
     task_name = "一键生成所有自建合集封面"
     logger.trace(f"--- 开始执行 '{task_name}' 任务 ---")
@@ -166,43 +190,39 @@ def task_generate_all_custom_collection_covers(processor):
         # 4. 实例化服务并循环处理
         cover_service = CoverGeneratorService(config=cover_config)
         
-        for i, collection_db_info in enumerate(collections_to_process):
-            if processor.is_stop_requested(): break
-            
+        def process_collection(collection_db_info):
+            if processor.is_stop_requested():
+                return
             collection_name = collection_db_info.get('name')
             emby_collection_id = collection_db_info.get('emby_collection_id')
-            
-            progress = 10 + int((i / total) * 90)
-            task_manager.update_status_from_thread(progress, f"({i+1}/{total}) 正在处理: {collection_name}")
-            
-            try:
-                # a. 获取完整的Emby合集详情，这是封面生成器需要的
-                emby_collection_details = emby.get_emby_item_details(
-                    emby_collection_id, processor.emby_url, processor.emby_api_key, processor.emby_user_id
-                )
-                if not emby_collection_details:
-                    logger.warning(f"无法获取合集 '{collection_name}' (Emby ID: {emby_collection_id}) 的详情，跳过。")
-                    continue
-
-                # 1. 从数据库记录中获取合集定义
-                definition = collection_db_info.get('definition_json', {})
-                content_types = definition.get('item_type', ['Movie'])
-
-                # 2. 直接将当前循环中的合集信息传递给辅助函数
-                item_count_to_pass = _get_cover_badge_text_for_collection(collection_db_info)
-
-                # 3. 调用封面生成服务
-                cover_service.generate_for_library(
-                    emby_server_id='main_emby',
-                    library=emby_collection_details,
-                    item_count=item_count_to_pass, # <-- 使用计算好的角标参数
-                    content_types=content_types,
-                    # ★★★ 修复：传入 custom_collection_data，激活策略 A/B ★★★
-                    custom_collection_data=collection_db_info
-                )
-            except Exception as e_gen:
-                logger.error(f"为自建合集 '{collection_name}' 生成封面时发生错误: {e_gen}", exc_info=True)
-                continue
+
+            # a. 获取完整的Emby合集详情，这是封面生成器需要的
+            emby_collection_details = emby.get_emby_item_details(
+                emby_collection_id, processor.emby_url, processor.emby_api_key, processor.emby_user_id
+            )
+            if not emby_collection_details:
+                logger.warning(f"无法获取合集 '{collection_name}' (Emby ID: {emby_collection_id}) 的详情，跳过。")
+                return
+
+            # 1. 从数据库记录中获取合集定义
+            definition = collection_db_info.get('definition_json', {})
+            content_types = definition.get('item_type', ['Movie'])
+
+            # 2. 直接将当前循环中的合集信息传递给辅助函数
+            item_count_to_pass = _get_cover_badge_text_for_collection(collection_db_info)
+
+            # 3. 调用封面生成服务
+            cover_service.generate_for_library(
+                emby_server_id='main_emby',
+                library=emby_collection_details,
+                item_count=item_count_to_pass, # <-- 使用计算好的角标参数
+                content_types=content_types,
+                # ★★★ 修复：传入 custom_collection_data，激活策略 A/B ★★★
+                custom_collection_data=collection_db_info,
+                force=force_full_update
+            )
+
+        _run_cover_jobs(processor, cover_service, collections_to_process, process_collection, lambda c: c.get('name'), "自建合集")
         
         final_message = "所有自建合集封面已处理完毕！"
         if processor.is_stop_requested(): final_message = "任务已中止。"
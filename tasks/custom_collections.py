@@ -5,6 +5,8 @@ import json
 import logging
 import pytz
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Dict, Any
 
@@ -22,6 +24,25 @@ import config_manager
 
 logger = logging.getLogger(__name__)
 
+# 合集级 Emby 写锁：并发刷新时同一合集的 Emby 写入/DB 落库串行执行
+_COLLECTION_WRITE_LOCKS: Dict[int, threading.Lock] = {}
+_COLLECTION_WRITE_LOCKS_GUARD = threading.Lock()
+# 猫眼榜单依赖外部脚本抓取，必须串行并保持间隔，防止被封控
+_MAOYAN_FETCH_LOCK = threading.Lock()
+
+def _get_collection_write_lock(collection_id: int) -> threading.Lock:
+    with _COLLECTION_WRITE_LOCKS_GUARD:
+        lock = _COLLECTION_WRITE_LOCKS.get(collection_id)
+        if not lock:
+            lock = threading.Lock()
+            _COLLECTION_WRITE_LOCKS[collection_id] = lock
+        return lock
+
+def _is_maoyan_definition(definition: Dict[str, Any]) -> bool:
+    raw_url = definition.get('url', '')
+    urls = raw_url if isinstance(raw_url, list) else [str(raw_url)]
+    return any(isinstance(u, str) and u.startswith('maoyan://') for u in urls)
+
 # 辅助函数应用修正
 def _apply_id_corrections(tmdb_items: list, definition: dict, collection_name: str) -> tuple[list, dict]:
     """
@@ -101,6 +122,220 @@ def _get_cover_badge_text_for_collection(collection_db_info: Dict[str, Any]) ->
     
     return item_count_to_pass
 
+# --- 单个外部源合集的刷新流程 (供批量任务并发调用) ---
+def _refresh_external_collection(processor, collection: Dict[str, Any], ctx: Dict[str, Any]) -> str:
+    """
+    刷新单个榜单/全局推荐合集：拉取源 → 匹配 → 订阅检查 → 写 Emby → 生成封面。
+    可在线程池中并发执行；Emby 写入部分由合集级写锁串行化。
+    返回 'ok' / 'emptied' / 'failed'。
+    """
+    collection_id = collection['id']
+    collection_name = collection['name']
+    collection_type = collection['type']
+    definition = collection['definition_json']
+    tmdb_to_emby_item_map = ctx['tmdb_to_emby_item_map']
+    prefetched_collection_map = ctx['prefetched_collection_map']
+    cover_service = ctx['cover_service']
+
+    try:
+        global_ordered_emby_ids = [] # 用于同步给 Emby 实体合集 (封面素材)
+        items_for_db = []            # 用于存入 generated_media_info_json
+        total_count = 0              # 用于角标
+
+        # 榜单/推荐类 (List/AI Global) - 全量模式
+        raw_tmdb_items = []
+        if collection_type == 'list':
+            importer = ListImporter(processor.tmdb_api_key)
+            if _is_maoyan_definition(definition):
+                # 猫眼榜单串行采集，并在释放前保持防封控间隔
+                with _MAOYAN_FETCH_LOCK:
+                    raw_tmdb_items, _ = importer.process(definition)
+                    time.sleep(10)
+            else:
+                raw_tmdb_items, _ = importer.process(definition)
+        else:
+            # ai_recommendation_global
+            from handler.custom_collection import RecommendationEngine
+            rec_engine = RecommendationEngine(processor.tmdb_api_key)
+            raw_tmdb_items = rec_engine.generate(definition)
+
+        # ==============================================================================
+        # ★★★ 新增逻辑：如果源数据为空，则删除合集并跳过 ★★★
+        # ==============================================================================
+        if not raw_tmdb_items:
+            logger.info(f"  ➜ 合集 '{collection_name}' 的外部源未返回任何数据 (真空壳)。")
+            logger.info(f"  ➜ 正在尝试从 Emby 中移除该合集 (如果存在)...")
+            
+            with _get_collection_write_lock(collection_id):
+                # 调用 Emby 模块删除合集
+                is_deleted = emby.delete_collection_by_name(
+                    collection_name=collection_name,
+                    base_url=processor.emby_url,
+                    api_key=processor.emby_api_key,
+                    user_id=processor.emby_user_id
+                )
+                
+                # 更新数据库状态为 0
+                update_data = {
+                    "emby_collection_id": None, # ID 置空
+                    "last_synced_at": datetime.now(pytz.utc),
+                    "in_library_count": 0,
+                    "generated_media_info_json": json.dumps([], ensure_ascii=False)
+                }
+                custom_collection_db.update_custom_collection_sync_results(collection_id, update_data)
+            
+            if is_deleted:
+                logger.info(f"  ➜ 合集 '{collection_name}' 已清理完毕。")
+            else:
+                logger.info(f"  ➜ 合集 '{collection_name}' 在 Emby 中不存在，无需清理。")
+                
+            return 'emptied'
+
+        # 应用修正
+        raw_tmdb_items, corrected_id_to_original_id_map = _apply_id_corrections(raw_tmdb_items, definition, collection_name)
+        
+        # 映射 Emby ID
+        tmdb_items = []
+        for item in raw_tmdb_items:
+            tmdb_id = str(item.get('id')) if item.get('id') else None
+            media_type = item.get('type')
+
+            # 全局 AI 推荐的剧集默认按第一季处理
+            if collection_type == 'ai_recommendation_global' and media_type == 'Series' and item.get('season') is None:
+                item['season'] = 1
+                logger.debug(f"  ➜ [全局推荐] 剧集《{item.get('title')}》未指定季，默认按第 1 季处理。")
+            
+            # ★★★ 新增：如果是 Series 且没有指定季，尝试拆解 ★★★
+            if media_type == 'Series' and 'season' not in item:
+                # 尝试获取详情以拆解季
+                try:
+                    # 只有当它是榜单类时才拆解，AI推荐类通常不需要这么细
+                    if collection_type == 'list':
+                        series_details = tmdb.get_tv_details(tmdb_id, processor.tmdb_api_key)
+                        if series_details and 'seasons' in series_details:
+                            seasons = series_details['seasons']
+                            series_name = series_details.get('name')
+                            
+                            # 标记是否已添加至少一个季
+                            added_season = False
+                            
+                            for season in seasons:
+                                s_num = season.get('season_number')
+                                if s_num is None or s_num == 0: continue
+                                
+                                s_id = str(season.get('id'))
+                                
+                                # 检查该季是否在库
+                                emby_id = None
+                                key = f"{s_id}_Season"
+                                if key in tmdb_to_emby_item_map:
+                                    emby_id = tmdb_to_emby_item_map[key]['Id']
+                                
+                                # 构造季条目
+                                season_item = {
+                                    'tmdb_id': tmdb_id,
+                                    'media_type': 'Series',
+                                    'emby_id': emby_id,
+                                    'title': series_name,
+                                    'season': s_num
+                                }
+                                tmdb_items.append(season_item)
+                                if emby_id: global_ordered_emby_ids.append(emby_id)
+                                added_season = True
+                            
+                            if added_season:
+                                continue # 如果成功拆解了季，就跳过原始 Series 条目
+                except Exception as e_split:
+                    logger.warning(f"拆解剧集 {tmdb_id} 失败，将保留原条目: {e_split}")
+            emby_id = item.get('emby_id')
+            
+            if not emby_id and tmdb_id:
+                key = f"{tmdb_id}_{media_type}"
+                if key in tmdb_to_emby_item_map:
+                    emby_id = tmdb_to_emby_item_map[key]['Id']
+            
+            processed_item = {
+                'tmdb_id': tmdb_id,
+                'media_type': media_type,
+                'emby_id': emby_id,
+                'title': item.get('title'),
+                **({'season': item['season']} if 'season' in item and item.get('season') is not None else {})
+            }
+            tmdb_items.append(processed_item)
+            
+            if emby_id:
+                global_ordered_emby_ids.append(emby_id)
+
+        # 榜单/全局AI类需要全量存储，因为反向代理层无法实时爬虫
+        items_for_db = tmdb_items
+        total_count = len(global_ordered_emby_ids)
+
+        # 执行健康检查 (榜单类和全局AI推荐都需要)
+        # 作用：对比 TMDB 列表和本地库，自动订阅缺失的媒体
+        if collection_type in ['list', 'ai_recommendation_global']:
+            # ★★★ 修复：构造 subscription_source 并适配新签名 ★★★
+            subscription_source = {
+                "type": "custom_collection",
+                "id": collection_id,
+                "name": collection_name
+            }
+            process_subscription_items_and_update_db(
+                tmdb_items=tmdb_items, 
+                tmdb_to_emby_item_map=tmdb_to_emby_item_map, 
+                subscription_source=subscription_source,
+                tmdb_api_key=processor.tmdb_api_key
+            )
+
+        # 后续处理
+        # 1. 更新 Emby 实体合集 (用于封面)
+        # Emby 写入按合集串行：同一合集不会被两个线程同时改写
+        should_allow_empty = (collection_type in ['list', 'ai_recommendation_global'])
+        
+        with _get_collection_write_lock(collection_id):
+            emby_collection_id = emby.create_or_update_collection_with_emby_ids(
+                collection_name=collection_name, 
+                emby_ids_in_library=global_ordered_emby_ids,
+                base_url=processor.emby_url, 
+                api_key=processor.emby_api_key, 
+                user_id=processor.emby_user_id,
+                prefetched_collection_map=prefetched_collection_map,
+                allow_empty=should_allow_empty  # <--- 传入修改后的标志
+            )
+
+            # 2. 更新数据库状态
+            update_data = {
+                "emby_collection_id": emby_collection_id,
+                "item_type": json.dumps(definition.get('item_type', ['Movie'])),
+                "last_synced_at": datetime.now(pytz.utc),
+                "in_library_count": total_count, # 保存真实总数
+                "generated_media_info_json": json.dumps(items_for_db, ensure_ascii=False)
+            }
+            custom_collection_db.update_custom_collection_sync_results(collection_id, update_data)
+
+        # 3. 封面生成
+        if cover_service and emby_collection_id:
+            try:
+                library_info = emby.get_emby_item_details(emby_collection_id, processor.emby_url, processor.emby_api_key, processor.emby_user_id)
+                if library_info:
+                    # 重新获取一次最新的 info 以确保 count 准确
+                    latest_collection_info = custom_collection_db.get_custom_collection_by_id(collection_id)
+                    item_count_to_pass = _get_cover_badge_text_for_collection(latest_collection_info)
+                    cover_service.generate_for_library(
+                        emby_server_id='main_emby', 
+                        library=library_info,
+                        item_count=item_count_to_pass, 
+                        content_types=definition.get('item_type', ['Movie']),
+                        custom_collection_data=latest_collection_info  
+                    )
+            except Exception as e_cover:
+                logger.error(f"为合集 '{collection_name}' 生成封面时出错: {e_cover}", exc_info=True)
+
+        return 'ok'
+
+    except Exception as e_coll:
+        logger.error(f"处理合集 '{collection_name}' (ID: {collection_id}) 时发生错误: {e_coll}", exc_info=True)
+        return 'failed'
+
 # ★★★ 一键生成所有合集的后台任务 (重构版) ★★★
 def task_process_all_custom_collections(processor):
     """
@@ -128,6 +363,11 @@ def task_process_all_custom_collections(processor):
             task_manager.update_status_from_thread(100, "没有需要刷新的榜单或全局推荐合集。")
             return
 
+        # 清理过期的榜单标题匹配记忆，过期条目会在本轮重新匹配
+        purged = custom_collection_db.purge_expired_list_title_matches()
+        if purged:
+            logger.debug(f"  ➜ 已清理 {purged} 条过期的榜单标题匹配记忆。")
+
         # 2. 加载全量映射 (用于匹配本地媒体)
         task_manager.update_status_from_thread(12, "正在从本地数据库加载全量媒体映射...")
         tmdb_to_emby_item_map = media_db.get_tmdb_to_emby_map(library_ids=None)
@@ -146,216 +386,46 @@ def task_process_all_custom_collections(processor):
         except Exception: pass
 
         total_collections = len(active_collections)
-
-        for i, collection in enumerate(active_collections):
-            if processor.is_stop_requested(): break
-
-            collection_id = collection['id']
-            collection_name = collection['name']
-            collection_type = collection['type']
-            definition = collection['definition_json']
-            
-            progress = 20 + int((i / total_collections) * 75)
-            task_manager.update_status_from_thread(progress, f"({i+1}/{total_collections}) 正在处理: {collection_name}")
-
-            try:
-                global_ordered_emby_ids = [] # 用于同步给 Emby 实体合集 (封面素材)
-                items_for_db = []            # 用于存入 generated_media_info_json
-                total_count = 0              # 用于角标
-
-                # 榜单/推荐类 (List/AI Global) - 全量模式
-                raw_tmdb_items = []
-                if collection_type == 'list':
-                    importer = ListImporter(processor.tmdb_api_key)
-                    raw_tmdb_items, _ = importer.process(definition)
-                else:
-                    # ai_recommendation_global
-                    from handler.custom_collection import RecommendationEngine
-                    rec_engine = RecommendationEngine(processor.tmdb_api_key)
-                    raw_tmdb_items = rec_engine.generate(definition)
-
-                # ==============================================================================
-                # ★★★ 新增逻辑：如果源数据为空，则删除合集并跳过 ★★★
-                # ==============================================================================
-                if not raw_tmdb_items:
-                    logger.info(f"  ➜ 合集 '{collection_name}' 的外部源未返回任何数据 (真空壳)。")
-                    logger.info(f"  ➜ 正在尝试从 Emby 中移除该合集 (如果存在)...")
-                    
-                    # 调用 Emby 模块删除合集
-                    is_deleted = emby.delete_collection_by_name(
-                        collection_name=collection_name,
-                        base_url=processor.emby_url,
-                        api_key=processor.emby_api_key,
-                        user_id=processor.emby_user_id
-                    )
-                    
-                    # 更新数据库状态为 0
-                    update_data = {
-                        "emby_collection_id": None, # ID 置空
-                        "last_synced_at": datetime.now(pytz.utc),
-                        "in_library_count": 0,
-                        "generated_media_info_json": json.dumps([], ensure_ascii=False)
-                    }
-                    custom_collection_db.update_custom_collection_sync_results(collection_id, update_data)
-                    
-                    if is_deleted:
-                        logger.info(f"  ➜ 合集 '{collection_name}' 已清理完毕。")
-                    else:
-                        logger.info(f"  ➜ 合集 '{collection_name}' 在 Emby 中不存在，无需清理。")
-                        
-                    continue # 跳过本次循环，处理下一个合集
-
-                # 应用修正
-                raw_tmdb_items, corrected_id_to_original_id_map = _apply_id_corrections(raw_tmdb_items, definition, collection_name)
-                
-                # 映射 Emby ID
-                tmdb_items = []
-                for item in raw_tmdb_items:
-                    tmdb_id = str(item.get('id')) if item.get('id') else None
-                    media_type = item.get('type')
-
-                    # 全局 AI 推荐的剧集默认按第一季处理
-                    if collection_type == 'ai_recommendation_global' and media_type == 'Series' and item.get('season') is None:
-                        item['season'] = 1
-                        logger.debug(f"  ➜ [全局推荐] 剧集《{item.get('title')}》未指定季，默认按第 1 季处理。")
-                    
-                    # ★★★ 新增：如果是 Series 且没有指定季，尝试拆解 ★★★
-                    if media_type == 'Series' and 'season' not in item:
-                        # 尝试获取详情以拆解季
-                        try:
-                            # 只有当它是榜单类时才拆解，AI推荐类通常不需要这么细
-                            if collection_type == 'list':
-                                series_details = tmdb.get_tv_details(tmdb_id, processor.tmdb_api_key)
-                                if series_details and 'seasons' in series_details:
-                                    seasons = series_details['seasons']
-                                    series_name = series_details.get('name')
-                                    
-                                    # 标记是否已添加至少一个季
-                                    added_season = False
-                                    
-                                    for season in seasons:
-                                        s_num = season.get('season_number')
-                                        if s_num is None or s_num == 0: continue
-                                        
-                                        s_id = str(season.get('id'))
-                                        
-                                        # 检查该季是否在库
-                                        emby_id = None
-                                        key = f"{s_id}_Season"
-                                        if key in tmdb_to_emby_item_map:
-                                            emby_id = tmdb_to_emby_item_map[key]['Id']
-                                        
-                                        # 构造季条目
-                                        season_item = {
-                                            'tmdb_id': tmdb_id,
-                                            'media_type': 'Series',
-                                            'emby_id': emby_id,
-                                            'title': series_name,
-                                            'season': s_num
-                                        }
-                                        tmdb_items.append(season_item)
-                                        if emby_id: global_ordered_emby_ids.append(emby_id)
-                                        added_season = True
-                                    
-                                    if added_season:
-                                        continue # 如果成功拆解了季，就跳过原始 Series 条目
-                        except Exception as e_split:
-                            logger.warning(f"拆解剧集 {tmdb_id} 失败，将保留原条目: {e_split}")
-                    emby_id = item.get('emby_id')
-                    
-                    if not emby_id and tmdb_id:
-                        key = f"{tmdb_id}_{media_type}"
-                        if key in tmdb_to_emby_item_map:
-                            emby_id = tmdb_to_emby_item_map[key]['Id']
-                    
-                    processed_item = {
-                        'tmdb_id': tmdb_id,
-                        'media_type': media_type,
-                        'emby_id': emby_id,
-                        'title': item.get('title'),
-                        **({'season': item['season']} if 'season' in item and item.get('season') is not None else {})
-                    }
-                    tmdb_items.append(processed_item)
-                    
-                    if emby_id:
-                        global_ordered_emby_ids.append(emby_id)
-
-                # 榜单/全局AI类需要全量存储，因为反向代理层无法实时爬虫
-                items_for_db = tmdb_items
-                total_count = len(global_ordered_emby_ids)
-
-                # 执行健康检查 (榜单类和全局AI推荐都需要)
-                # 作用：对比 TMDB 列表和本地库，自动订阅缺失的媒体
-                if collection_type in ['list', 'ai_recommendation_global']:
-                    # ★★★ 修复：构造 subscription_source 并适配新签名 ★★★
-                    subscription_source = {
-                        "type": "custom_collection",
-                        "id": collection_id,
-                        "name": collection_name
-                    }
-                    process_subscription_items_and_update_db(
-                        tmdb_items=tmdb_items, 
-                        tmdb_to_emby_item_map=tmdb_to_emby_item_map, 
-                        subscription_source=subscription_source,
-                        tmdb_api_key=processor.tmdb_api_key
-                    )
-
-                # 后续处理
-                # 1. 更新 Emby 实体合集 (用于封面)
-                should_allow_empty = (collection_type in ['list', 'ai_recommendation_global'])
-                
-                emby_collection_id = emby.create_or_update_collection_with_emby_ids(
-                    collection_name=collection_name, 
-                    emby_ids_in_library=global_ordered_emby_ids,
-                    base_url=processor.emby_url, 
-                    api_key=processor.emby_api_key, 
-                    user_id=processor.emby_user_id,
-                    prefetched_collection_map=prefetched_collection_map,
-                    allow_empty=should_allow_empty  # <--- 传入修改后的标志
-                )
-
-                # 2. 更新数据库状态
-                update_data = {
-                    "emby_collection_id": emby_collection_id,
-                    "item_type": json.dumps(definition.get('item_type', ['Movie'])),
-                    "last_synced_at": datetime.now(pytz.utc),
-                    "in_library_count": total_count, # 保存真实总数
-                    "generated_media_info_json": json.dumps(items_for_db, ensure_ascii=False)
-                }
-                custom_collection_db.update_custom_collection_sync_results(collection_id, update_data)
-
-                # 3. 封面生成
-                if cover_service and emby_collection_id:
-                    try:
-                        library_info = emby.get_emby_item_details(emby_collection_id, processor.emby_url, processor.emby_api_key, processor.emby_user_id)
-                        if library_info:
-                            # 重新获取一次最新的 info 以确保 count 准确
-                            latest_collection_info = custom_collection_db.get_custom_collection_by_id(collection_id)
-                            item_count_to_pass = _get_cover_badge_text_for_collection(latest_collection_info)
-                            cover_service.generate_for_library(
-                                emby_server_id='main_emby', 
-                                library=library_info,
-                                item_count=item_count_to_pass, 
-                                content_types=definition.get('item_type', ['Movie']),
-                                custom_collection_data=latest_collection_info  
-                            )
-                    except Exception as e_cover:
-                        logger.error(f"为合集 '{collection_name}' 生成封面时出错: {e_cover}", exc_info=True)
-
-                # 防封控休眠 (仅针对猫眼榜单)
-                is_maoyan = False
-                raw_url = definition.get('url', '')
-                urls = raw_url if isinstance(raw_url, list) else [str(raw_url)]
-                for u in urls:
-                    if isinstance(u, str) and u.startswith('maoyan://'):
-                        is_maoyan = True
-                        break
-                if collection_type == 'list' and is_maoyan:
-                    time.sleep(10)
-                
-            except Exception as e_coll:
-                logger.error(f"处理合集 '{collection_name}' (ID: {collection_id}) 时发生错误: {e_coll}", exc_info=True)
-                continue
+        max_workers = max(1, int(config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_CUSTOM_COLLECTION_REFRESH_WORKERS, constants.DEFAULT_CUSTOM_COLLECTION_REFRESH_WORKERS) or 1))
+        max_workers = min(max_workers, total_collections)
+        if cover_service and max_workers > 1:
+            # 并发生成封面前先把字体准备好，避免多个线程同时下载同一个字体文件
+            cover_service.prepare()
+
+        ctx = {
+            'tmdb_to_emby_item_map': tmdb_to_emby_item_map,
+            'prefetched_collection_map': prefetched_collection_map,
+            'cover_service': cover_service,
+        }
+        logger.info(f"  ➜ 共 {total_collections} 个合集待刷新，并发数: {max_workers}。")
+        task_manager.update_status_from_thread(20, f"正在并发刷新 {total_collections} 个合集 (并发数: {max_workers})...")
+
+        def run_one(collection):
+            if processor.is_stop_requested():
+                return 'skipped'
+            return _refresh_external_collection(processor, collection, ctx)
+
+        done_count = 0
+        failed_names = []
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="CollectionRefresh") as executor:
+            future_to_collection = {executor.submit(run_one, c): c for c in active_collections}
+            for future in as_completed(future_to_collection):
+                collection = future_to_collection[future]
+                try:
+                    result = future.result()
+                except Exception as e_coll:
+                    logger.error(f"处理合集 '{collection['name']}' (ID: {collection['id']}) 时发生错误: {e_coll}", exc_info=True)
+                    result = 'failed'
+                if result == 'failed':
+                    failed_names.append(collection['name'])
+
+                done_count += 1
+                progress = 20 + int((done_count / total_collections) * 75)
+                result_text = {'ok': '已完成', 'emptied': '源为空已清理', 'failed': '失败', 'skipped': '已跳过'}.get(result, result)
+                task_manager.update_status_from_thread(progress, f"({done_count}/{total_collections}) {result_text}: {collection['name']}")
+
+        if failed_names:
+            logger.warning(f"  ➜ 以下 {len(failed_names)} 个合集刷新失败: {', '.join(failed_names)}")
         
         final_message = "所有外部源合集(List/Global AI)均已处理完毕！"
         if processor.is_stop_requested(): final_message = "任务已中止。"
@@ -623,24 +693,25 @@ def process_single_custom_collection(processor, custom_collection_id: int):
         # 5. 在 Emby 中创建/更新合集
         task_manager.update_status_from_thread(60, "正在Emby中创建/更新合集...")
         should_allow_empty = (collection_type in ['list', 'ai_recommendation', 'ai_recommendation_global'])
-        emby_collection_id = emby.create_or_update_collection_with_emby_ids(
-            collection_name=collection_name, 
-            emby_ids_in_library=global_ordered_emby_ids, 
-            base_url=processor.emby_url, 
-            api_key=processor.emby_api_key, 
-            user_id=processor.emby_user_id,
-            allow_empty=should_allow_empty 
-        )
-
-        # 6. 更新数据库状态
-        update_data = {
-            "emby_collection_id": emby_collection_id,
-            "item_type": json.dumps(definition.get('item_type', ['Movie'])),
-            "last_synced_at": datetime.now(pytz.utc),
-            "in_library_count": total_count,
-            "generated_media_info_json": json.dumps(items_for_db, ensure_ascii=False)
-        }
-        custom_collection_db.update_custom_collection_sync_results(custom_collection_id, update_data)
+        with _get_collection_write_lock(custom_collection_id):
+            emby_collection_id = emby.create_or_update_collection_with_emby_ids(
+                collection_name=collection_name, 
+                emby_ids_in_library=global_ordered_emby_ids, 
+                base_url=processor.emby_url, 
+                api_key=processor.emby_api_key, 
+                user_id=processor.emby_user_id,
+                allow_empty=should_allow_empty 
+            )
+
+            # 6. 更新数据库状态
+            update_data = {
+                "emby_collection_id": emby_collection_id,
+                "item_type": json.dumps(definition.get('item_type', ['Movie'])),
+                "last_synced_at": datetime.now(pytz.utc),
+                "in_library_count": total_count,
+                "generated_media_info_json": json.dumps(items_for_db, ensure_ascii=False)
+            }
+            custom_collection_db.update_custom_collection_sync_results(custom_collection_id, update_data)
 
         # 7. 封面生成
         try:
@@ -7,13 +7,16 @@ import copy
 import gc
 import os
 import re
+import hashlib
 import logging
+import threading
 import requests
 from typing import List, Optional, Dict, Any, Tuple
 import concurrent.futures
 from collections import defaultdict
 from gevent import spawn_later
 from datetime import datetime, timezone, timedelta
+from psycopg2.extras import execute_values
 # 导入需要的底层模块和共享实例
 import task_manager
 import utils
@@ -22,7 +25,8 @@ import config_manager
 import handler.tmdb as tmdb
 import handler.emby as emby
 import handler.telegram as telegram
-from database import connection, settings_db, media_db, queries_db, maintenance_db
+from handler import ffprobe_pool
+from database import connection, settings_db, media_db, queries_db, maintenance_db, latest_feed_db
 from .helpers import parse_full_asset_details, reconstruct_metadata_from_db, translate_tmdb_metadata_recursively
 from extensions import UPDATING_METADATA
 
@@ -422,9 +426,11 @@ def task_reprocess_single_item(processor, item_id: str, item_name_for_ui: str, f
                     probe_helper = SmartOrganizer.__new__(SmartOrganizer)
                     probe_helper.client = client
                     file_node = {"pick_code": pc, "pc": pc, "file_name": os.path.basename(local_path), "fn": os.path.basename(local_path)}
-                    emby_json, raw_ffprobe = probe_helper._probe_mediainfo_with_ffprobe(file_node=file_node, sha1=sha1, silent_log=True) or (None, None)
+                    # 探测结果由 ffprobe_pool 直接写入 p115_mediainfo_cache
+                    emby_json, raw_ffprobe = probe_helper._probe_mediainfo_with_ffprobe(
+                        file_node=file_node, sha1=sha1, silent_log=True, priority=ffprobe_pool.PRIORITY_BACKFILL
+                    ) or (None, None)
                     if emby_json:
-                        P115CacheManager.save_mediainfo_cache(sha1, emby_json, raw_ffprobe)
                         mediainfo = emby_json
                 except: pass
                 
@@ -729,6 +735,129 @@ def prune_tmdb_payload_for_translation(item_type: str, tmdb_data):
 
     return data
 
+# --- 元数据缓存批量写入 ---
+# 这些字段在冲突更新时永远不覆盖
+_METADATA_NEVER_UPDATE_COLS = {'tmdb_id', 'item_type', 'subscription_sources_json', 'subscription_status'}
+
+
+def _metadata_content_hash(metadata: Dict[str, Any]) -> str:
+    payload = {k: v for k, v in metadata.items() if v is not None and k != 'content_hash'}
+    return hashlib.md5(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+def _metadata_upsert_sql(columns: Tuple[str, ...], item_type: str) -> str:
+    exclude_cols = set(_METADATA_NEVER_UPDATE_COLS)
+    # 只有当类型是 电影(Movie) 或 剧集(Series) 时，才排除 title
+    # 这样 季(Season) 和 集(Episode) 的标题依然可以正常同步更新
+    if item_type in ['Movie', 'Series']:
+        exclude_cols.add('title')
+
+    update_clauses = []
+    for col in columns:
+        if col in exclude_cols:
+            continue
+        # total_episodes 被锁定时保持原值
+        if col == 'total_episodes':
+            update_clauses.append(
+                "total_episodes = CASE WHEN media_metadata.total_episodes_locked IS TRUE THEN media_metadata.total_episodes ELSE EXCLUDED.total_episodes END"
+            )
+        else:
+            update_clauses.append(f"{col} = EXCLUDED.{col}")
+
+    return f"""
+        INSERT INTO media_metadata ({', '.join(columns)}, last_synced_at)
+        VALUES %s
+        ON CONFLICT (tmdb_id, item_type)
+        DO UPDATE SET {', '.join(update_clauses)}, last_synced_at = NOW()
+    """
+
+
+def _write_metadata_batch(cursor, metadata_batch: List[Dict[str, Any]], force_full_update: bool = False) -> Tuple[int, int]:
+    """
+    把一批元数据记录写入 media_metadata，返回 (写入行数, 内容未变行数)。
+    1. 同一批内重复的 (tmdb_id, item_type) 先在内存中合并 (后者覆盖前者的非空字段)；
+    2. 内容哈希与库中一致、且仍在库中的行只刷新 last_synced_at；
+    3. 其余行按 (item_type, 列签名) 分组，每组一条 execute_values upsert；
+       某组失败时回滚该组，逐行带 SAVEPOINT 重试，只丢弃真正出错的行。
+    """
+    merged: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for metadata in metadata_batch:
+        key = (metadata.get('tmdb_id'), metadata.get('item_type'))
+        record = {k: v for k, v in metadata.items() if v is not None}
+        if key in merged:
+            merged[key].update(record)
+        else:
+            merged[key] = record
+    for record in merged.values():
+        record['content_hash'] = _metadata_content_hash(record)
+
+    # --- 1. 比对内容哈希 ---
+    unchanged_keys = []
+    if not force_full_update and merged:
+        tmdb_ids = [k[0] for k in merged]
+        item_types = [k[1] for k in merged]
+        cursor.execute("""
+            SELECT m.tmdb_id, m.item_type, m.content_hash, m.in_library, m.emby_item_ids_json
+            FROM media_metadata m
+            JOIN unnest(%s::text[], %s::text[]) AS k(tmdb_id, item_type)
+              ON m.tmdb_id = k.tmdb_id AND m.item_type = k.item_type
+        """, (tmdb_ids, item_types))
+        for row in cursor.fetchall():
+            key = (row['tmdb_id'], row['item_type'])
+            record = merged.get(key)
+            if not record or not row['content_hash'] or row['content_hash'] != record['content_hash']:
+                continue
+            # 其它流程 (删除/离线对账) 可能改过在库状态，哈希一致但已离线的行仍需重写
+            if not row['in_library']:
+                continue
+            try:
+                new_ids = json.loads(record.get('emby_item_ids_json') or '[]')
+            except (TypeError, ValueError):
+                continue
+            if sorted(row['emby_item_ids_json'] or []) != sorted(new_ids):
+                continue
+            unchanged_keys.append(key)
+
+    if unchanged_keys:
+        cursor.execute("""
+            UPDATE media_metadata m SET last_synced_at = NOW()
+            FROM unnest(%s::text[], %s::text[]) AS k(tmdb_id, item_type)
+            WHERE m.tmdb_id = k.tmdb_id AND m.item_type = k.item_type
+        """, ([k[0] for k in unchanged_keys], [k[1] for k in unchanged_keys]))
+        for key in unchanged_keys:
+            merged.pop(key, None)
+
+    # --- 2. 按列签名分组批量写入 ---
+    groups: Dict[Tuple[str, Tuple[str, ...]], List[Dict[str, Any]]] = defaultdict(list)
+    for record in merged.values():
+        groups[(record.get('item_type'), tuple(record.keys()))].append(record)
+
+    written = 0
+    for (item_type, columns), records in groups.items():
+        sql = _metadata_upsert_sql(columns, item_type)
+        template = f"({', '.join(['%s'] * len(columns))}, NOW())"
+        rows = [tuple(r[c] for c in columns) for r in records]
+        try:
+            cursor.execute("SAVEPOINT sp_metadata_group;")
+            execute_values(cursor, sql, rows, template=template, page_size=500)
+            cursor.execute("RELEASE SAVEPOINT sp_metadata_group;")
+            written += len(rows)
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT sp_metadata_group;")
+            logger.warning(f"  ➜ 批量写入 {len(rows)} 条 {item_type} 元数据失败，改为逐条写入: {e}")
+            for record, row in zip(records, rows):
+                try:
+                    cursor.execute("SAVEPOINT sp_metadata_row;")
+                    execute_values(cursor, sql, [row], template=template)
+                    cursor.execute("RELEASE SAVEPOINT sp_metadata_row;")
+                    written += 1
+                except Exception as row_e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT sp_metadata_row;")
+                    logger.error(f"写入失败 {record.get('tmdb_id')}: {row_e}")
+
+    return written, len(unchanged_keys)
+
+
 # --- 重量级的元数据缓存填充任务 ---
 def task_populate_metadata_cache(processor, batch_size: int = 10, force_full_update: bool = False):
     """
@@ -742,6 +871,7 @@ def task_populate_metadata_cache(processor, batch_size: int = 10, force_full_upd
     logger.info(f"--- 模式: {sync_mode} (分批大小: {batch_size}) ---")
     
     total_updated_count = 0
+    total_unchanged_count = 0
     total_offline_count = 0
 
     try:
@@ -1330,12 +1460,14 @@ def task_populate_metadata_cache(processor, batch_size: int = 10, force_full_upd
                 
                 # --- 1. 构建顶层记录 ---
                 asset_details_list = []
+                # 版本按 Emby ID 排序：emby_item_ids_json 与 asset_details_json 按下标一一对应，
+                # 且顺序固定后 content_hash 不会因 Emby 返回顺序变化而抖动
+                top_level_versions = sorted(
+                    (v for v in item_group if v.get('Id') and v.get('Type') == item_type),
+                    key=lambda v: str(v.get('Id'))
+                )
                 if item_type in ["Movie", "Series"]:
-                    for v in item_group:
-                        # 仅处理当前类型的项目 (防止 Series 组里混入 Season/Episode)
-                        if v.get('Type') != item_type:
-                            continue
-                            
+                    for v in top_level_versions:
                         source_lib_id = str(v.get('_SourceLibraryId'))
                         current_lib_guid = lib_id_to_guid_map.get(source_lib_id)
 
@@ -1409,7 +1541,7 @@ def task_populate_metadata_cache(processor, batch_size: int = 10, force_full_upd
                     "watchlist_tmdb_status": tmdb_details.get('status') if tmdb_details else None,
                     "in_library": True,
                     "subscription_status": "NONE",
-                    "emby_item_ids_json": json.dumps(list(set(v.get('Id') for v in item_group if v.get('Id') and v.get('Type') == item_type)), ensure_ascii=False),
+                    "emby_item_ids_json": json.dumps(sorted(set(v.get('Id') for v in top_level_versions)), ensure_ascii=False),
                     "asset_details_json": json.dumps(asset_details_list, ensure_ascii=False),
                     "rating": item.get('CommunityRating'),
                     "date_added": item.get('DateCreated') or None,
@@ -1636,59 +1768,15 @@ def task_populate_metadata_cache(processor, batch_size: int = 10, force_full_upd
 
             # 7. 写入数据库 & 子集离线对账
             if metadata_batch:
-                total_updated_count += len(metadata_batch)
 
                 with connection.get_db_connection() as conn:
                     cursor = conn.cursor()
                     
-                    # --- A. 执行写入 ---
-                    for idx, metadata in enumerate(metadata_batch):
-                        savepoint_name = f"sp_{idx}"
-                        try:
-                            cursor.execute(f"SAVEPOINT {savepoint_name};")
-                            columns = [k for k, v in metadata.items() if v is not None]
-                            values = [v for v in metadata.values() if v is not None]
-                            cols_str = ', '.join(columns)
-                            vals_str = ', '.join(['%s'] * len(values))
-                            
-                            update_clauses = []
-                            current_type = metadata.get('item_type')
-                        
-                            for col in columns:
-                                # ★★★ 2. 定义基础排除列表 ★★★
-                                # 这些字段永远不更新
-                                exclude_cols = {'tmdb_id', 'item_type', 'subscription_sources_json', 'subscription_status'}
-                                
-                                # ★★★ 3. 动态判断是否排除标题 ★★★
-                                # 只有当类型是 电影(Movie) 或 剧集(Series) 时，才排除 title
-                                # 这样 季(Season) 和 集(Episode) 的标题依然可以正常同步更新
-                                if current_type in ['Movie', 'Series']:
-                                    exclude_cols.add('title')
+                    # --- A. 执行写入 (按列签名分组批量 upsert，内容未变的行只刷新同步时间) ---
+                    written, unchanged = _write_metadata_batch(cursor, metadata_batch, force_full_update)
+                    total_updated_count += written
+                    total_unchanged_count += unchanged
 
-                                if col in exclude_cols: 
-                                    continue
-                                
-                                # 针对 total_episodes 字段，检查锁定状态
-                                # 逻辑：如果 total_episodes_locked 为 TRUE，则保持原值；否则使用新值 (EXCLUDED.total_episodes)
-                                if col == 'total_episodes':
-                                    update_clauses.append(
-                                        "total_episodes = CASE WHEN media_metadata.total_episodes_locked IS TRUE THEN media_metadata.total_episodes ELSE EXCLUDED.total_episodes END"
-                                    )
-                                else:
-                                    # 其他字段正常更新
-                                    update_clauses.append(f"{col} = EXCLUDED.{col}")
-                            
-                            sql = f"""
-                                INSERT INTO media_metadata ({cols_str}, last_synced_at) 
-                                VALUES ({vals_str}, NOW()) 
-                                ON CONFLICT (tmdb_id, item_type) 
-                                DO UPDATE SET {', '.join(update_clauses)}, last_synced_at = NOW()
-                            """
-                            cursor.execute(sql, tuple(values))
-                        except Exception as e:
-                            cursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint_name};")
-                            logger.error(f"写入失败 {metadata.get('tmdb_id')}: {e}")
-                    
                     # --- B. 执行子集离线对账 ---
                     if series_ids_processed_in_batch:
                         active_child_ids = {
@@ -1725,6 +1813,8 @@ def task_populate_metadata_cache(processor, batch_size: int = 10, force_full_upd
                             """, (list(series_ids_processed_in_batch),))
                             total_offline_count += cursor.rowcount
 
+                    # 在库内容可能已变化，首页“最新”物化视图随本批次一起失效
+                    latest_feed_db.mark_latest_feed_stale(cursor)
                     conn.commit()
             
             del batch_item_groups
@@ -1741,7 +1831,7 @@ def task_populate_metadata_cache(processor, batch_size: int = 10, force_full_upd
         if cleaned_zombies > 0:
             logger.info(f"  ➜ [大扫除] 成功物理删除了 {cleaned_zombies} 条已废弃的内部ID记录 (如 xxx-S1E1)。")
             
-        final_msg = f"同步完成！新增/更新: {total_updated_count} 个媒体项, 标记离线: {total_offline_count} 个媒体项。"
+        final_msg = f"同步完成！新增/更新: {total_updated_count} 个媒体项, 内容未变: {total_unchanged_count} 个, 标记离线: {total_offline_count} 个媒体项。"
         logger.info(f"  ➜ {final_msg}")
         task_manager.update_status_from_thread(100, final_msg)
 
@@ -1803,78 +1893,200 @@ def task_execute_auto_tagging_rules(processor):
 
     task_manager.update_status_from_thread(100, "自动打标规则执行完毕")
 
-# --- 自动打标 ---
-def task_bulk_auto_tag(processor, library_ids: List[str], tags: List[str], rating_filters: Optional[List[str]] = None):
+# --- 批量标签写入引擎 ---
+_BULK_TAG_CHECKPOINT_KEY = 'bulk_tag_checkpoint'
+_BULK_TAG_MAX_WORKERS = 6
+_BULK_TAG_LIST_FIELDS = "Id,Name,OfficialRating,CustomRating,Tags,TagItems,LockedFields"
+
+
+class _TagWriteGate:
     """
-    后台任务：支持为多个媒体库批量打标签 (支持分级过滤，优先使用自定义分级)。
+    按 Emby 的响应自适应调整写入并发 (AIMD)：
+    写入失败或响应变慢时并发减半并短暂停顿，连续成功后再逐步放宽，避免把 Emby 压垮。
     """
-    try:
-        if not library_ids:
-            logger.info("  ➜ 未指定媒体库，将扫描所有库...")
-            all_libs = emby.get_emby_libraries(processor.emby_url, processor.emby_api_key, processor.emby_user_id)
-            if all_libs:
-                # 过滤掉合集、播放列表等非内容库
-                library_ids = [l['Id'] for l in all_libs if l.get('CollectionType') not in ['boxsets', 'playlists', 'music']]
-        
-        total_libs = len(library_ids)
-        filter_msg = f" (分级限制: {','.join(rating_filters)})" if rating_filters else ""
-        
-        for lib_idx, lib_id in enumerate(library_ids):
-            # 初始状态更新
-            task_manager.update_status_from_thread(int((lib_idx/total_libs)*100), f"正在读取第 {lib_idx+1}/{total_libs} 个媒体库...")
-            
-            # ★★★ 2. 请求 OfficialRating 和 CustomRating 字段 ★★★
-            items = emby.get_emby_library_items(
-                base_url=processor.emby_url,
-                api_key=processor.emby_api_key,
-                library_ids=[lib_id],
-                media_type_filter="Movie,Series,Episode",
-                user_id=processor.emby_user_id,
-                fields="Id,Name,OfficialRating,CustomRating" 
-            )
-            
-            if not items: 
-                logger.info(f"  ➜ 媒体库 {lib_id} 为空或无法访问。")
+    def __init__(self, max_workers: int, slow_seconds: float = 5.0):
+        self.max_limit = max(1, max_workers)
+        self.limit = max(1, self.max_limit // 2)
+        self.slow_seconds = slow_seconds
+        self.active = 0
+        self.success_streak = 0
+        self.pause_until = 0.0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.active >= self.limit:
+                self.cond.wait(0.5)
+            self.active += 1
+            wait_seconds = self.pause_until - time.time()
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+    def release(self, ok: bool, elapsed: float):
+        with self.cond:
+            self.active -= 1
+            if not ok or elapsed > self.slow_seconds:
+                if self.limit > 1:
+                    logger.debug(f"  ➜ [批量标签] Emby 响应变慢/失败，写入并发降至 {max(1, self.limit // 2)}。")
+                self.limit = max(1, self.limit // 2)
+                self.success_streak = 0
+                self.pause_until = time.time() + (5 if not ok else 1)
+            else:
+                self.success_streak += 1
+                if self.limit < self.max_limit and self.success_streak >= self.limit * 10:
+                    self.limit += 1
+                    self.success_streak = 0
+            self.cond.notify_all()
+
+
+def _extract_item_tags(item: Dict[str, Any]) -> List[str]:
+    """从列表接口返回的条目中提取现有标签 (Tags 与 TagItems 双路合并，保持原顺序)。"""
+    tags = list(item.get("Tags") or [])
+    for ti in item.get("TagItems") or []:
+        if isinstance(ti, dict) and ti.get("Name") and ti["Name"] not in tags:
+            tags.append(ti["Name"])
+    return tags
+
+
+def _run_bulk_tag_job(processor, library_ids: List[str], tags: List[str], rating_filters: Optional[List[str]], mode: str):
+    """
+    批量标签引擎 (mode: 'add' / 'remove')：
+    1. 列表接口一次性带回 Tags/LockedFields，本地算出目标标签，已是目标状态的条目不发任何请求；
+    2. 需要变更的条目以自适应并发写入；
+    3. 按媒体库记录断点，中止后以相同参数重跑会跳过已完成的库。
+    """
+    action_label = "打标" if mode == 'add' else "移除标签"
+    if not library_ids:
+        logger.info("  ➜ 未指定媒体库，将扫描所有库...")
+        all_libs = emby.get_emby_libraries(processor.emby_url, processor.emby_api_key, processor.emby_user_id)
+        if all_libs:
+            # 过滤掉合集、播放列表等非内容库
+            library_ids = [l['Id'] for l in all_libs if l.get('CollectionType') not in ['boxsets', 'playlists', 'music']]
+    if not library_ids:
+        task_manager.update_status_from_thread(100, "没有可处理的媒体库")
+        return
+
+    logger.info(f"  ➜ 启动批量{action_label} | 目标库: {len(library_ids)}个 | 标签: {tags} | 分级限制: {rating_filters if rating_filters else '无 (全量)'}")
+
+    signature = hashlib.md5(json.dumps(
+        [mode, sorted(library_ids), sorted(tags), sorted(rating_filters or [])], ensure_ascii=False
+    ).encode('utf-8')).hexdigest()
+    checkpoint = settings_db.get_setting(_BULK_TAG_CHECKPOINT_KEY) or {}
+    done_libraries = set(checkpoint.get('done_libraries') or []) if checkpoint.get('signature') == signature else set()
+    if done_libraries:
+        logger.info(f"  ➜ 检测到上次中断的同参数任务，将跳过已完成的 {len(done_libraries)} 个媒体库。")
+
+    tag_set = set(tags)
+    total_libs = len(library_ids)
+
+    for lib_idx, lib_id in enumerate(library_ids):
+        if lib_id in done_libraries:
+            continue
+        if processor.is_stop_requested():
+            logger.info("  ➜ 任务被中止，已保存断点。")
+            return
+
+        task_manager.update_status_from_thread(int((lib_idx/total_libs)*100), f"正在读取第 {lib_idx+1}/{total_libs} 个媒体库...")
+        items = emby.get_emby_library_items(
+            base_url=processor.emby_url,
+            api_key=processor.emby_api_key,
+            library_ids=[lib_id],
+            media_type_filter="Movie,Series,Episode",
+            user_id=processor.emby_user_id,
+            fields=_BULK_TAG_LIST_FIELDS
+        )
+        if items is None:
+            logger.warning(f"  ➜ 媒体库 {lib_id} 读取失败，本次跳过 (不记入断点)。")
+            continue
+
+        # 1. 本地计算差异
+        pending = []
+        skipped_count = 0
+        unchanged_count = 0
+        for item in items:
+            if rating_filters:
+                # 优先取 CustomRating，如果没有则取 OfficialRating
+                item_rating = item.get('CustomRating') or item.get('OfficialRating')
+                if not _is_rating_match(item.get('Name', '未知'), item_rating, rating_filters):
+                    skipped_count += 1
+                    continue
+
+            current_tags = _extract_item_tags(item)
+            if mode == 'add':
+                target_tags = current_tags + [t for t in tags if t not in current_tags]
+            else:
+                target_tags = [t for t in current_tags if t not in tag_set]
+            if target_tags == current_tags:
+                unchanged_count += 1
                 continue
+            pending.append((item, target_tags))
 
-            total_items = len(items)
-            logger.info(f"  ➜ 媒体库 {lib_id} 扫描到 {total_items} 个项目，开始过滤...")
-            
-            processed_count = 0
-            skipped_count = 0
+        logger.info(f"  ➜ 媒体库 {lib_id} 共 {len(items)} 个项目: 需{action_label} {len(pending)} 个, 已是目标状态 {unchanged_count} 个, 不符分级 {skipped_count} 个。")
 
-            for i, item in enumerate(items):
-                if processor.is_stop_requested(): return
-                
-                item_name = item.get('Name', '未知')
-                
-                # ★★★ 修复点：将进度更新移到过滤逻辑之前，并提高频率 ★★★
-                if i % 50 == 0:
-                    # 计算全局进度
-                    current_progress = int((lib_idx/total_libs)*100 + (i/total_items)*(100/total_libs))
-                    task_manager.update_status_from_thread(
-                        current_progress, 
-                        f"库({lib_idx+1}/{total_libs}) 正在扫描: {item_name}"
+        # 2. 自适应并发写入
+        processed_count = 0
+        failed_count = 0
+        if pending:
+            gate = _TagWriteGate(_BULK_TAG_MAX_WORKERS)
+
+            def _write(item, target_tags):
+                if processor.is_stop_requested():
+                    return None
+                gate.acquire()
+                started = time.time()
+                ok = False
+                try:
+                    ok = emby.set_item_tags(
+                        item.get("Id"), target_tags, processor.emby_url, processor.emby_api_key,
+                        processor.emby_user_id, locked_fields=item.get("LockedFields")
                     )
+                finally:
+                    gate.release(ok, time.time() - started)
+                return ok
 
-                # ★★★ 3. 分级过滤逻辑 (自定义分级优先) ★★★
-                if rating_filters:
-                    # 优先取 CustomRating，如果没有则取 OfficialRating
-                    item_rating = item.get('CustomRating') or item.get('OfficialRating')
-                    
-                    if not _is_rating_match(item_name, item_rating, rating_filters):
-                        skipped_count += 1
-                        continue # 分级不匹配，跳过
+            with concurrent.futures.ThreadPoolExecutor(max_workers=_BULK_TAG_MAX_WORKERS) as executor:
+                futures = {executor.submit(_write, item, target): item for item, target in pending}
+                for i, future in enumerate(concurrent.futures.as_completed(futures)):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"  ➜ {action_label}失败 (ID: {futures[future].get('Id')}): {e}")
+                        result = False
+                    if result:
+                        processed_count += 1
+                    elif result is False:
+                        failed_count += 1
+                    if i % 20 == 0:
+                        current_progress = int((lib_idx/total_libs)*100 + (i/len(pending))*(100/total_libs))
+                        task_manager.update_status_from_thread(
+                            current_progress,
+                            f"库({lib_idx+1}/{total_libs}) 正在{action_label}: {i+1}/{len(pending)}"
+                        )
 
-                
-                # 执行打标
-                success = emby.add_tags_to_item(item.get("Id"), tags, processor.emby_url, processor.emby_api_key, processor.emby_user_id)
-                if success:
-                    processed_count += 1
+        logger.info(f"  ➜ 媒体库 {lib_id} 处理完成: {action_label} {processed_count} 个, 失败 {failed_count} 个。")
 
-            logger.info(f"  ➜ 媒体库 {lib_id} 处理完成: 打标 {processed_count} 个, 跳过 {skipped_count} 个 (不符分级)。")
-        
-        task_manager.update_status_from_thread(100, "所有选定库批量打标完成")
+        if processor.is_stop_requested():
+            logger.info("  ➜ 任务被中止，已保存断点。")
+            return
+        if failed_count == 0:
+            done_libraries.add(lib_id)
+            settings_db.save_setting(_BULK_TAG_CHECKPOINT_KEY, {
+                'signature': signature,
+                'done_libraries': sorted(done_libraries),
+            })
+
+    settings_db.delete_setting(_BULK_TAG_CHECKPOINT_KEY)
+
+
+# --- 自动打标 ---
+def task_bulk_auto_tag(processor, library_ids: List[str], tags: List[str], rating_filters: Optional[List[str]] = None):
+    """
+    后台任务：支持为多个媒体库批量打标签 (支持分级过滤，优先使用自定义分级)。
+    """
+    try:
+        _run_bulk_tag_job(processor, library_ids, tags, rating_filters, mode='add')
+        if not processor.is_stop_requested():
+            task_manager.update_status_from_thread(100, "所有选定库批量打标完成")
     except Exception as e:
         logger.error(f"  ➜ 批量打标任务失败: {e}", exc_info=True)
         task_manager.update_status_from_thread(-1, "任务异常中止")
@@ -1885,63 +2097,9 @@ def task_bulk_remove_tags(processor, library_ids: List[str], tags: List[str], ra
     后台任务：从指定媒体库中批量移除特定标签 (支持分级过滤，优先使用自定义分级)。
     """
     try:
-        if not library_ids:
-            logger.info("  ➜ 未指定媒体库，将扫描所有库...")
-            all_libs = emby.get_emby_libraries(processor.emby_url, processor.emby_api_key, processor.emby_user_id)
-            if all_libs:
-                library_ids = [l['Id'] for l in all_libs if l.get('CollectionType') not in ['boxsets', 'playlists', 'music']]
-        logger.info(f"启动批量移除任务 | 目标库: {len(library_ids)}个 | 标签: {tags} | 分级限制: {rating_filters if rating_filters else '无 (全量)'}")
-        
-        total_libs = len(library_ids)
-        filter_msg = f" (分级限制: {','.join(rating_filters)})" if rating_filters else ""
-
-        for lib_idx, lib_id in enumerate(library_ids):
-            # 初始状态更新
-            task_manager.update_status_from_thread(int((lib_idx/total_libs)*100), f"正在读取第 {lib_idx+1}/{total_libs} 个媒体库...")
-
-            items = emby.get_emby_library_items(
-                base_url=processor.emby_url, api_key=processor.emby_api_key,
-                library_ids=[lib_id], media_type_filter="Movie,Series,Episode",
-                user_id=processor.emby_user_id,
-                fields="Id,Name,OfficialRating,CustomRating" 
-            )
-            if not items: continue
-
-            total_items = len(items)
-            processed_count = 0
-            skipped_count = 0
-
-            for i, item in enumerate(items):
-                if processor.is_stop_requested(): return
-                
-                item_name = item.get('Name', '未知')
-
-                # ★★★ 修复点：将进度更新移到过滤逻辑之前，并提高频率 ★★★
-                if i % 5 == 0:
-                    current_progress = int((lib_idx/total_libs)*100 + (i/total_items)*(100/total_libs))
-                    task_manager.update_status_from_thread(
-                        current_progress, 
-                        f"库({lib_idx+1}/{total_libs}) 正在扫描: {item_name}"
-                    )
-
-                # ★★★ 分级过滤逻辑 (自定义分级优先) ★★★
-                if rating_filters:
-                    # 优先取 CustomRating，如果没有则取 OfficialRating
-                    item_rating = item.get('CustomRating') or item.get('OfficialRating')
-                    
-                    if not _is_rating_match(item.get('Name'), item_rating, rating_filters):
-                        skipped_count += 1
-                        continue 
-
-                
-                # 执行移除 
-                success = emby.remove_tags_from_item(item.get("Id"), tags, processor.emby_url, processor.emby_api_key, processor.emby_user_id)
-                if success:
-                    processed_count += 1
-            
-            logger.info(f"  媒体库 {lib_id} 处理完成: 移除 {processed_count} 个, 跳过 {skipped_count} 个。")
-        
-        task_manager.update_status_from_thread(100, "批量标签移除完成")
+        _run_bulk_tag_job(processor, library_ids, tags, rating_filters, mode='remove')
+        if not processor.is_stop_requested():
+            task_manager.update_status_from_thread(100, "批量标签移除完成")
     except Exception as e:
         logger.error(f"批量清理任务失败: {e}")
         task_manager.update_status_from_thread(-1, "清理任务异常中止")
@@ -2174,13 +2332,113 @@ def task_repair_p115_fingerprints(processor):
 
 
 # --- 终极媒体信息备份任务 ---
+_MEDIAINFO_BACKUP_CURSOR_KEY = 'mediainfo_backup_cursor'
+_MEDIAINFO_RESTORE_CURSOR_KEY = 'mediainfo_restore_cursor'
+_MEDIAINFO_CHUNK_SIZE = 200
+_MEDIAINFO_LOOKUP_WORKERS = 4   # 115 API / 数据库查询阶段
+_MEDIAINFO_PROBE_WORKERS = 2    # 在线 ffprobe 阶段 (占用 115 下行带宽，并发不宜高)
+_MEDIAINFO_IO_WORKERS = 8       # 本地文件读写阶段
+
+
+def _run_pipeline_stage(func, jobs: list, max_workers: int, stage_label: str) -> list:
+    """在有界线程池中执行流水线的一个阶段，按输入顺序返回结果 (单项异常记为 None)。"""
+    if not jobs:
+        return []
+
+    def _safe(job):
+        try:
+            return func(job)
+        except Exception as e:
+            logger.warning(f"  ➜ [{stage_label}] 处理失败: {e}")
+            return None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+        return list(executor.map(_safe, jobs))
+
+
+def _safe_parse_json_list(data) -> list:
+    if isinstance(data, list): return data
+    if isinstance(data, str):
+        try:
+            parsed = json.loads(data)
+            return parsed if isinstance(parsed, list) else []
+        except: return []
+    return []
+
+
+def _resolve_backup_asset_fingerprint(processor, client, job: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    [备份流水线 · 115 阶段] 解析单个资产的 PC 码与 SHA1。
+    返回 (extracted_pc, sha1, sha1_source)，sha1_source 为 'etk' / 'api' / None (未新获取)。
+    """
+    from handler.p115_service import P115CacheManager
+
+    current_sha1 = job['sha1']
+    # 只从 ETK 官方 STRM/HTTP PC 地址提取 115 指纹。
+    extracted_pc, extracted_sha1 = processor._extract_115_fingerprints(job['path'])
+    # 兜底安检：确保提取出来的是合法的 PC 码 (纯字母数字且长度合理)
+    if extracted_pc and not (extracted_pc.isalnum() and 10 < len(extracted_pc) < 25):
+        extracted_pc = None
+
+    if current_sha1:
+        return extracted_pc, current_sha1, None
+    if extracted_sha1:
+        return extracted_pc, extracted_sha1, 'etk'
+
+    actual_pc = extracted_pc or job['pc']
+    if not actual_pc or not client:
+        return extracted_pc, None, None
+
+    fid = None
+    try:
+        # 优先使用 p115pickcode 库本地计算，无需查库，速度极快
+        from p115pickcode import to_id
+        fid = to_id(actual_pc)
+    except (ImportError, ValueError, TypeError):
+        try:
+            from p115client.tool.iterdir import to_id
+            fid = to_id(actual_pc)
+        except (ImportError, ValueError, TypeError):
+            # 兜底查库
+            fid = P115CacheManager.get_fid_by_pickcode(actual_pc)
+    if not fid:
+        return extracted_pc, None, None
+
+    try:
+        info_res = client.fs_get_info(fid)
+        if info_res and info_res.get('state'):
+            fetched_sha1 = info_res['data'].get('sha1')
+            if fetched_sha1:
+                return extracted_pc, fetched_sha1, 'api'
+    except Exception as e:
+        logger.warning(f"  ➜ 获取 SHA1 失败 (PC: {actual_pc}): {e}")
+    return extracted_pc, None, None
+
+
+def _read_backup_mediainfo_file(job: Dict[str, Any]) -> Tuple[str, Optional[list]]:
+    """[备份流水线 · 文件阶段] 返回 ('missing', None) / ('loaded', raw_info) / ('skip', None)。"""
+    mediainfo_path = job['mediainfo_path']
+    if not os.path.exists(mediainfo_path):
+        return 'missing', None
+    if not job['needs_backup']:
+        return 'skip', None
+    try:
+        with open(mediainfo_path, 'r', encoding='utf-8') as f:
+            raw_info = json.load(f)
+        if raw_info and isinstance(raw_info, list):
+            return 'loaded', raw_info
+    except Exception as e:
+        logger.warning(f"  ➜ 读取本地 JSON 失败 {mediainfo_path}: {e}")
+    return 'skip', None
+
+
 def task_backup_mediainfo(processor):
     """
-    【终极媒体信息备份任务】(精准过滤版 + 待复核标记)
-    1. 通过高级 SQL 精准获取真正缺失 SHA1 或 缺失指纹缓存 的媒体项。
-    2. 检查 SHA1，缺失的通过解析 链接/STRM 提取 PC 码 -> 换取 FID -> 115 API 补齐并写入 media_metadata。
-    3. 检查本地 -mediainfo.json，如果缺失则将该项目标记为“待复核”。
-    4. 如果存在，则读取并写入指纹库 p115_mediainfo_cache。
+    【终极媒体信息备份任务】(分阶段流水线 + 断点续跑)
+    1. 通过高级 SQL 精准获取真正缺失 SHA1 或 缺失指纹缓存 的媒体项，按 (类型, TMDb ID) 排序后分块处理。
+    2. 115 阶段：解析 链接/STRM 提取 PC 码，缺失 SHA1 的换取 FID 调 115 API 补齐 (有界并发)。
+    3. 文件阶段：批量反查本地路径后并发读取 -mediainfo.json，缺失的标记为“待复核”。
+    4. 数据库阶段：每块在一个事务内批量写入指纹库和 SHA1/PC 数组，提交后保存游标，重启后从游标之后继续。
     """
     logger.info("--- 开始执行媒体信息备份任务 ---")
     
@@ -2188,9 +2446,19 @@ def task_backup_mediainfo(processor):
     time.sleep(1)  # 增加短暂停顿，确保前端能渲染出初始状态
     
     items = media_db.get_missing_mediainfo_assets()
+    items.sort(key=lambda it: (str(it['item_type']), str(it['tmdb_id'])))
+
+    cursor_state = settings_db.get_setting(_MEDIAINFO_BACKUP_CURSOR_KEY) or {}
+    last_key = tuple(cursor_state.get('last_key') or ())
+    if last_key:
+        resumed = [it for it in items if (str(it['item_type']), str(it['tmdb_id'])) > last_key]
+        if len(resumed) < len(items):
+            logger.info(f"  ➜ 检测到上次中断的备份进度，跳过游标之前的 {len(items) - len(resumed)} 个项目。")
+        items = resumed
     total = len(items)
     
     if total == 0:
+        settings_db.delete_setting(_MEDIAINFO_BACKUP_CURSOR_KEY)
         logger.info("  ➜ 所有媒体信息均已备份，无需处理。")
         task_manager.update_status_from_thread(100, "所有媒体信息均已备份，无需处理")
         time.sleep(1)  # 增加短暂停顿，确保前端能渲染出完成状态
@@ -2198,195 +2466,171 @@ def task_backup_mediainfo(processor):
 
     logger.info(f"  ➜ 共扫描到 {total} 个项目需要补充 SHA1 或备份媒体信息...")
     
-    from handler.p115_service import P115Service, P115CacheManager
+    from handler.p115_service import P115Service
     client = P115Service.get_client()
+    local_root = processor.config.get(constants.CONFIG_OPTION_LOCAL_STRM_ROOT, '')
     
     sha1_fixed_count = 0
     mediainfo_backed_up_count = 0
+    stopped = False
     
     try:
-        with connection.get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            for i, item in enumerate(items):
-                if processor.is_stop_requested(): break
-                
-                if i % 50 == 0: 
-                    task_manager.update_status_from_thread(int((i/total)*100), f"正在处理 ({i+1}/{total}): {item['title']}...")
-                
-                tmdb_id = item['tmdb_id']
-                item_type = item['item_type']
-                title = item['title']
-                
-                # ==========================================
-                # ★ 智能定位 Emby ID (分集报错需定位到父剧集)
-                # ==========================================
-                emby_ids = item.get('emby_item_ids_json', [])
-                if isinstance(emby_ids, str):
-                    try: emby_ids = json.loads(emby_ids)
-                    except: emby_ids = []
-                target_emby_id = emby_ids[0] if emby_ids else None
-                
-                target_log_type = item_type
-                log_title = title
-                
-                if item_type == 'Episode':
-                    parent_ids = item.get('parent_emby_ids_json')
-                    if isinstance(parent_ids, str):
-                        try: parent_ids = json.loads(parent_ids)
-                        except: parent_ids = []
-                    elif not parent_ids:
-                        parent_ids = []
-                        
+        for chunk_start in range(0, total, _MEDIAINFO_CHUNK_SIZE):
+            if processor.is_stop_requested():
+                stopped = True
+                break
+            chunk = items[chunk_start:chunk_start + _MEDIAINFO_CHUNK_SIZE]
+            task_manager.update_status_from_thread(
+                int((chunk_start/total)*100), f"正在处理 ({chunk_start+1}-{chunk_start+len(chunk)}/{total}): {chunk[0]['title']}..."
+            )
+
+            # --- 准备：解析数组，定位待复核使用的 Emby ID (分集报错需定位到父剧集) ---
+            contexts = []
+            asset_jobs = []
+            for item in chunk:
+                emby_ids = _safe_parse_json_list(item.get('emby_item_ids_json'))
+                ctx = {
+                    'tmdb_id': item['tmdb_id'],
+                    'item_type': item['item_type'],
+                    'title': item['title'],
+                    'target_emby_id': emby_ids[0] if emby_ids else None,
+                    'target_log_type': item['item_type'],
+                    'log_title': item['title'],
+                    'pcs': _safe_parse_json_list(item.get('file_pickcode_json')),
+                    'sha1s': _safe_parse_json_list(item.get('file_sha1_json')),
+                    'needs_db_update': False,
+                }
+                if item['item_type'] == 'Episode':
+                    parent_ids = _safe_parse_json_list(item.get('parent_emby_ids_json'))
                     if parent_ids:
-                        target_emby_id = parent_ids[0]
-                        target_log_type = 'Series'
-                        log_title = item.get('parent_title') or '未知剧集'
+                        ctx['target_emby_id'] = parent_ids[0]
+                        ctx['target_log_type'] = 'Series'
+                        ctx['log_title'] = item.get('parent_title') or '未知剧集'
                     else:
                         # ★ 核心修复：如果找不到父剧集ID，强制设为 None，防止把分集ID写进待复核列表
-                        target_emby_id = None
-                
-                def _safe_parse_json_list(data):
-                    if isinstance(data, list): return data
-                    if isinstance(data, str):
-                        try:
-                            parsed = json.loads(data)
-                            return parsed if isinstance(parsed, list) else []
-                        except: return []
-                    return []
-
-                pcs = _safe_parse_json_list(item.get('file_pickcode_json'))
-                sha1s = _safe_parse_json_list(item.get('file_sha1_json'))
-                assets = _safe_parse_json_list(item.get('asset_details_json'))
-                
-                needs_db_update = False
-                
-                for idx, asset in enumerate(assets):
-                    if not isinstance(asset, dict):
+                        ctx['target_emby_id'] = None
+                contexts.append(ctx)
+
+                for idx, asset in enumerate(_safe_parse_json_list(item.get('asset_details_json'))):
+                    if not isinstance(asset, dict) or not asset.get('path'):
                         continue
-                        
-                    current_path = asset.get('path')
-                    if not current_path: continue
-                    
-                    current_sha1 = sha1s[idx] if idx < len(sha1s) else None
-                    current_pc = pcs[idx] if idx < len(pcs) else None
-                    
-                    # 只从 ETK 官方 STRM/HTTP PC 地址提取 115 指纹。
-                    extracted_pc, extracted_sha1 = processor._extract_115_fingerprints(current_path)
-                            
-                    # 兜底安检：确保提取出来的是合法的 PC 码 (纯字母数字且长度合理)
-                    if extracted_pc and not (extracted_pc.isalnum() and 10 < len(extracted_pc) < 25):
-                        extracted_pc = None
-                            
-                    actual_pc = extracted_pc or current_pc
+                    asset_jobs.append({
+                        'ctx': ctx,
+                        'idx': idx,
+                        'path': asset['path'],
+                        'sha1': ctx['sha1s'][idx] if idx < len(ctx['sha1s']) else None,
+                        'pc': ctx['pcs'][idx] if idx < len(ctx['pcs']) else None,
+                    })
+
+            # --- 阶段 1 (115)：补齐 PC 码与缺失的 SHA1 ---
+            fingerprints = _run_pipeline_stage(
+                lambda job: _resolve_backup_asset_fingerprint(processor, client, job),
+                asset_jobs, _MEDIAINFO_LOOKUP_WORKERS, "SHA1 补齐"
+            )
+            for job, result in zip(asset_jobs, fingerprints):
+                extracted_pc, sha1, sha1_source = result or (None, job['sha1'], None)
+                ctx, idx = job['ctx'], job['idx']
+                # 如果提取到了 PC 码，且数据库里没有，则更新 PC 数组
+                if extracted_pc and job['pc'] != extracted_pc:
+                    while len(ctx['pcs']) <= idx: ctx['pcs'].append(None)
+                    ctx['pcs'][idx] = extracted_pc
+                    ctx['needs_db_update'] = True
+                if sha1_source:
+                    while len(ctx['sha1s']) <= idx: ctx['sha1s'].append(None)
+                    ctx['sha1s'][idx] = sha1
+                    ctx['needs_db_update'] = True
+                    sha1_fixed_count += 1
+                    logger.info(f"  ➜ [{ctx['title']}] 成功{'通过 ETK PC 地址' if sha1_source == 'etk' else '通过 115 API'}获取 SHA1: {sha1}")
+                job['pc'] = extracted_pc or job['pc']
+                job['sha1'] = sha1
 
-                    # 如果提取到了 PC 码，且数据库里没有，则更新 PC 数组
-                    if extracted_pc and current_pc != extracted_pc:
-                        while len(pcs) <= idx: pcs.append(None)
-                        pcs[idx] = extracted_pc
-                        needs_db_update = True
-                        
-                    # 如果通过 ETK PC 地址顺手查到 SHA1，直接回填。
-                    if extracted_sha1 and not current_sha1:
-                        current_sha1 = extracted_sha1
-                        while len(sha1s) <= idx: sha1s.append(None)
-                        sha1s[idx] = current_sha1
-                        needs_db_update = True
-                        sha1_fixed_count += 1
-                        logger.info(f"  ➜ 成功通过 ETK PC 地址获取 SHA1: {current_sha1}")
-                    
-                    # 阶段 1: 补齐缺失的 SHA1 (如果万能提取器没拿到 SHA1，再调 API)
-                    if not current_sha1 and actual_pc:
-                        logger.info(f"  ➜ [{title}] 缺失 SHA1，正在通过本地计算 FID 并请求 115 API 补齐 (PC: {actual_pc})...")
-                        fid = None
-                        try:
-                            # 优先使用 p115pickcode 库本地计算，无需查库，速度极快
-                            from p115pickcode import to_id
-                            fid = to_id(actual_pc)
-                        except (ImportError, ValueError, TypeError): # ★ 增加异常捕获，防止奇葩字符串搞崩任务
-                            try:
-                                from p115client.tool.iterdir import to_id
-                                fid = to_id(actual_pc)
-                            except (ImportError, ValueError, TypeError):
-                                # 兜底查库
-                                fid = P115CacheManager.get_fid_by_pickcode(actual_pc)
-                                
-                        if fid and client:
-                            try:
-                                info_res = client.fs_get_info(fid)
-                                if info_res and info_res.get('state'):
-                                    fetched_sha1 = info_res['data'].get('sha1')
-                                    if fetched_sha1:
-                                        current_sha1 = fetched_sha1
-                                        while len(sha1s) <= idx:
-                                            sha1s.append(None)
-                                        sha1s[idx] = current_sha1
-                                        needs_db_update = True
-                                        sha1_fixed_count += 1
-                                        logger.info(f"  ➜ 成功获取 SHA1: {current_sha1}")
-                            except Exception as e:
-                                logger.warning(f"  ➜ 获取 SHA1 失败: {e}")
-                                
-                    # 阶段 2: 备份媒体信息到指纹库 & 缺失检查
-                    if current_path and not current_path.startswith('http'):
-                        local_root = processor.config.get(constants.CONFIG_OPTION_LOCAL_STRM_ROOT, '')
-                        mediainfo_path = None
-                        
-                        # 通过 PC/SHA1 回到本地 STRM 目录查找 JSON。
-                        if current_sha1 or actual_pc:
-                            query_val = current_sha1 if current_sha1 else actual_pc
-                            query_col = "sha1" if current_sha1 else "pick_code"
-                            cursor.execute(f"SELECT local_path FROM p115_filesystem_cache WHERE {query_col} = %s AND local_path IS NOT NULL LIMIT 1", (query_val,))
-                            cache_row = cursor.fetchone()
-                            if cache_row and cache_row['local_path']:
-                                # 拼接出真实的本地 JSON 路径
-                                base_local = os.path.join(local_root, str(cache_row['local_path']).lstrip('\\/'))
-                                mediainfo_path = os.path.splitext(base_local)[0] + "-mediainfo.json"
-                        
+            with connection.get_db_connection() as conn:
+                cursor = conn.cursor()
+
+                # --- 阶段 2 (文件)：批量反查本地路径，并发读取 -mediainfo.json ---
+                file_jobs = [job for job in asset_jobs if not job['path'].startswith('http')]
+                chunk_sha1s = list({job['sha1'] for job in file_jobs if job['sha1']})
+                chunk_pcs = list({job['pc'] for job in file_jobs if job['pc'] and not job['sha1']})
+                path_by_sha1, path_by_pc, cached_sha1s = {}, {}, set()
+                if chunk_sha1s or chunk_pcs:
+                    cursor.execute("""
+                        SELECT sha1, pick_code, local_path FROM p115_filesystem_cache
+                        WHERE local_path IS NOT NULL AND (sha1 = ANY(%s) OR pick_code = ANY(%s))
+                    """, (chunk_sha1s, chunk_pcs))
+                    for row in cursor.fetchall():
+                        if row['sha1']: path_by_sha1.setdefault(row['sha1'], row['local_path'])
+                        if row['pick_code']: path_by_pc.setdefault(row['pick_code'], row['local_path'])
+                if chunk_sha1s:
+                    cursor.execute("SELECT sha1 FROM p115_mediainfo_cache WHERE sha1 = ANY(%s)", (chunk_sha1s,))
+                    cached_sha1s = {row['sha1'] for row in cursor.fetchall()}
+
+                for job in file_jobs:
+                    # 通过 PC/SHA1 回到本地 STRM 目录查找 JSON。
+                    rel_path = path_by_sha1.get(job['sha1']) if job['sha1'] else path_by_pc.get(job['pc'])
+                    if rel_path:
+                        base_local = os.path.join(local_root, str(rel_path).lstrip('\\/'))
+                        job['mediainfo_path'] = os.path.splitext(base_local)[0] + "-mediainfo.json"
+                    else:
                         # 兜底：如果没查到，或者本来就是本地 STRM 路径，直接替换后缀
-                        if not mediainfo_path:
-                            mediainfo_path = os.path.splitext(current_path)[0] + "-mediainfo.json"
-                        
-                        if not os.path.exists(mediainfo_path):
-                            # ★★★ 缺失 mediainfo.json，标记待复核 (仅限电影和剧集) ★★★
-                            if target_emby_id and target_log_type in ['Movie', 'Series']:
-                                filename = os.path.basename(mediainfo_path)
-                                match = re.search(r'(S\d{1,2}E\d{1,3})', filename, re.IGNORECASE)
-                                reason = f"缺失媒体信息: {match.group(1).upper()}" if match else "缺失媒体信息"
-                                    
-                                processor.log_db_manager.save_to_failed_log(
-                                    cursor, target_emby_id, log_title, reason, target_log_type, score=0.0
-                                )
-                                logger.warning(f"  ➜ [{log_title}] 缺失本地 JSON，已标记为待复核: {reason}")
-                        else:
-                            # 文件存在，如果有 SHA1 且未缓存，则备份
-                            if current_sha1 and not media_db.is_mediainfo_cached(current_sha1):
-                                try:
-                                    with open(mediainfo_path, 'r', encoding='utf-8') as f:
-                                        raw_info = json.load(f)
-                                        
-                                    if raw_info and isinstance(raw_info, list):
-                                        cursor.execute("""
-                                            INSERT INTO p115_mediainfo_cache (sha1, mediainfo_json)
-                                            VALUES (%s, %s::jsonb)
-                                            ON CONFLICT (sha1) DO NOTHING
-                                        """, (current_sha1, json.dumps(raw_info, ensure_ascii=False)))
-                                        
-                                        if cursor.rowcount > 0:
-                                            mediainfo_backed_up_count += 1
-                                            logger.info(f"  ➜ [{log_title}] 媒体信息已成功备份至数据库。")
-                                except Exception as e:
-                                    logger.warning(f"  ➜ 读取本地 JSON 失败 {mediainfo_path}: {e}")
-                
-                if needs_db_update:
-                    media_db.update_media_sha1_and_pc_json(tmdb_id, item_type, sha1s, pcs)
-                
-                if i > 0 and i % 50 == 0:
-                    conn.commit()
-            
-            conn.commit()
-            
-        msg = f"备份任务完成！补齐 SHA1: {sha1_fixed_count} 个，成功备份媒体信息: {mediainfo_backed_up_count} 个。"
+                        job['mediainfo_path'] = os.path.splitext(job['path'])[0] + "-mediainfo.json"
+                    job['needs_backup'] = bool(job['sha1']) and job['sha1'] not in cached_sha1s
+
+                file_results = _run_pipeline_stage(
+                    _read_backup_mediainfo_file, file_jobs, _MEDIAINFO_IO_WORKERS, "读取媒体信息"
+                )
+
+                # --- 阶段 3 (数据库)：整块一个事务批量写入 ---
+                mediainfo_rows = {}
+                for job, result in zip(file_jobs, file_results):
+                    status, raw_info = result or ('skip', None)
+                    ctx = job['ctx']
+                    if status == 'loaded':
+                        mediainfo_rows.setdefault(job['sha1'], (job['sha1'], json.dumps(raw_info, ensure_ascii=False)))
+                    elif status == 'missing' and ctx['target_emby_id'] and ctx['target_log_type'] in ['Movie', 'Series']:
+                        # ★★★ 缺失 mediainfo.json，标记待复核 (仅限电影和剧集) ★★★
+                        filename = os.path.basename(job['mediainfo_path'])
+                        match = re.search(r'(S\d{1,2}E\d{1,3})', filename, re.IGNORECASE)
+                        reason = f"缺失媒体信息: {match.group(1).upper()}" if match else "缺失媒体信息"
+                        processor.log_db_manager.save_to_failed_log(
+                            cursor, ctx['target_emby_id'], ctx['log_title'], reason, ctx['target_log_type'], score=0.0
+                        )
+                        logger.warning(f"  ➜ [{ctx['log_title']}] 缺失本地 JSON，已标记为待复核: {reason}")
+
+                if mediainfo_rows:
+                    inserted = execute_values(cursor, """
+                        INSERT INTO p115_mediainfo_cache (sha1, mediainfo_json)
+                        VALUES %s
+                        ON CONFLICT (sha1) DO NOTHING
+                        RETURNING sha1
+                    """, list(mediainfo_rows.values()), template="(%s, %s::jsonb)", fetch=True)
+                    mediainfo_backed_up_count += len(inserted)
+                    if inserted:
+                        logger.info(f"  ➜ 本批 {len(inserted)} 条媒体信息已成功备份至数据库。")
+
+                fingerprint_rows = [
+                    (json.dumps(ctx['sha1s'], ensure_ascii=False), json.dumps(ctx['pcs'], ensure_ascii=False), ctx['tmdb_id'], ctx['item_type'])
+                    for ctx in contexts if ctx['needs_db_update']
+                ]
+                if fingerprint_rows:
+                    execute_values(cursor, """
+                        UPDATE media_metadata AS m
+                        SET file_sha1_json = v.sha1_json::jsonb, file_pickcode_json = v.pc_json::jsonb
+                        FROM (VALUES %s) AS v(sha1_json, pc_json, tmdb_id, item_type)
+                        WHERE m.tmdb_id = v.tmdb_id AND m.item_type = v.item_type
+                    """, fingerprint_rows)
+
+                conn.commit()
+
+            last_item = chunk[-1]
+            settings_db.save_setting(_MEDIAINFO_BACKUP_CURSOR_KEY, {
+                'last_key': [str(last_item['item_type']), str(last_item['tmdb_id'])],
+            })
+
+        if stopped:
+            msg = f"任务已中止，进度已保存。补齐 SHA1: {sha1_fixed_count} 个，成功备份媒体信息: {mediainfo_backed_up_count} 个。"
+        else:
+            settings_db.delete_setting(_MEDIAINFO_BACKUP_CURSOR_KEY)
+            msg = f"备份任务完成！补齐 SHA1: {sha1_fixed_count} 个，成功备份媒体信息: {mediainfo_backed_up_count} 个。"
         logger.info(f"  ➜ {msg}")
         task_manager.update_status_from_thread(100, msg)
         
@@ -2397,11 +2641,14 @@ def task_backup_mediainfo(processor):
 # --- 终极媒体信息还原任务 ---
 def task_restore_mediainfo(processor, force_full_update: bool = False):
     """
-    【恢复媒体信息任务】(万能指纹提取 + I/O 节流优化版)
+    【恢复媒体信息任务】(分阶段流水线 + 断点续跑)
     force_full_update=False: 仅遍历本地查找缺失 -mediainfo.json 的 .strm 文件并补齐。
     force_full_update=True: 全量模式。查库获取所有在库项，逐个清除 Emby 缓存、清空数据库缓存，并重新生成。
+    待处理路径排序后分块：读 STRM (文件) -> 指纹/指纹库查询 (数据库/115) -> 在线 ffprobe -> 写 JSON (文件)，
+    每个阶段使用独立的有界线程池；每块完成后保存游标，中止后同模式重跑会从游标之后继续。
     """
     mode_str = "全量强制刷新" if force_full_update else "增量查漏补缺"
+    mode_key = 'full' if force_full_update else 'incremental'
     logger.info(f"--- 开始执行媒体信息还原任务 ({mode_str}) ---")
     task_manager.update_status_from_thread(0, f"正在准备数据 ({mode_str})...")
     time.sleep(1)  # 增加短暂停顿，确保前端能渲染出初始状态
@@ -2427,12 +2674,7 @@ def task_restore_mediainfo(processor, force_full_update: bool = False):
             if not path: continue
             
             # 提取 Emby ID 列表 (处理多版本情况)
-            emby_ids = row.get('emby_item_ids_json')
-            if isinstance(emby_ids, str):
-                try: emby_ids = json.loads(emby_ids)
-                except: emby_ids = []
-            if not isinstance(emby_ids, list):
-                emby_ids = []
+            emby_ids = _safe_parse_json_list(row.get('emby_item_ids_json'))
 
             # ETK HTTP PC 地址转换为本地 STRM 路径。
             local_path = path
@@ -2456,9 +2698,19 @@ def task_restore_mediainfo(processor, force_full_update: bool = False):
                     # 增量模式只处理缺失的
                     if not os.path.exists(json_path):
                         items_to_restore.append({'path': strm_path, 'emby_ids': []})
+
+    items_to_restore.sort(key=lambda it: it['path'])
+    cursor_state = settings_db.get_setting(_MEDIAINFO_RESTORE_CURSOR_KEY) or {}
+    if cursor_state.get('mode') == mode_key and cursor_state.get('last_path'):
+        last_path = cursor_state['last_path']
+        resumed = [it for it in items_to_restore if it['path'] > last_path]
+        if len(resumed) < len(items_to_restore):
+            logger.info(f"  ➜ 检测到上次中断的还原进度，跳过游标之前的 {len(items_to_restore) - len(resumed)} 个文件。")
+        items_to_restore = resumed
                     
     total = len(items_to_restore)
     if total == 0:
+        settings_db.delete_setting(_MEDIAINFO_RESTORE_CURSOR_KEY)
         logger.info("  ➜ 没有需要还原媒体信息的项目。")
         task_manager.update_status_from_thread(100, "没有需要还原媒体信息的项目")
         time.sleep(1)  
@@ -2469,141 +2721,159 @@ def task_restore_mediainfo(processor, force_full_update: bool = False):
     restored_count = 0
     failed_count = 0
     cleared_emby_count = 0
+    cleared_lock = threading.Lock()
+    stopped = False
     
     # ★★★ 新增：用于收集成功生成的路径，最后统一通知 Emby 扫描 ★★★
     successfully_restored_paths = []
 
-    def _probe_and_cache_mediainfo_online(pc, sha1, filename):
-        if not client or not pc or not sha1:
-            return None
-
-        try:
-            probe_helper = SmartOrganizer.__new__(SmartOrganizer)
-            probe_helper.client = client
-
-            file_node = {"pick_code": pc, "pc": pc, "file_name": filename, "fn": filename}
-
-            emby_json, raw_ffprobe = probe_helper._probe_mediainfo_with_ffprobe(
-                file_node=file_node,
-                sha1=sha1,
-                silent_log=False
-            ) or (None, None)
-
-            if emby_json:
-                P115CacheManager.save_mediainfo_cache(sha1, emby_json, raw_ffprobe)
-                P115CacheManager.get_raw_ffprobe_cache(sha1)
-                return emby_json
-
-        except Exception as e:
-            logger.warning(f"  ➜ [媒体信息还原] 在线 ffprobe 提取失败 {filename}: {e}")
-
-        return None
-    
-    for i, item in enumerate(items_to_restore):
-        if processor.is_stop_requested(): break
-        
+    def _read_strm(item):
         strm_path = item['path']
-        emby_ids = item['emby_ids']
-        
-        # ★ 优化 1：动态调整进度推送频率
-        update_interval = 1 if total <= 50 else (10 if total <= 500 else 50)
-        if i % update_interval == 0 or i == total - 1:
-            task_manager.update_status_from_thread(int((i/total)*100), f"正在处理 ({i+1}/{total})...")
-            time.sleep(0.1) # 强制让出 CPU 时间片，让前端喘口气
-
-        filename = os.path.basename(strm_path)
-        strm_content_path = None
-        
         try:
             with open(strm_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                strm_content_path = content.replace('\\', '/')
+                return f.read().strip().replace('\\', '/')
         except Exception as e:
             logger.warning(f"  ➜ 读取 STRM 失败 {strm_path}: {e}")
-            failed_count += 1
-            continue
-
-        # 从 STRM 内容中提取真实的视频扩展名
-        real_ext = ".mkv" 
-        if strm_content_path:
-            parsed_ext = os.path.splitext(strm_content_path)[1].lower()
-            if parsed_ext in ['.mkv', '.mp4', '.ts', '.avi', '.rmvb', '.wmv', '.mov', '.m2ts', '.flv', '.mpg', '.iso']:
-                real_ext = parsed_ext
-                
-        real_filename = filename.replace('.strm', real_ext)
-        if real_filename == filename: 
-            real_filename = os.path.splitext(filename)[0] + real_ext
+            return None
 
-        # 2. 调用核心处理器的万能指纹提取器
-        pc, sha1 = processor._extract_115_fingerprints(strm_content_path)
-        
+    def _resolve_from_cache(job):
+        """指纹阶段：提取 PC/SHA1，全量模式下先清缓存，再尝试指纹库 / raw_ffprobe 重建。"""
+        nonlocal cleared_emby_count
+        pc, sha1 = processor._extract_115_fingerprints(job['content'])
         if not sha1 and pc:
             sha1 = processor._get_sha1_by_pickcode(pc)
+        job['pc'], job['sha1'] = pc, sha1
 
-        # =================================================================
-        # ★ 全量模式特有逻辑：流水线式清除 Emby 缓存和数据库缓存
-        # =================================================================
+        # ★ 全量模式特有逻辑：清除 Emby 缓存和数据库缓存
         if force_full_update:
             # 1. 清除 Emby 内部缓存 (神医接口会自动删除本地 JSON)
-            for eid in emby_ids:
+            for eid in job['emby_ids']:
                 try:
                     emby.clear_item_media_info(eid, processor.emby_url, processor.emby_api_key)
-                    cleared_emby_count += 1
+                    with cleared_lock:
+                        cleared_emby_count += 1
                 except Exception:
                     pass
-            
             # 2. 清除数据库中的 mediainfo_json (保留 raw_ffprobe_json)
             if sha1:
                 media_db.clear_mediainfo_json_by_sha1(sha1)
 
-        # 3. 获取或生成媒体信息
-        mediainfo = None
-
         # 如果不是强制全量，先尝试直接从数据库获取格式化好的 mediainfo
         if not force_full_update and sha1:
             mediainfo = media_db.get_mediainfo_by_sha1(sha1)
             if mediainfo:
                 # 命中 mediainfo_json 时也顺手读取 RAW，触发旧缓存 _etk 自动补齐。
                 P115CacheManager.get_raw_ffprobe_cache(sha1)
+                return mediainfo
 
-        # 如果没有获取到 (或者是强制全量被清空了)，则尝试重新生成或在线提取
-        if not mediainfo and sha1 and pc:
-            # 先看有没有 raw_ffprobe_json 可以用来极速重新格式化
-            raw_ffprobe = P115CacheManager.get_raw_ffprobe_cache(sha1)
-            # ★ 新增：前置探测
-            if raw_ffprobe and _has_und_text_subtitle(raw_ffprobe):
-                logger.info(f"  ➜ 发现旧缓存含有未知文本字幕，丢弃旧数据准备重新嗅探: {sha1[:8]}")
-                raw_ffprobe = None
-            if raw_ffprobe:
-                try:
-                    analyzer = SmartOrganizer.__new__(SmartOrganizer)
-                    dummy_node = {"fn": real_filename}
-                    mediainfo = analyzer._build_emby_mediainfo_from_ffprobe(raw_ffprobe, dummy_node, sha1)
-                    if mediainfo:
-                        P115CacheManager.save_mediainfo_cache(sha1, mediainfo, raw_ffprobe)
-                except Exception as e:
-                    logger.warning(f"  ➜ 重新格式化 raw_ffprobe 失败: {e}")
-
-            # 如果还是没有，只能在线提取了
-            if not mediainfo:
-                mediainfo = _probe_and_cache_mediainfo_online(pc, sha1, real_filename)
-        
-        # 4. 写入本地文件
-        if mediainfo:
-            json_path = os.path.splitext(strm_path)[0] + "-mediainfo.json"
+        if not (sha1 and pc):
+            return None
+        # 先看有没有 raw_ffprobe_json 可以用来极速重新格式化
+        raw_ffprobe = P115CacheManager.get_raw_ffprobe_cache(sha1)
+        if raw_ffprobe and _has_und_text_subtitle(raw_ffprobe):
+            logger.info(f"  ➜ 发现旧缓存含有未知文本字幕，丢弃旧数据准备重新嗅探: {sha1[:8]}")
+            raw_ffprobe = None
+        if raw_ffprobe:
             try:
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(mediainfo, f, ensure_ascii=False)
-                restored_count += 1
-                successfully_restored_paths.append(strm_path) # ★★★ 收集成功生成的路径 ★★★
+                analyzer = SmartOrganizer.__new__(SmartOrganizer)
+                dummy_node = {"fn": job['real_filename']}
+                mediainfo = analyzer._build_emby_mediainfo_from_ffprobe(raw_ffprobe, dummy_node, sha1)
+                if mediainfo:
+                    P115CacheManager.save_mediainfo_cache(sha1, mediainfo, raw_ffprobe)
+                    return mediainfo
             except Exception as e:
-                logger.error(f"  ➜ 写入 JSON 失败 {json_path}: {e}")
+                logger.warning(f"  ➜ 重新格式化 raw_ffprobe 失败: {e}")
+        return None
+
+    def _probe_and_cache_mediainfo_online(job):
+        pc, sha1, filename = job['pc'], job['sha1'], job['real_filename']
+        if not client or not pc or not sha1:
+            return None
+
+        try:
+            probe_helper = SmartOrganizer.__new__(SmartOrganizer)
+            probe_helper.client = client
+
+            file_node = {"pick_code": pc, "pc": pc, "file_name": filename, "fn": filename}
+
+            # 探测结果由 ffprobe_pool 直接写入 p115_mediainfo_cache
+            emby_json, raw_ffprobe = probe_helper._probe_mediainfo_with_ffprobe(
+                file_node=file_node,
+                sha1=sha1,
+                silent_log=False,
+                priority=ffprobe_pool.PRIORITY_BACKFILL
+            ) or (None, None)
+
+            if emby_json:
+                P115CacheManager.get_raw_ffprobe_cache(sha1)
+                return emby_json
+
+        except Exception as e:
+            logger.warning(f"  ➜ [媒体信息还原] 在线 ffprobe 提取失败 {filename}: {e}")
+
+        return None
+
+    def _write_mediainfo(job):
+        json_path = os.path.splitext(job['path'])[0] + "-mediainfo.json"
+        try:
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(job['mediainfo'], f, ensure_ascii=False)
+            return True
+        except Exception as e:
+            logger.error(f"  ➜ 写入 JSON 失败 {json_path}: {e}")
+            return False
+
+    chunk_size = _MEDIAINFO_CHUNK_SIZE // 2
+    for chunk_start in range(0, total, chunk_size):
+        if processor.is_stop_requested():
+            stopped = True
+            break
+        chunk = items_to_restore[chunk_start:chunk_start + chunk_size]
+        task_manager.update_status_from_thread(
+            int((chunk_start/total)*100), f"正在处理 ({chunk_start+1}-{chunk_start+len(chunk)}/{total})..."
+        )
+
+        # 阶段 1 (文件)：并发读取 STRM 内容
+        contents = _run_pipeline_stage(_read_strm, chunk, _MEDIAINFO_IO_WORKERS, "读取 STRM")
+        jobs = []
+        for item, content in zip(chunk, contents):
+            if content is None:
                 failed_count += 1
-        else:
-            failed_count += 1
-            
-        # ★ 优化 2：每个文件处理完微小休眠，进行 I/O 节流
-        time.sleep(0.005)
+                continue
+            filename = os.path.basename(item['path'])
+            # 从 STRM 内容中提取真实的视频扩展名
+            real_ext = ".mkv"
+            parsed_ext = os.path.splitext(content)[1].lower()
+            if parsed_ext in ['.mkv', '.mp4', '.ts', '.avi', '.rmvb', '.wmv', '.mov', '.m2ts', '.flv', '.mpg', '.iso']:
+                real_ext = parsed_ext
+            real_filename = filename.replace('.strm', real_ext)
+            if real_filename == filename:
+                real_filename = os.path.splitext(filename)[0] + real_ext
+            jobs.append({**item, 'content': content, 'real_filename': real_filename, 'pc': None, 'sha1': None})
+
+        # 阶段 2 (数据库/115)：指纹提取 + 指纹库命中 / raw_ffprobe 重建
+        for job, mediainfo in zip(jobs, _run_pipeline_stage(_resolve_from_cache, jobs, _MEDIAINFO_LOOKUP_WORKERS, "指纹查询")):
+            job['mediainfo'] = mediainfo
+
+        # 阶段 3 (115)：剩余的只能在线提取，单独限流
+        probe_jobs = [job for job in jobs if not job['mediainfo'] and job['sha1'] and job['pc']]
+        for job, mediainfo in zip(probe_jobs, _run_pipeline_stage(_probe_and_cache_mediainfo_online, probe_jobs, _MEDIAINFO_PROBE_WORKERS, "在线提取")):
+            job['mediainfo'] = mediainfo
+
+        # 阶段 4 (文件)：并发写入本地 JSON
+        write_jobs = [job for job in jobs if job['mediainfo']]
+        failed_count += len(jobs) - len(write_jobs)
+        for job, ok in zip(write_jobs, _run_pipeline_stage(_write_mediainfo, write_jobs, _MEDIAINFO_IO_WORKERS, "写入媒体信息")):
+            if ok:
+                restored_count += 1
+                successfully_restored_paths.append(job['path']) # ★★★ 收集成功生成的路径 ★★★
+            else:
+                failed_count += 1
+
+        settings_db.save_setting(_MEDIAINFO_RESTORE_CURSOR_KEY, {'mode': mode_key, 'last_path': chunk[-1]['path']})
+
+    if not stopped:
+        settings_db.delete_setting(_MEDIAINFO_RESTORE_CURSOR_KEY)
             
     # =================================================================
     # ★★★ 终极收尾：匹配受影响的媒体库并触发精准扫描 ★★★
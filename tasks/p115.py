@@ -5,13 +5,15 @@ import re
 import json
 import time
 import threading
+import hashlib
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import config_manager
 import constants
 from database import settings_db
 from database.connection import get_db_connection
+from psycopg2.extras import execute_values
 import handler.tmdb as tmdb
 
 # 从 115 服务主模块导入核心类和辅助函数
@@ -28,6 +30,7 @@ from handler.p115_service import (
     resolve_p115_sorting_target_by_local_path,
 )
 from handler.p115_media_analyzer import P115MediaAnalyzerMixin
+from handler import ffprobe_pool
 from handler.tg_media_candidate import candidate_to_recognition_hints, lookup_candidate_hint_for_name
 
 logger = logging.getLogger(__name__)
@@ -1026,101 +1029,253 @@ def task_sync_115_directory_tree(processor=None):
         update_progress(100, "未找到有效的分类目标目录 CID，任务结束。")
         return
 
-    total_cached = 0
-    total_cleaned = 0
+    # 本轮同步代号：扫到的目录都会打上这个代号，扫完后同父目录下代号不一致的即为失效缓存
+    sync_gen = int(time.time() * 1000)
     total_cids = len(target_dirs)
-    
-    for idx, (cid, dir_name) in enumerate(target_dirs.items()):
-        base_prog = int((idx / total_cids) * 100)
-        update_progress(base_prog, f"  ➜ 正在扫描第 {idx+1}/{total_cids} 个分类目录: [{dir_name}] ...")
-        
+    stop_requested = threading.Event()
+
+    def is_stopped():
+        if processor and getattr(processor, 'is_stop_requested', lambda: False)():
+            stop_requested.set()
+        return stop_requested.is_set()
+
+    def sync_one_category(cid, dir_name):
+        """扫描单个分类目录，按页批量写入子目录缓存。返回 (更新数, 清理数)。"""
         offset = 0
         limit = 1000
         page_count = 0
-        
-        # ★ 核心新增：记录本次从网盘真实扫到的所有子目录 ID
-        current_valid_sub_cids = set()
-        
+        cached_count = 0
+        scan_completed = False
+
         while True:
-            if processor and getattr(processor, 'is_stop_requested', lambda: False)():
-                update_progress(100, "任务已被用户手动终止。")
-                return
+            if is_stopped():
+                return cached_count, 0
 
             try:
                 res = client.fs_files({'cid': cid, 'limit': limit, 'offset': offset, 'record_open_time': 0, 'count_folders': 0})
                 data = res.get('data', [])
-                
-                if not data: 
+
+                if not data:
+                    scan_completed = True
                     break
-                
+
                 page_count += 1
-                dir_count_in_page = 0
-                
-                with get_db_connection() as conn:
-                    with conn.cursor() as cursor:
-                        for item in data:
-                            fc_val = item.get('fc') if item.get('fc') is not None else item.get('type')
-                            if str(fc_val) == '0':
-                                sub_cid = item.get('fid') or item.get('file_id')
-                                sub_name = item.get('fn') or item.get('n') or item.get('file_name')
-                                if sub_cid and sub_name:
-                                    # 记录有效的子目录 ID
-                                    current_valid_sub_cids.add(str(sub_cid))
-                                    
-                                    current_local_path = os.path.join(dir_name, str(sub_name))
-                                    
-                                    cursor.execute("""
-                                        INSERT INTO p115_filesystem_cache (id, parent_id, name, local_path)
-                                        VALUES (%s, %s, %s, %s)
-                                        ON CONFLICT (parent_id, name)
-                                        DO UPDATE SET 
-                                            id = EXCLUDED.id, 
-                                            local_path = EXCLUDED.local_path,
-                                            updated_at = NOW()
-                                    """, (str(sub_cid), str(cid), str(sub_name), current_local_path))
-                                    total_cached += 1
-                                    dir_count_in_page += 1
+
+                # 同一页内 115 允许同名目录，按 (parent_id, name) 去重，避免一条语句内重复冲突
+                page_rows = {}
+                for item in data:
+                    fc_val = item.get('fc') if item.get('fc') is not None else item.get('type')
+                    if str(fc_val) == '0':
+                        sub_cid = item.get('fid') or item.get('file_id')
+                        sub_name = item.get('fn') or item.get('n') or item.get('file_name')
+                        if sub_cid and sub_name:
+                            current_local_path = os.path.join(dir_name, str(sub_name))
+                            page_rows[str(sub_name)] = (str(sub_cid), str(cid), str(sub_name), current_local_path, sync_gen)
+
+                if page_rows:
+                    with get_db_connection() as conn:
+                        with conn.cursor() as cursor:
+                            execute_values(cursor, """
+                                INSERT INTO p115_filesystem_cache (id, parent_id, name, local_path, sync_gen)
+                                VALUES %s
+                                ON CONFLICT (parent_id, name)
+                                DO UPDATE SET 
+                                    id = EXCLUDED.id, 
+                                    local_path = EXCLUDED.local_path,
+                                    sync_gen = EXCLUDED.sync_gen,
+                                    updated_at = NOW()
+                            """, list(page_rows.values()), page_size=limit)
                         conn.commit()
-                
-                update_progress(base_prog, f"  ➜ [{dir_name}] | 翻阅第 {page_count} 页 | 新增/更新 {dir_count_in_page} 个目录...")
-                
+                cached_count += len(page_rows)
+
+                logger.info(f"  ➜ [{dir_name}] | 翻阅第 {page_count} 页 | 新增/更新 {len(page_rows)} 个目录...")
+
                 if len(data) < limit:
+                    scan_completed = True
                     break
-                    
+
                 offset += limit
-                
+
             except Exception as e:
                 logger.error(f"  ➜ 同步目录树异常 [{dir_name}]: {e}")
-                break 
+                break
 
         # =================================================================
-        # ★★★ 核心新增：清理本地数据库中多余的失效目录 ★★★
+        # ★★★ 清理本地数据库中多余的失效目录 (仅在完整扫描后执行，防止半途异常误删) ★★★
         # =================================================================
+        if not scan_completed:
+            logger.warning(f"  ➜ [{dir_name}] 本次扫描未完整结束，跳过失效缓存清理。")
+            return cached_count, 0
+
+        cleaned_count = 0
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
-                    # 1. 先查出本地数据库里，属于当前父目录(cid)的所有子目录 ID
-                    cursor.execute("SELECT id FROM p115_filesystem_cache WHERE parent_id = %s", (str(cid),))
-                    db_sub_cids = {row['id'] for row in cursor.fetchall()}
-                    
-                    # 2. 找出“在本地数据库里，但不在网盘真实列表里”的失效 ID
-                    invalid_cids = db_sub_cids - current_valid_sub_cids
-                    
-                    # 3. 执行删除
-                    if invalid_cids:
-                        # 转换成元组供 SQL IN 语句使用
-                        invalid_cids_tuple = tuple(invalid_cids)
-                        cursor.execute("DELETE FROM p115_filesystem_cache WHERE id IN %s", (invalid_cids_tuple,))
-                        conn.commit()
-                        
-                        cleaned_count = len(invalid_cids)
-                        total_cleaned += cleaned_count
-                        logger.info(f"  ➜ [{dir_name}] 清理了 {cleaned_count} 个已失效的本地目录缓存。")
+                    cursor.execute(
+                        "DELETE FROM p115_filesystem_cache WHERE parent_id = %s AND sync_gen IS DISTINCT FROM %s",
+                        (str(cid), sync_gen)
+                    )
+                    cleaned_count = cursor.rowcount or 0
+                conn.commit()
+            if cleaned_count:
+                logger.info(f"  ➜ [{dir_name}] 清理了 {cleaned_count} 个已失效的本地目录缓存。")
         except Exception as e:
             logger.error(f"  ➜ 清理失效目录异常 [{dir_name}]: {e}")
 
+        return cached_count, cleaned_count
+
+    # 多个分类并发扫描：115 接口调用由客户端统一限速，并发只是让翻页等待与写库重叠
+    max_workers = max(1, min(total_cids, int(get_config().get(constants.CONFIG_OPTION_115_MAX_WORKERS, 3) or 1)))
+    total_cached = 0
+    total_cleaned = 0
+    finished = 0
+    update_progress(0, f"  ➜ 共 {total_cids} 个分类目录，使用 {max_workers} 个线程并发扫描...")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_name = {
+            executor.submit(sync_one_category, cid, dir_name): dir_name
+            for cid, dir_name in target_dirs.items()
+        }
+        for future in as_completed(future_to_name):
+            dir_name = future_to_name[future]
+            finished += 1
+            try:
+                cached_count, cleaned_count = future.result()
+                total_cached += cached_count
+                total_cleaned += cleaned_count
+            except Exception as e:
+                logger.error(f"  ➜ 同步目录树异常 [{dir_name}]: {e}")
+            update_progress(int(finished / total_cids * 100), f"  ➜ 已完成 {finished}/{total_cids} 个分类目录: [{dir_name}]")
+
+    if stop_requested.is_set():
+        update_progress(100, "任务已被用户手动终止。")
+        return
+
     update_progress(100, f"=== 同步结束！共更新 {total_cached} 个目录，清理 {total_cleaned} 个失效缓存 ===")
 
+# STRM 清单：超过该间隔 (或某分类在清单里还没有记录) 才做一次 os.walk 全盘对账，其余时候只按清单差集清理
+_STRM_MANIFEST_FULL_RECONCILE_KEY = 'p115_strm_manifest_last_full_reconcile'
+_STRM_MANIFEST_FULL_RECONCILE_INTERVAL = 24 * 3600
+# 本地 STRM 写入/字幕下载线程池大小，以及积压多少个任务时先收一次结果
+_STRM_SYNC_IO_WORKERS = 8
+_STRM_SYNC_IO_DRAIN_THRESHOLD = 1000
+
+
+def _strm_content_hash(content):
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def _load_strm_manifest():
+    """读取 STRM/字幕清单，返回 {local_path: row}。"""
+    manifest = {}
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT local_path, kind, target_cid, fid, pick_code, sha1, rel_path,
+                           content_hash, mtime, file_size
+                    FROM p115_strm_manifest
+                """)
+                for row in cursor.fetchall():
+                    manifest[row['local_path']] = dict(row)
+    except Exception as e:
+        logger.warning(f"  ➜ [STRM清单] 读取清单失败，本次将逐个校验本地文件: {e}")
+    return manifest
+
+
+def _save_strm_manifest(rows):
+    """批量写入新增/变化的清单行。"""
+    if not rows:
+        return
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            execute_values(cursor, """
+                INSERT INTO p115_strm_manifest (
+                    local_path, kind, target_cid, fid, pick_code, sha1, rel_path,
+                    content_hash, mtime, file_size, updated_at
+                ) VALUES %s
+                ON CONFLICT (local_path) DO UPDATE SET
+                    kind = EXCLUDED.kind,
+                    target_cid = EXCLUDED.target_cid,
+                    fid = EXCLUDED.fid,
+                    pick_code = EXCLUDED.pick_code,
+                    sha1 = EXCLUDED.sha1,
+                    rel_path = EXCLUDED.rel_path,
+                    content_hash = EXCLUDED.content_hash,
+                    mtime = EXCLUDED.mtime,
+                    file_size = EXCLUDED.file_size,
+                    updated_at = NOW()
+            """, [
+                (
+                    r['local_path'], r['kind'], r.get('target_cid'), r.get('fid'), r.get('pick_code'),
+                    r.get('sha1'), r.get('rel_path'), r.get('content_hash'), r.get('mtime'), r.get('file_size') or 0,
+                )
+                for r in rows
+            ], template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())", page_size=1000)
+        conn.commit()
+
+
+def _restore_missing_file_cache_rows(rows):
+    """
+    清单未变化的视频不再逐个 save_file_cache，这里只把 p115_filesystem_cache 中缺失的行批量补回，
+    避免缓存被清空/误删后永远得不到重建。返回补回的行数。
+    """
+    if not rows:
+        return 0
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM p115_filesystem_cache WHERE id = ANY(%s)",
+                (list({r['fid'] for r in rows}),),
+            )
+            existing_ids = {row['id'] for row in cursor.fetchall()}
+            missing = {}
+            seen_ids = set()
+            for r in rows:
+                if r['fid'] in existing_ids or r['fid'] in seen_ids:
+                    continue
+                seen_ids.add(r['fid'])
+                missing[(r['parent_id'], r['name'])] = r
+            if not missing:
+                return 0
+            execute_values(cursor, """
+                INSERT INTO p115_filesystem_cache (id, parent_id, name, sha1, pick_code, local_path, size)
+                VALUES %s
+                ON CONFLICT (parent_id, name) DO UPDATE SET
+                    id = EXCLUDED.id,
+                    sha1 = EXCLUDED.sha1,
+                    pick_code = EXCLUDED.pick_code,
+                    local_path = EXCLUDED.local_path,
+                    size = CASE WHEN EXCLUDED.size > 0 THEN EXCLUDED.size ELSE p115_filesystem_cache.size END,
+                    updated_at = NOW()
+            """, [
+                (r['fid'], r['parent_id'], r['name'], r.get('sha1'), r.get('pick_code'), r.get('local_path'), r.get('size') or 0)
+                for r in missing.values()
+            ], page_size=1000)
+        conn.commit()
+    return len(missing)
+
+
+def _delete_strm_manifest_rows(paths):
+    if not paths:
+        return
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM p115_strm_manifest WHERE local_path = ANY(%s)", (list(paths),))
+        conn.commit()
+
+
+def _strm_manifest_stat_matches(entry, local_path):
+    """清单记录的 mtime/大小与本地文件一致，说明上次写入后没被外部改动（只 stat，不打开文件）。"""
+    if not entry or entry.get('mtime') is None:
+        return False
+    try:
+        st = os.stat(local_path)
+    except OSError:
+        return False
+    return abs(float(entry['mtime']) - st.st_mtime) < 0.001 and int(entry.get('file_size') or 0) == st.st_size
+
+
 def task_full_sync_strm_and_subs(processor=None):
     """
     【V4 终极上帝视角版】全量生成 STRM 与 同步字幕
@@ -1155,6 +1310,7 @@ def task_full_sync_strm_and_subs(processor=None):
         logger.warning(f"  ➜ 无法暂停监控队列: {e}")
         resume_queue_processing = lambda: None # 兜底防报错
 
+    io_pool = None
     try:
         local_root = config.get(constants.CONFIG_OPTION_LOCAL_STRM_ROOT)
         etk_url = config.get(constants.CONFIG_OPTION_ETK_SERVER_URL, "").rstrip('/')
@@ -1197,11 +1353,15 @@ def task_full_sync_strm_and_subs(processor=None):
                 cid_to_rel_path[cid] = r.get('category_path') or r.get('dir_name', '未识别')
 
         # 加载 DB 中的目录树 (新增提取 local_path)
+        # 只有目录会作为父节点参与路径推导，文件行 (带 PC/SHA1) 不进内存
         dir_cache = {} 
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("SELECT id, parent_id, name, local_path FROM p115_filesystem_cache")
+                    cursor.execute("""
+                        SELECT id, parent_id, name, local_path FROM p115_filesystem_cache
+                        WHERE COALESCE(pick_code, '') = '' AND COALESCE(sha1, '') = ''
+                    """)
                     for row in cursor.fetchall():
                         dir_cache[str(row['id'])] = {
                             'pid': str(row['parent_id']), 
@@ -1212,6 +1372,21 @@ def task_full_sync_strm_and_subs(processor=None):
             update_progress(100, f"读取本地目录缓存失败: {e}")
             return
 
+        # 加载上次生成的 STRM/字幕清单：内容与 mtime 都没变的文件直接跳过，不再逐个 open
+        strm_manifest = _load_strm_manifest()
+        manifest_path_by_fid = {
+            str(row['fid']): path for path, row in strm_manifest.items()
+            if row.get('kind') == 'strm' and row.get('fid')
+        }
+        manifest_seen_paths = set()
+        manifest_changed_rows = []
+        pending_io = []
+        io_pool = ThreadPoolExecutor(max_workers=_STRM_SYNC_IO_WORKERS)
+        # 字幕下载走 115 直链，沿用 115 并发配置限流
+        subtitle_download_slots = threading.BoundedSemaphore(
+            max(1, int(config.get(constants.CONFIG_OPTION_115_MAX_WORKERS, 3) or 1))
+        )
+
         # 动态 API 路径缓存池 (防止重复请求 115 接口)
         dynamic_path_cache = {}
         remote_file_ids = set()
@@ -1398,8 +1573,81 @@ def task_full_sync_strm_and_subs(processor=None):
                     logger.warning(f"  ➜ [全量同步] 路径异常文件移动异常：{e}")
             return moved_count
 
+        def write_strm_job(strm_path, content, old_path=None):
+            """线程池任务：网盘文件移动过则先把旧 STRM 挪过来，再按内容比对写入。"""
+            if old_path and not os.path.exists(strm_path) and os.path.exists(old_path) and not is_virtual_strm_file(old_path):
+                try:
+                    os.replace(old_path, strm_path)
+                    logger.debug(f"  ➜ [移动] STRM 跟随网盘路径变化: {old_path} -> {strm_path}")
+                except OSError as e:
+                    logger.debug(f"  ➜ [移动] 迁移旧 STRM 失败，改为重新生成: {e}")
+
+            was_existing = os.path.exists(strm_path)
+            need_write = True
+            if was_existing:
+                try:
+                    with open(strm_path, 'r', encoding='utf-8') as f:
+                        old_content = f.read().strip()
+                        if old_content == content:
+                            need_write = False
+                        else:
+                            logger.debug(f"  ➜ [更新] 内容不一致触发覆盖 -> 旧: [{old_content}] | 新: [{content}]")
+                except Exception:
+                    pass
+
+            if need_write:
+                with open(strm_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                if not was_existing:
+                    logger.debug(f"  ➜ [新增] 生成 STRM: {os.path.basename(strm_path)}")
+            return was_existing, need_write, os.stat(strm_path)
+
+        def download_sub_job(pc, sub_path, name):
+            """线程池任务：下载字幕，本地已存在则只登记清单。"""
+            if os.path.exists(sub_path):
+                return False, os.stat(sub_path)
+            import requests
+            with subtitle_download_slots:
+                url_obj = client.download_url(pc, user_agent="Mozilla/5.0")
+                if not url_obj:
+                    return False, None
+                headers = {"User-Agent": "Mozilla/5.0", "Cookie": P115Service.get_cookies()}
+                resp = requests.get(str(url_obj), stream=True, timeout=15, headers=headers)
+                resp.raise_for_status()
+                with open(sub_path, 'wb') as f:
+                    for chunk in resp.iter_content(8192):
+                        f.write(chunk)
+            logger.info(f"  ⬇️ [增量] 下载字幕: {name}")
+            return True, os.stat(sub_path)
+
+        def drain_pending_io():
+            """在主线程收集线程池结果，更新计数并登记清单。"""
+            nonlocal files_generated, subs_downloaded
+            for kind, future, manifest_row in pending_io:
+                try:
+                    if kind == 'strm':
+                        was_existing, written, st = future.result()
+                        if written:
+                            files_generated += 1
+                            if was_existing:
+                                changed_strm_files.add(manifest_row['local_path'])
+                    else:
+                        downloaded, st = future.result()
+                        if downloaded:
+                            subs_downloaded += 1
+                        if st is None:
+                            continue
+                except Exception as e:
+                    label = "下载字幕失败" if kind == 'sub' else "写入 STRM 失败"
+                    logger.error(f"  ➜ {label} [{os.path.basename(manifest_row['local_path'])}]: {e}")
+                    continue
+                manifest_row['mtime'] = st.st_mtime
+                manifest_row['file_size'] = st.st_size
+                manifest_changed_rows.append(manifest_row)
+            pending_io.clear()
+
         def process_full_sync_items(items, target_cid, category_name):
-            nonlocal files_generated, subs_downloaded, root_anomaly_skipped
+            nonlocal root_anomaly_skipped
             for item in items:
                 # 兼容 OpenAPI、Cookie 和 p115client 标准化字段
                 name = first_present(item.get('fn'), item.get('n'), item.get('file_name'), item.get('name')) or ''
@@ -1452,31 +1700,33 @@ def task_full_sync_strm_and_subs(processor=None):
                     if rename_config.get('strm_url_fmt') == 'with_name':
                         content = f"{content}/{name}"
 
-                    need_write = True
-                    if os.path.exists(strm_path):
-                        try:
-                            with open(strm_path, 'r', encoding='utf-8') as f:
-                                old_content = f.read().strip()
-                                if old_content == content:
-                                    need_write = False
-                                else:
-                                    logger.debug(f"  ➜ [更新] 内容不一致触发覆盖 -> 旧: [{old_content}] | 新: [{content}]")
-                        except Exception:
-                            pass
-
-                    if need_write:
-                        was_existing_strm = os.path.exists(strm_path)
-                        with open(strm_path, 'w', encoding='utf-8') as f:
-                            f.write(content)
-                        if not was_existing_strm:
-                            logger.debug(f"  ➜ [新增] 生成 STRM: {strm_name}")
-                        else:
-                            changed_strm_files.add(os.path.abspath(strm_path))
-                        files_generated += 1
-
-                    valid_local_files.add(os.path.abspath(strm_path))
-
                     sha1 = item.get('sha1') or item.get('sha')
+                    strm_abs = os.path.abspath(strm_path)
+                    content_hash = _strm_content_hash(content)
+                    manifest_entry = strm_manifest.get(strm_abs)
+                    manifest_seen_paths.add(strm_abs)
+                    valid_local_files.add(strm_abs)
+
+                    # 清单命中 (内容、fid、sha1 一致) 且本地文件没被动过：不读不写，也不重写文件缓存
+                    strm_unchanged = (
+                        manifest_entry is not None
+                        and manifest_entry.get('content_hash') == content_hash
+                        and str(manifest_entry.get('fid') or '') == str(fid or '')
+                        and str(manifest_entry.get('sha1') or '') == str(sha1 or '')
+                        and _strm_manifest_stat_matches(manifest_entry, strm_abs)
+                    )
+
+                    if not strm_unchanged:
+                        old_path = manifest_path_by_fid.get(str(fid)) if fid else None
+                        if old_path == strm_abs:
+                            old_path = None
+                        manifest_row = {
+                            'local_path': strm_abs, 'kind': 'strm', 'target_cid': str(target_cid),
+                            'fid': str(fid) if fid else None, 'pick_code': pc, 'sha1': sha1,
+                            'rel_path': os.path.join(rel_dir, strm_name).replace('\\', '/'),
+                            'content_hash': content_hash,
+                        }
+                        pending_io.append(('strm', io_pool.submit(write_strm_job, strm_abs, content, old_path), manifest_row))
 
                     # 生成 Mediainfo (等同 MP 直出逻辑)
                     if config.get(constants.CONFIG_OPTION_115_GENERATE_MEDIAINFO, False):
@@ -1494,13 +1744,13 @@ def task_full_sync_strm_and_subs(processor=None):
                                 if not mediainfo_text:
                                     prober = _StandaloneProber(client)
                                     probe_item = {'fid': fid, 'pc': pc, 'sha1': sha1, 'fn': name, 'fs': raw_size}
-                                    mediainfo_obj = prober._probe_mediainfo_with_ffprobe(probe_item, sha1=sha1, silent_log=True)
+                                    # 全量同步属于回填，排在整理/交互探测之后；结果由 ffprobe_pool 写入缓存
+                                    mediainfo_obj, _ = prober._probe_mediainfo_with_ffprobe(
+                                        probe_item, sha1=sha1, silent_log=True, priority=ffprobe_pool.PRIORITY_BACKFILL
+                                    ) or (None, None)
                                     if mediainfo_obj:
-                                        probe_sha1 = sha1 or probe_item.get('sha1')
-                                        if probe_sha1:
-                                            probe_sha1 = str(probe_sha1).upper()
-                                            P115CacheManager.save_mediainfo_cache(probe_sha1, mediainfo_obj)
-                                            sha1 = probe_sha1
+                                        if sha1:
+                                            sha1 = str(sha1).upper()
                                         mediainfo_text = json.dumps(mediainfo_obj, ensure_ascii=False, indent=2)
 
                                 if mediainfo_text:
@@ -1513,36 +1763,44 @@ def task_full_sync_strm_and_subs(processor=None):
                             if os.path.exists(mediainfo_filepath):
                                 valid_local_files.add(os.path.abspath(mediainfo_filepath))
 
-                    # 写入本地数据库缓存 (p115_filesystem_cache)
+                    # 写入本地数据库缓存 (p115_filesystem_cache)；清单未变化的先攒着，最后只批量补回缺失行
                     if pc and fid:
-                        file_local_path = os.path.join(rel_dir, name).replace('\\', '/')
                         synced_cache_file_ids.add(str(fid))
-                        P115CacheManager.save_file_cache(
-                            fid=fid, parent_id=pid, name=name,
-                            sha1=sha1, pick_code=pc,
-                            local_path=file_local_path, size=file_size
-                        )
+                        file_local_path = os.path.join(rel_dir, name).replace('\\', '/')
+                        if strm_unchanged:
+                            unchanged_cache_rows.append({
+                                'fid': str(fid), 'parent_id': str(pid), 'name': str(name), 'sha1': sha1,
+                                'pick_code': pc, 'local_path': file_local_path, 'size': safe_file_size,
+                            })
+                        else:
+                            P115CacheManager.save_file_cache(
+                                fid=fid, parent_id=pid, name=name,
+                                sha1=sha1, pick_code=pc,
+                                local_path=file_local_path, size=file_size
+                            )
 
                 # 处理字幕下载
                 elif ext in known_sub_exts and download_subs:
-                    sub_path = os.path.join(current_local_path, name)
-                    if not os.path.exists(sub_path):
-                        try:
-                            import requests
-                            url_obj = client.download_url(pc, user_agent="Mozilla/5.0")
-                            if url_obj:
-                                headers = {"User-Agent": "Mozilla/5.0", "Cookie": P115Service.get_cookies()}
-                                resp = requests.get(str(url_obj), stream=True, timeout=15, headers=headers)
-                                resp.raise_for_status()
-                                with open(sub_path, 'wb') as f:
-                                    for chunk in resp.iter_content(8192):
-                                        f.write(chunk)
-                                logger.info(f"  ⬇️ [增量] 下载字幕: {name}")
-                                subs_downloaded += 1
-                        except Exception as e:
-                            logger.error(f"  ➜ 下载字幕失败 [{name}]: {e}")
+                    sub_path = os.path.abspath(os.path.join(current_local_path, name))
+                    manifest_seen_paths.add(sub_path)
+                    valid_local_files.add(sub_path)
+                    sub_entry = strm_manifest.get(sub_path)
+                    if (
+                        sub_entry is not None
+                        and str(sub_entry.get('fid') or '') == str(fid or '')
+                        and _strm_manifest_stat_matches(sub_entry, sub_path)
+                    ):
+                        continue
 
-                    valid_local_files.add(os.path.abspath(sub_path))
+                    manifest_row = {
+                        'local_path': sub_path, 'kind': 'sub', 'target_cid': str(target_cid),
+                        'fid': str(fid) if fid else None, 'pick_code': pc, 'sha1': item.get('sha1') or item.get('sha'),
+                        'rel_path': os.path.join(rel_dir, name).replace('\\', '/'),
+                    }
+                    pending_io.append(('sub', io_pool.submit(download_sub_job, pc, sub_path, name), manifest_row))
+
+                if len(pending_io) >= _STRM_SYNC_IO_DRAIN_THRESHOLD:
+                    drain_pending_io()
 
         def run_cookie_fast_sync(target_cid, category_name, progress):
             raw_p115_client = getattr(client, 'raw_client', None)
@@ -1607,6 +1865,7 @@ def task_full_sync_strm_and_subs(processor=None):
         subs_downloaded = 0
         root_anomaly_skipped = 0
         changed_strm_files = set()
+        unchanged_cache_rows = []
         
         fetch_types = [4] # 4=视频
         if download_subs: fetch_types.append(1) # 1=文档(含字幕)
@@ -1672,6 +1931,18 @@ def task_full_sync_strm_and_subs(processor=None):
             if not target_invalid:
                 successful_target_cids.add(target_cid)
 
+        drain_pending_io()
+        try:
+            _save_strm_manifest(manifest_changed_rows)
+        except Exception as e:
+            logger.warning(f"  ➜ [STRM清单] 写入清单失败，下次同步将重新校验这些文件: {e}")
+        try:
+            restored_cache_rows = _restore_missing_file_cache_rows(unchanged_cache_rows)
+            if restored_cache_rows:
+                logger.info(f"  ➜ [全量同步] 已补回 {restored_cache_rows} 条缺失的 115 文件缓存。")
+        except Exception as e:
+            logger.warning(f"  ➜ [全量同步] 补回缺失的 115 文件缓存失败: {e}")
+        unchanged_cache_rows.clear()
         logger.info(f"  ➜ 增量同步完成！新增/更新 STRM: {files_generated} 个, 下载字幕: {subs_downloaded} 个。")
         moved_path_anomaly_count = move_path_anomaly_files_to_inbox()
         if root_anomaly_skipped:
@@ -1763,8 +2034,33 @@ def task_full_sync_strm_and_subs(processor=None):
 
                         conn.commit()
 
+                # 清单差集：上次生成过、本次远端已不存在的文件
+                stale_manifest_paths = [
+                    path for path, row in strm_manifest.items()
+                    if path not in manifest_seen_paths and str(row.get('target_cid')) in successful_target_cids
+                ]
+                for strm_path in stale_manifest_paths:
+                    if strm_manifest[strm_path].get('kind') != 'strm' or not os.path.exists(strm_path):
+                        continue
+                    if is_virtual_strm_file(strm_path):
+                        logger.debug(f"  ➜ [三方对账] 保留虚拟入库 STRM: {strm_path}")
+                        continue
+                    try:
+                        os.remove(strm_path)
+                        cleaned_strm_files += 1
+                        logger.debug(f"  ➜ [三方对账] 删除远端已不存在的 STRM: {strm_path}")
+                    except Exception as e:
+                        logger.warning(f"  ➜ [三方对账] 删除失效 STRM 失败 {strm_path}: {e}")
+                _delete_strm_manifest_rows(stale_manifest_paths)
+
+                # 距上次全盘对账超过周期时全部分类 os.walk 兜底清理清单之外的 STRM；
+                # 清单里还没有记录的分类 (首次/升级后/新增分类) 本次也立即对账
+                last_full_reconcile = (settings_db.get_setting(_STRM_MANIFEST_FULL_RECONCILE_KEY) or {}).get('ts') or 0
+                need_full_walk = not strm_manifest or (time.time() - float(last_full_reconcile)) > _STRM_MANIFEST_FULL_RECONCILE_INTERVAL
+                manifest_cids = {str(row.get('target_cid')) for row in strm_manifest.values()}
+                walk_cids = target_cid_list if need_full_walk else [cid for cid in target_cid_list if str(cid) not in manifest_cids]
                 valid_strm_paths = {p for p in valid_local_files if p.lower().endswith('.strm')}
-                for cid in target_cid_list:
+                for cid in walk_cids:
                     rel_path = cid_to_rel_path.get(cid)
                     if not rel_path:
                         continue
@@ -1788,6 +2084,9 @@ def task_full_sync_strm_and_subs(processor=None):
                             except Exception as e:
                                 logger.warning(f"  ➜ [三方对账] 删除失效 STRM 失败 {strm_path}: {e}")
 
+                if need_full_walk and target_cid_list:
+                    settings_db.save_setting(_STRM_MANIFEST_FULL_RECONCILE_KEY, {'ts': time.time()})
+
                 logger.info(
                     f"  ➜ [三方对账] 缓存新增/更新目录 {len(remote_dir_cache_rows)} 条，"
                     f"清理失踪文件缓存 {deleted_cache_files} 条、空目录缓存 {deleted_cache_dirs} 条、"
@@ -1928,6 +2227,8 @@ def task_full_sync_strm_and_subs(processor=None):
         logger.error(f"  ➜ 全量同步任务异常: {e}", exc_info=True)
         update_progress(100, f"任务异常结束: {e}")
     finally:
+        if io_pool is not None:
+            io_pool.shutdown(wait=True)
         # ★ 任务结束（无论成功失败），务必解除监控队列抑制，恢复处理
         try:
             resume_queue_processing()
@@ -2495,13 +2796,12 @@ def task_monitor_115_life_events(processor=None):
                                         'fn': file_name, 'file_name': file_name,
                                         'fs': file_size, 'size': file_size
                                     }
-                                    mediainfo_obj = prober._probe_mediainfo_with_ffprobe(probe_item, sha1=file_sha1, silent_log=False)
+                                    mediainfo_obj, _ = prober._probe_mediainfo_with_ffprobe(
+                                        probe_item, sha1=file_sha1, silent_log=False, priority=ffprobe_pool.PRIORITY_ORGANIZE
+                                    ) or (None, None)
                                     if mediainfo_obj:
-                                        probe_sha1 = file_sha1 or probe_item.get('sha1') or probe_item.get('sha')
-                                        if probe_sha1:
-                                            probe_sha1 = str(probe_sha1).upper()
-                                            P115CacheManager.save_mediainfo_cache(probe_sha1, mediainfo_obj)
-                                            file_sha1 = probe_sha1
+                                        if file_sha1:
+                                            file_sha1 = str(file_sha1).upper()
                                         mediainfo_text = json.dumps(mediainfo_obj, ensure_ascii=False, indent=2)
 
                                 if mediainfo_text:
@@ -3008,8 +3008,9 @@ def _raw_for_file(file_info: Dict[str, Any]) -> Dict[str, Any]:
         if not pick_code:
             return {}
         try:
+            from handler import ffprobe_pool
             from handler.p115_media_analyzer import P115MediaAnalyzerMixin
-            from handler.p115_service import P115CacheManager, P115Service
+            from handler.p115_service import P115Service
             analyzer = P115MediaAnalyzerMixin()
             analyzer.client = P115Service.get_client()
             if not analyzer.client:
@@ -3022,13 +3023,15 @@ def _raw_for_file(file_info: Dict[str, Any]) -> Dict[str, Any]:
                 'file_name': file_info.get('file_name') or file_info.get('name') or sha1,
                 'n': file_info.get('name') or file_info.get('file_name') or sha1,
             }
-            result = analyzer._probe_mediainfo_with_ffprobe(probe_file, sha1=sha1, silent_log=True)
+            # 探测结果由 ffprobe_pool 直接写入 p115_mediainfo_cache
+            result = analyzer._probe_mediainfo_with_ffprobe(
+                probe_file, sha1=sha1, silent_log=True, priority=ffprobe_pool.PRIORITY_BACKFILL
+            )
             if not result:
                 return {}
             emby_json, raw_probe = result if isinstance(result, tuple) else (result, None)
             if not isinstance(raw_probe, dict) or not raw_probe:
                 return {}
-            P115CacheManager.save_mediainfo_cache(sha1, emby_json if isinstance(emby_json, dict) else {}, raw_probe, file_info=probe_file)
             logger.info(
                 "  ➜ [共享资源] 已自动补齐缺失 RAW：%s",
                 file_info.get('file_name') or file_info.get('name') or sha1,
@@ -4,6 +4,7 @@
 import time
 import json
 import logging
+from datetime import datetime, timedelta, timezone
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 导入需要的底层模块和共享实例
@@ -14,11 +15,160 @@ from extensions import SYSTEM_UPDATE_MARKERS, SYSTEM_UPDATE_LOCK
 
 logger = logging.getLogger(__name__)
 
+# 用户数据同步参数
+_USER_DATA_SYNC_WORKERS = 4
+# 每个用户至少每 7 天做一次全量对账，兜底修正任何遗漏
+_USER_DATA_FULL_RECONCILE_INTERVAL = timedelta(days=7)
+# 没有 Webhook 变化标记时，隔多久仍做一次低频增量巡检 (防止 Webhook 丢失)
+_USER_DATA_SWEEP_INTERVAL = timedelta(hours=6)
+# 增量水位回退余量，抵消 Emby 与本机的时钟偏差
+_USER_DATA_WATERMARK_SLACK = timedelta(minutes=5)
+
+
+def _aggregate_user_items(items: list) -> list:
+    """把用户视角的条目聚合为入库粒度：电影用自身ID，分集聚合到剧集ID。"""
+    final_data_map = {}
+    for item in items:
+        item_type = item.get('Type')
+        item_id = item.get('Id')
+        # 聚合逻辑：电影用自身ID，分集聚合到剧集ID
+        target_id = item_id if item_type in ['Movie', 'Series'] else item.get('SeriesId')
+        if not target_id: continue
+
+        new_user_data = item.get('UserData', {})
+
+        # =========================================================
+        # ★★★ 核心修复：播放次数兜底逻辑 ★★★
+        # =========================================================
+        raw_play_count = new_user_data.get('PlayCount', 0)
+        is_played = new_user_data.get('Played', False)
+
+        # 如果 Emby 说“已播放”但次数是 0，强制修正为 1
+        if is_played and raw_play_count == 0:
+            current_play_count = 1
+        else:
+            current_play_count = raw_play_count
+        # =========================================================
+
+        if target_id not in final_data_map:
+            # --- 初始化新条目 ---
+            final_data_map[target_id] = item
+            if item_type == 'Episode':
+                final_data_map[target_id]['Id'] = target_id
+
+            # 确保 UserData 字典存在
+            if 'UserData' not in final_data_map[target_id]:
+                final_data_map[target_id]['UserData'] = {}
+
+            # 初始化 PlayCount
+            final_data_map[target_id]['UserData']['PlayCount'] = current_play_count
+
+            # 初始化 Played 状态 (如果是电影，直接用自己的；如果是分集，稍后聚合)
+            if 'Played' not in final_data_map[target_id]['UserData']:
+                 final_data_map[target_id]['UserData']['Played'] = is_played
+
+        else:
+            # --- 聚合到已存在的条目 (主要是剧集) ---
+            existing_item = final_data_map[target_id]
+            existing_ud = existing_item.get('UserData', {})
+
+            # 1. 更新播放进度 (取最新的)
+            if 'PlaybackPositionTicks' in new_user_data:
+                existing_ud['PlaybackPositionTicks'] = new_user_data['PlaybackPositionTicks']
+
+            # 2. 更新已播放状态 (逻辑：只要有一集是 Played，剧集记录就可能被更新，具体看 Emby 返回的 Series 自身状态，这里做累加辅助)
+            if 'Played' in new_user_data:
+                # 如果当前分集是已播放，或者之前的记录已经是已播放，则保持 true
+                existing_ud['Played'] = existing_ud.get('Played', False) or is_played
+
+            # 3. ★★★ 累加播放次数 ★★★
+            if 'PlayCount' not in existing_ud:
+                existing_ud['PlayCount'] = 0
+
+            existing_ud['PlayCount'] += current_play_count
+
+    return list(final_data_map.values())
+
+
+def _fetch_incremental_user_items(user_id: str, emby_url: str, emby_key: str, since: datetime):
+    """
+    增量拉取：只取水位之后 UserData 变化过的条目。
+    电影直接入库；受影响的剧集重新拉取该剧全部有状态分集后整体聚合，保证剧集级次数/状态准确。
+    返回 None 表示拉取失败。
+    """
+    changed = emby.get_user_view_data_changed_since(user_id, emby_url, emby_key, since)
+    if changed is None:
+        return None
+
+    movie_items = [it for it in changed if it.get('Type') == 'Movie']
+    series_ids = set()
+    for it in changed:
+        if it.get('Type') == 'Series' and it.get('Id'):
+            series_ids.add(it['Id'])
+        elif it.get('Type') == 'Episode' and it.get('SeriesId'):
+            series_ids.add(it['SeriesId'])
+
+    result = _aggregate_user_items(movie_items)
+    for series_id in series_ids:
+        episodes = emby.get_user_series_view_data(user_id, emby_url, emby_key, series_id)
+        if episodes is None:
+            return None
+        # 剧集自身条目放在最前面，保证收藏等剧集级状态以剧集为准
+        series_items = [it for it in changed if it.get('Id') == series_id and it.get('Type') == 'Series']
+        result.extend(_aggregate_user_items(series_items + episodes))
+    return result
+
+
+def _sync_one_user_data(processor, user: dict, emby_url: str, emby_key: str, state: dict) -> str:
+    """
+    同步单个用户的媒体状态，返回本次采用的模式：'full' / 'incremental' / 'skipped' / 'failed'。
+    - 从未全量同步或距上次全量超过对账周期：全量；
+    - 被 Webhook 标记为 dirty，或距上次同步超过巡检间隔：按水位增量；
+    - 其余情况直接跳过。
+    """
+    user_id = user.get('Id')
+    user_name = user.get('Name')
+    if processor.is_stop_requested():
+        return 'skipped'
+
+    now = datetime.now(timezone.utc)
+    last_synced_at = state.get('last_synced_at')
+    last_full_sync_at = state.get('last_full_sync_at')
+
+    if not last_synced_at or not last_full_sync_at or now - last_full_sync_at > _USER_DATA_FULL_RECONCILE_INTERVAL:
+        mode = 'full'
+    elif state.get('dirty_since') or now - last_synced_at > _USER_DATA_SWEEP_INTERVAL:
+        mode = 'incremental'
+    else:
+        return 'skipped'
+
+    if mode == 'full':
+        user_items_with_data = emby.get_all_user_view_data(user_id, emby_url, emby_key)
+        items_to_upsert = _aggregate_user_items(user_items_with_data) if user_items_with_data is not None else None
+    else:
+        items_to_upsert = _fetch_incremental_user_items(
+            user_id, emby_url, emby_key, last_synced_at - _USER_DATA_WATERMARK_SLACK
+        )
+
+    if items_to_upsert is None:
+        logger.warning(f"  ➜ 拉取用户 '{user_name}' 的媒体状态失败，保留原水位，下次重试。")
+        return 'failed'
+
+    if items_to_upsert:
+        user_db.upsert_user_media_data_batch(user_id, items_to_upsert)
+    user_db.save_user_sync_state(user_id, now, is_full=(mode == 'full'))
+
+    mode_label = "全量" if mode == 'full' else "增量"
+    logger.info(f"  ➜ 已为用户 '{user_name}' {mode_label}同步 {len(items_to_upsert)} 条媒体状态。")
+    return mode
+
+
 # ★★★ 用户数据全量同步任务 ★★★
 def task_sync_all_user_data(processor):
     """
-    【V2 - 双向同步版】用户数据全量同步任务
-    - 新增逻辑：在同步开始时，清理掉本地数据库中存在、但 Emby 服务器上已不存在的用户。
+    【V3 - 增量同步版】用户数据同步任务
+    - 在同步开始时，清理掉本地数据库中存在、但 Emby 服务器上已不存在的用户。
+    - 播放状态按用户水位增量同步 (Webhook 标记 + 低频巡检)，每个用户定期全量对账；用户间并发处理。
     """
     task_name = "同步用户数据"
     logger.trace(f"--- 开始执行 '{task_name}' 任务 ---")
@@ -83,89 +233,34 @@ def task_sync_all_user_data(processor):
         task_manager.update_status_from_thread(8, "正在同步用户注册时间与扩展状态...")
         user_db.upsert_emby_users_extended_batch_sync(all_users_basic)
         
-        # 步骤 4: 循环同步每个用户的媒体播放状态
+        # 步骤 4: 并发同步每个用户的媒体播放状态 (按水位增量，定期全量对账)
         total_users = len(all_users_basic)
-        logger.info(f"  ➜ 共找到 {total_users} 个Emby用户，将逐一同步其数据...")
-
-        for i, user in enumerate(all_users_basic):
-            user_id = user.get('Id')
-            user_name = user.get('Name')
-            if not user_id: continue
-            if processor.is_stop_requested(): break
-
-            progress = 10 + int((i / total_users) * 90)
-            task_manager.update_status_from_thread(progress, f"({i+1}/{total_users}) 正在同步用户: {user_name}")
-
-            user_items_with_data = emby.get_all_user_view_data(user_id, emby_url, emby_key)
-            if not user_items_with_data:
-                continue
-            
-            final_data_map = {}
-            for item in user_items_with_data:
-                item_type = item.get('Type')
-                item_id = item.get('Id')
-                # 聚合逻辑：电影用自身ID，分集聚合到剧集ID
-                target_id = item_id if item_type in ['Movie', 'Series'] else item.get('SeriesId')
-                if not target_id: continue
-
-                new_user_data = item.get('UserData', {})
-                
-                # =========================================================
-                # ★★★ 核心修复：播放次数兜底逻辑 ★★★
-                # =========================================================
-                raw_play_count = new_user_data.get('PlayCount', 0)
-                is_played = new_user_data.get('Played', False)
-                
-                # 如果 Emby 说“已播放”但次数是 0，强制修正为 1
-                if is_played and raw_play_count == 0:
-                    current_play_count = 1
-                else:
-                    current_play_count = raw_play_count
-                # =========================================================
-
-                if target_id not in final_data_map:
-                    # --- 初始化新条目 ---
-                    final_data_map[target_id] = item
-                    if item_type == 'Episode':
-                        final_data_map[target_id]['Id'] = target_id
-                    
-                    # 确保 UserData 字典存在
-                    if 'UserData' not in final_data_map[target_id]:
-                        final_data_map[target_id]['UserData'] = {}
-                    
-                    # 初始化 PlayCount
-                    final_data_map[target_id]['UserData']['PlayCount'] = current_play_count
-                    
-                    # 初始化 Played 状态 (如果是电影，直接用自己的；如果是分集，稍后聚合)
-                    if 'Played' not in final_data_map[target_id]['UserData']:
-                         final_data_map[target_id]['UserData']['Played'] = is_played
-
-                else:
-                    # --- 聚合到已存在的条目 (主要是剧集) ---
-                    existing_item = final_data_map[target_id]
-                    existing_ud = existing_item.get('UserData', {})
-                    
-                    # 1. 更新播放进度 (取最新的)
-                    if 'PlaybackPositionTicks' in new_user_data:
-                        existing_ud['PlaybackPositionTicks'] = new_user_data['PlaybackPositionTicks']
-                    
-                    # 2. 更新已播放状态 (逻辑：只要有一集是 Played，剧集记录就可能被更新，具体看 Emby 返回的 Series 自身状态，这里做累加辅助)
-                    if 'Played' in new_user_data:
-                        # 如果当前分集是已播放，或者之前的记录已经是已播放，则保持 true
-                        existing_ud['Played'] = existing_ud.get('Played', False) or is_played
-                    
-                    # 3. ★★★ 累加播放次数 ★★★
-                    if 'PlayCount' not in existing_ud:
-                        existing_ud['PlayCount'] = 0
-                    
-                    existing_ud['PlayCount'] += current_play_count
-            
-            # 将 map 转换为 list 准备入库
-            final_data_to_upsert = list(final_data_map.values())
-            
-            user_db.upsert_user_media_data_batch(user_id, final_data_to_upsert)
-            
-            logger.info(f"  ➜ 成功为用户 '{user_name}' 同步了 {len(final_data_to_upsert)} 条媒体状态。")
+        sync_states = user_db.get_user_sync_states()
+        logger.info(f"  ➜ 共找到 {total_users} 个Emby用户，将以 {_USER_DATA_SYNC_WORKERS} 并发同步其数据...")
+
+        stats = {'full': 0, 'incremental': 0, 'skipped': 0, 'failed': 0}
+        with ThreadPoolExecutor(max_workers=_USER_DATA_SYNC_WORKERS) as executor:
+            future_to_user = {
+                executor.submit(
+                    _sync_one_user_data, processor, user, emby_url, emby_key, sync_states.get(user.get('Id')) or {}
+                ): user
+                for user in all_users_basic if user.get('Id')
+            }
+            for i, future in enumerate(as_completed(future_to_user)):
+                user_name = future_to_user[future].get('Name')
+                try:
+                    mode = future.result()
+                except Exception as e:
+                    logger.error(f"  ➜ 同步用户 '{user_name}' 的媒体状态失败: {e}", exc_info=True)
+                    mode = 'failed'
+                stats[mode] = stats.get(mode, 0) + 1
+                progress = 10 + int(((i + 1) / total_users) * 90)
+                task_manager.update_status_from_thread(min(progress, 99), f"({i+1}/{total_users}) 已同步用户: {user_name}")
+
+        logger.info(
+            f"  ➜ 用户数据同步统计: 全量 {stats['full']}，增量 {stats['incremental']}，"
+            f"无变化跳过 {stats['skipped']}，失败 {stats['failed']}。"
+        )
 
         final_message = f"任务完成！已成功为 {total_users} 个用户同步数据。"
         if processor.is_stop_requested(): final_message = "任务已中断。"
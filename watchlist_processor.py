@@ -7,7 +7,7 @@ import re
 import requests
 import concurrent.futures
 from typing import Optional, Dict, Any, List, Tuple
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta, time as dt_time
 import threading
 from collections import defaultdict
 from decimal import Decimal
@@ -84,6 +84,53 @@ def _safe_int(value: Any, default: int = 0) -> int:
         return default
 
 
+# ★★★ 追剧调度：常规追剧任务只处理 watchlist_next_check_at 已到期的剧集 ★★★
+_CHECK_INTERVAL_AIRING_SOON = timedelta(hours=6)     # 下一集 1 天内播出
+_CHECK_INTERVAL_PENDING = timedelta(days=1)          # 待定 (新剧保护，TMDb 集数变动频繁)
+_CHECK_MAX_WAIT_WATCHING = timedelta(days=7)         # 已知下一集播出日期时，最长多久复查一次排期
+_CHECK_MAX_WAIT_PAUSED = timedelta(days=14)
+_CHECK_BACKOFF_NO_SCHEDULE = (                       # 无下一集排期：按距上一集播出天数退避
+    (7, timedelta(hours=12)),
+    (30, timedelta(days=1)),
+)
+_CHECK_BACKOFF_NO_SCHEDULE_MAX = timedelta(days=3)
+
+
+def _compute_next_check_at(
+    status: str,
+    next_air_date,
+    days_since_last: int,
+    today,
+) -> Optional[datetime]:
+    """
+    根据追剧判定结果计算下次常规检查时间。
+    - 已完结返回 None (不参与常规追剧，由“已完结剧集复活检查”负责)；
+    - 有下一集排期时，在播出前一天复查，远期排期按状态封顶退避；
+    - 无排期时按距上一集播出的天数退避，暂停状态间隔加倍。
+    """
+    if status == STATUS_COMPLETED:
+        return None
+    now = datetime.now(timezone.utc)
+    if status == STATUS_PENDING:
+        return now + _CHECK_INTERVAL_PENDING
+
+    if next_air_date:
+        if (next_air_date - today).days <= 1:
+            return now + _CHECK_INTERVAL_AIRING_SOON
+        day_before_air = datetime.combine(next_air_date - timedelta(days=1), dt_time.min, tzinfo=timezone.utc)
+        max_wait = _CHECK_MAX_WAIT_PAUSED if status == STATUS_PAUSED else _CHECK_MAX_WAIT_WATCHING
+        return max(now + _CHECK_INTERVAL_AIRING_SOON, min(day_before_air, now + max_wait))
+
+    interval = _CHECK_BACKOFF_NO_SCHEDULE_MAX
+    for max_days, step in _CHECK_BACKOFF_NO_SCHEDULE:
+        if days_since_last <= max_days:
+            interval = step
+            break
+    if status == STATUS_PAUSED:
+        interval *= 2
+    return now + interval
+
+
 def _shared_resource_auto_share_enabled() -> bool:
     try:
         cfg = settings_db.get_shared_resource_config() or {}
@@ -285,9 +332,14 @@ class WatchlistProcessor:
                 today_str = datetime.now().date().isoformat()
                 where_clause = f"""
                     WHERE watching_status IN ('{STATUS_WATCHING}', '{STATUS_PENDING}', '{STATUS_PAUSED}')
+                      AND (watchlist_next_check_at IS NULL OR watchlist_next_check_at <= NOW())
                 """
 
             active_series = self._get_series_to_process(where_clause, tmdb_id=tmdb_id)
+            if not tmdb_id and active_series:
+                # 按到期先后处理：从未检查过 / 被 Webhook 提前的剧集优先
+                active_series.sort(key=lambda s: s.get('watchlist_next_check_at') or datetime.min.replace(tzinfo=timezone.utc))
+                logger.info(f"  ➜ [追剧调度] 本轮到期需检查的活跃剧集: {len(active_series)} 部。")
             
             if active_series:
                 total = len(active_series)
@@ -3669,7 +3721,10 @@ class WatchlistProcessor:
             "watchlist_next_episode_json": json.dumps(real_next_episode_to_air) if real_next_episode_to_air else None,
             "watchlist_missing_info_json": json.dumps(missing_info),
             "last_episode_to_air_json": json.dumps(last_episode_to_air) if last_episode_to_air else None,
-            "watchlist_is_airing": is_truly_airing
+            "watchlist_is_airing": is_truly_airing,
+            "watchlist_next_check_at": _compute_next_check_at(
+                final_status, effective_next_episode_air_date, days_since_last, today
+            ),
         }
         
         # ★ 将标志位合入数据库更新字典